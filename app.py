@@ -1,13 +1,68 @@
+import io
+import json
+import threading
 from uuid import uuid4
-from flask import Flask, request, render_template_string, send_file, redirect, url_for
-from engine import generate_pdf_report
+from flask import (
+    Flask, Response, request, send_file, redirect,
+    stream_with_context, url_for,
+)
+from jinja2 import Template
+from engine import (
+    REPORT_PDF_BACKENDS, ReportResult, generate_report, pdf_render_stats,
+    release_report_files, warm_templates,
+)
 
 app = Flask(__name__)
 app.secret_key = "dev"  # для MVP
 
-# token -> (pdf_path, download_name)
-REPORTS: dict[str, tuple[str, str]] = {}
+# token -> ReportResult (PDF в памяти; на диск пишется, только если включено в engine)
+REPORTS: dict[str, ReportResult] = {}
 MAX_REPORTS_IN_MEMORY = 50  # чтобы память не раздувалась на долгой работе сервера
+MAX_REPORT_BYTES_IN_MEMORY = 200 * 1024 * 1024
+
+SSE_KEEPALIVE_SEC = 15  # комментарий-пинг, чтобы прокси не закрывали соединение
+
+# Одновременных генераций не больше этого (OCR, LLM и печать PDF — тяжёлые);
+# лишние запросы получают 503 «сервер занят», а не очередь из потоков
+MAX_CONCURRENT_JOBS = 8
+BUSY_MESSAGE = "Сервер сейчас занят формированием других отчётов. Повторите попытку через минуту."
+
+
+class ReportJob:
+    """
+    Фоновая генерация отчёта: накопленный текст LLM + итог (готово/ошибка).
+    Поток генерации пишет, SSE-поток читает (через Condition).
+    """
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.version = 0
+        self.text = ""
+        self.done = False
+        self.error: str | None = None
+
+    def update(self, **fields) -> None:
+        with self.cond:
+            for k, v in fields.items():
+                setattr(self, k, v)
+            self.version += 1
+            self.cond.notify_all()
+
+    def wait_change(self, seen_version: int, timeout: float) -> tuple:
+        """Ждёт изменения после seen_version; возвращает снимок (version, text, done, error)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != seen_version, timeout=timeout)
+            return self.version, self.text, self.done, self.error
+
+
+# token -> ReportJob
+JOBS: dict[str, ReportJob] = {}
+
+# REPORTS и JOBS меняют и обработчики запросов, и фоновые потоки генерации
+_STORE_LOCK = threading.Lock()
+
+# Свободные места под генерацию; занимает generate(), освобождает поток генерации
+_JOB_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS)
 
 FORM_HTML = """
 <!doctype html>
@@ -116,7 +171,7 @@ READY_HTML = """
 <html lang="ru">
 <head>
   <meta charset="utf-8">
-  <title>Отчёт готов</title>
+  <title>Формирование отчёта</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
   <style>
     body{font-family:Arial, sans-serif; max-width:900px; margin:24px auto; padding:0 12px;}
@@ -124,21 +179,29 @@ READY_HTML = """
     .btn{margin-top:14px; padding:14px 16px; font-size:16px; cursor:pointer; width:100%;}
     .hint{color:#666; font-size:14px; margin-top:8px; line-height:1.4;}
     .ok{font-size:18px; font-weight:700;}
+    .err{background:#fff3f3; border:1px solid #ffb3b3; padding:10px; border-radius:8px; margin:12px 0;}
+    .llm{white-space:pre-wrap; line-height:1.45; margin-top:12px;}
+    .hidden{display:none;}
   </style>
 </head>
 <body>
   <h2>Расшифровка анализов — PDF отчёт</h2>
 
   <div class="card">
-    <div class="ok">✅ Отчёт готов</div>
-    <div class="hint">
-      Нажмите кнопку ниже, чтобы скачать PDF.
-    </div>
+    <div id="status" class="ok">⏳ Идёт обработка и формирование PDF…</div>
+    <div id="error" class="err hidden"></div>
+    <div id="llm" class="llm"></div>
 
-    <form method="get" action="/download/{{ token }}">
+    <form id="downloadForm" class="hidden" method="get" action="/download/{{ token }}">
       <button class="btn" type="submit">Скачать PDF</button>
     </form>
 
+    <noscript>
+      <div class="hint">
+        Через 10–30 секунд откройте <a href="/download/{{ token }}">ссылку на PDF</a>.
+      </div>
+    </noscript>
+
     <form method="get" action="/">
       <button class="btn" type="submit">Сформировать новый отчёт</button>
     </form>
@@ -147,6 +210,29 @@ READY_HTML = """
       Дисклеймер: отчёт носит справочный характер, не является диагнозом и назначением лечения.
     </div>
   </div>
+
+  <script>
+    (function(){
+      var es = new EventSource("/stream/{{ token }}");
+      var llm = document.getElementById("llm");
+      es.addEventListener("text", function(e){
+        llm.textContent = JSON.parse(e.data).text;
+      });
+      es.addEventListener("done", function(){
+        es.close();
+        document.getElementById("status").textContent = "✅ Отчёт готов";
+        document.getElementById("downloadForm").classList.remove("hidden");
+      });
+      es.addEventListener("error", function(e){
+        if (!e.data) { return; }  // обрыв соединения — EventSource переподключится сам
+        es.close();
+        document.getElementById("status").textContent = "❌ Не удалось сформировать отчёт";
+        var box = document.getElementById("error");
+        box.textContent = JSON.parse(e.data).message;
+        box.classList.remove("hidden");
+      });
+    })();
+  </script>
 </body>
 </html>
 """
@@ -154,17 +240,86 @@ READY_HTML = """
 
 def _trim_reports_cache() -> None:
     # удаляем самые старые записи, если их слишком много
-    if len(REPORTS) <= MAX_REPORTS_IN_MEMORY:
-        return
     # dict сохраняет порядок вставки (Python 3.7+)
-    to_drop = len(REPORTS) - MAX_REPORTS_IN_MEMORY
-    for k in list(REPORTS.keys())[:to_drop]:
-        REPORTS.pop(k, None)
+    evicted: list[ReportResult] = []
+    with _STORE_LOCK:
+        if len(REPORTS) > MAX_REPORTS_IN_MEMORY:
+            for k in list(REPORTS.keys())[:len(REPORTS) - MAX_REPORTS_IN_MEMORY]:
+                evicted.append(REPORTS.pop(k))
+        # незавершённые задачи не трогаем: их /stream ещё ждёт клиент
+        to_drop = len(JOBS) - MAX_REPORTS_IN_MEMORY
+        for k in list(JOBS.keys()):
+            if to_drop <= 0:
+                break
+            job = JOBS[k]
+            if job.done or job.error:
+                del JOBS[k]
+                to_drop -= 1
+        # и ограничиваем суммарный объём PDF в памяти
+        total = sum(len(r.pdf_bytes) for r in REPORTS.values())
+        for k in list(REPORTS.keys()):
+            if total <= MAX_REPORT_BYTES_IN_MEMORY:
+                break
+            report = REPORTS.pop(k, None)
+            if report is not None:
+                evicted.append(report)
+                total -= len(report.pdf_bytes)
+    # файлы вытесненных отчётов (если они сохранялись на диск) удалит уборщик
+    for report in evicted:
+        release_report_files(report)
+
+
+def _run_report_job(token: str, job: ReportJob, **kwargs) -> None:
+    """Генерация отчёта в фоне; текст LLM уходит в job по мере генерации."""
+    try:
+        report = generate_report(
+            on_llm_text=lambda text: job.update(text=text),
+            **kwargs,
+        )
+    except Exception as e:
+        job.update(error=str(e))
+        return
+    with _STORE_LOCK:
+        REPORTS[token] = report
+    # Отчёт уже сохранён: сбой уборки не должен превращать его в ошибку
+    try:
+        _trim_reports_cache()
+    except Exception as e:
+        app.logger.warning("Не удалось освободить старые отчёты: %s", e)
+    job.update(done=True)
+
+
+def _run_report_job_in_slot(token: str, job: ReportJob, **kwargs) -> None:
+    """_run_report_job, затем освобождает место, занятое в generate()."""
+    try:
+        _run_report_job(token, job, **kwargs)
+    finally:
+        _JOB_SLOTS.release()
+
+
+# Страницы компилируются один раз при импорте, а не на каждый запрос
+FORM_TEMPLATE = app.jinja_env.from_string(FORM_HTML)
+READY_TEMPLATE = app.jinja_env.from_string(READY_HTML)
+# Прогрев необязателен: без шаблона приложение стартует, а ошибка будет при рендере отчёта
+try:
+    warm_templates()
+except Exception as e:
+    app.logger.warning("Не удалось заранее скомпилировать шаблоны отчёта: %s", e)
+
+
+def _render_page(template: Template, **context) -> str:
+    """Как render_template_string, но с заранее скомпилированным шаблоном."""
+    app.update_template_context(context)
+    return template.render(context)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @app.get("/")
 def index():
-    return render_template_string(FORM_HTML, error=None, sex="м", age=30, raw_text="")
+    return _render_page(FORM_TEMPLATE, error=None, sex="м", age=30, raw_text="")
 
 
 @app.post("/generate")
@@ -183,6 +338,11 @@ def generate():
         if age < 0 or age > 120:
             raise ValueError("Возраст должен быть в диапазоне 0–120.")
 
+        # Необязательно: способ печати PDF (по умолчанию — engine.REPORT_PDF_BACKEND)
+        pdf_backend = (request.form.get("pdf_backend", "") or "").strip().lower() or None
+        if pdf_backend is not None and pdf_backend not in REPORT_PDF_BACKENDS:
+            raise ValueError("pdf_backend должен быть одним из: " + ", ".join(REPORT_PDF_BACKENDS) + ".")
+
         # Файл (опционально)
         up = request.files.get("file")
         file_bytes = None
@@ -195,24 +355,43 @@ def generate():
             filename = up.filename
             mimetype = up.mimetype or ""
 
-        pdf_path, download_name = generate_pdf_report(
-            sex=sex,
-            age=age,
-            raw_text=raw_text,
-            file_bytes=file_bytes,
-            filename=filename,
-            mimetype=mimetype,
-        )
+        if not raw_text and not file_bytes:
+            raise ValueError("Нужно либо вставить текст анализов, либо загрузить файл (PDF/фото).")
 
-        token = uuid4().hex
-        REPORTS[token] = (str(pdf_path), download_name)
-        _trim_reports_cache()
+        if not _JOB_SLOTS.acquire(blocking=False):
+            return _render_page(
+                FORM_TEMPLATE, error=BUSY_MESSAGE, sex=sex, age=age, raw_text=raw_text,
+            ), 503
 
-        return render_template_string(READY_HTML, token=token)
+        token = uuid4().hex
+        job = ReportJob()
+        with _STORE_LOCK:
+            JOBS[token] = job
+        try:
+            _trim_reports_cache()
+            threading.Thread(
+                target=_run_report_job_in_slot,
+                args=(token, job),
+                kwargs=dict(
+                    sex=sex,
+                    age=age,
+                    raw_text=raw_text,
+                    file_bytes=file_bytes,
+                    filename=filename,
+                    mimetype=mimetype,
+                    pdf_backend=pdf_backend,
+                ),
+                daemon=True,
+            ).start()
+        except Exception:
+            _JOB_SLOTS.release()   # поток не запущен — место никто не освободит
+            raise
+
+        return _render_page(READY_TEMPLATE, token=token)
 
     except Exception as e:
-        return render_template_string(
-            FORM_HTML,
+        return _render_page(
+            FORM_TEMPLATE,
             error=str(e),
             sex=request.form.get("sex", "м"),
             age=request.form.get("age", ""),
@@ -220,19 +399,62 @@ def generate():
         )
 
 
+@app.get("/stream/<token>")
+def stream(token: str):
+    """Server-Sent Events: частичный текст расшифровки, затем done/error."""
+    job = JOBS.get(token)
+    if job is None:
+        return Response(
+            _sse("error", {"message": "Отчёт не найден. Сформируйте его заново."}),
+            mimetype="text/event-stream",
+        )
+
+    def events():
+        seen = -1
+        sent_text = None
+        while True:
+            version, text, done, error = job.wait_change(seen, SSE_KEEPALIVE_SEC)
+            if version == seen:
+                yield ": keepalive\n\n"
+                continue
+            seen = version
+            if text and text != sent_text:
+                sent_text = text
+                yield _sse("text", {"text": text})
+            if error:
+                yield _sse("error", {"message": error})
+                return
+            if done:
+                yield _sse("done", {})
+                return
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/download/<token>")
 def download(token: str):
-    if token not in REPORTS:
+    # Отчёт может быть вытеснен между проверкой и чтением — берём один раз
+    report = REPORTS.get(token)
+    if report is None:
         return redirect(url_for("index"))
 
-    pdf_path, download_name = REPORTS[token]
     return send_file(
-        pdf_path,
+        io.BytesIO(report.pdf_bytes),
         as_attachment=True,
-        download_name=download_name,
+        download_name=report.download_name,
         mimetype="application/pdf",
     )
 
 
+@app.get("/render-stats")
+def render_stats():
+    """Метрики пула печати PDF: длина очереди, занятые воркеры, время печати."""
+    return {"pool": pdf_render_stats()}
+
+
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
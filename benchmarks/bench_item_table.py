@@ -0,0 +1,111 @@
+"""
+Пакетная оценка показателей: списки Item против колоночной ItemTable.
+
+«Списки» — поэлементные функции (assign_confidence, status_by_range,
+is_sanity_outlier, evaluate_parse_quality); «колонки» — те же расчёты
+через parsers/item_table.ItemTable. Показатели синтетические: N штук
+из небольшого словаря имён, как в пакете отчётов одной лаборатории.
+Также печатается память на один Item (slots).
+
+Запуск (из корня проекта):
+    python benchmarks/bench_item_table.py [-n 1000000] [-r 3]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+from parsers.item_table import ItemTable
+from parsers.quality import evaluate_parse_quality
+from parsers.sanity_ranges import is_sanity_outlier
+
+NAMES = [
+    ("Гемоглобин (HGB)", "HGB", "г/л", (120, 160)),
+    ("Эритроциты (RBC)", "RBC", "*10^12/л", (3.8, 5.1)),
+    ("Лейкоциты (WBC)", "WBC", "*10^9/л", (4.0, 9.0)),
+    ("Тромбоциты (PLT)", "PLT", "*10^9/л", (150, 400)),
+    ("СОЭ", "ESR", "мм/ч", (2, 20)),
+    ("Глюкоза", "GLUC", "ммоль/л", (3.9, 6.1)),
+    ("Холестерин общий", "CHOL", "ммоль/л", (None, 5.2)),
+    ("АЛТ", "ALT", "Ед/л", (0, 40)),
+    ("Неизвестный показатель", "Неизвестный показатель", "", None),
+]
+
+
+def make_items(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    items = []
+    for _ in range(n):
+        raw, name, unit, ref = rnd.choice(NAMES)
+        lo, hi = ref if ref else (None, None)
+        value = None if rnd.random() < 0.02 else round(rnd.uniform(0, 2 * (hi or 10)), 2)
+        items.append(engine.Item(
+            raw_name=raw, name=name, value=value, unit=unit,
+            ref_text=f"{lo}-{hi}" if ref else "",
+            ref=engine.Range(lo, hi) if ref else None,
+            ref_source="", status="",
+        ))
+    return items
+
+
+def by_items(items: list) -> dict:
+    engine.assign_confidence(items)
+    statuses = [engine.status_by_range(it.value, it.ref) for it in items]
+    outliers = sum(1 for it in items if it.value is not None and is_sanity_outlier(it.name, it.value))
+    quality = evaluate_parse_quality(items)
+    return {"statuses": statuses.count("В НОРМЕ"), "outliers": outliers, "quality": quality}
+
+
+def by_table(items: list) -> dict:
+    table = ItemTable.from_items(items)
+    table.assign_confidence()
+    statuses = table.statuses()
+    outliers = int(table.sanity_outliers().sum())
+    quality = table.quality()
+    return {"statuses": statuses.count("В НОРМЕ"), "outliers": outliers, "quality": quality}
+
+
+def bench(fn, items: list, repeat: int) -> tuple:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(items)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def item_size(n: int = 10000) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = make_items(n)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--items", type=int, default=1_000_000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    t_items, expected = bench(by_items, items, args.repeat)
+    t_table, got = bench(by_table, items, args.repeat)
+    assert got == expected, "результаты разошлись"
+
+    print(f"{args.items} показателей, ~{item_size():.0f} байт на Item вместе с Range и числами")
+    for label, t in (("списки", t_items), ("колонки", t_table)):
+        print(f"{label:<8} {t * 1000:8.1f} мс  {args.items / t:12.0f} показателей/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Классификация строк (биомаркер / шум / единица / референс): время на документ
+без кэша признаков и с line_features (признаки строки считаются один раз).
+
+На каждый документ выполняется тот же путь, что в generate_report:
+compute_ocr_quality_metrics → _smart_to_candidates → parse_items_from_candidates
+(+ compute_item_confidence). «До» — кэш признаков отключён, каждая проверка
+заново прогоняет регулярки; «после» — кэш очищается перед каждым документом,
+чтобы не учитывать повторы между документами.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_line_features.py [-r 5] [файлы.txt ...]
+
+По умолчанию берутся все tests/fixtures/*.txt.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+from parsers import line_scorer
+from parsers.metrics import compute_ocr_quality_metrics
+
+
+def run_document(text: str) -> list:
+    compute_ocr_quality_metrics(text)
+    items = engine.parse_items_from_candidates(engine._smart_to_candidates(text))
+    return [(it.name, it.value, engine.compute_item_confidence(it)) for it in items]
+
+
+def time_document(text: str, repeat: int, cached: bool) -> tuple:
+    original = line_scorer._line_features
+    if not cached:
+        line_scorer._line_features = original.__wrapped__
+    try:
+        times = []
+        for _ in range(repeat):
+            original.cache_clear()
+            t0 = time.perf_counter()
+            result = run_document(text)
+            times.append(time.perf_counter() - t0)
+        info = original.cache_info()
+    finally:
+        line_scorer._line_features = original
+    return statistics.median(times), result, info
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="текстовые документы (по умолчанию tests/fixtures/*.txt)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="повторов на документ (берётся медиана)")
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.files] or sorted((ROOT / "tests" / "fixtures").glob("*.txt"))
+    if not paths:
+        sys.exit("нет документов")
+
+    total_before = total_after = 0.0
+    for path in paths:
+        text = path.read_text(encoding="utf-8")
+        t_before, expected, _ = time_document(text, args.repeat, cached=False)
+        t_after, got, info = time_document(text, args.repeat, cached=True)
+        assert got == expected, f"{path.name}: результаты разошлись"
+        total_before += t_before
+        total_after += t_after
+        print(f"{path.name:<32} строк {len(text.splitlines()):5d}  "
+              f"без кэша {t_before * 1000:8.1f} мс  с line_features {t_after * 1000:8.1f} мс  "
+              f"x{t_before / t_after:4.1f}  (уникальных строк {info.currsize}, попаданий {info.hits})")
+    print(f"{'итого':<32} {'':11}  без кэша {total_before * 1000:8.1f} мс  "
+          f"с line_features {total_after * 1000:8.1f} мс  x{total_before / total_after:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+МЕДСИ inline: поиск единицы перебором шаблонов против одной альтернации.
+
+«Перебор» — как было: для каждой строки шаблон \\s(unit)\\s по каждой
+единице из _MEDSI_UNITS (re.compile на вызове, через кэш re);
+«альтернация» — _find_unit: один проход по строке. Документ —
+tests/fixtures/medsi_pypdf_text.txt, повторённый N раз с маркерами страниц.
+Замеряется поиск единицы по всем строкам и medsi_inline_candidates целиком.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_medsi_extract.py [--pages 1000] [-r 5]
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from parsers import medsi_extractor as me
+
+FIXTURE = ROOT / "tests" / "fixtures" / "medsi_pypdf_text.txt"
+
+
+def make_document(pages: int) -> str:
+    page = FIXTURE.read_text(encoding="utf-8")
+    return "\n".join(f"--- PAGE {n} ---\n{page}" for n in range(1, pages + 1))
+
+
+def loop_find_unit(line: str):
+    """Прежний поиск: шаблон на каждую единицу, первая найденная по списку."""
+    for u in me._MEDSI_UNITS:
+        m = re.compile(r"\s(" + re.escape(u) + r")\s").search(line)
+        if m:
+            return m.start(1), m.end(1), u
+    return None
+
+
+def bench(fn, arg, repeat: int) -> tuple:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(arg)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def extract_with(find_unit):
+    def run(text: str) -> list:
+        real = me._find_unit
+        me._find_unit = find_unit
+        try:
+            return me.medsi_inline_candidates(text)
+        finally:
+            me._find_unit = real
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_document(args.pages)
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+
+    t_loop, expected = bench(lambda ls: [loop_find_unit(ln) for ln in ls], lines, args.repeat)
+    t_alt, got = bench(lambda ls: [me._find_unit(ln) for ln in ls], lines, args.repeat)
+    assert got == expected, "поиск единицы разошёлся"
+
+    e_loop, expected = bench(extract_with(loop_find_unit), text, args.repeat)
+    e_alt, got = bench(extract_with(me._find_unit), text, args.repeat)
+    assert got == expected, "кандидаты разошлись"
+
+    print(f"{args.pages} страниц, {len(lines)} строк, {len(got)} кандидатов")
+    print("поиск единицы:")
+    for label, t in (("перебор", t_loop), ("альтернация", t_alt)):
+        print(f"  {label:<12} {t * 1000:8.1f} мс  {len(lines) / t:12.0f} строк/с")
+    print("medsi_inline_candidates:")
+    for label, t in (("перебор", e_loop), ("альтернация", e_alt)):
+        print(f"  {label:<12} {t * 1000:8.1f} мс  {args.pages / t:12.0f} страниц/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+normalize_name: перебор ключей RUS_NAME_MAP против автомата Ахо–Корасик и кэша.
+
+Имена строятся из ключей словаря с типичным «шумом» бланков
+(регистр, единицы, запятые, "%"), часть имён повторяется — как в реальных
+отчётах, где одни и те же показатели встречаются в каждом бланке.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_normalize_name.py [-n 10000] [--unique 0.3]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+
+SUFFIXES = ("", " %", ", %", " абс.", " (кровь)", " г/л", " в сыворотке")
+PREFIXES = ("", "Общий ", "Средний ", "")
+
+
+def make_names(n: int, unique: float, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    keys = list(engine.RUS_NAME_MAP)
+    pool_size = max(1, int(n * unique))
+    pool = [
+        (rnd.choice(PREFIXES) + rnd.choice(keys) + rnd.choice(SUFFIXES)).capitalize()
+        for _ in range(pool_size)
+    ]
+    pool += ["Неизвестный показатель %d" % i for i in range(pool_size // 10)]
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def legacy_normalize_name(raw: str) -> str:
+    """normalize_name до автомата: перебор всех ключей на каждое имя."""
+    s = re.sub(r"\s+", " ", (raw or "").strip())
+    m = re.search(r"\(([A-Za-zА-ЯЁа-яё][A-Za-zА-ЯЁа-яё0-9%-]{1,9})\)", s)
+    if m:
+        code = m.group(1).upper()
+        after_paren = s[m.end():].strip().lstrip(',.;').strip()
+        if after_paren.startswith('%') and not code.endswith('%'):
+            code = code + '%'
+        return engine.ALIASES.get(code, code)
+    m_comma = re.search(r"\(([A-Za-zА-ЯЁа-яё0-9][A-Za-zА-ЯЁа-яё0-9%-]{0,9})\s*,", s)
+    if m_comma:
+        code = m_comma.group(1).upper()
+        if code in engine.ALIASES:
+            return engine.ALIASES[code]
+    low = s.lower()
+    if "%" in low:
+        for k, v in engine.RUS_NAME_MAP.items():
+            if "%" in k and k in low:
+                return v
+    for k in sorted(engine.RUS_NAME_MAP.keys(), key=len, reverse=True):
+        if k in low:
+            return engine.RUS_NAME_MAP[k]
+    m2 = re.search(r"\b([A-Za-z]{2,6}%?)\b", s)
+    if m2:
+        code = m2.group(1).upper()
+        if code in engine.ALIASES:
+            return engine.ALIASES[code]
+    return s.replace(" ", "_").replace("-", "_").upper()
+
+
+def _time(fn, names) -> tuple:
+    t0 = time.perf_counter()
+    out = [fn(n) for n in names]
+    return time.perf_counter() - t0, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10000, help="число имён")
+    parser.add_argument("--unique", type=float, default=0.3, help="доля различных имён")
+    args = parser.parse_args()
+
+    names = make_names(args.n, args.unique)
+    uncached = engine._normalize_name_cached.__wrapped__
+
+    t_legacy, expected = _time(legacy_normalize_name, names)
+    t_matcher, got = _time(uncached, names)
+    engine._normalize_name_cached.cache_clear()
+    t_cached, got_cached = _time(engine.normalize_name, names)
+
+    assert got == expected and got_cached == expected, "результаты разошлись"
+    print(f"{len(names)} имён, ключей в RUS_NAME_MAP: {len(engine.RUS_NAME_MAP)}")
+    for label, t in (("перебор", t_legacy), ("автомат", t_matcher), ("автомат+кэш", t_cached)):
+        print(f"{label:<12} {t * 1000:9.1f} мс  {t / len(names) * 1e6:7.2f} мкс/имя  "
+              f"x{t_legacy / t:5.1f}")
+    print(engine._normalize_name_cached.cache_info())
+
+
+if __name__ == "__main__":
+    main()
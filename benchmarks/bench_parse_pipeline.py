@@ -0,0 +1,110 @@
+"""
+_run_parse_pipeline: время разбора одного документа на корпусе тестов.
+
+«Повторный» — прежний порядок: parse_with_fallback, затем ещё раз
+assign_confidence, deduplicate_items и evaluate_parse_quality над результатом;
+«однопроходный» — _select_parse + _finish_parse, как в _run_parse_pipeline:
+посчитанное при выборе baseline переносится дальше. Корпус: tests/fixtures/*.txt и многострочные
+текстовые константы модулей tests/*.py (RAW_TEXT, MEDSI_TEXT, …).
+Метрики B1 (compute_ocr_quality_metrics и др.) одинаковы в обоих вариантах
+и в замер не входят.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_parse_pipeline.py [-r 20]
+"""
+import argparse
+import ast
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+from parsers.quality import evaluate_parse_quality
+
+
+def load_corpus() -> list:
+    texts = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "tests" / "fixtures").glob("*.txt"))]
+    for path in sorted((ROOT / "tests").glob("test_*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in tree.body:
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                    and isinstance(node.value.value, str) and node.value.value.count("\n") >= 3):
+                texts.append(node.value.value)
+    return texts
+
+
+def _source(raw_text: str):
+    if "\t" not in raw_text:
+        return engine.text_to_candidate_records(raw_text) or raw_text
+    return raw_text
+
+
+def repeated(raw_text: str):
+    """Прежний порядок: всё, что посчитал parse_with_fallback, считается заново."""
+    items = engine.parse_with_fallback(_source(raw_text))
+    if not items:
+        return None
+    engine.assign_confidence(items)
+    items, dedup_dropped = engine.deduplicate_items(items)
+    engine._apply_fallback_refs(items)
+    items, outlier_count = engine.apply_sanity_filter(items)
+    quality = evaluate_parse_quality(items, dedup_dropped_count=dedup_dropped, sanity_outlier_count=outlier_count)
+    return items, quality
+
+
+def single_pass(raw_text: str):
+    outcome = engine._select_parse(_source(raw_text))
+    if not outcome.items:
+        return None
+    items, quality, _, _ = engine._finish_parse(outcome)
+    return items, quality
+
+
+def bench(fn, texts: list, repeat: int) -> tuple:
+    per_doc = []
+    results = []
+    with contextlib.redirect_stderr(io.StringIO()):
+        for text in texts:
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                result = fn(text)
+                times.append(time.perf_counter() - t0)
+            per_doc.append(statistics.median(times))
+            results.append(None if result is None else ([_fields(it) for it in result[0]], result[1]))
+    return per_doc, results
+
+
+def _fields(it) -> tuple:
+    return (it.name, it.value, it.ref_text, it.status, it.confidence)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-r", "--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = load_corpus()
+    # Кандидаты мемоизированы — прогреваем, чтобы замер касался только разбора
+    with contextlib.redirect_stderr(io.StringIO()):
+        for text in texts:
+            _source(text)
+
+    t_repeated, expected = bench(repeated, texts, args.repeat)
+    t_single, got = bench(single_pass, texts, args.repeat)
+    assert got == expected, "результаты разошлись"
+
+    print(f"{len(texts)} документов")
+    for label, per_doc in (("повторный", t_repeated), ("однопроходный", t_single)):
+        print(f"{label:<14} медиана {statistics.median(per_doc) * 1e6:8.1f} мкс/док  "
+              f"сумма {sum(per_doc) * 1000:8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Сравнение способов печати PDF: Chromium (Playwright) против нативного pdf_writer.
+
+Каждый бэкенд запускается в отдельном процессе, чтобы честно измерить
+пиковую память (ru_maxrss процесса + дочерних, т.е. и браузера).
+Печатается один и тот же контекст отчёта (30 показателей).
+
+Запуск (из корня проекта):
+    python benchmarks/bench_pdf_backends.py [-n 20] [--backend native|chromium]
+
+Нативному бэкенду нужен TTF-шрифт из engine.NATIVE_PDF_FONT_PATHS
+(или путь в --font), Chromium — установленный playwright install chromium.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+from engine import Item, Range
+
+
+def _context() -> dict:
+    items = [
+        Item(raw_name=f"Показатель {i}", name="HGB", value=100.0 + i, unit="г/л",
+             ref_text="120-150", ref=Range(low=120.0, high=150.0), ref_source="lab",
+             status="НИЖЕ" if i % 3 else "В НОРМЕ", confidence=1.0)
+        for i in range(30)
+    ]
+    high_low = [it for it in items if it.status != "В НОРМЕ"]
+    return engine.build_template_context("ж", 30, items, high_low, engine.LLM_NARRATIVE_PLACEHOLDER)
+
+
+ANSWER = "**КРАТКИЙ ИТОГ ПО ФАКТАМ**\n" + "Справочный текст о показателях. " * 40
+
+
+def _peak_rss_mb() -> float:
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (self_kb + children_kb) / 1024
+
+
+def run_backend(backend: str, n: int) -> dict:
+    """Печатает отчёт n раз в текущем процессе; возвращает метрики."""
+    ctx = _context()
+    if backend == "native":
+        def render():
+            return engine.render_pdf_native(ctx, ANSWER)
+    else:
+        html = engine.fill_report_narrative(engine.render_html_report(ctx), ANSWER)
+
+        def render():
+            return engine.render_pdf_bytes(html, ctx["created_at"])
+
+    size = len(render())  # прогрев (шрифт / первый запуск браузера)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        render()
+    elapsed = time.perf_counter() - t0
+    return {
+        "backend": backend,
+        "renders_per_sec": round(n / elapsed, 2),
+        "ms_per_render": round(elapsed / n * 1000, 2),
+        "pdf_kb": round(size / 1024, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=20, help="печатей на бэкенд")
+    parser.add_argument("--backend", choices=engine.REPORT_PDF_BACKENDS, help="запустить один бэкенд в этом процессе")
+    parser.add_argument("--font", help="путь к TTF для нативного бэкенда")
+    args = parser.parse_args()
+
+    if args.font:
+        engine.NATIVE_PDF_FONT_PATHS = (Path(args.font),)
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.n)))
+        return
+
+    for backend in engine.REPORT_PDF_BACKENDS:
+        cmd = [sys.executable, __file__, "-n", str(args.n), "--backend", backend]
+        if args.font:
+            cmd += ["--font", args.font]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode != 0:
+            errors = [ln for ln in proc.stderr.splitlines() if "Error" in ln] or ["?"]
+            err = errors[-1].strip()
+            print(f"{backend:<9} ошибка: {err}")
+            continue
+        m = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{backend:<9} {m['renders_per_sec']:8.2f} отчётов/с  {m['ms_per_render']:8.2f} мс  "
+              f"PDF {m['pdf_kb']:7.1f} КБ  пик RSS {m['peak_rss_mb']:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
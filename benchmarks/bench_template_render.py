@@ -0,0 +1,103 @@
+"""
+Микробенчмарк накладных расходов на рендер шаблонов.
+
+Сравнивает:
+  - отчёт: новая Environment + get_template на каждый рендер (как было)
+           против реестра engine.get_template (компиляция один раз);
+  - страницы Flask: render_template_string против заранее
+           скомпилированных FORM_TEMPLATE / READY_TEMPLATE.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_template_render.py [-n 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import engine
+from engine import Item, Range
+
+
+def _context() -> dict:
+    items = [
+        Item(raw_name=f"Показатель {i}", name="HGB", value=100.0 + i, unit="г/л",
+             ref_text="120-150", ref=Range(low=120.0, high=150.0), ref_source="lab",
+             status="НИЖЕ" if i % 3 else "В НОРМЕ", confidence=1.0)
+        for i in range(30)
+    ]
+    high_low = [it for it in items if it.status != "В НОРМЕ"]
+    return engine.build_template_context("ж", 30, items, high_low, "Текст справки\nвторая строка")
+
+
+def _bench(label: str, fn, n: int) -> float:
+    fn()  # прогрев
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    per_call_ms = (time.perf_counter() - t0) / n * 1000
+    print(f"  {label:<44} {per_call_ms:8.3f} ms")
+    return per_call_ms
+
+
+def bench_report(n: int) -> None:
+    ctx = _context()
+
+    def fresh_env():
+        env = Environment(
+            loader=FileSystemLoader(str(engine.TEMPLATES_DIR)),
+            autoescape=select_autoescape(["html", "xml"]),
+        )
+        return env.get_template(engine.TEMPLATE_NAME).render(**ctx)
+
+    def registry():
+        return engine.render_html_report(ctx)
+
+    print("report.html:")
+    before = _bench("Environment на каждый рендер", fresh_env, n)
+    after = _bench("реестр engine.get_template", registry, n)
+    print(f"  ускорение: x{before / after:.1f}")
+
+
+def bench_pages(n: int) -> None:
+    import app as app_module
+    from flask import render_template_string
+
+    flask_app = app_module.app
+
+    def string_form():
+        return render_template_string(app_module.FORM_HTML, error=None, sex="м", age=30, raw_text="")
+
+    def compiled_form():
+        return app_module._render_page(app_module.FORM_TEMPLATE, error=None, sex="м", age=30, raw_text="")
+
+    def string_ready():
+        return render_template_string(app_module.READY_HTML, token="0" * 32)
+
+    def compiled_ready():
+        return app_module._render_page(app_module.READY_TEMPLATE, token="0" * 32)
+
+    with flask_app.test_request_context("/"):
+        print("FORM_HTML:")
+        _bench("render_template_string", string_form, n)
+        _bench("FORM_TEMPLATE (скомпилирован)", compiled_form, n)
+        print("READY_HTML:")
+        _bench("render_template_string", string_ready, n)
+        _bench("READY_TEMPLATE (скомпилирован)", compiled_ready, n)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200, help="рендеров на вариант")
+    args = parser.parse_args()
+    bench_report(args.n)
+    bench_pages(args.n)
+
+
+if __name__ == "__main__":
+    main()
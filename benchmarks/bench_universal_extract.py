@@ -0,0 +1,94 @@
+"""
+universal_extract: строк в секунду на синтетическом документе.
+
+Документ: N страниц из строк в форматах Гемотест / Citilab / Helix /
+однострочных показателей и служебного шума, с маркерами страниц.
+Отдельно замеряются стадии предобработки (склейки и очистка строк)
+и universal_extract целиком.
+
+Запуск (из корня проекта):
+    python benchmarks/bench_universal_extract.py [--pages 50] [-r 5]
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from parsers import universal_extractor as ue
+
+BLOCKS = [
+    "Гемоглобин 144 г/л 132 - 172",
+    "Эритроциты 4.85 *10^12/л 4.28 - 5.78",
+    "Лейкоциты (WBC) 6.1 10^9/л 3.9 - 10.9",
+    "СОЭ 5 мм/час 0 - 20",
+    "Калий\n(K+)\n(сыворотка крови)\nA09.05.031\n3.7\nммоль/л\n3.5 - 5.1",
+    "Глюкоза\n5.27+\nммоль/л\n4.1 - 5.9",
+    "г/лГемоглобин (HGB) 150 130 - 160",
+    "Средний объем эритроцитов\n(MCV)\n87.3\nфл\n80 - 100",
+    "Гликозилированный гемоглобин (HBA1c,\nDCCT/NGSP)\n5.0\n%\n4.0 - 6.0",
+    "Холестерин-ЛПВП 1.25 ммоль/л Смотри текст",
+    "x10*9/\nл",
+    "Лицензия № ЛО-77-01-000000 от 01.01.2020",
+    "Дата исследования: 12.03.2024",
+    "< 5.2 ммоль/л - нормальный уровень",
+    "Лабораторный комплекс правообладателя",
+]
+
+
+def make_document(pages: int, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    out = []
+    for page in range(1, pages + 1):
+        out.append(f"--- PAGE {page} ---")
+        out.extend(rnd.choice(BLOCKS) for _ in range(30))
+    return "\n".join(out)
+
+
+def preprocess(raw_text: str) -> list:
+    """Только стадии предобработки universal_extract_candidates (до Pass 1)."""
+    lines = ue._prepared_lines(raw_text)
+    lines = ue._rejoin_broken_units(lines)
+    lines = ue._preclean_citilab_format(lines)
+    lines = ue._rejoin_open_parens(lines)
+    lines = ue._rejoin_fragmented_lines(lines)
+    lines = ue._strip_gemotest_markers(lines)
+    lines = ue._rejoin_broken_names(lines)
+    return [ln for ln in lines if not ue._is_scale_annotation(ln)]
+
+
+def bench(fn, text: str, repeat: int) -> tuple:
+    times = []
+    for _ in range(repeat):
+        ue.line_features.__globals__["_line_features"].cache_clear()
+        with contextlib.redirect_stderr(io.StringIO()):
+            t0 = time.perf_counter()
+            result = fn(text)
+            times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_document(args.pages)
+    n_lines = len(text.splitlines())
+    t_pre, lines = bench(preprocess, text, args.repeat)
+    t_all, got = bench(ue.universal_extract, text, args.repeat)
+
+    print(f"{args.pages} страниц, {n_lines} строк → {len(lines)} после предобработки, "
+          f"кандидатов {len(got.splitlines())}")
+    for label, t in (("предобработка", t_pre), ("целиком", t_all)):
+        print(f"{label:<14} {t * 1000:8.1f} мс  {n_lines / t:10.0f} строк/с")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Подбор LLM_MAX_TOKENS_* по фактическим токенам ответов из отладочного лога.
+
+_generate_llm_answer пишет в OCR_DEBUG_PATH строку
+«LLM tokens: {...}» с числом отклонений (n_deviations), максимумом
+completionTokens по вызовам (completion_max) и числом обрезанных по
+maxTokens ответов (truncated / retried). Скрипт берёт перцентиль
+completion_max для каждого числа отклонений, проводит через них прямую
+base + per_deviation·n (МНК с весом по числу ответов, затем сдвиг base
+вверх, чтобы прямая не опускалась ниже ни одного перцентиля) и добавляет
+запас. Для «всё в норме» (n = 0) — отдельный перцентиль.
+
+Ответы, обрезанные и после повтора с MAX_TOKENS, дают лишь нижнюю оценку
+длины — они учитываются, но выводятся отдельно.
+
+Без аргументов читает OCR_DEBUG_PATH и его предыдущую копию (*.1, см.
+DEBUG_LOG_MAX_BYTES).
+
+Запуск (из корня проекта):
+    python benchmarks/calibrate_llm_max_tokens.py [outputs/ocr_debug.txt ...] [-p 95] [--margin 0.1]
+"""
+import argparse
+import ast
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import engine
+
+MARKER = "LLM tokens: "
+
+
+def read_samples(paths):
+    """(n_deviations, completion_max, обрезан_после_повтора) из строк «LLM tokens: {...}»."""
+    samples = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8", errors="replace").splitlines():
+            pos = line.find(MARKER)
+            if pos < 0:
+                continue
+            try:
+                tokens = ast.literal_eval(line[pos + len(MARKER):].strip())
+            except (ValueError, SyntaxError):
+                continue
+            if "n_deviations" not in tokens or not tokens.get("completion_max"):
+                continue   # старый формат строки или ответа от LLM не было
+            lower_bound = tokens.get("truncated", 0) > tokens.get("retried", 0)
+            samples.append((int(tokens["n_deviations"]), int(tokens["completion_max"]), lower_bound))
+    return samples
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def fit_line(points):
+    """points: [(n, q, weight)] → (base, per_deviation), прямая не ниже ни одной точки."""
+    if len(points) == 1:
+        n, q, _ = points[0]
+        return q - engine.LLM_MAX_TOKENS_PER_DEVIATION * n, engine.LLM_MAX_TOKENS_PER_DEVIATION
+    w_sum = sum(w for _, _, w in points)
+    n_mean = sum(n * w for n, _, w in points) / w_sum
+    q_mean = sum(q * w for _, q, w in points) / w_sum
+    var = sum(w * (n - n_mean) ** 2 for n, _, w in points)
+    slope = max(0.0, sum(w * (n - n_mean) * (q - q_mean) for n, q, w in points) / var)
+    base = max(q - slope * n for n, q, _ in points)
+    return base, slope
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    rotated = engine.OCR_DEBUG_PATH.with_name(engine.OCR_DEBUG_PATH.name + ".1")
+    default_logs = [str(p) for p in (rotated, engine.OCR_DEBUG_PATH) if p.exists()]
+    parser.add_argument("logs", nargs="*", default=default_logs)
+    parser.add_argument("-p", "--percentile", type=float, default=95.0)
+    parser.add_argument("--margin", type=float, default=0.1, help="запас сверх перцентиля (доля)")
+    parser.add_argument("--min-samples", type=int, default=5, help="меньше ответов на n — n пропускается")
+    args = parser.parse_args()
+
+    samples = read_samples(args.logs)
+    if not samples:
+        sys.exit("В логе нет строк «LLM tokens» с n_deviations и completion_max > 0")
+
+    by_n = defaultdict(list)
+    for n, completion, _ in samples:
+        by_n[n].append(completion)
+
+    print(f"{len(samples)} ответов, из них обрезано и после повтора: {sum(1 for s in samples if s[2])}")
+    print(f"{'n':>3} {'ответов':>8} {'p' + format(args.percentile, 'g'):>6} {'max':>6} {'сейчас':>7}")
+    points = []
+    for n in sorted(by_n):
+        q = percentile(by_n[n], args.percentile)
+        mark = "" if len(by_n[n]) >= args.min_samples else "  (мало данных, не учитывается)"
+        print(f"{n:>3} {len(by_n[n]):>8} {q:>6} {max(by_n[n]):>6} {engine.llm_max_tokens(n):>7}{mark}")
+        if n > 0 and len(by_n[n]) >= args.min_samples:
+            points.append((n, q, len(by_n[n])))
+
+    k = 1 + args.margin
+    print("\nПредлагаемые значения:")
+    if len(by_n.get(0, ())) >= args.min_samples:
+        print(f"  LLM_MAX_TOKENS_ALL_NORMAL = {math.ceil(percentile(by_n[0], args.percentile) * k)}"
+              f"   # сейчас {engine.LLM_MAX_TOKENS_ALL_NORMAL}")
+    if points:
+        base, per_dev = fit_line(points)
+        base, per_dev = math.ceil(base * k), math.ceil(per_dev * k)
+        print(f"  LLM_MAX_TOKENS_BASE = {base}   # сейчас {engine.LLM_MAX_TOKENS_BASE}")
+        print(f"  LLM_MAX_TOKENS_PER_DEVIATION = {per_dev}   # сейчас {engine.LLM_MAX_TOKENS_PER_DEVIATION}")
+
+        def over(limit):
+            return sum(1 for n, c, _ in samples if n > 0 and c > limit(n))
+
+        print(f"\nОтветов длиннее лимита (n > 0): сейчас {over(engine.llm_max_tokens)}, "
+              f"с предложенными {over(lambda n: min(base + per_dev * n, engine.MAX_TOKENS))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,34 +8,45 @@
 # - логи: outputs/ocr_debug.txt
 
 import re
+import os
 import base64
+import contextvars
+import hashlib
 import json
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple, List, Set, Dict, Any
+from typing import Callable, Optional, Tuple, List, Sequence, Set, Dict, Any, Union
 from uuid import uuid4
 
 import requests
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, TemplateNotFound, select_autoescape
 from playwright.sync_api import sync_playwright
 
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 
-from ocr_preprocess import preprocess_image_bytes
+from ocr_preprocess import preprocess_image_bytes, get_image_info, needs_tiling, split_image_into_tiles, stitch_tile_lines
+from pdf_writer import FontError, TrueTypeFont, render_report_pdf
+from parsers.candidates import Candidate, format_candidates
+from parsers.keyword_matcher import KeywordMatcher
+from parsers import patterns as rx
 from parsers.ocr_preflight import choose_ocr_mode_preflight
 
 
 # ==========================
 # ПАПКИ / ФАЙЛЫ
 # ==========================
-OUT_DIR = Path("outputs")
-OUT_DIR.mkdir(exist_ok=True)
+OUT_DIR = Path("outputs")         # создаётся при первой записи (может быть недоступна)
 
-TEMPLATES_DIR = Path("templates")
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"   # не зависит от cwd
 TEMPLATE_NAME = "report.html"
+TEMPLATES_AUTO_RELOAD = False     # dev: перечитывать шаблон при изменении файла
+TEMPLATES_BYTECODE_CACHE_DIR: Optional[Path] = None   # напр. OUT_DIR / "jinja_cache" — быстрее холодный старт
 
 RAW_RESPONSE_PATH = OUT_DIR / "yc_raw_response.json"
 
@@ -49,6 +60,12 @@ OCR_DEBUG_PATH = OUT_DIR / "ocr_debug.txt"
 
 PDF_TEXT_EXTRACT_PATH = OUT_DIR / "pdf_text_extract.txt"
 
+# Отладочные артефакты выше (кроме логов ocr_debug/ocr_poll_log): когда сохранять
+# (parsers/debug_artifacts): off / sampled / on_error / always. Пишутся в фоновом потоке.
+DEBUG_ARTIFACTS_MODE = "on_error"
+DEBUG_ARTIFACTS_SAMPLE_RATE = 0.01    # доля запросов в режиме sampled
+DEBUG_LOG_MAX_BYTES = 10 * 1024 * 1024   # ocr_debug / ocr_poll_log: больше — переименовать в *.1
+
 
 # ==========================
 # КЛЮЧ СЕРВИСНОГО АККАУНТА
@@ -83,9 +100,89 @@ MODEL_URI = f"gpt://{FOLDER_ID}/yandexgpt/latest"
 API_URL_LLM = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
 
 TEMPERATURE = 0.2
-MAX_TOKENS = 1300
+MAX_TOKENS = 1300                 # потолок; фактический maxTokens — llm_max_tokens()
 TIMEOUT_SEC = 120
 
+# Бюджет токенов запроса (build_llm_prompt / llm_max_tokens)
+LLM_CHARS_PER_TOKEN = 3.0         # грубая оценка для русского текста
+LLM_MAX_TOKENS_ALL_NORMAL = 350
+LLM_MAX_TOKENS_BASE = 500
+LLM_MAX_TOKENS_PER_DEVIATION = 110   # подбирать по логу: benchmarks/calibrate_llm_max_tokens.py
+LLM_TRUNCATED_STATUS = "ALTERNATIVE_STATUS_TRUNCATED_FINAL"   # ответ упёрся в maxTokens
+LLM_PROMPT_COMPACT_FROM = 6       # с этого числа отклонений промпт сжимается
+
+# Кэш ответов LLM по тексту промпта (parsers/llm_cache.py). Ответы цитируют
+# данные пациента, поэтому по умолчанию кэш только в памяти процесса
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH: Optional[Path] = None   # напр. OUT_DIR / "llm_cache.json" — хранить на диске между перезапусками
+LLM_CACHE_TTL_SEC = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 500
+LLM_CACHE_VERSION = "2"   # менять при изменении SYSTEM_PROMPT / build_llm_prompt
+
+# Бюджет времени и circuit breaker для стадии LLM (parsers/llm_circuit.py)
+LLM_BUDGET_SEC = 45.0             # вся стадия LLM одного отчёта, включая повтор после отказа
+LLM_BREAKER_WINDOW = 20           # последних вызовов в окне
+LLM_BREAKER_MIN_CALLS = 5
+LLM_BREAKER_MAX_ERROR_RATE = 0.5
+LLM_BREAKER_MAX_AVG_LATENCY_SEC = 40.0
+LLM_BREAKER_COOLDOWN_SEC = 60.0
+LLM_MAX_INFLIGHT = 8              # потоков под запросы к LLM
+LLM_HEDGE_ENABLED = False         # дублирующий запрос, если первый долго молчит
+LLM_HEDGE_DELAY_SEC = 12.0
+
+# Статистика отказов по сигнатурам (parsers/llm_refusal_policy.py):
+# для «отказных» сигнатур обычный и смягчённый промпты идут одновременно
+LLM_REFUSAL_POLICY_ENABLED = True
+LLM_REFUSAL_STATS_PATH = OUT_DIR / "llm_refusal_stats.json"
+LLM_SPECULATE_REFUSAL_RATE = 0.3
+
+LLM_SOFTENED_PROMPT_PREFIX = (
+    "Ты — справочный помощник, аналог медицинской энциклопедии. "
+    "Твоя задача — дать ОБЩУЮ ОБРАЗОВАТЕЛЬНУЮ информацию о лабораторных показателях. "
+    "Это НЕ медицинская консультация, а информационная справка, как в учебнике.\n\n"
+)
+
+# Локальная справка без LLM для простых случаев (все в норме / 1–2 небольших отклонения)
+LOCAL_NARRATIVE_ENABLED = True
+LOCAL_NARRATIVE_MAX_DEVIATIONS = 2
+LOCAL_NARRATIVE_STATUS_CLASSES = ("status-warn",)   # классы status_class_for_item, допустимые локально
+
+# Параллельно с LLM: заранее рендерим отчёт и прогреваем Chromium (только при PDF_RENDER_WORKERS = 0;
+# воркеры пула и так держат браузер прогретым)
+REPORT_PRERENDER_ENABLED = True
+
+# generate_report: сохранять исходник/HTML/PDF в OUT_DIR (False — только в памяти)
+REPORT_PERSIST_TO_DISK = False
+
+# Файлы отчётов на диске: OUT_DIR/reports/<2 символа uid>/ + уборка (parsers/report_storage)
+REPORT_STORAGE_SUBDIR = "reports"
+REPORT_STORAGE_SHARD_CHARS = 2
+REPORT_STORAGE_TTL_SEC = 7 * 24 * 3600              # None — не удалять по возрасту
+REPORT_STORAGE_MAX_BYTES = 2 * 1024 ** 3            # None — без бюджета объёма
+REPORT_STORAGE_COMPRESS_AFTER_SEC = 3600            # gzip исходников original_*; None — не сжимать
+REPORT_STORAGE_JANITOR_INTERVAL_SEC = 300           # 0 — без фоновой уборки
+
+# Печать через Chromium — в пуле процессов с прогретыми браузерами (parsers/pdf_render_pool).
+# 0 — Playwright в потоке запроса, как раньше (тогда работает и прогрев PrewarmedPdfRender).
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_QUEUE_MAX = 16          # задач в очереди; сверх этого — отказ (RenderQueueFull)
+PDF_RENDER_TIMEOUT_SEC = 60        # зависшая печать: воркер перезапускается
+
+# Печать PDF: "chromium" (HTML → Playwright) или "native" (pdf_writer, без браузера).
+# native нужен TTF-шрифт с кириллицей; без него отчёт печатается через Chromium.
+REPORT_PDF_BACKEND = "chromium"
+REPORT_PDF_BACKENDS = ("chromium", "native")
+NATIVE_PDF_FONT_PATHS = (
+    Path("fonts") / "DejaVuSans.ttf",
+    Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+    Path("/usr/share/fonts/dejavu/DejaVuSans.ttf"),
+    Path("/usr/share/fonts/TTF/DejaVuSans.ttf"),
+    Path("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"),
+)
+
+# Стриминг ответа LLM в браузер (SSE)
+LLM_STREAM_REFUSAL_WINDOW = 200   # символов: пока текст короче, проверяем на отказ и не отдаём клиенту
+
 SYSTEM_PROMPT = (
     "Ты — информационный помощник по лабораторным анализам.\n"
     "Данный сервис является ИНФОРМАЦИОННЫМ РЕСУРСОМ и НЕ является медицинским учреждением.\n"
@@ -137,6 +234,15 @@ OPERATIONS_API_BASE = "https://operation.api.cloud.yandex.net/operations"
 # Preprocessing изображений перед OCR
 OCR_PREPROCESS_ENABLED = True
 
+# Tiling высоких сканов: режем на перекрывающиеся полосы и OCR-им параллельно
+OCR_TILING_ENABLED = True
+OCR_TILE_MAX_WORKERS = 4
+
+# Мемо кандидатов по дайджесту текста (text_to_candidate_records): один и тот же текст
+# (pypdf-текст, fallback в _run_parse_pipeline, B2 rerun) разбирается один раз на процесс
+CANDIDATES_MEMO_ENABLED = True
+CANDIDATES_MEMO_MAX_ENTRIES = 128
+
 
 # ==========================
 # Справочники (локальные)
@@ -438,10 +544,63 @@ SPECIALIST_MAP = {
 # ============================================================
 # helpers
 # ============================================================
-def _dbg(msg: str) -> None:
+def _append_log(path: Path, msg: str) -> None:
+    """
+    Дописывает строку в лог. Лог — только диагностика: если папка недоступна
+    для записи, строка теряется, а запрос не падает. Файл больше
+    DEBUG_LOG_MAX_BYTES переименовывается в *.1 (одна старая копия).
+    """
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    prev = OCR_DEBUG_PATH.read_text(encoding="utf-8") if OCR_DEBUG_PATH.exists() else ""
-    OCR_DEBUG_PATH.write_text(prev + f"[{ts}] {msg}\n", encoding="utf-8")
+    try:
+        try:
+            f = open(path, "a", encoding="utf-8")
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, "a", encoding="utf-8")
+        with f:
+            f.write(f"[{ts}] {msg}\n")
+            size = f.tell()
+        if size > DEBUG_LOG_MAX_BYTES:
+            os.replace(path, path.with_name(path.name + ".1"))
+    except OSError:
+        pass
+
+
+def _dbg(msg: str) -> None:
+    _append_log(OCR_DEBUG_PATH, msg)
+
+
+_ARTIFACTS = None
+
+
+def get_artifact_writer():
+    """Писатель отладочных артефактов (пересоздаётся при смене DEBUG_ARTIFACTS_MODE)."""
+    global _ARTIFACTS
+    if _ARTIFACTS is None or _ARTIFACTS.mode != DEBUG_ARTIFACTS_MODE:
+        from parsers.debug_artifacts import ArtifactWriter
+        _ARTIFACTS = ArtifactWriter(DEBUG_ARTIFACTS_MODE, sample_rate=DEBUG_ARTIFACTS_SAMPLE_RATE)
+    return _ARTIFACTS
+
+
+def _artifact(path: Path, payload: Any, error: bool = False) -> None:
+    """
+    Отладочный артефакт: сохраняется по DEBUG_ARTIFACTS_MODE в фоновом потоке.
+    payload — строка/байты или функция без аргументов (тяжёлая сериализация — тоже в фоне).
+    error=True — артефакт описывает ошибку (сохраняется во всех режимах, кроме off).
+    """
+    get_artifact_writer().write(path, payload, error=error)
+
+
+def _with_artifact_scope(fn: Callable) -> Callable:
+    """Границы запроса для артефактов: выборка sampled, сброс буфера on_error при исключении."""
+    import functools
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with get_artifact_writer().request():
+            return fn(*args, **kwargs)
+
+    return wrapper
 
 
 def _safe_json_loads(text: str) -> Any:
@@ -455,24 +614,19 @@ def _resp_json_or_die(r: requests.Response, where: str) -> Any:
     try:
         return _safe_json_loads(r.text)
     except Exception:
-        OCR_HTTP_LAST_PATH.write_text(
-            f"[{where}] HTTP {r.status_code}\n\n{r.text[:200000]}",
-            encoding="utf-8",
-        )
+        _artifact(OCR_HTTP_LAST_PATH, f"[{where}] HTTP {r.status_code}\n\n{r.text[:200000]}", error=True)
         raise
 
 
 def _log_poll(msg: str) -> None:
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    prev = OCR_POLL_LOG_PATH.read_text(encoding="utf-8") if OCR_POLL_LOG_PATH.exists() else ""
-    OCR_POLL_LOG_PATH.write_text(prev + f"[{ts}] {msg}\n", encoding="utf-8")
+    _append_log(OCR_POLL_LOG_PATH, msg)
 
 
 def _dedup_lines_keep_order(lines: List[str]) -> List[str]:
     seen = set()
     out = []
     for ln in lines:
-        k = re.sub(r"\s+", " ", ln.strip())
+        k = rx.WHITESPACE.sub(" ", ln.strip())
         if not k or k in seen:
             continue
         seen.add(k)
@@ -599,13 +753,13 @@ def get_iam_token() -> str:
 # ==========================
 # ПАРСИНГ
 # ==========================
-@dataclass
+@dataclass(slots=True)
 class Range:
     low: Optional[float]
     high: Optional[float]
 
 
-@dataclass
+@dataclass(slots=True)
 class Item:
     raw_name: str
     name: str
@@ -638,16 +792,15 @@ def compute_item_confidence(it: Item) -> float:
     # Подозрительное значение → 0.0
     raw = it.raw_name or ""
     if any(ch in raw for ch in ['^', '*', '/']):
-        import re as _re
-        if not _re.search(r"\*10\^\d+", raw):
+        if not rx.POW10_SUFFIX.search(raw):
             return 0.0
 
     has_ref = it.ref is not None
     has_unit = bool((it.unit or "").strip())
 
     # Проверяем, является ли имя известным биомаркером
-    from parsers.line_scorer import has_known_biomarker
-    is_known = has_known_biomarker(it.raw_name or it.name)
+    from parsers.line_scorer import line_features
+    is_known = line_features(it.raw_name or it.name).has_biomarker
 
     if has_ref and has_unit and is_known:
         return 1.0
@@ -662,7 +815,7 @@ def compute_item_confidence(it: Item) -> float:
 
     # value есть, но ни ref, ни биомаркер не определены
     name_clean = (it.raw_name or "").strip()
-    if len(name_clean) < 3 or not re.search(r"[A-Za-zА-Яа-я]{2,}", name_clean):
+    if len(name_clean) < 3 or not rx.LETTERS2.search(name_clean):
         return 0.3
 
     return 0.5
@@ -945,12 +1098,12 @@ RUS_NAME_MAP = {
 
 def clean_raw_name(s: str) -> str:
     s = (s or "").strip()
-    s = re.sub(r"\s+", " ", s)
+    s = rx.WHITESPACE.sub(" ", s)
     # Убираем только латинские коды в скобках (WBC, MCV, микроскопия и т.п.)
     # Оставляем кириллические коды (МСН, МСНС, СРБ, СОЭ) — они нужны для normalize_name
-    s = re.sub(r"\s*\([A-Za-z0-9\-#%\s]+\)\s*", " ", s)
+    s = rx.LATIN_CODE_PARENS.sub(" ", s)
     s = s.replace("%", "%")                  # оставим % в raw_name (для отображения), но нормализация ниже
-    s = re.sub(r"\s+", " ", s).strip()
+    s = rx.WHITESPACE.sub(" ", s).strip()
     return s
 
 
@@ -970,25 +1123,22 @@ def sanitize_raw_name(s: str) -> str:
         return s
 
     # 1. Удалить "(Приказ МЗ РФ № ...)" или "(Приказ ...)"
-    s = re.sub(r"\(Приказ[^)]*\)", "", s, flags=re.IGNORECASE)
+    s = rx.ORDER_PARENS.sub("", s)
 
     # 2. Удалить коды услуг вида "A09.05.042", "A09.05.026, A09.05.004"
-    s = re.sub(r"\bA\d{2}\.\d{2}\.\d{3}(?:\.\d+)?(?:\s*,\s*A\d{2}\.\d{2}\.\d{3}(?:\.\d+)?)*", "", s)
+    s = rx.SERVICE_CODES.sub("", s)
 
     # 3. Удалить указание биоматериала в скобках
-    s = re.sub(
-        r"\(\s*(?:венозная кровь|сыворотка крови|кровь[^)]*|капиллярная кровь|плазма)\s*\)",
-        "", s, flags=re.IGNORECASE,
-    )
+    s = rx.BIOMATERIAL_PARENS.sub("", s)
 
     # P8: Удалить методологические квалификаторы "(в соответствии со стандартизацией DCCT)" и т.п.
-    s = re.sub(r"\(в соответствии[^)]*\)", "", s, flags=re.IGNORECASE)
+    s = rx.METHOD_QUALIFIER_PARENS.sub("", s)
 
     # 4. Удалить "Дата исследования: ..."
-    s = re.sub(r"Дата исследования[:\s]*[\d.]+[;\s]*", "", s, flags=re.IGNORECASE)
+    s = rx.STUDY_DATE.sub("", s)
 
     # 5. Очистка пробелов
-    s = re.sub(r"\s+", " ", s).strip()
+    s = rx.WHITESPACE.sub(" ", s).strip()
 
     # 6. Убрать висячие запятые и точки с запятой в конце
     s = s.rstrip(",;: ")
@@ -1012,7 +1162,7 @@ def _is_garbage_name(name: str) -> bool:
         return True
 
     # P7: фрагмент HbA1c — "HbA" / "Hb" без суффикса "1c"
-    if re.match(r'^hba?\s*$', low):
+    if rx.HBA_FRAGMENT.match(low):
         return True
 
     # Фрагменты регуляторных кодов
@@ -1044,17 +1194,55 @@ def _is_garbage_name(name: str) -> bool:
 
     # Имя начинается со скобки и содержит только биоматериал / служебный текст.
     # P7: разрешаем короткие лабораторные коды: (K+), (Na+), (Ca2+), (АЛТ), (ЛДГ) и т.д.
-    if s.startswith("(") and not re.search(r'\([A-ZА-Яа-яa-z][A-ZА-Яа-яa-z+\d]{0,5}\)', s):
+    if s.startswith("(") and not rx.LAB_CODE_PARENS.search(s):
         return True
 
     return False
 
 
+# Ключи RUS_NAME_MAP ищутся одним проходом (Ахо–Корасик); автомат строится один раз.
+# Если RUS_NAME_MAP меняют во время работы — вызвать rebuild_name_matcher().
+NORMALIZE_NAME_CACHE_SIZE = 4096
+
+_RUS_NAME_MATCHER = KeywordMatcher(RUS_NAME_MAP)
+
+
+def rebuild_name_matcher() -> None:
+    """Перестраивает автомат по RUS_NAME_MAP и сбрасывает кэш normalize_name."""
+    global _RUS_NAME_MATCHER
+    _RUS_NAME_MATCHER = KeywordMatcher(RUS_NAME_MAP)
+    _normalize_name_cached.cache_clear()
+
+
+def _match_rus_name(low: str) -> Optional[str]:
+    """
+    Код по RUS_NAME_MAP для имени в нижнем регистре:
+    при "%" в имени — первый (по порядку словаря) ключ с "%",
+    иначе — самый длинный ключ ("гликированный гемоглоб" раньше "гемоглоб"),
+    при равной длине — тот, что раньше в словаре.
+    """
+    found = _RUS_NAME_MATCHER.match_indices(low)
+    if not found:
+        return None
+    keys = _RUS_NAME_MATCHER.keys
+    if "%" in low:
+        for i in found:
+            if "%" in keys[i]:
+                return RUS_NAME_MAP[keys[i]]
+    best = max(found, key=lambda i: (len(keys[i]), -i))
+    return RUS_NAME_MAP[keys[best]]
+
+
 def normalize_name(raw: str) -> str:
-    s = re.sub(r"\s+", " ", (raw or "").strip())
+    return _normalize_name_cached(raw or "")
+
+
+@lru_cache(maxsize=NORMALIZE_NAME_CACHE_SIZE)
+def _normalize_name_cached(raw: str) -> str:
+    s = rx.WHITESPACE.sub(" ", (raw or "").strip())
 
     # коды в скобках: (Ne), (RDW-SD), (WBC), (P-LCR), (HBA1c) и т.п.
-    m = re.search(r"\(([A-Za-zА-ЯЁа-яё][A-Za-zА-ЯЁа-яё0-9%-]{1,9})\)", s)
+    m = rx.NAME_CODE_PARENS.search(s)
     if m:
         code = m.group(1).upper()
         after_paren = s[m.end():].strip().lstrip(',.;').strip()
@@ -1064,28 +1252,19 @@ def normalize_name(raw: str) -> str:
         return ALIASES.get(code, code)
 
     # Коды с запятой в скобках: (HBA1c, DCCT/NGSP), (ЛПНП, LDL)
-    m_comma = re.search(r"\(([A-Za-zА-ЯЁа-яё0-9][A-Za-zА-ЯЁа-яё0-9%-]{0,9})\s*,", s)
+    m_comma = rx.NAME_CODE_COMMA.search(s)
     if m_comma:
         code = m_comma.group(1).upper()
         if code in ALIASES:
             return ALIASES[code]
 
-    low = s.lower()
-
-    # ПРИОРИТЕТ: если имя содержит "%", сначала ищем % маппинги
-    if "%" in low:
-        for k, v in RUS_NAME_MAP.items():
-            if "%" in k and k in low:
-                return v
-
-    # Сортируем ключи по длине (сначала длинные), чтобы
-    # "гликированный гемоглоб" сработал раньше "гемоглоб"
-    for k in sorted(RUS_NAME_MAP.keys(), key=len, reverse=True):
-        if k in low:
-            return RUS_NAME_MAP[k]
+    # ПРИОРИТЕТ: % маппинги, затем самый длинный ключ RUS_NAME_MAP
+    code = _match_rus_name(s.lower())
+    if code is not None:
+        return code
 
     # попытка вытащить "NE%" из текста
-    m2 = re.search(r"\b([A-Za-z]{2,6}%?)\b", s)
+    m2 = rx.NAME_LATIN_CODE.search(s)
     if m2:
         code = m2.group(1).upper()
         if code in ALIASES:
@@ -1096,7 +1275,7 @@ def normalize_name(raw: str) -> str:
 
 def parse_float(x: str) -> Optional[float]:
     x = (x or "").strip().replace(",", ".")
-    x = re.sub(r"[^\d\.\-]", "", x)
+    x = rx.NOT_NUMBER_CHARS.sub("", x)
     try:
         return float(x)
     except Exception:
@@ -1114,24 +1293,24 @@ def parse_ref_range(text: str) -> Optional[Range]:
     t = t.replace("—", "-").replace("–", "-").replace(",", ".")
 
     # Канонизация «до X» → «<X» (до удаления пробелов!)
-    m_do = re.match(r"^[Дд]о\s*(\d+(?:\.\d+)?)$", t)
+    m_do = rx.REF_UPTO_EXACT.match(t)
     if m_do:
         t = f"<{m_do.group(1)}"
 
     # Удаляем пробелы, но оставляем дефис между числами
-    t = re.sub(r"\s+", "", t)
+    t = rx.WHITESPACE.sub("", t)
     
     # Проверяем на сравнения <=, >=, <, >
-    m = re.match(r"^(<=|<|≤)(-?\d+(?:\.\d+)?)$", t)
+    m = rx.REF_UPPER_EXACT.match(t)
     if m:
         return Range(low=None, high=float(m.group(2)))
 
-    m = re.match(r"^(>=|>|≥)(-?\d+(?:\.\d+)?)$", t)
+    m = rx.REF_LOWER_EXACT.match(t)
     if m:
         return Range(low=float(m.group(2)), high=None)
 
     # Проверяем диапазон вида "low-high"
-    m = re.match(r"^(-?\d+(?:\.\d+)?)-(-?\d+(?:\.\d+)?)$", t)
+    m = rx.REF_RANGE_EXACT.match(t)
     if m:
         low_val = float(m.group(1))
         high_val = float(m.group(2))
@@ -1191,19 +1370,19 @@ def format_range(r: Optional[Range]) -> str:
 # ============================================================
 def _extract_ref_text(s: str) -> str:
     t = (s or "").strip().replace("—", "-").replace("–", "-").replace(",", ".")
-    t = re.sub(r"\s+", " ", t)
+    t = rx.WHITESPACE.sub(" ", t)
 
-    m = re.search(r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_RANGE_DOT.search(t)
     if m:
         return f"{m.group(1)}-{m.group(2)}"
 
-    m = re.search(r"(<=|>=|<|>|≤|≥)\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_COMPARATOR_DOT.search(t)
     if m:
         op = m.group(1).replace("≤", "<=").replace("≥", ">=")
         return f"{op}{m.group(2)}"
 
     # Формат «до число» → «<число»
-    m = re.search(r"(?:^|\s)[Дд]о\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_UPTO.search(t)
     if m:
         return f"<{m.group(1)}"
 
@@ -1212,7 +1391,7 @@ def _extract_ref_text(s: str) -> str:
 
 def _starts_like_value_line(s: str) -> bool:
     t = (s or "").strip()
-    return bool(re.match(r"^(?:[↑↓+]\s*)?\d", t))
+    return bool(rx.VALUE_LINE_START.match(t))
 
 
 def _is_noise_line(low: str) -> bool:
@@ -1231,7 +1410,7 @@ def _looks_like_name_line(s: str) -> bool:
     if _starts_like_value_line(t):
         return False
     # должно быть хотя бы 2 буквы
-    if not re.search(r"[A-Za-zА-Яа-я]{2,}", t):
+    if not rx.LETTERS2.search(t):
         return False
     return True
 
@@ -1246,7 +1425,7 @@ def _normalize_scientific_notation(s: str) -> str:
     s = s.replace("⁴", "^4").replace("⁵", "^5").replace("⁶", "^6")
     s = s.replace("⁷", "^7").replace("⁸", "^8").replace("⁹", "^9").replace("⁰", "^0")
     # Варианты записи: 10~9, 10*9 → 10^9 (без -, чтобы не ломать рефы типа "10 - 40")
-    s = re.sub(r"10\s*[~*]\s*(\d+)", r"10^\1", s, flags=re.IGNORECASE)
+    s = rx.POW10_OCR_VARIANT.sub(r"10^\1", s)
     # Если уже есть 10^N - оставляем как есть
     return s
 
@@ -1260,23 +1439,18 @@ def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
     - "28 мм/ч" -> (28.0, "мм/ч")
     - "77.0 %" -> (77.0, "%")
     """
-    t = re.sub(r"\s+", " ", (s or "").strip())
+    t = rx.WHITESPACE.sub(" ", (s or "").strip())
     t = t.replace("↑", "").replace("↓", "").replace("+", "").strip()
     # Strip leading comparison operators: "< 37 пмоль/л" → "37 пмоль/л"
-    t = re.sub(r"^[<>≤≥]=?\s*", "", t).strip()
+    t = rx.LEADING_COMPARATOR.sub("", t).strip()
 
     # Нормализуем научную нотацию
     t = _normalize_scientific_notation(t)
     
     # Сначала пытаемся найти формат *10^N или 10^N (с пробелами или без)
     # Варианты: "*10^9/л", "* 10^9 /л", "10^9/л"
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)(.*)$",  # 8.23 *10^9/л
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)(.*)$",       # 8.23 10^9/л
-    ]
-    
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, t, re.IGNORECASE)
+    for pattern in rx.HELIX_POW10_VALUE_UNIT:
+        pow_match = pattern.search(t)
         if pow_match:
             base = parse_float(pow_match.group(1))
             if base is not None:
@@ -1292,13 +1466,13 @@ def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
                     after_match_end = pow_match.end()
                     if after_match_end < len(t):
                         after_part = t[after_match_end:].strip()
-                        if after_part and not re.match(r"^\d", after_part):
+                        if after_part and not rx.LEADING_DIGIT.match(after_part):
                             # Это не число, скорее всего единица
                             unit = f"{unit}{after_part}".strip()
                 return base, unit
     
     # Обычный формат: число + единица (без степени)
-    m = re.match(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)$", t)
+    m = rx.VALUE_WITH_REST.match(t)
     if not m:
         return None, ""
     val = parse_float(m.group(1))
@@ -1307,7 +1481,7 @@ def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
     # Но сохраняем %, мм/ч, г/л целиком
     if rest:
         # Если есть / или %, берём до следующего пробела или до конца
-        unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", rest)
+        unit_match = rx.UNIT_TOKEN.match(rest)
         if unit_match:
             unit = unit_match.group(1).strip()
         else:
@@ -1325,7 +1499,13 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
       "NE% 77.0 % 47.0 - 72.0"
     Возвращает: name\tvalue\tref\tunit
     """
-    s = re.sub(r"\s+", " ", (line or "").strip())
+    cand = _one_line_row_candidate(line)
+    return cand.to_tsv() if cand is not None else None
+
+
+def _one_line_row_candidate(line: str) -> Optional[Candidate]:
+    """_try_parse_one_line_row, но возвращает Candidate."""
+    s = rx.WHITESPACE.sub(" ", (line or "").strip())
     if not s:
         return None
     low = s.lower()
@@ -1335,8 +1515,8 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
         return None
 
     # найдём референс (span) прямо в строке
-    range_match = re.search(r"(-?\d+(?:[.,]\d+)?)\s*[–—-]\s*(-?\d+(?:[.,]\d+)?)", s)
-    comp_match = re.search(r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)", s)
+    range_match = rx.REF_RANGE.search(s)
+    comp_match = rx.REF_COMPARATOR.search(s)
 
     ref_span = None
     ref_text = ""
@@ -1361,10 +1541,8 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
     # When first comp_match is used as ref but left has no digits,
     # look for a second comp operator → first is value, second is ref.
     if not range_match and comp_match and ref_span == comp_match.span():
-        if not re.search(r"\d", left):
-            second_comp = re.search(
-                r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)", right
-            )
+        if not rx.DIGIT.search(left):
+            second_comp = rx.REF_COMPARATOR.search(right)
             if second_comp:
                 value_num = parse_float(comp_match.group(2).replace(",", "."))
                 if value_num is not None:
@@ -1374,22 +1552,17 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
                     between = right[:second_comp.start()].strip()
                     unit = between if between else ""
                     name_part = left.strip()
-                    if name_part and re.search(r"[A-Za-zА-Яа-я]", name_part):
-                        return f"{name_part}\t{value_num:g}\t{new_ref}\t{unit}".strip()
+                    if name_part and rx.LETTER.search(name_part):
+                        return Candidate(name_part, value_num, new_ref, unit, source="helix")
 
     # значение — последнее число в left (или число перед *10^N)
     left_norm = left.replace(",", ".")
     left_norm = _normalize_scientific_notation(left_norm)  # Нормализуем научную нотацию
     
     # Сначала проверяем формат *10^N или 10^N
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)",  # 8.23 *10^9
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)",       # 8.23 10^9
-    ]
-    
     pow_match = None
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, left_norm, re.IGNORECASE)
+    for pattern in rx.HELIX_POW10_VALUE:
+        pow_match = pattern.search(left_norm)
         if pow_match:
             break
     
@@ -1415,7 +1588,7 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
                     unit = f"{unit}{right_unit}"
     else:
         # Обычный формат: берём последнее число
-        nums = re.findall(r"[-+]?\d+(?:\.\d+)?", left_norm)
+        nums = rx.NUMBER.findall(left_norm)
         if not nums:
             return None
         value_str = nums[-1]
@@ -1424,7 +1597,7 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
             return None
         name_part = left_norm.rsplit(value_str, 1)[0].strip()
         # Strip trailing comparison operators (e.g., "Тестостерон >" → "Тестостерон")
-        name_part = re.sub(r'\s*[<>≤≥]=?\s*$', '', name_part).strip()
+        name_part = rx.TRAILING_COMPARATOR.sub('', name_part).strip()
         # unit: чаще всего после value в left (например "73.0 %") или в right
         unit = ""
         # Ищем единицу после числа в left
@@ -1432,16 +1605,16 @@ def _try_parse_one_line_row(line: str) -> Optional[str]:
         if after_value:
             after_value = after_value.strip()
             # Берём первую часть (до пробела или до конца), сохраняя / и %
-            unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", after_value)
+            unit_match = rx.UNIT_TOKEN.match(after_value)
             if unit_match:
                 unit = unit_match.group(1).strip()
         if not unit and right:
             unit = right.split(" ")[0].strip()
     
-    if not name_part or not re.search(r"[A-Za-zА-Яа-я]", name_part):
+    if not name_part or not rx.LETTER.search(name_part):
         return None
 
-    return f"{name_part}\t{value:g}\t{ref_text}\t{unit}".strip()
+    return Candidate(name_part, value, ref_text, unit, source="helix")
 
 
 def helix_table_to_candidates(plain_text: str) -> str:
@@ -1452,16 +1625,22 @@ def helix_table_to_candidates(plain_text: str) -> str:
     
     Обрабатывает все страницы PDF - игнорирует маркеры страниц (--- PAGE N ---), если они есть.
     """
-    lines = [re.sub(r"\s+", " ", l.strip()) for l in (plain_text or "").splitlines()]
+    return format_candidates(helix_table_candidates(plain_text)).strip()
+
+
+def helix_table_candidates(plain_text: str) -> List[Candidate]:
+    """helix_table_to_candidates без форматирования в TSV: список Candidate."""
+    lines = [rx.WHITESPACE.sub(" ", l.strip()) for l in (plain_text or "").splitlines()]
     # Убираем маркеры страниц (если они остались после ocr_result_to_plaintext)
-    lines = [l for l in lines if l and not re.match(r"^---\s*PAGE\s+\d+\s+---", l, re.IGNORECASE)]
+    lines = [l for l in lines if l and not rx.HELIX_PAGE_MARKER.match(l)]
     lines = [l for l in lines if l]
     _dbg(f"helix_table_to_candidates: input_lines={len(lines)} (после удаления маркеров страниц)")
 
-    out: List[str] = []
+    out: List[Candidate] = []
 
     # pass1: двухстрочный
     pending_name: Optional[str] = None
+    pending_pos = 0
     i = 0
     while i < len(lines):
         l = lines[i]
@@ -1473,13 +1652,14 @@ def helix_table_to_candidates(plain_text: str) -> str:
 
         if _looks_like_name_line(l):
             pending_name = l
+            pending_pos = i
             i += 1
             continue
 
         if pending_name and _starts_like_value_line(l):
             # Объединяем текущую строку и следующую (если есть), чтобы поймать *10^N
             combined_line = l
-            if i + 1 < len(lines) and re.search(r"^\s*\d+\s", lines[i + 1]):
+            if i + 1 < len(lines) and rx.NEXT_LINE_NUMBER.search(lines[i + 1]):
                 # Следующая строка начинается с числа — возможно продолжение *10^N
                 combined_line = f"{l} {lines[i + 1]}"
             
@@ -1501,8 +1681,7 @@ def helix_table_to_candidates(plain_text: str) -> str:
                     adv = 2
 
             if ref:
-                candidate = f"{pending_name}\t{val:g}\t{ref}\t{unit}".strip()
-                out.append(candidate)
+                out.append(Candidate(pending_name, val, ref, unit, source="helix", span=(pending_pos, i + adv)))
                 _dbg(f"candidate (2-line): {pending_name[:40]}... val={val} ref={ref} unit={unit}")
                 pending_name = None
                 i += adv
@@ -1520,52 +1699,71 @@ def helix_table_to_candidates(plain_text: str) -> str:
         i += 1
 
     # pass2: однострочный
-    out2: List[str] = []
-    for l in lines:
-        cand = _try_parse_one_line_row(l)
-        if cand:
+    out2: List[Candidate] = []
+    for pos, l in enumerate(lines):
+        cand = _one_line_row_candidate(l)
+        if cand is not None:
+            cand.span = (pos, pos + 1)
             out2.append(cand)
-            _dbg(f"candidate (1-line): {cand[:60]}...")
+            _dbg(f"candidate (1-line): {cand.to_tsv()[:60]}...")
 
-    merged = _dedup_lines_keep_order(out + out2)
+    merged = _dedup_candidates_keep_order(out + out2)
     _dbg(f"helix_table_to_candidates: output_lines={len(merged)} (2-line={len(out)}, 1-line={len(out2)})")
-    return "\n".join(merged).strip()
+    return merged
+
+
+def _dedup_candidates_keep_order(candidates: Sequence[Candidate]) -> List[Candidate]:
+    """_dedup_lines_keep_order по TSV-строкам кандидатов."""
+    seen = set()
+    out = []
+    for c in candidates:
+        k = rx.WHITESPACE.sub(" ", c.to_tsv().strip())
+        if not k or k in seen:
+            continue
+        seen.add(k)
+        out.append(c)
+    return out
+
+
+# Подстроки, при наличии которых в имени кандидат считается мусором
+_NOISE_CANDIDATE_SUBSTRINGS = (
+    "гост",
+    "гемотест",
+    "лаборатория гемотест",
+    "лаборатория инвитро",
+    "лаборатория медси",
+    "лаборатория хеликс",
+    "сертификат соответствия",
+    "правообладател",
+    "iso 9001",
+    "iso 15189",
+    "iso 13485",
+)
+
+
+def _is_noise_candidate_name(name: str) -> bool:
+    from parsers.line_scorer import line_features
+
+    name = name.strip()
+    # Проверка 1: is_noise (prefix-based)
+    if line_features(name).is_noise:
+        return True
+    # Проверка 2: contains-based для оставшихся случаев
+    name_lower = name.lower()
+    return any(sub in name_lower for sub in _NOISE_CANDIDATE_SUBSTRINGS)
 
 
 def _filter_noise_candidates(candidates: str) -> str:
     """Убирает кандидаты, чьё имя является мусорной строкой (ГОСТ, служебные и т.п.)."""
-    from parsers.line_scorer import is_noise
-
-    # Подстроки, при наличии которых в имени кандидат считается мусором
-    _NOISE_SUBSTRINGS = (
-        "гост",
-        "гемотест",
-        "лаборатория гемотест",
-        "лаборатория инвитро",
-        "лаборатория медси",
-        "лаборатория хеликс",
-        "сертификат соответствия",
-        "правообладател",
-        "iso 9001",
-        "iso 15189",
-        "iso 13485",
+    return "\n".join(
+        line for line in candidates.splitlines()
+        if not _is_noise_candidate_name(line.split("\t")[0])
     )
 
-    lines = candidates.splitlines()
-    filtered = []
-    for line in lines:
-        parts = line.split("\t")
-        if parts:
-            name = parts[0].strip()
-            name_lower = name.lower()
-            # Проверка 1: is_noise (prefix-based)
-            if is_noise(name):
-                continue
-            # Проверка 2: contains-based для оставшихся случаев
-            if any(sub in name_lower for sub in _NOISE_SUBSTRINGS):
-                continue
-        filtered.append(line)
-    return "\n".join(filtered)
+
+def _filter_noise_candidate_records(candidates: Sequence[Candidate]) -> List[Candidate]:
+    """_filter_noise_candidates для списка Candidate."""
+    return [c for c in candidates if not _is_noise_candidate_name(c.name)]
 
 
 def _prestrip_interstitial_noise(raw_text: str) -> str:
@@ -1579,7 +1777,7 @@ def _prestrip_interstitial_noise(raw_text: str) -> str:
     Безопасно: сохраняем строки-значения (начинаются с цифры/стрелки),
     строки-единицы (л, мл, %, г/л, x10^…), и строки-имена.
     """
-    from parsers.line_scorer import is_header_service_line, is_noise
+    from parsers.line_scorer import line_features
 
     lines = raw_text.splitlines()
     result: list[str] = []
@@ -1590,17 +1788,18 @@ def _prestrip_interstitial_noise(raw_text: str) -> str:
             continue
 
         # Всегда убираем header/service строки (коды услуг, лицензии, приказы)
-        if is_header_service_line(s):
+        features = line_features(s)
+        if features.is_header_service:
             continue
 
         # Проверяем is_noise, но сохраняем потенциальные значения и единицы
-        if is_noise(s):
+        if features.is_noise:
             # Строки с цифрой в начале — возможные значения → сохраняем
-            if re.match(r'^[↑↓+\-]?\s*\d', s):
+            if rx.NOISE_VALUE_START.match(s):
                 result.append(ln)
                 continue
             # Короткие строки из букв/символов единиц (л, мл, %, фл) → сохраняем
-            if re.match(r'^[а-яА-Яa-zA-Z/%*^°µ]+[/а-яА-Яa-zA-Z0-9^]*$', s) and len(s) <= 15:
+            if rx.NOISE_UNIT_LINE.match(s) and len(s) <= 15:
                 result.append(ln)
                 continue
             # Остальной шум → убираем
@@ -1704,162 +1903,230 @@ def _merge_conditional_refs(text: str) -> str:
 
 def _smart_to_candidates(raw_text: str) -> str:
     """
-    Авто-детект формата лаборатории и преобразование в TSV-кандидаты.
+    Авто-детект формата лаборатории и преобразование в TSV-кандидаты
+    (_smart_candidates, отформатированные в TSV).
+    """
+    return format_candidates(_smart_candidates(raw_text))
+
+
+def _smart_candidates(raw_text: str) -> List[Candidate]:
+    """
+    Авто-детект формата лаборатории и извлечение кандидатов (Candidate).
 
     Порядок:
       1. МЕДСИ — специальная обработка (склейки ref+value).
-      2. HELIX → helix_table_to_candidates.
+      2. HELIX → helix_table_candidates.
       3. INVITRO → universal_extract (будущий invitro_parser).
       4. Иначе → universal_extract.
 
     ВАЖНО: universal НЕ вызывает helix. UNKNOWN НЕ вызывает helix.
     """
     from parsers.lab_detector import detect_lab, LabType
-    from parsers.medsi_extractor import medsi_inline_to_candidates
-    from parsers.universal_extractor import universal_extract
+    from parsers.medsi_extractor import medsi_inline_candidates
+    from parsers.universal_extractor import universal_extract_candidates
 
     # Merge multi-line conditional reference ranges before any extraction
     raw_text = _merge_conditional_refs(raw_text)
 
     det = detect_lab(raw_text)
-    _dbg(f"_smart_to_candidates: detected {det.lab_type.value} "
+    _dbg(f"_smart_candidates: detected {det.lab_type.value} "
          f"(conf={det.confidence:.2f}, sigs={det.matched_signatures})")
 
     # ─── МЕДСИ ───
     if det.lab_type == LabType.MEDSI:
-        candidates = medsi_inline_to_candidates(raw_text)
-        cand_count = len(candidates.splitlines()) if candidates else 0
+        candidates = medsi_inline_candidates(raw_text)
+        cand_count = len(candidates)
         if cand_count >= 5:
-            candidates = _filter_noise_candidates(candidates)
-            _dbg(f"_smart_to_candidates: MEDSI → {len(candidates.splitlines()) if candidates.strip() else 0} candidates (raw {cand_count})")
+            candidates = _filter_noise_candidate_records(candidates)
+            _dbg(f"_smart_candidates: MEDSI → {len(candidates)} candidates (raw {cand_count})")
             return candidates
-        _dbg(f"_smart_to_candidates: MEDSI returned only {cand_count} candidates, falling back to universal")
+        _dbg(f"_smart_candidates: MEDSI returned only {cand_count} candidates, falling back to universal")
 
     # ─── CITILAB (→ universal with pre-clean) ───
     if det.lab_type == LabType.CITILAB:
         cleaned_text = _prestrip_interstitial_noise(raw_text)
-        candidates = universal_extract(cleaned_text)
+        candidates = universal_extract_candidates(cleaned_text)
         if candidates:
-            candidates = _filter_noise_candidates(candidates)
-            _dbg(f"_smart_to_candidates: CITILAB (universal) → {len(candidates.splitlines())} candidates")
+            candidates = _filter_noise_candidate_records(candidates)
+            _dbg(f"_smart_candidates: CITILAB (universal) → {len(candidates)} candidates")
             return candidates
-        _dbg("_smart_to_candidates: CITILAB (universal) empty, falling back")
+        _dbg("_smart_candidates: CITILAB (universal) empty, falling back")
 
     # ─── HELIX ───
     if det.lab_type == LabType.HELIX:
-        candidates = helix_table_to_candidates(raw_text)
-        cand_count = len(candidates.splitlines()) if candidates else 0
+        candidates = helix_table_candidates(raw_text)
+        cand_count = len(candidates)
         if cand_count >= 5:
-            candidates = _filter_noise_candidates(candidates)
-            _dbg(f"_smart_to_candidates: HELIX → {len(candidates.splitlines()) if candidates.strip() else 0} candidates (raw {cand_count})")
+            candidates = _filter_noise_candidate_records(candidates)
+            _dbg(f"_smart_candidates: HELIX → {len(candidates)} candidates (raw {cand_count})")
             return candidates
-        _dbg(f"_smart_to_candidates: HELIX returned only {cand_count} candidates, falling back to universal")
+        _dbg(f"_smart_candidates: HELIX returned only {cand_count} candidates, falling back to universal")
 
     # ─── INVITRO (пока → universal, место для будущего invitro_parser) ───
     if det.lab_type == LabType.INVITRO:
         # TODO: заменить на invitro_parser, когда будет готов
         cleaned_text = _prestrip_interstitial_noise(raw_text)
-        candidates = universal_extract(cleaned_text)
+        candidates = universal_extract_candidates(cleaned_text)
         if candidates:
-            candidates = _filter_noise_candidates(candidates)
-            _dbg(f"_smart_to_candidates: INVITRO (universal) → {len(candidates.splitlines())} candidates")
+            candidates = _filter_noise_candidate_records(candidates)
+            _dbg(f"_smart_candidates: INVITRO (universal) → {len(candidates)} candidates")
             return candidates
-        _dbg("_smart_to_candidates: INVITRO (universal) empty")
+        _dbg("_smart_candidates: INVITRO (universal) empty")
 
     # ─── GEMOTEST (→ universal) ───
     if det.lab_type == LabType.GEMOTEST:
         cleaned_text = _prestrip_interstitial_noise(raw_text)
-        candidates = universal_extract(cleaned_text)
+        candidates = universal_extract_candidates(cleaned_text)
         if candidates:
-            candidates = _filter_noise_candidates(candidates)
-            _dbg(f"_smart_to_candidates: GEMOTEST (universal) → {len(candidates.splitlines())} candidates")
+            candidates = _filter_noise_candidate_records(candidates)
+            _dbg(f"_smart_candidates: GEMOTEST (universal) → {len(candidates)} candidates")
             return candidates
-        _dbg("_smart_to_candidates: GEMOTEST (universal) empty")
+        _dbg("_smart_candidates: GEMOTEST (universal) empty")
 
     # ─── UNKNOWN / fallback ───
     cleaned_text = _prestrip_interstitial_noise(raw_text)
-    candidates = universal_extract(cleaned_text)
+    candidates = universal_extract_candidates(cleaned_text)
     if candidates:
-        candidates = _filter_noise_candidates(candidates)
-        _dbg(f"_smart_to_candidates: Universal → {len(candidates.splitlines())} candidates")
+        candidates = _filter_noise_candidate_records(candidates)
+        _dbg(f"_smart_candidates: Universal → {len(candidates)} candidates")
         return candidates
 
-    _dbg("_smart_to_candidates: all extractors returned empty")
-    return ""
+    _dbg("_smart_candidates: all extractors returned empty")
+    return []
 
 
-def parse_items_from_candidates(raw_text: str) -> List[Item]:
+_CANDIDATES_MEMO: "OrderedDict[bytes, Tuple[Callable[[str], List[Candidate]], Tuple[Candidate, ...]]]" = OrderedDict()
+_CANDIDATES_MEMO_LOCK = threading.Lock()
+_CANDIDATES_MEMO_STATS = {"hits": 0, "misses": 0}
+
+
+def text_to_candidates(raw_text: str) -> str:
+    """TSV-кандидаты текста (text_to_candidate_records, отформатированные в TSV)."""
+    return format_candidates(text_to_candidate_records(raw_text))
+
+
+def text_to_candidate_records(raw_text: str) -> List[Candidate]:
     """
-    Поддерживаем:
-      1) name\tvalue\tref\tunit
-      2) name\tvalue\tref unit
-      3) name\tvalue unit\tref
-      4) name value *10^N\t... (исправление разбитых значений)
+    _smart_candidates (склейка условных ref, detect_lab, экстрактор) с мемо
+    по дайджесту текста: LRU на CANDIDATES_MEMO_MAX_ENTRIES текстов.
+    Запись привязана к текущей _smart_candidates — если её подменили,
+    старые результаты не используются. Кандидаты из мемо общие — не изменять.
     """
-    items: List[Item] = []
+    extract = _smart_candidates
+    if not CANDIDATES_MEMO_ENABLED or CANDIDATES_MEMO_MAX_ENTRIES <= 0:
+        return extract(raw_text)
+
+    key = hashlib.blake2b(raw_text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _CANDIDATES_MEMO_LOCK:
+        entry = _CANDIDATES_MEMO.get(key)
+        if entry is not None and entry[0] is extract:
+            _CANDIDATES_MEMO.move_to_end(key)
+            _CANDIDATES_MEMO_STATS["hits"] += 1
+            _dbg(f"text_to_candidate_records: memo hit ({len(raw_text)} chars)")
+            return list(entry[1])
+
+    candidates = extract(raw_text)
+    with _CANDIDATES_MEMO_LOCK:
+        _CANDIDATES_MEMO[key] = (extract, tuple(candidates))
+        _CANDIDATES_MEMO.move_to_end(key)
+        while len(_CANDIDATES_MEMO) > CANDIDATES_MEMO_MAX_ENTRIES:
+            _CANDIDATES_MEMO.popitem(last=False)
+        _CANDIDATES_MEMO_STATS["misses"] += 1
+    return candidates
+
+
+def candidates_memo_stats() -> Dict[str, int]:
+    with _CANDIDATES_MEMO_LOCK:
+        return dict(_CANDIDATES_MEMO_STATS, entries=len(_CANDIDATES_MEMO))
+
+
+def clear_candidates_memo() -> None:
+    with _CANDIDATES_MEMO_LOCK:
+        _CANDIDATES_MEMO.clear()
+
+
+def _split_candidate_ref_and_unit(ref_text: str) -> tuple[str, str]:
+    """"3.8-5.1 г/л" → ("3.8-5.1", "г/л"), если единица прилипла к референсу."""
+    t = (ref_text or "").strip()
+    if not t:
+        return "", ""
+    t_norm = t.replace("—", "-").replace("–", "-")
+    t_norm = rx.WHITESPACE.sub(" ", t_norm).strip()
+    m = rx.REF_WITH_UNIT.match(t_norm)
+    if not m:
+        return t, ""
+    left = m.group(1).strip()
+    unit = m.group(2).strip()
 
-    def _split_ref_and_unit(ref_text: str) -> tuple[str, str]:
-        t = (ref_text or "").strip()
-        if not t:
-            return "", ""
-        t_norm = t.replace("—", "-").replace("–", "-")
-        t_norm = re.sub(r"\s+", " ", t_norm).strip()
-        m = re.match(r"^(.+?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$", t_norm)
-        if not m:
-            return t, ""
-        left = m.group(1).strip()
-        unit = m.group(2).strip()
+    left_check = left.replace(",", ".").replace(" ", "")
+    left_check = left_check.replace("≤", "<=").replace("≥", ">=")
+
+    if rx.REF_RANGE_EXACT_G.match(left_check) or rx.REF_COMPARATOR_EXACT_ASCII.match(left_check):
+        return left, unit
 
-        left_check = left.replace(",", ".").replace(" ", "")
-        left_check = left_check.replace("≤", "<=").replace("≥", ">=")
+    return t, ""
 
-        if re.match(r"^(-?\d+(\.\d+)?)-(-?\d+(\.\d+)?)$", left_check) or re.match(r"^(<=|>=|<|>)(-?\d+(\.\d+)?)$", left_check):
-            return left, unit
 
+def _split_candidate_value_and_unit(val_text: str) -> tuple[str, str]:
+    """"5.2 г/л" → ("5.2", "г/л"), если единица прилипла к значению."""
+    t = rx.WHITESPACE.sub(" ", (val_text or "").strip())
+    if not t:
+        return "", ""
+    m = rx.VALUE_WITH_UNIT.match(t)
+    if not m:
         return t, ""
+    return m.group(1), m.group(2)
 
-    def _split_value_and_unit(val_text: str) -> tuple[str, str]:
-        t = re.sub(r"\s+", " ", (val_text or "").strip())
-        if not t:
-            return "", ""
-        m = re.match(r"^([-+]?\d+(?:[.,]\d+)?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$", t)
-        if not m:
-            return t, ""
-        return m.group(1), m.group(2)
 
-    def _fix_broken_scientific_notation(raw_name: str, raw_val: str) -> tuple[str, str]:
-        """
-        Исправляет случаи, когда значение разбито:
-        raw_name = "Лейкоциты (WBC) 8.23 *10^"
-        raw_val = "9"
-        Возвращает: ("Лейкоциты (WBC)", "8.23")
-        """
-        # Проверяем, есть ли в raw_name паттерн "*10^"
-        pow_match = re.search(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^", raw_name, re.IGNORECASE)
-        if pow_match:
-            # raw_val может быть степенью (цифра) или уже корректным значением
-            raw_val_stripped = raw_val.strip()
-            # Извлекаем число перед *10^
-            base_str = pow_match.group(1).replace(",", ".")
-            base_val = parse_float(base_str)
-            if base_val is not None:
-                # Удаляем из raw_name всё от числа до конца
-                name_clean = raw_name[:pow_match.start()].strip()
-                # Если raw_val - это цифра (степень), игнорируем её, берём base_str
-                # Если raw_val - это уже значение, оставляем его
-                if raw_val_stripped.isdigit() and len(raw_val_stripped) <= 2:
-                    # Скорее всего это степень, игнорируем
-                    return name_clean, base_str
-                else:
-                    # Возможно, это уже значение
-                    val_check = parse_float(raw_val_stripped)
-                    if val_check is not None:
-                        return name_clean, raw_val_stripped
-                    return name_clean, base_str
-        return raw_name, raw_val
+def _fix_broken_scientific_notation(raw_name: str, raw_val: str) -> tuple[str, str]:
+    """
+    Исправляет случаи, когда значение разбито:
+    raw_name = "Лейкоциты (WBC) 8.23 *10^"
+    raw_val = "9"
+    Возвращает: ("Лейкоциты (WBC)", "8.23")
+    """
+    # Проверяем, есть ли в raw_name паттерн "*10^"
+    pow_match = rx.POW10_BROKEN_VALUE.search(raw_name)
+    if pow_match:
+        # raw_val может быть степенью (цифра) или уже корректным значением
+        raw_val_stripped = raw_val.strip()
+        # Извлекаем число перед *10^
+        base_str = pow_match.group(1).replace(",", ".")
+        base_val = parse_float(base_str)
+        if base_val is not None:
+            # Удаляем из raw_name всё от числа до конца
+            name_clean = raw_name[:pow_match.start()].strip()
+            # Если raw_val - это цифра (степень), игнорируем её, берём base_str
+            # Если raw_val - это уже значение, оставляем его
+            if raw_val_stripped.isdigit() and len(raw_val_stripped) <= 2:
+                # Скорее всего это степень, игнорируем
+                return name_clean, base_str
+            else:
+                # Возможно, это уже значение
+                val_check = parse_float(raw_val_stripped)
+                if val_check is not None:
+                    return name_clean, raw_val_stripped
+                return name_clean, base_str
+    return raw_name, raw_val
 
+
+def parse_items_from_candidates(raw_text: Union[str, Sequence[Candidate]]) -> List[Item]:
+    """
+    Поддерживаем:
+      1) name\tvalue\tref\tunit
+      2) name\tvalue\tref unit
+      3) name\tvalue unit\tref
+      4) name value *10^N\t... (исправление разбитых значений)
+
+    Вместо TSV можно передать список Candidate — тогда строки не разбираются
+    и значение берётся из кандидата как число.
+    """
     from parsers.line_scorer import is_noise as _is_noise_line
 
+    if not isinstance(raw_text, str):
+        return _items_from_candidate_records(raw_text)
+
+    items: List[Item] = []
     for line in (raw_text or "").splitlines():
         if not line.strip():
             continue
@@ -1882,80 +2149,127 @@ def parse_items_from_candidates(raw_text: str) -> List[Item]:
 
         # если unit прилип к value
         if not unit:
-            raw_val2, unit2 = _split_value_and_unit(raw_val)
+            raw_val2, unit2 = _split_candidate_value_and_unit(raw_val)
             if unit2:
                 raw_val = raw_val2
                 unit = unit2
 
-        # если unit прилип к ref
-        if not unit:
-            ref2, unit2 = _split_ref_and_unit(ref_text)
-            if unit2:
-                ref_text = ref2
-                unit = unit2
-        
-        # Очистка единицы от повторяющихся референсов (например, "*10^9/л 0.02 - 0.50" -> "*10^9/л")
-        if unit:
-            # Удаляем из единицы паттерны, похожие на референсы (числа с дефисом или диапазоны)
-            unit_cleaned = re.sub(r"\s+\d+\.?\d*\s*[-–—]\s*\d+\.?\d*", "", unit).strip()
-            # Если единица стала пустой или слишком короткой, оставляем оригинал
-            if unit_cleaned and len(unit_cleaned) >= 2:
-                unit = unit_cleaned
-
-        raw_name_cleaned = clean_raw_name(raw_name)
-        name = normalize_name(raw_name)
-        if name == raw_name.replace(" ", "_").replace("-", "_").upper():
-            # если нормализация не дала смысла — попробуем по cleaned
-            name = normalize_name(raw_name_cleaned)
-
-        value = parse_float(raw_val)
-        ref = parse_ref_range(ref_text) if ref_text else None
-        status = status_by_range(value, ref)
-        ref_source = "референс лаборатории" if ref else "нет"
-
-        # Логирование проблемных случаев
-        if value is not None and ref is not None:
-            if status == "ВЫШЕ" and value <= ref.high if ref.high else False:
-                _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
-            if status == "НИЖЕ" and value >= ref.low if ref.low else False:
-                _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
-
-        # Подмена неполного raw_name на красивое отображаемое имя
-        _DISPLAY_OVERRIDE = {
-            "MCH": "Среднее содержание Hb в эр. (MCH)",
-            "MCHC": "Средняя концентрация Hb в эр. (MCHC)",
-        }
-        if name in _DISPLAY_OVERRIDE and len(raw_name) < 20:
-            raw_name = _DISPLAY_OVERRIDE[name]
-
-        # Очистка raw_name от мусора (коды приказов, биоматериал, коды услуг) для отображения
-        raw_name_display = sanitize_raw_name(raw_name)
-
-        # P8: если после очистки имя слишком короткое — подставляем из DISPLAY_NAME_MAP
-        _name_core = re.sub(r'\([^)]*\)', '', raw_name_display).strip()
-        if len(_name_core) < 3 and name in DISPLAY_NAME_MAP:
-            raw_name_display = DISPLAY_NAME_MAP[name]
-
-        # P6: фильтр мусорных имён (МЗ РФ, DCCT, биоматериал и т.п.)
-        if _is_garbage_name(raw_name_display):
-            _dbg(f"Garbage name filtered: '{raw_name_display}' (original: '{raw_name}')")
-            continue  # skip this item
-
-        items.append(Item(
-            raw_name=raw_name_display,
-            name=name,
-            value=value,
-            unit=unit,
-            ref_text=ref_text,
-            ref=ref,
-            ref_source=ref_source,
-            status=status,
-        ))
+        item = _candidate_item(raw_name, parse_float(raw_val), ref_text, unit)
+        if item is not None:
+            items.append(item)
+
+    return items
+
+
+def _items_from_candidate_records(candidates: Sequence[Candidate]) -> List[Item]:
+    """parse_items_from_candidates для списка Candidate."""
+    from parsers.line_scorer import is_noise as _is_noise_line
+
+    items: List[Item] = []
+    for c in candidates:
+        raw_name = c.name.strip()
+        # Кандидат без ref и единицы, срезанный до двух колонок, как и в TSV не берём
+        if c.columns < 3 or _is_noise_line(raw_name):
+            continue
+
+        value = c.value
+        if "^" in raw_name:
+            # Исправление разбитых значений с *10^ (значение — из имени)
+            raw_val = c.value_str
+            raw_name, fixed_val = _fix_broken_scientific_notation(raw_name, raw_val)
+            if fixed_val != raw_val:
+                value = parse_float(fixed_val)
+
+        item = _candidate_item(raw_name, value, c.ref.strip(), c.unit.strip())
+        if item is not None:
+            items.append(item)
 
     return items
 
 
-def parse_with_fallback(raw_text: str) -> List[Item]:
+def _candidate_item(raw_name: str, value: Optional[float], ref_text: str, unit: str) -> Optional[Item]:
+    """Item из полей кандидата (общая часть разбора TSV и Candidate); None — мусорное имя."""
+    # если unit прилип к ref
+    if not unit:
+        ref2, unit2 = _split_candidate_ref_and_unit(ref_text)
+        if unit2:
+            ref_text = ref2
+            unit = unit2
+
+    # Очистка единицы от повторяющихся референсов (например, "*10^9/л 0.02 - 0.50" -> "*10^9/л")
+    if unit:
+        # Удаляем из единицы паттерны, похожие на референсы (числа с дефисом или диапазоны)
+        unit_cleaned = rx.UNIT_TRAILING_RANGE.sub("", unit).strip()
+        # Если единица стала пустой или слишком короткой, оставляем оригинал
+        if unit_cleaned and len(unit_cleaned) >= 2:
+            unit = unit_cleaned
+
+    raw_name_cleaned = clean_raw_name(raw_name)
+    name = normalize_name(raw_name)
+    if name == raw_name.replace(" ", "_").replace("-", "_").upper():
+        # если нормализация не дала смысла — попробуем по cleaned
+        name = normalize_name(raw_name_cleaned)
+
+    ref = parse_ref_range(ref_text) if ref_text else None
+    status = status_by_range(value, ref)
+    ref_source = "референс лаборатории" if ref else "нет"
+
+    # Логирование проблемных случаев
+    if value is not None and ref is not None:
+        if status == "ВЫШЕ" and value <= ref.high if ref.high else False:
+            _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
+        if status == "НИЖЕ" and value >= ref.low if ref.low else False:
+            _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
+
+    # Подмена неполного raw_name на красивое отображаемое имя
+    _DISPLAY_OVERRIDE = {
+        "MCH": "Среднее содержание Hb в эр. (MCH)",
+        "MCHC": "Средняя концентрация Hb в эр. (MCHC)",
+    }
+    if name in _DISPLAY_OVERRIDE and len(raw_name) < 20:
+        raw_name = _DISPLAY_OVERRIDE[name]
+
+    # Очистка raw_name от мусора (коды приказов, биоматериал, коды услуг) для отображения
+    raw_name_display = sanitize_raw_name(raw_name)
+
+    # P8: если после очистки имя слишком короткое — подставляем из DISPLAY_NAME_MAP
+    _name_core = rx.PARENS.sub('', raw_name_display).strip()
+    if len(_name_core) < 3 and name in DISPLAY_NAME_MAP:
+        raw_name_display = DISPLAY_NAME_MAP[name]
+
+    # P6: фильтр мусорных имён (МЗ РФ, DCCT, биоматериал и т.п.)
+    if _is_garbage_name(raw_name_display):
+        _dbg(f"Garbage name filtered: '{raw_name_display}' (original: '{raw_name}')")
+        return None
+
+    return Item(
+        raw_name=raw_name_display,
+        name=name,
+        value=value,
+        unit=unit,
+        ref_text=ref_text,
+        ref=ref,
+        ref_source=ref_source,
+        status=status,
+    )
+
+
+@dataclass(slots=True)
+class ParseOutcome:
+    """
+    Итог выбора baseline / fallback для одного текста.
+
+    quality — evaluate_parse_quality(items) без счётчиков дублей и sanity
+    (None, если для выбранных items она не считалась или устарела);
+    deduped=True — confidence уже назначен и дубли сняты, повторять не нужно.
+    """
+    items: List[Item]
+    source: str = "none"  # "baseline" / "fallback" / "none"
+    quality: Optional[dict] = None
+    deduped: bool = False
+
+
+def _select_parse(raw_text: Union[str, Sequence[Candidate]]) -> ParseOutcome:
     """
     Архитектура "baseline-first + safe-fallback":
 
@@ -1972,20 +2286,32 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
       3) max valid_ref_count    (больше референсов)
 
     ВАЖНО: baseline-логика НЕ изменяется. Fallback — отдельный модуль.
+
+    raw_text может быть списком Candidate: baseline разбирает записи,
+    а TSV для fallback собирается, только если до него дошло.
+
+    Посчитанные по пути confidence, дедупликация и качество baseline
+    возвращаются в ParseOutcome, чтобы _run_parse_pipeline их не пересчитывал.
     """
     from parsers.quality import evaluate_parse_quality
     from parsers.fallback_generic import fallback_parse_candidates
 
+    def _fallback_text() -> str:
+        return raw_text if isinstance(raw_text, str) else format_candidates(raw_text)
+
     # --- ШАГ 1: baseline ---
-    baseline_items = parse_items_from_candidates(raw_text) if "\t" in raw_text else []
+    if isinstance(raw_text, str):
+        baseline_items = parse_items_from_candidates(raw_text) if "\t" in raw_text else []
+    else:
+        baseline_items = parse_items_from_candidates(raw_text)
     if not baseline_items:
         # Baseline ничего не дал — пробуем fallback
         _dbg("parse_with_fallback: baseline returned 0 items, trying fallback")
-        fallback_items = fallback_parse_candidates(raw_text)
+        fallback_items = fallback_parse_candidates(_fallback_text())
         if fallback_items:
             _dbg(f"parse_with_fallback: fallback returned {len(fallback_items)} items")
-            return fallback_items
-        return baseline_items  # пустой список
+            return ParseOutcome(fallback_items, "fallback")
+        return ParseOutcome(baseline_items)  # пустой список
 
     # --- ШАГ 1.5: дедупликация baseline ---
     assign_confidence(baseline_items)
@@ -1993,6 +2319,7 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
 
     # --- ШАГ 2: оцениваем качество baseline ---
     baseline_quality = evaluate_parse_quality(baseline_items)
+    baseline = ParseOutcome(baseline_items, "baseline", baseline_quality, deduped=True)
     _dbg(f"parse_with_fallback: baseline quality={baseline_quality}")
 
     needs_fallback = (
@@ -2003,16 +2330,17 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
     if not needs_fallback:
         # Baseline достаточно хорош — возвращаем его
         _dbg("parse_with_fallback: baseline OK, no fallback needed")
-        return baseline_items
+        return baseline
 
     # --- ШАГ 3: fallback ---
     _dbg("parse_with_fallback: baseline insufficient, running fallback")
-    fallback_items = fallback_parse_candidates(raw_text)
+    fallback_items = fallback_parse_candidates(_fallback_text())
 
     if not fallback_items:
         _dbg("parse_with_fallback: fallback returned 0 items, using baseline")
-        return baseline_items
+        return baseline
 
+    # Качество fallback считается до confidence и дедупликации — только для сравнения
     fallback_quality = evaluate_parse_quality(fallback_items)
     _dbg(f"parse_with_fallback: fallback quality={fallback_quality}")
 
@@ -2035,10 +2363,15 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
 
     if fallback_rank > baseline_rank:
         _dbg(f"parse_with_fallback: fallback wins (rank {fallback_rank} > {baseline_rank})")
-        return fallback_items
+        return ParseOutcome(fallback_items, "fallback")
     else:
         _dbg(f"parse_with_fallback: baseline wins (rank {baseline_rank} >= {fallback_rank})")
-        return baseline_items
+        return baseline
+
+
+def parse_with_fallback(raw_text: Union[str, Sequence[Candidate]]) -> List[Item]:
+    """Items, выбранные _select_parse (baseline или fallback)."""
+    return _select_parse(raw_text).items
 
 
 def detect_panel(parsed_names: Set[str]) -> Dict[str, int]:
@@ -2095,14 +2428,14 @@ def deduplicate_items(items: List[Item]) -> List[Item]:
         # HBA1C: prefer DCCT/NGSP (%) over IFCC (mmol/mol)
         if name == "HBA1C" and len(group) > 1:
             dcct = [it for it in group
-                    if re.search(r'(?i)\b(DCCT|NGSP)\b', it.raw_name or '')]
+                    if rx.HBA1C_DCCT.search(it.raw_name or '')]
             if dcct:
                 result.append(dcct[0])
                 dropped += len(group) - 1
                 continue
         # Сортируем: лучший первый
         group.sort(key=lambda it: (
-            getattr(it, 'confidence', 0.0),
+            it.confidence,
             1 if it.ref is not None else 0,
             1 if (it.unit or '').strip() else 0,
         ), reverse=True)
@@ -2143,13 +2476,52 @@ def drop_percent_if_absolute(items: List[Item]) -> List[Item]:
     return items
 
 
-def build_dict_explanations(high_low: List[Item]) -> str:
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def build_dict_explanations(high_low: List[Item], compact: bool = False) -> str:
+    """
+    Справка по отклонённым показателям для промпта.
+
+    Повторы не передаются: один показатель — одна строка, предложение,
+    уже встречавшееся в справке по другому показателю, опускается,
+    одинаковые справки объединяются в одну строку.
+    compact=True (большие панели) — только первое предложение справки.
+    """
     if not high_low:
         return "Нет отклонений — пояснения не требуются."
-    lines = []
+    entries: List[List[Any]] = []          # [[имена], текст]
+    by_text: Dict[str, int] = {}
+    seen_names: Set[str] = set()
+    seen_sentences: Set[str] = set()
     for it in high_low:
-        lines.append(f"- {it.name}: {EXPLAIN_DICT.get(it.name, '(нет справки — можно добавить)')}")
-    return "\n".join(lines)
+        if it.name in seen_names:
+            continue
+        seen_names.add(it.name)
+        expl = EXPLAIN_DICT.get(it.name, "(нет справки — можно добавить)")
+        if expl in by_text:
+            entries[by_text[expl]][0].append(it.name)
+            continue
+        sentences = _SENTENCE_SPLIT_RE.split(expl)
+        if compact:
+            sentences = sentences[:1]
+        fresh = [x for x in sentences if x.lower() not in seen_sentences]
+        seen_sentences.update(x.lower() for x in sentences)
+        by_text[expl] = len(entries)
+        entries.append([[it.name], " ".join(fresh) or sentences[0]])
+    return "\n".join(f"- {', '.join(names)}: {text}" for names, text in entries)
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов YandexGPT (без обращения к tokenize API)."""
+    return int(len(text or "") / LLM_CHARS_PER_TOKEN) + 1
+
+
+def llm_max_tokens(n_deviations: int) -> int:
+    """maxTokens под число отклонений: короткий ответ для «всё в норме», не больше MAX_TOKENS."""
+    if n_deviations <= 0:
+        return min(LLM_MAX_TOKENS_ALL_NORMAL, MAX_TOKENS)
+    return min(LLM_MAX_TOKENS_BASE + LLM_MAX_TOKENS_PER_DEVIATION * n_deviations, MAX_TOKENS)
 
 
 def suggest_specialists(high_low: List[Item]) -> List[str]:
@@ -2190,10 +2562,44 @@ def _is_llm_refusal(text: str) -> bool:
 # ==========================
 # LLM call (ретраи)
 # ==========================
-def call_yandexgpt(iam_token: str, user_text: str) -> str:
+def _record_llm_usage(usage: Optional[Dict[str, Any]], result: Dict[str, Any], max_tokens: int) -> None:
+    """
+    Пишет в лог (и в usage, если передан) число токенов промпта и ответа из result.usage
+    и статус ответа; usage["truncated"] — ответ обрезан по maxTokens.
+    """
+    raw = result.get("usage") or {}
+    alts = result.get("alternatives") or [{}]
+    status = alts[0].get("status") or ""
+    try:
+        info = {
+            "input_tokens": int(raw.get("inputTextTokens", 0)),
+            "completion_tokens": int(raw.get("completionTokens", 0)),
+            "max_tokens": max_tokens,
+        }
+    except (TypeError, ValueError):
+        info = {"max_tokens": max_tokens}
+    info["status"] = status
+    info["truncated"] = status == LLM_TRUNCATED_STATUS
+    _dbg(f"LLM usage: input={info.get('input_tokens')} completion={info.get('completion_tokens')} "
+         f"maxTokens={max_tokens} status={status or '-'}")
+    if usage is not None:
+        usage.update(info)
+
+
+def call_yandexgpt(
+    iam_token: str,
+    user_text: str,
+    max_tokens: Optional[int] = None,
+    usage: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    max_tokens — лимит ответа (по умолчанию MAX_TOKENS);
+    usage — словарь, куда пишется фактическое число токенов (result.usage).
+    """
+    max_tokens = max_tokens or MAX_TOKENS
     payload = {
         "modelUri": MODEL_URI,
-        "completionOptions": {"stream": False, "temperature": TEMPERATURE, "maxTokens": str(MAX_TOKENS)},
+        "completionOptions": {"stream": False, "temperature": TEMPERATURE, "maxTokens": str(max_tokens)},
         "messages": [
             {"role": "system", "text": SYSTEM_PROMPT},
             {"role": "user", "text": user_text},
@@ -2208,10 +2614,11 @@ def call_yandexgpt(iam_token: str, user_text: str) -> str:
     last_err = None
     for delay in (1, 2, 4):
         r = requests.post(API_URL_LLM, headers=headers, json=payload, timeout=TIMEOUT_SEC)
-        RAW_RESPONSE_PATH.write_text(r.text, encoding="utf-8")
+        _artifact(RAW_RESPONSE_PATH, r.text, error=r.status_code != 200)
 
         if r.status_code == 200:
             data = _resp_json_or_die(r, "foundationModels/v1/completion")
+            _record_llm_usage(usage, data["result"], max_tokens)
             return data["result"]["alternatives"][0]["message"]["text"]
 
         if r.status_code in (500, 502, 503, 504):
@@ -2224,7 +2631,114 @@ def call_yandexgpt(iam_token: str, user_text: str) -> str:
     raise RuntimeError(f"LLM временно недоступен после ретраев. Последняя ошибка: {last_err}")
 
 
-def build_llm_prompt(sex: str, age: int, high_low: List[Item], dict_expl: str, specialist_list: List[str]) -> str:
+def call_yandexgpt_stream(
+    iam_token: str,
+    user_text: str,
+    on_text: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    max_tokens: Optional[int] = None,
+    usage: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Потоковый вариант call_yandexgpt ("stream": true).
+
+    YandexGPT присылает построчно JSON-объекты, в каждом — накопленный текст.
+    on_text(text) вызывается с накопленным текстом по мере поступления.
+
+    Проверка на отказ (_is_llm_refusal) выполняется на первых чанках:
+    пока текст короче LLM_STREAM_REFUSAL_WINDOW, он не отдаётся клиенту;
+    если это отказ — чтение прерывается и возвращается частичный текст,
+    чтобы повтор со смягчённым промптом начался сразу.
+
+    should_stop() — проверяется на каждом чанке; True прерывает чтение
+    (параллельный запрос уже победил).
+
+    max_tokens / usage — как в call_yandexgpt (usage берётся из последнего чанка).
+    """
+    max_tokens = max_tokens or MAX_TOKENS
+    payload = {
+        "modelUri": MODEL_URI,
+        "completionOptions": {"stream": True, "temperature": TEMPERATURE, "maxTokens": str(max_tokens)},
+        "messages": [
+            {"role": "system", "text": SYSTEM_PROMPT},
+            {"role": "user", "text": user_text},
+        ],
+    }
+    headers = {
+        "Authorization": f"Bearer {iam_token}",
+        "Content-Type": "application/json; charset=utf-8",
+        "Accept": "application/json",
+    }
+
+    last_err = None
+    for delay in (1, 2, 4):
+        r = requests.post(API_URL_LLM, headers=headers, json=payload, timeout=TIMEOUT_SEC, stream=True)
+
+        if r.status_code in (500, 502, 503, 504):
+            last_err = f"LLM HTTP {r.status_code}: {r.text[:800]}"
+            r.close()
+            time.sleep(delay)
+            continue
+
+        if r.status_code != 200:
+            _artifact(RAW_RESPONSE_PATH, r.text, error=True)
+            raise RuntimeError(f"LLM HTTP {r.status_code}. См. {RAW_RESPONSE_PATH}\n{r.text[:1200]}")
+
+        text = ""
+        result: Dict[str, Any] = {}
+        raw_lines: List[str] = []
+        window_passed = False
+        try:
+            for line in r.iter_lines(decode_unicode=True):
+                if should_stop is not None and should_stop():
+                    _dbg("LLM stream: stopped by caller")
+                    return ""
+                if not line:
+                    continue
+                raw_lines.append(line)
+                data = _safe_json_loads(line)
+                if "error" in data:
+                    raise RuntimeError(f"LLM stream error: {str(data['error'])[:800]}")
+                result = data["result"]
+                alt = result["alternatives"][0]
+                text = alt["message"]["text"]
+
+                if not window_passed:
+                    if _is_llm_refusal(text):
+                        _dbg(f"LLM stream: refusal on first chunks: {text[:100]}")
+                        break
+                    if len(text) < LLM_STREAM_REFUSAL_WINDOW and alt.get("status") not in (
+                        "ALTERNATIVE_STATUS_FINAL", LLM_TRUNCATED_STATUS,
+                    ):
+                        continue
+                    window_passed = True
+                _emit_llm_text(on_text, text)
+        finally:
+            r.close()
+            _artifact(RAW_RESPONSE_PATH, lambda lines=raw_lines: "\n".join(lines))
+        _record_llm_usage(usage, result, max_tokens)
+
+        # Короткий ответ, закончившийся внутри окна проверки
+        if not window_passed and text and not _is_llm_refusal(text):
+            _emit_llm_text(on_text, text)
+        return text
+
+    raise RuntimeError(f"LLM временно недоступен после ретраев. Последняя ошибка: {last_err}")
+
+
+def build_llm_prompt(
+    sex: str, age: int, high_low: List[Item], dict_expl: str, specialist_list: List[str],
+    compact: Optional[bool] = None,
+) -> str:
+    """
+    Промпт для YandexGPT.
+
+    compact — сжатый вариант для больших панелей (по умолчанию — если
+    отклонений не меньше LLM_PROMPT_COMPACT_FROM): короче строки фактов,
+    по 1–2 предложения на показатель, меньше пунктов в списках.
+    """
+    if compact is None:
+        compact = len(high_low) >= LLM_PROMPT_COMPACT_FROM
     if not high_low:
         # ALL NORMAL — short reassuring response
         return f"""Пациент: пол {sex}, возраст {age}.
@@ -2251,14 +2765,34 @@ def build_llm_prompt(sex: str, age: int, high_low: List[Item], dict_expl: str, s
 - Ответ должен быть КОРОТКИМ и ПОЗИТИВНЫМ — всё в порядке.""".strip()
 
     # There ARE deviations
-    deviations = "\n".join(
-            [
-                f"- {it.raw_name}: {it.status} | значение {it.value:g} {it.unit or ''} | "
-                f"норма {it.ref_text or format_range(it.ref)}"
-                for it in high_low
-                if it.value is not None and it.ref is not None
-            ]
+    if compact:
+        deviations = "\n".join(
+            f"- {it.raw_name}: {it.status} {it.value:g} {it.unit or ''} (норма {it.ref_text or format_range(it.ref)})"
+            for it in high_low
+            if it.value is not None and it.ref is not None
+        )
+        per_marker = (
+            "По каждому отклонённому показателю — 1–2 предложения: что отражает и с чем МОЖЕТ быть связано "
+            "отклонение (формулировка: «повышение может быть связано с…»). "
+            "Родственные показатели (например, эритроцитарные индексы) описывай одним абзацем."
+        )
+        n_points = "3"
+    else:
+        deviations = "\n".join(
+                [
+                    f"- {it.raw_name}: {it.status} | значение {it.value:g} {it.unit or ''} | "
+                    f"норма {it.ref_text or format_range(it.ref)}"
+                    for it in high_low
+                    if it.value is not None and it.ref is not None
+                ]
+            )
+        per_marker = (
+            "По КАЖДОМУ отклонённому показателю — отдельный абзац:\n"
+            "- Что отражает этот показатель (1 предложение, как в энциклопедии)\n"
+            "- С чем МОЖЕТ быть связано повышение/понижение (1–2 варианта, формулировка: «повышение может быть связано с…»)\n"
+            "- С какими другими показателями обычно оценивается вместе (если применимо)"
         )
+        n_points = "3–5"
 
     specialist_hint = ", ".join(specialist_list) if specialist_list else "терапевт"
 
@@ -2294,20 +2828,17 @@ def build_llm_prompt(sex: str, age: int, high_low: List[Item], dict_expl: str, s
 Перечислить ТОЛЬКО отклонения от референсов: какой показатель, в какую сторону отклонён (выше/ниже), на сколько. Без интерпретации — только факты.
 
 **ЧТО ОТРАЖАЮТ ЭТИ ПОКАЗАТЕЛИ**
-По КАЖДОМУ отклонённому показателю — отдельный абзац:
-- Что отражает этот показатель (1 предложение, как в энциклопедии)
-- С чем МОЖЕТ быть связано повышение/понижение (1–2 варианта, формулировка: «повышение может быть связано с…»)
-- С какими другими показателями обычно оценивается вместе (если применимо)
+{per_marker}
 НЕ ставить диагнозы. НЕ использовать слово «заболевание». Использовать «состояние», «процесс», «изменение».
 
 **К КАКИМ СПЕЦИАЛИСТАМ ИМЕЕТ СМЫСЛ ОБРАТИТЬСЯ**
 Список специалистов для интерпретации результатов. Формулировка: «для интерпретации результатов имеет смысл обратиться к…»
 
 **ЧТО ИМЕЕТ СМЫСЛ ОБСУДИТЬ С ВРАЧОМ**
-3–5 конкретных пунктов: какие дополнительные обследования обсудить, нужна ли пересдача, какие показатели оценить в динамике.
+{n_points} конкретных пунктов: какие дополнительные обследования обсудить, нужна ли пересдача, какие показатели оценить в динамике.
 
 **ВОПРОСЫ ВРАЧУ**
-3–5 конкретных вопросов, которые пациент может задать врачу на приёме.
+{n_points} конкретных вопросов, которые пациент может задать врачу на приёме.
 Вопросы должны быть ТОЛЬКО о причинах отклонений, необходимости пересдачи, дополнительных обследованиях.
 ЗАПРЕЩЕНО формулировать вопросы о диете, питании, образе жизни, лекарствах или способах снижения/повышения показателей.
 """.strip()
@@ -2381,6 +2912,143 @@ def build_fallback_text(sex: str, age: int, items: List[Item], high_low: List[It
     return "\n".join(parts)
 
 
+# ==========================
+# Локальная справка (без LLM)
+# ==========================
+_NARRATIVE_NAMES: Optional[Dict[str, str]] = None
+
+
+def _narrative_name(code: str) -> str:
+    """Русское название показателя: заголовок из EXPLAIN_DICT или самый длинный ключ RUS_NAME_MAP."""
+    global _NARRATIVE_NAMES
+    if _NARRATIVE_NAMES is None:
+        names: Dict[str, str] = {}
+        for key, c in RUS_NAME_MAP.items():
+            if len(key) > len(names.get(c, "")):
+                names[c] = key
+        for c, expl in EXPLAIN_DICT.items():
+            head = expl.split(" — ", 1)[0]
+            if head != expl and len(head) <= 40:
+                names[c] = head
+        _NARRATIVE_NAMES = {c: n[:1].upper() + n[1:] for c, n in names.items()}
+    return _NARRATIVE_NAMES.get(code, code)
+
+
+def route_narrative(high_low: List[Item]) -> Tuple[str, str]:
+    """
+    Решает, кто пишет справку: "LOCAL" (build_local_narrative) или "LLM".
+
+    Локально — если отклонений нет или их не больше LOCAL_NARRATIVE_MAX_DEVIATIONS,
+    все они есть в EXPLAIN_DICT и небольшие (класс из LOCAL_NARRATIVE_STATUS_CLASSES).
+    Возвращает (route, reason).
+    """
+    if not LOCAL_NARRATIVE_ENABLED:
+        return "LLM", "DISABLED"
+    if not high_low:
+        return "LOCAL", "ALL_NORMAL"
+    if len(high_low) > LOCAL_NARRATIVE_MAX_DEVIATIONS:
+        return "LLM", "TOO_MANY_DEVIATIONS"
+    if any(it.name not in EXPLAIN_DICT for it in high_low):
+        return "LLM", "UNKNOWN_MARKER"
+    if any(status_class_for_item(it, WARN_PCT) not in LOCAL_NARRATIVE_STATUS_CLASSES for it in high_low):
+        return "LLM", "MARKED_DEVIATION"
+    return "LOCAL", "MILD_DEVIATIONS"
+
+
+def _deviation_pct(it: Item) -> Optional[float]:
+    """На сколько процентов значение вышло за границу референса."""
+    r = it.ref
+    if it.value is None or r is None:
+        return None
+    if it.status == "ВЫШЕ" and r.high:
+        return (it.value - r.high) / r.high * 100.0
+    if it.status == "НИЖЕ" and r.low:
+        return (r.low - it.value) / r.low * 100.0
+    return None
+
+
+def build_local_narrative(sex: str, age: int, items: List[Item], high_low: List[Item]) -> str:
+    """
+    Справка без LLM в той же структуре, что просит build_llm_prompt.
+    Используется для случаев, которые route_narrative признал простыми.
+    """
+    disclaimer = (
+        "**ДИСКЛЕЙМЕР**\n"
+        "Данная информация носит справочный характер и не является диагнозом, "
+        "медицинским заключением или рекомендацией по лечению. "
+        "Для интерпретации результатов необходимо обратиться к врачу.\n"
+    )
+
+    if not high_low:
+        names = []
+        explain_lines = []
+        seen_codes: Set[str] = set()
+        for it in items:
+            name = _narrative_name(it.name)
+            if name not in names:
+                names.append(name)
+            # Пояснения — только здесь: в отчёте без отклонений раздела пояснений нет
+            if it.name in EXPLAIN_DICT and it.name not in seen_codes and len(explain_lines) < 8:
+                seen_codes.add(it.name)
+                explain_lines.append("• " + _SENTENCE_SPLIT_RE.split(EXPLAIN_DICT[it.name])[0])
+        shown = ", ".join(names[:8]) + (" и другие" if len(names) > 8 else "")
+        text = disclaimer + (
+            "\n**КРАТКИЙ ИТОГ ПО ФАКТАМ**\n"
+            f"Все распознанные показатели ({len(items)}) находятся в пределах референсных "
+            "значений лаборатории, отклонений не обнаружено.\n"
+            "\n**ЧТО ОТРАЖАЮТ ЭТИ ПОКАЗАТЕЛИ**\n"
+            f"В документе представлены: {shown}."
+        )
+        if explain_lines:
+            text += "\n" + "\n".join(explain_lines)
+        return text
+
+    fact_lines = []
+    explain_lines = []
+    for it in high_low:
+        name = _narrative_name(it.name)
+        direction = "выше" if it.status == "ВЫШЕ" else "ниже"
+        bound = "верхней" if it.status == "ВЫШЕ" else "нижней"
+        pct = _deviation_pct(it)
+        pct_text = f", на {pct:.0f}% {direction} {bound} границы" if pct is not None else ""
+        fact_lines.append(
+            f"• {name} ({it.raw_name}): {direction} референса — "
+            f"{it.value:g} {it.unit or ''} (норма: {it.ref_text or format_range(it.ref)}){pct_text}"
+        )
+        explain_lines.append(
+            f"• {EXPLAIN_DICT[it.name]} Небольшое отклонение от границы референса "
+            "обычно оценивается вместе с другими показателями и в динамике."
+        )
+
+    n_normal = sum(1 for it in items if it.status == "В НОРМЕ")
+    if n_normal:
+        fact_lines.append(f"Остальные распознанные показатели ({n_normal}) — в пределах референсных значений.")
+
+    spec_line = ", ".join(suggest_specialists(high_low)) or "терапевт"
+    dev_names = ", ".join(_narrative_name(it.name) for it in high_low)
+
+    parts = [disclaimer]
+    parts.append("\n**КРАТКИЙ ИТОГ ПО ФАКТАМ**")
+    parts.append("\n".join(fact_lines))
+    parts.append("\n**ЧТО ОТРАЖАЮТ ЭТИ ПОКАЗАТЕЛИ**")
+    parts.append("\n".join(explain_lines))
+    parts.append("\n**К КАКИМ СПЕЦИАЛИСТАМ ИМЕЕТ СМЫСЛ ОБРАТИТЬСЯ**")
+    parts.append(f"Для интерпретации результатов имеет смысл обратиться к: {spec_line}.")
+    parts.append("\n**ЧТО ИМЕЕТ СМЫСЛ ОБСУДИТЬ С ВРАЧОМ**")
+    parts.append(
+        f"• Значимо ли отклонение ({dev_names}) с учётом самочувствия и анамнеза?\n"
+        "• Нужна ли пересдача для подтверждения результата?\n"
+        "• Имеет ли смысл оценить показатель в динамике?"
+    )
+    parts.append("\n**ВОПРОСЫ ВРАЧУ**")
+    parts.append(
+        f"• С чем может быть связано отклонение ({dev_names})?\n"
+        "• Через какое время имеет смысл пересдать анализ?\n"
+        "• Какие дополнительные исследования помогут уточнить картину?"
+    )
+    return "\n".join(parts)
+
+
 # ==========================
 # HTML render
 # ==========================
@@ -2408,6 +3076,438 @@ def status_class_for_item(it: Item, warn_pct: float = WARN_PCT) -> str:
     return "muted"
 
 
+class LlmUnavailable(RuntimeError):
+    """LLM не вызывался или не успел: breaker разомкнут / исчерпан бюджет времени."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+_LLM_BREAKER = None
+_LLM_EXECUTOR = None
+
+
+def _get_llm_breaker():
+    """Общий circuit breaker эндпоинта LLM (один на процесс)."""
+    global _LLM_BREAKER
+    if _LLM_BREAKER is None:
+        from parsers.llm_circuit import CircuitBreaker
+        _LLM_BREAKER = CircuitBreaker(
+            window=LLM_BREAKER_WINDOW,
+            min_calls=LLM_BREAKER_MIN_CALLS,
+            max_error_rate=LLM_BREAKER_MAX_ERROR_RATE,
+            max_avg_latency_sec=LLM_BREAKER_MAX_AVG_LATENCY_SEC,
+            cooldown_sec=LLM_BREAKER_COOLDOWN_SEC,
+        )
+    return _LLM_BREAKER
+
+
+def _get_llm_executor():
+    global _LLM_EXECUTOR
+    if _LLM_EXECUTOR is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_INFLIGHT, thread_name_prefix="llm")
+    return _LLM_EXECUTOR
+
+
+def _call_llm_guarded(
+    fn: Callable[[], str],
+    deadline,
+    *,
+    hedge_delay: Optional[float] = None,
+    run_info: Optional[Dict[str, Any]] = None,
+    alternatives: Tuple[Callable[[], str], ...] = (),
+    accept: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Вызывает fn() (запрос к LLM) в пределах бюджета deadline.
+
+    - breaker разомкнут → LlmUnavailable("BREAKER_OPEN") без запроса;
+    - бюджет исчерпан → LlmUnavailable("BUDGET_EXCEEDED"), запрос дорабатывает
+      в фоне, но его результат уже не ждём;
+    - hedge_delay: если первый запрос молчит дольше, отправляется второй
+      такой же, берётся ответ, пришедший первым;
+    - alternatives: запросы, отправляемые сразу вместе с fn (например,
+      смягчённый промпт); берётся первый ответ, прошедший accept().
+      Если ни один не прошёл — возвращается ответ fn (или первой альтернативы).
+      В HALF_OPEN альтернативы не отправляются (run_info["alternatives_skipped"]).
+    run_info["winner"] — индекс победившего запроса (0 — fn, 1.. — alternatives).
+    Результат каждого запроса (успех/ошибка, задержка) учитывается в breaker.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    breaker = _get_llm_breaker()
+    run_info = run_info if run_info is not None else {}
+    # Бюджет — до allow(): в HALF_OPEN allow() занимает единственный слот
+    # пробного вызова, и выход после него без record() заклинил бы breaker
+    if deadline.expired():
+        raise LlmUnavailable("BUDGET_EXCEEDED", "Бюджет времени на LLM исчерпан")
+    if not breaker.allow():
+        raise LlmUnavailable("BREAKER_OPEN", "LLM временно отключён (circuit breaker)")
+    # Пробный вызов HALF_OPEN — ровно один запрос: без альтернатив и hedge
+    probe = breaker.state == "HALF_OPEN"
+    if probe and alternatives:
+        alternatives = ()
+        run_info["alternatives_skipped"] = True
+
+    attempts: Dict[Any, Dict[str, Any]] = {}
+
+    def _submit(call: Callable[[], str], idx: int):
+        attempt = {"t0": time.monotonic(), "recorded": False, "idx": idx}
+
+        def run() -> str:
+            ok = False
+            try:
+                result = call()
+                ok = True
+                return result
+            finally:
+                if not attempt["recorded"]:
+                    attempt["recorded"] = True
+                    breaker.record(ok, time.monotonic() - attempt["t0"])
+
+        # Копия контекста: артефакты потока (сырой ответ LLM) — в буфер запроса
+        future = _get_llm_executor().submit(contextvars.copy_context().run, run)
+        attempts[future] = attempt
+        return future
+
+    try:
+        first = _submit(fn, 0)
+    except BaseException:
+        breaker.release()
+        raise
+    pending = {first}
+    for i, alt in enumerate(alternatives, start=1):
+        pending.add(_submit(alt, i))
+    t_start = attempts[first]["t0"]
+    hedged = False
+    last_exc: Optional[BaseException] = None
+    rejected: Optional[Tuple[int, str]] = None
+    can_hedge = hedge_delay is not None and not probe
+
+    while True:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            for a in attempts.values():
+                if not a["recorded"]:
+                    a["recorded"] = True
+                    breaker.record(False, time.monotonic() - a["t0"])
+            for f in pending:
+                f.cancel()
+            run_info["budget_exceeded"] = True
+            raise LlmUnavailable("BUDGET_EXCEEDED", "LLM не ответил в пределах бюджета времени")
+
+        timeout = remaining
+        if can_hedge and not hedged:
+            timeout = min(remaining, max(0.0, hedge_delay - (time.monotonic() - t_start)))
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is not None:
+                last_exc = f.exception()
+                continue
+            text = f.result()
+            idx = attempts[f]["idx"]
+            if accept is None or accept(text):
+                run_info["winner"] = idx
+                if hedged:
+                    run_info["hedge_won"] = f is not first and idx == 0
+                for other in pending:
+                    other.cancel()
+                return text
+            if rejected is None or idx < rejected[0]:
+                rejected = (idx, text)
+
+        if not pending:
+            if rejected is not None:
+                run_info["winner"] = rejected[0]
+                return rejected[1]
+            if last_exc is not None:
+                raise last_exc
+            continue
+
+        if can_hedge and not hedged and first in pending:
+            elapsed = time.monotonic() - t_start
+            if elapsed >= hedge_delay and deadline.remaining() > 0:
+                _dbg(f"LLM hedge: first request silent for {elapsed:.1f}s, sending duplicate")
+                pending.add(_submit(fn, 0))
+                hedged = True
+                run_info["hedged"] = True
+
+
+_REFUSAL_POLICY = None
+
+
+def _get_refusal_policy():
+    """Общая статистика отказов LLM (одна на процесс, сохраняется на диск)."""
+    global _REFUSAL_POLICY
+    if _REFUSAL_POLICY is None:
+        from parsers.llm_refusal_policy import RefusalStats
+        _REFUSAL_POLICY = RefusalStats(
+            LLM_REFUSAL_STATS_PATH,
+            speculate_threshold=LLM_SPECULATE_REFUSAL_RATE,
+        )
+    return _REFUSAL_POLICY
+
+
+_LLM_CACHE = None
+
+
+def _get_llm_cache():
+    """Лениво создаёт общий кэш ответов LLM (один на процесс)."""
+    global _LLM_CACHE
+    if _LLM_CACHE is None:
+        from parsers.llm_cache import LlmResponseCache
+        _LLM_CACHE = LlmResponseCache(
+            LLM_CACHE_PATH,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_sec=LLM_CACHE_TTL_SEC,
+        )
+    return _LLM_CACHE
+
+
+def _generate_llm_answer(
+    sex: str, age: int, items: List[Item], high_low: List[Item],
+    on_text: Optional[Callable[[str], None]] = None,
+    gate_info: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Текст расшифровки от LLM (с кэшем по тексту промпта).
+
+    Порядок: кэш → YandexGPT → при отказе смягчённый промпт → fallback-текст.
+    Ключ кэша — answer_cache_key(промпт): ответ цитирует возраст и значения
+    пациента, поэтому переиспользуется только для того же промпта.
+    В кэш попадают только ответы, не распознанные как отказ.
+    Сигнатура отклонений (deviation_signature) ведёт статистику отказов.
+
+    Если передан on_text — ответ запрашивается в потоковом режиме
+    (call_yandexgpt_stream), и on_text получает накопленный текст по мере
+    генерации; итоговый текст (из кэша / fallback) тоже отдаётся через on_text.
+
+    Вся стадия укладывается в LLM_BUDGET_SEC; при разомкнутом breaker или
+    исчерпанном бюджете сразу используется build_fallback_text. Состояние
+    breaker, перерасход бюджета и причина fallback пишутся в gate_info
+    (quality["metrics"]["llm_gate"]), туда же — оценка токенов промпта,
+    выбранный maxTokens и фактические токены из ответов (gate_info["tokens"]).
+    Ответ, обрезанный по maxTokens, запрашивается повторно с MAX_TOKENS;
+    обрезанный и после этого ответ не кэшируется.
+
+    Возвращает (answer, cache_info для quality["metrics"]["llm_cache"]).
+    """
+    from parsers.llm_cache import answer_cache_key, deviation_signature
+
+    signature = deviation_signature(sex, age, high_low, version=LLM_CACHE_VERSION)
+    compact = len(high_low) >= LLM_PROMPT_COMPACT_FROM
+    dict_expl = build_dict_explanations(high_low, compact=compact)
+    specialists = suggest_specialists(high_low)
+    llm_prompt = build_llm_prompt(sex, age, high_low, dict_expl, specialists, compact=compact)
+
+    cache_key = answer_cache_key(llm_prompt, version=LLM_CACHE_VERSION)
+    cache_info: Dict[str, Any] = {"enabled": LLM_CACHE_ENABLED, "hit": False}
+    cache = None
+    if LLM_CACHE_ENABLED:
+        try:
+            cache = _get_llm_cache()
+            cached = cache.get(cache_key)
+            cache_info["key"] = cache_key[:12]
+            if cached is not None:
+                _dbg(f"LLM cache HIT: {cache_key[:12]}")
+                cache_info["hit"] = True
+                cache_info.update(cache.stats())
+                _emit_llm_text(on_text, cached)
+                return cached, cache_info
+        except Exception as e:
+            _dbg(f"LLM cache lookup failed: {e}")
+            cache = None
+
+    softened_prompt = LLM_SOFTENED_PROMPT_PREFIX + llm_prompt
+    max_tokens = llm_max_tokens(len(high_low))
+    usages: List[Dict[str, Any]] = []
+    # Ответы, обрезанные по maxTokens и после повтора, — в кэш не кладём
+    truncated_answers: Set[str] = set()
+
+    from parsers.llm_circuit import LlmDeadline
+
+    deadline = LlmDeadline(LLM_BUDGET_SEC)
+    run_info: Dict[str, Any] = {
+        "budget_sec": LLM_BUDGET_SEC,
+        "budget_exceeded": False,
+        "hedged": False,
+        "hedge_won": False,
+        "fallback_reason": None,
+    }
+
+    policy = None
+    if LLM_REFUSAL_POLICY_ENABLED:
+        try:
+            policy = _get_refusal_policy()
+        except Exception as e:
+            _dbg(f"LLM refusal policy unavailable: {e}")
+    speculate = policy is not None and policy.should_speculate(signature)
+    refusal_info: Dict[str, Any] = {"speculative": speculate, "winner": None}
+    if policy is not None:
+        refusal_info["normal_refusal_rate"] = round(policy.refusal_rate(signature), 3)
+
+    # Брошенный по бюджету стрим не должен перезаписать fallback у клиента
+    stream_live = {"on": True}
+
+    def _stream_cb(text: str) -> None:
+        if stream_live["on"]:
+            _emit_llm_text(on_text, text)
+
+    def _make_call(variant: str, prompt: str, claim: Optional[Dict[str, Any]] = None) -> Callable[[], str]:
+        """
+        Запрос с вариантом промпта; результат идёт в статистику отказов.
+        claim — общий для параллельных запросов: клиенту уходит текст только
+        того варианта, который первым прошёл проверку на отказ, второй
+        стрим останавливается. Параллельные запросы идут стримом и без
+        подписчика — иначе проигравший дорабатывал бы до конца генерации.
+        """
+        cb = _stream_cb
+        stop = None
+        if claim is not None:
+            def cb(text: str) -> None:
+                with claim["lock"]:
+                    if claim["variant"] is None:
+                        claim["variant"] = variant
+                if claim["variant"] == variant:
+                    _stream_cb(text)
+
+            def stop() -> bool:
+                return claim["variant"] not in (None, variant)
+
+        def request(limit: int) -> Tuple[str, Dict[str, Any]]:
+            usage: Dict[str, Any] = {}
+            usages.append(usage)
+            if on_text is not None or claim is not None:
+                kwargs: Dict[str, Any] = {"on_text": cb}
+                if stop is not None:
+                    kwargs["should_stop"] = stop
+                text = call_yandexgpt_stream(token, prompt, max_tokens=limit, usage=usage, **kwargs)
+            else:
+                text = call_yandexgpt(token, prompt, max_tokens=limit, usage=usage)
+            return text, usage
+
+        def call() -> str:
+            text, usage = request(max_tokens)
+            if usage.get("truncated") and max_tokens < MAX_TOKENS and not (stop is not None and stop()):
+                # Бюджет по числу отклонений мал для этого ответа — повтор с потолком
+                _dbg(f"LLM answer truncated at maxTokens={max_tokens}, retrying with {MAX_TOKENS}")
+                text, usage = request(MAX_TOKENS)
+                usage["retry"] = True
+            if stop is not None and stop():
+                return ""  # проиграл параллельному запросу — в статистику не пишем
+            if usage.get("truncated"):
+                truncated_answers.add(rx.BLANK_LINES.sub("\n\n", text).strip())
+            if policy is not None:
+                policy.record(signature, variant, _is_llm_refusal(text))
+            return text
+
+        return call
+
+    def _call(variant: str, prompt: str) -> str:
+        return _call_llm_guarded(
+            _make_call(variant, prompt),
+            deadline,
+            hedge_delay=LLM_HEDGE_DELAY_SEC if (LLM_HEDGE_ENABLED and on_text is None) else None,
+            run_info=run_info,
+        )
+
+    def _call_speculative() -> str:
+        claim: Dict[str, Any] = {"variant": None, "lock": threading.Lock()}
+        variants = ("normal", "softened")
+        text = _call_llm_guarded(
+            _make_call("normal", llm_prompt, claim),
+            deadline,
+            run_info=run_info,
+            alternatives=(_make_call("softened", softened_prompt, claim),),
+            accept=lambda t: bool(t) and not _is_llm_refusal(t),
+        )
+        refusal_info["winner"] = variants[run_info.get("winner", 0)]
+        return text
+
+    from_llm = False
+    try:
+        token = get_iam_token()
+        if speculate:
+            _dbg(f"LLM speculative: normal+softened for signature {signature[:12]}")
+            answer = _call_speculative()
+        else:
+            answer = _call("normal", llm_prompt)
+            refusal_info["winner"] = "normal"
+        answer = rx.BLANK_LINES.sub("\n\n", answer).strip()
+        from_llm = bool(answer)
+        if not answer:
+            raise RuntimeError("LLM вернул пустой ответ")
+
+        # Detect LLM refusal and retry with softened prompt
+        # (и после спекулятивного вызова, если breaker отправил только пробный)
+        sequential = not speculate or run_info.get("alternatives_skipped")
+        if _is_llm_refusal(answer) and sequential:
+            _dbg(f"LLM refusal detected: {answer[:100]}... Retrying with softened prompt.")
+            answer = _call("softened", softened_prompt)
+            answer = rx.BLANK_LINES.sub("\n\n", answer).strip()
+            refusal_info["winner"] = "softened"
+
+        # If still refusing — use fallback text
+        if _is_llm_refusal(answer):
+            _dbg(f"LLM refusal on retry: {answer[:100]}... Using fallback text.")
+            answer = build_fallback_text(sex, age, items, high_low)
+            from_llm = False
+            refusal_info["winner"] = None
+            run_info["fallback_reason"] = "REFUSAL"
+    except LlmUnavailable as e:
+        _dbg(f"LLM skipped: {e.reason}: {e}")
+        answer = build_fallback_text(sex, age, items, high_low)
+        from_llm = False
+        run_info["fallback_reason"] = e.reason
+    except Exception as e:
+        _dbg(f"LLM failed: {e}")
+        answer = build_fallback_text(sex, age, items, high_low)
+        from_llm = False
+        run_info["fallback_reason"] = "LLM_ERROR"
+
+    run_info.pop("winner", None)
+    run_info["refusal_policy"] = refusal_info
+    run_info["tokens"] = {
+        "compact_prompt": compact,
+        "prompt_estimate": estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(llm_prompt),
+        "max_tokens": max_tokens,
+        "calls": len(usages),
+        "input_tokens": sum(u.get("input_tokens", 0) for u in usages),
+        "completion_tokens": sum(u.get("completion_tokens", 0) for u in usages),
+        "completion_max": max((u.get("completion_tokens", 0) for u in usages), default=0),
+        "n_deviations": len(high_low),
+        "truncated": sum(1 for u in usages if u.get("truncated")),
+        "retried": sum(1 for u in usages if u.get("retry")),
+    }
+    _dbg(f"LLM tokens: {run_info['tokens']}")
+    stream_live["on"] = False
+    run_info["elapsed_sec"] = round(deadline.elapsed(), 2)
+    run_info["breaker"] = _get_llm_breaker().snapshot()
+    if gate_info is not None:
+        gate_info.update(run_info)
+
+    if not from_llm:
+        _emit_llm_text(on_text, answer)
+    if cache is not None:
+        if from_llm and answer and answer not in truncated_answers:
+            cache.put(cache_key, answer)
+        cache_info.update(cache.stats())
+    return answer, cache_info
+
+
+def _emit_llm_text(on_text: Optional[Callable[[str], None]], text: str) -> None:
+    """Отдаёт текст подписчику стрима; ошибки подписчика не ломают отчёт."""
+    if on_text is None:
+        return
+    try:
+        on_text(text)
+    except Exception as e:
+        _dbg(f"on_llm_text callback failed: {e}")
+
+
 def build_template_context(sex: str, age: int, items: List[Item], high_low: List[Item], human_text: str, missing_warnings: Optional[List[str]] = None, quality: Optional[dict] = None) -> dict:
     """
     Формирует контекст для шаблона отчёта.
@@ -2464,23 +3564,81 @@ def build_template_context(sex: str, age: int, items: List[Item], high_low: List
     }
 
 
+# Реестр шаблонов: одна Environment на процесс, каждый шаблон компилируется один раз
+_TEMPLATE_ENV: Optional[Environment] = None
+_TEMPLATES: Dict[str, Template] = {}
+
+
+def get_template_env() -> Environment:
+    """Общая Environment для шаблонов отчёта (создаётся один раз)."""
+    global _TEMPLATE_ENV
+    if _TEMPLATE_ENV is None:
+        bytecode_cache = None
+        if TEMPLATES_BYTECODE_CACHE_DIR is not None:
+            Path(TEMPLATES_BYTECODE_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(TEMPLATES_BYTECODE_CACHE_DIR))
+        _TEMPLATE_ENV = Environment(
+            loader=FileSystemLoader(str(TEMPLATES_DIR)),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=TEMPLATES_AUTO_RELOAD,
+            bytecode_cache=bytecode_cache,
+        )
+    return _TEMPLATE_ENV
+
+
+def get_template(name: str = TEMPLATE_NAME) -> Template:
+    """
+    Скомпилированный шаблон из реестра.
+    При TEMPLATES_AUTO_RELOAD Jinja сама сверяет mtime файла и перекомпилирует.
+    """
+    if TEMPLATES_AUTO_RELOAD:
+        return get_template_env().get_template(name)
+    template = _TEMPLATES.get(name)
+    if template is None:
+        template = _TEMPLATES[name] = get_template_env().get_template(name)
+    return template
+
+
+def reset_template_cache() -> None:
+    """Сбрасывает реестр (после смены TEMPLATES_DIR / настроек)."""
+    global _TEMPLATE_ENV
+    _TEMPLATE_ENV = None
+    _TEMPLATES.clear()
+
+
+def warm_templates(names: Tuple[str, ...] = (TEMPLATE_NAME,)) -> None:
+    """Компилирует шаблоны заранее — вызывается при старте приложения."""
+    for name in names:
+        get_template(name)
+
+
 def render_html_report(context: dict) -> str:
-    tpl_path = TEMPLATES_DIR / TEMPLATE_NAME
-    if not tpl_path.exists():
+    try:
+        template = get_template(TEMPLATE_NAME)
+    except TemplateNotFound:
+        tpl_path = TEMPLATES_DIR / TEMPLATE_NAME
         raise FileNotFoundError(f"Не найден шаблон: {tpl_path.resolve()}")
-
-    env = Environment(
-        loader=FileSystemLoader(str(TEMPLATES_DIR)),
-        autoescape=select_autoescape(["html", "xml"]),
-    )
-    template = env.get_template(TEMPLATE_NAME)
     return template.render(**context)
 
 
+# Метка на месте текста LLM: отчёт рендерится заранее, текст подставляется потом
+LLM_NARRATIVE_PLACEHOLDER = "@@LLM_NARRATIVE_PLACEHOLDER@@"
+
+
+def narrative_to_html(text: str) -> str:
+    """То же преобразование, что фильтр шаблона: replace("\\n", "<br>") | safe."""
+    return (text or "").replace("\n", "<br>")
+
+
+def fill_report_narrative(shell_html: str, text: str) -> str:
+    """Подставляет текст справки в отчёт, отрендеренный с LLM_NARRATIVE_PLACEHOLDER."""
+    return shell_html.replace(LLM_NARRATIVE_PLACEHOLDER, narrative_to_html(text), 1)
+
+
 # ==========================
 # PDF: HTML -> PDF
 # ==========================
-def render_pdf_from_html(html_path: Path, pdf_path: Path, created_at: str) -> None:
+def _pdf_options(created_at: str) -> Dict[str, Any]:
     header_template = """
     <div style="font-size:9px; width:100%; padding:0 12mm; color:#666;">
       <div style="display:flex; justify-content:space-between; align-items:center; width:100%;">
@@ -2499,22 +3657,188 @@ def render_pdf_from_html(html_path: Path, pdf_path: Path, created_at: str) -> No
     </div>
     """
 
+    return {
+        "format": "A4",
+        "print_background": True,
+        "display_header_footer": True,
+        "header_template": header_template,
+        "footer_template": footer_template,
+        "margin": {"top": "18mm", "right": "12mm", "bottom": "18mm", "left": "12mm"},
+    }
+
+
+_PDF_RENDER_POOL = None
+
+
+def get_pdf_render_pool():
+    """Общий пул воркеров печати (создаётся при первом обращении, закрывается при выходе)."""
+    global _PDF_RENDER_POOL
+    if _PDF_RENDER_POOL is None:
+        import atexit
+        from parsers.pdf_render_pool import PdfRenderPool
+        _PDF_RENDER_POOL = PdfRenderPool(
+            workers=PDF_RENDER_WORKERS,
+            max_queue=PDF_RENDER_QUEUE_MAX,
+            render_timeout=PDF_RENDER_TIMEOUT_SEC,
+        )
+        atexit.register(_PDF_RENDER_POOL.close)
+    return _PDF_RENDER_POOL
+
+
+def pdf_render_stats() -> Optional[Dict[str, Any]]:
+    """Метрики пула печати (очередь, время печати, перезапуски); None — пул ещё не запускался."""
+    return _PDF_RENDER_POOL.stats() if _PDF_RENDER_POOL is not None else None
+
+
+def render_pdf_bytes(html: str, created_at: str) -> bytes:
+    """
+    Печатает PDF из HTML-строки, не трогая диск (set_content → page.pdf()).
+    При PDF_RENDER_WORKERS > 0 печать уходит в пул воркеров, иначе — Playwright в текущем потоке.
+    """
+    if PDF_RENDER_WORKERS > 0:
+        pool = get_pdf_render_pool()
+        t0 = time.perf_counter()
+        data = pool.render(html, _pdf_options(created_at))
+        _dbg(f"PDF printed by render pool in {(time.perf_counter() - t0) * 1000:.0f} ms "
+             f"(queue {pool.stats()['queue_length']})")
+        return data
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            page = browser.new_page()
+            page.set_content(html, wait_until="load")
+            return page.pdf(**_pdf_options(created_at))
+        finally:
+            browser.close()
+
+
+_NATIVE_PDF_FONT: Optional[TrueTypeFont] = None
+
+
+def get_native_pdf_font() -> TrueTypeFont:
+    """Шрифт для нативной печати: первый найденный из NATIVE_PDF_FONT_PATHS, разбирается один раз."""
+    global _NATIVE_PDF_FONT
+    if _NATIVE_PDF_FONT is None:
+        for path in NATIVE_PDF_FONT_PATHS:
+            if Path(path).is_file():
+                _NATIVE_PDF_FONT = TrueTypeFont(path)
+                break
+        else:
+            raise FontError("Не найден TTF-шрифт для нативной печати (NATIVE_PDF_FONT_PATHS)")
+    return _NATIVE_PDF_FONT
+
+
+def render_pdf_native(context: dict, answer: str) -> bytes:
+    """Печатает PDF без браузера (pdf_writer) из контекста отчёта и текста справки."""
+    return render_report_pdf(dict(context, human_text=answer), get_native_pdf_font())
+
+
+def render_pdf_from_html(html_path: Path, pdf_path: Path, created_at: str) -> None:
     with sync_playwright() as p:
         browser = p.chromium.launch()
         page = browser.new_page()
         page.goto(html_path.resolve().as_uri(), wait_until="load")
-        page.pdf(
-            path=str(pdf_path),
-            format="A4",
-            print_background=True,
-            display_header_footer=True,
-            header_template=header_template,
-            footer_template=footer_template,
-            margin={"top": "18mm", "right": "12mm", "bottom": "18mm", "left": "12mm"},
-        )
+        page.pdf(path=str(pdf_path), **_pdf_options(created_at))
         browser.close()
 
 
+_FILL_NARRATIVE_JS = """
+(html) => {
+  const el = document.getElementById("llm-narrative");
+  if (!el) { return false; }
+  el.innerHTML = html;
+  return true;
+}
+"""
+
+
+class PrewarmedPdfRender:
+    """
+    Печать PDF, подготовленная параллельно с генерацией текста LLM.
+
+    В фоновом потоке запускается Chromium, и в страницу загружается отчёт
+    с LLM_NARRATIVE_PLACEHOLDER (таблица, факты, качество — всё, кроме
+    справки). Когда текст готов, finish() подставляет его в блок
+    #llm-narrative и печатает PDF. Playwright (sync API) привязан к потоку,
+    поэтому все вызовы браузера выполняются в одном фоновом потоке.
+
+    Результат — только pdf_bytes: файл пишет вызывающий код, чтобы после
+    таймаута поздняя печать не соревновалась с его собственной.
+    """
+
+    def __init__(self, shell_html: str, created_at: str):
+        import queue
+
+        self.pdf_bytes: Optional[bytes] = None
+        self.error: Optional[BaseException] = None
+        self.warm_ms: Optional[float] = None
+        self._narrative: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=1)
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(shell_html, created_at), daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, shell_html: str, created_at: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            with sync_playwright() as p:
+                browser = p.chromium.launch()
+                try:
+                    page = browser.new_page()
+                    page.set_content(shell_html, wait_until="load")
+                    self.warm_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+                    # Ждём текст справки (None — отмена)
+                    narrative_html = self._narrative.get(timeout=TIMEOUT_SEC * 4)
+                    if narrative_html is None or self._cancelled.is_set():
+                        return
+                    if not page.evaluate(_FILL_NARRATIVE_JS, narrative_html):
+                        raise RuntimeError("В шаблоне отчёта нет блока #llm-narrative")
+                    pdf_bytes = page.pdf(**_pdf_options(created_at))
+                    # После таймаута finish() результат уже никому не нужен
+                    if not self._cancelled.is_set():
+                        self.pdf_bytes = pdf_bytes
+                finally:
+                    browser.close()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def finish(self, narrative_text: str, timeout: float = TIMEOUT_SEC) -> bool:
+        """
+        Подставляет текст и ждёт печати. True — PDF готов (pdf_bytes).
+
+        Если печать не уложилась в timeout — отмена: браузер закрывается в
+        фоновом потоке (ждём его до timeout), поздний результат отбрасывается.
+        """
+        try:
+            self._narrative.put_nowait(narrative_to_html(narrative_text))
+        except Exception:
+            return False
+        if not self._done.wait(timeout):
+            _dbg(f"PDF prewarm: print timed out after {timeout}s, cancelling")
+            self.cancel(wait=timeout)
+            return False
+        return self.error is None
+
+    def cancel(self, wait: Optional[float] = None) -> None:
+        """
+        Закрывает браузер без печати (если текст так и не понадобился).
+        wait — сколько секунд ждать завершения фонового потока (None — не ждать).
+        """
+        self._cancelled.set()
+        try:
+            self._narrative.put_nowait(None)
+        except Exception:
+            pass
+        if wait is not None:
+            self._thread.join(wait)
+            if self._thread.is_alive():
+                _dbg("PDF prewarm: browser thread still running after cancel")
+
+
 # ==========================
 # Vision OCR
 # ==========================
@@ -2547,6 +3871,43 @@ def ocr_image_sync(iam_token: str, file_bytes: bytes, mime_type: str) -> Dict[st
     return _resp_json_or_die(r, "ocr/recognizeText")
 
 
+def ocr_image_tiled(iam_token: str, image_bytes: bytes) -> Tuple[Dict[str, Any], str]:
+    """
+    OCR высокого/большого скана по тайлам.
+
+    Изображение режется на перекрывающиеся горизонтальные полосы
+    (размер тайла подбирается по размерам картинки), тайлы распознаются
+    параллельно, строки склеиваются по перекрытию с удалением дублей на швах.
+
+    Возвращает (сводный OCR JSON для отладки, склеенный plain text).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    tiles = split_image_into_tiles(image_bytes)
+    _dbg(f"OCR tiled: {len(tiles)} tiles, spans={[(t, b) for _, t, b in tiles]}")
+
+    def _one(tile_bytes: bytes) -> Dict[str, Any]:
+        return ocr_image_sync(iam_token, tile_bytes, "image/png")
+
+    workers = max(1, min(OCR_TILE_MAX_WORKERS, len(tiles)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Своя копия контекста на тайл: артефакты OCR тайлов — в буфер запроса
+        futures = [pool.submit(contextvars.copy_context().run, _one, tb) for tb, _, _ in tiles]
+        results = [f.result() for f in futures]
+
+    tiles_lines = [ocr_result_to_plaintext(res).splitlines() for res in results]
+    plain = "\n".join(stitch_tile_lines(tiles_lines)).strip()
+    _dbg(f"OCR tiled: lines per tile={[len(x) for x in tiles_lines]}, stitched={len(plain.splitlines())}")
+
+    raw = {
+        "tiles": [
+            {"top": top, "bottom": bottom, "result": res}
+            for (_, top, bottom), res in zip(tiles, results)
+        ]
+    }
+    return raw, plain
+
+
 def ocr_pdf_async_start(iam_token: str, pdf_bytes: bytes) -> str:
     payload = {"mimeType": "application/pdf", "languageCodes": OCR_LANGS, "model": OCR_MODEL, "content": _b64(pdf_bytes)}
     url = f"{OCR_API_BASE}/recognizeTextAsync"
@@ -2691,8 +4052,8 @@ def try_extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
         text = "\n".join(parts).strip()
         if text:
             # Для отладки сохраняем с маркерами страниц
-            debug_text = "\n\n".join([f"--- PAGE {i+1} ---\n{p}" for i, p in enumerate(parts)])
-            PDF_TEXT_EXTRACT_PATH.write_text(debug_text, encoding="utf-8")
+            _artifact(PDF_TEXT_EXTRACT_PATH,
+                      lambda: "\n\n".join(f"--- PAGE {i+1} ---\n{p}" for i, p in enumerate(parts)))
             _dbg(f"pypdf extracted pages={len(reader.pages)} text_len={len(text)}, page_lengths={page_lengths}")
         return text
     except Exception as e:
@@ -2709,9 +4070,18 @@ def extract_text_from_upload(
     mimetype: str,
     *,
     adaptive_threshold: bool = False,
+    preprocess_flags: Optional[Dict[str, Any]] = None,
 ) -> str:
+    """
+    Извлекает текст из загруженного PDF/изображения.
+
+    adaptive_threshold и preprocess_flags (kwargs preprocess_image_bytes,
+    выбранные preflight по метрикам изображения) применяются к картинкам.
+    """
     if adaptive_threshold:
-        _dbg("extract_text_from_upload: adaptive_threshold=True (B2 rerun mode)")
+        _dbg("extract_text_from_upload: adaptive_threshold=True")
+    if preprocess_flags:
+        _dbg(f"extract_text_from_upload: preprocess_flags={preprocess_flags}")
     iam = get_iam_token()
     name = (filename or "").lower()
 
@@ -2720,12 +4090,12 @@ def extract_text_from_upload(
         _dbg("PDF upload detected")
 
         direct_text = try_extract_text_from_pdf_bytes(file_bytes)
-        direct_candidates = _smart_to_candidates(direct_text) if direct_text else ""
+        direct_candidates = text_to_candidates(direct_text) if direct_text else ""
         _dbg(f"pypdf candidates_lines={len(direct_candidates.splitlines()) if direct_candidates else 0}")
 
         # Если pypdf дал уже достаточно строк — берём его (быстро)
         if direct_candidates and len(direct_candidates.splitlines()) >= 10:
-            OCR_CANDIDATES_PATH.write_text(direct_candidates, encoding="utf-8")
+            _artifact(OCR_CANDIDATES_PATH, direct_candidates)
             return direct_candidates.strip()
 
         # OCR async
@@ -2744,7 +4114,7 @@ def extract_text_from_upload(
                 if op.get("done"):
                     done = True
                     if op.get("error"):
-                        OCR_RAW_PATH.write_text(json.dumps(op, ensure_ascii=False, indent=2), encoding="utf-8")
+                        _artifact(OCR_RAW_PATH, lambda: json.dumps(op, ensure_ascii=False, indent=2), error=True)
                         raise RuntimeError(f"OCR PDF operation error: {op['error']}")
                     break
                 time.sleep(sleep_s)
@@ -2753,7 +4123,7 @@ def extract_text_from_upload(
             if not done:
                 _dbg("OCR operation wait timeout (done=false). Using pypdf fallback if any.")
                 if direct_candidates:
-                    OCR_CANDIDATES_PATH.write_text(direct_candidates, encoding="utf-8")
+                    _artifact(OCR_CANDIDATES_PATH, direct_candidates)
                     return direct_candidates.strip()
                 return direct_text.strip() if direct_text.strip() else ""
 
@@ -2764,11 +4134,11 @@ def extract_text_from_upload(
                     time.sleep(2.0)
                     continue
 
-                OCR_RAW_PATH.write_text(json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8")
+                _artifact(OCR_RAW_PATH, lambda res=res: json.dumps(res, ensure_ascii=False, indent=2))
                 ocr_plain = ocr_result_to_plaintext(res)
-                OCR_PLAIN_PATH.write_text(ocr_plain or "", encoding="utf-8")
+                _artifact(OCR_PLAIN_PATH, ocr_plain or "")
 
-                ocr_candidates = _smart_to_candidates(ocr_plain or "")
+                ocr_candidates = text_to_candidates(ocr_plain or "")
                 _dbg(f"OCR plain_len={len(ocr_plain)} candidates_lines={len(ocr_candidates.splitlines()) if ocr_candidates else 0}")
                 break
 
@@ -2783,7 +4153,7 @@ def extract_text_from_upload(
                 merged_lines.extend([ln.strip() for ln in block.splitlines() if ln.strip()])
         merged = _dedup_lines_keep_order(merged_lines)
 
-        OCR_CANDIDATES_PATH.write_text("\n".join(merged), encoding="utf-8")
+        _artifact(OCR_CANDIDATES_PATH, lambda: "\n".join(merged))
 
         if merged:
             return "\n".join(merged).strip()
@@ -2808,20 +4178,37 @@ def extract_text_from_upload(
     ocr_bytes = file_bytes
     if OCR_PREPROCESS_ENABLED:
         try:
-            ocr_bytes, ocr_mime = preprocess_image_bytes(file_bytes, ocr_mime)
+            pp_kwargs = dict(preprocess_flags or {})
+            pp_kwargs["enable_adaptive_threshold"] = adaptive_threshold
+            ocr_bytes, ocr_mime = preprocess_image_bytes(file_bytes, ocr_mime, **pp_kwargs)
             _dbg(f"Preprocess OK: {len(file_bytes)}→{len(ocr_bytes)} bytes, mime={ocr_mime}")
         except Exception as e:
             _dbg(f"Preprocess failed (using original): {e}")
             ocr_bytes = file_bytes  # fallback на оригинал
 
-    ocr = ocr_image_sync(iam, ocr_bytes, ocr_mime)
+    tiled = None
+    if OCR_TILING_ENABLED:
+        try:
+            info = get_image_info(ocr_bytes)
+            if needs_tiling(info["width"], info["height"]):
+                tiled = ocr_image_tiled(iam, ocr_bytes)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            _dbg(f"Tiling failed (using whole image): {e}")
+            tiled = None
+
+    if tiled is not None:
+        ocr, plain = tiled
+    else:
+        ocr = ocr_image_sync(iam, ocr_bytes, ocr_mime)
+        plain = ocr_result_to_plaintext(ocr)
 
-    OCR_RAW_PATH.write_text(json.dumps(ocr, ensure_ascii=False, indent=2), encoding="utf-8")
-    plain = ocr_result_to_plaintext(ocr)
-    OCR_PLAIN_PATH.write_text(plain or "", encoding="utf-8")
+    _artifact(OCR_RAW_PATH, lambda: json.dumps(ocr, ensure_ascii=False, indent=2))
+    _artifact(OCR_PLAIN_PATH, plain or "")
 
-    candidates = _smart_to_candidates(plain or "")
-    OCR_CANDIDATES_PATH.write_text(candidates or "", encoding="utf-8")
+    candidates = text_to_candidates(plain or "")
+    _artifact(OCR_CANDIDATES_PATH, candidates or "")
 
     # если кандидаты пустые — вернём хотя бы plain, чтобы не было "пусто"
     return candidates.strip() if candidates.strip() else (plain or "").strip()
@@ -2835,12 +4222,14 @@ _FALLBACK_REFS: dict[str, Range] = {
 }
 
 
-def _apply_fallback_refs(items: List[Item]) -> None:
+def _apply_fallback_refs(items: List[Item]) -> int:
     """Assign fallback reference ranges to items with ref=None (in-place).
 
     Only applies to known biomarkers listed in _FALLBACK_REFS.
     Updates ref, ref_text, ref_source, and recalculates status.
+    Returns the number of items that got a fallback ref.
     """
+    added = 0
     for it in items:
         if it.ref is not None:
             continue
@@ -2852,6 +4241,44 @@ def _apply_fallback_refs(items: List[Item]) -> None:
         it.ref_source = "интерпретация лаборатории"
         it.status = status_by_range(it.value, fallback)
         _dbg(f"fallback_ref: {it.name}={it.value} => ref={it.ref_text}, status={it.status}")
+        added += 1
+    return added
+
+
+def _finish_parse(outcome: ParseOutcome):
+    """
+    Доводит items из _select_parse: confidence + дедупликация (если их ещё не было),
+    fallback-референсы, sanity-фильтр, evaluate_parse_quality.
+
+    Baseline уже прошёл confidence и дедупликацию — повторная дедупликация
+    уникальных имён ничего бы не отбросила. Если после этого набор items не
+    изменился, качество baseline переиспользуется.
+
+    Возвращает (items, quality, dedup_dropped, outlier_count).
+    """
+    from parsers.quality import evaluate_parse_quality
+
+    items = outcome.items
+    dedup_dropped = 0
+    if not outcome.deduped:
+        assign_confidence(items)
+        items, dedup_dropped = deduplicate_items(items)
+    refs_added = _apply_fallback_refs(items)
+    items, outlier_count = apply_sanity_filter(items)
+
+    if outcome.quality is not None and not refs_added and not outlier_count:
+        quality = dict(
+            outcome.quality,
+            duplicate_dropped_count=dedup_dropped,
+            sanity_outlier_count=outlier_count,
+        )
+    else:
+        quality = evaluate_parse_quality(
+            items,
+            dedup_dropped_count=dedup_dropped,
+            sanity_outlier_count=outlier_count,
+        )
+    return items, quality, dedup_dropped, outlier_count
 
 
 # ==========================
@@ -2862,38 +4289,27 @@ def _run_parse_pipeline(raw_text: str):
     B2-хелпер: парсинг raw_text → (items, quality, dedup_dropped, outlier_count).
 
     Выполняет:
-      1) _smart_to_candidates (если нет табуляции)
-      2) parse_with_fallback
-      3) assign_confidence + deduplicate + sanity_filter
-      4) evaluate_parse_quality
+      1) text_to_candidate_records (если нет табуляции)
+      2) _select_parse (baseline / fallback)
+      3) _finish_parse: confidence, дедупликация, sanity_filter, evaluate_parse_quality
+         (что уже посчитал _select_parse, не пересчитывается)
       5) compute metrics + parse_score
 
     Возвращает (items, quality, dedup_dropped, outlier_count) или
     (None, None, 0, 0) если парсинг дал 0 items.
     """
-    from parsers.quality import evaluate_parse_quality
     from parsers.metrics import compute_ocr_quality_metrics, compute_parse_metrics, compute_parse_score, classify_quality_reasons
 
-    text = raw_text
-    if "\t" not in text:
-        candidates = _smart_to_candidates(text)
+    source: Union[str, List[Candidate]] = raw_text
+    if "\t" not in raw_text:
+        candidates = text_to_candidate_records(raw_text)
         if candidates:
-            text = candidates
+            source = candidates
 
-    items = parse_with_fallback(text)
-    if not items:
+    outcome = _select_parse(source)
+    if not outcome.items:
         return None, None, 0, 0
-
-    assign_confidence(items)
-    items, dedup_dropped = deduplicate_items(items)
-    _apply_fallback_refs(items)
-    items, outlier_count = apply_sanity_filter(items)
-
-    quality = evaluate_parse_quality(
-        items,
-        dedup_dropped_count=dedup_dropped,
-        sanity_outlier_count=outlier_count,
-    )
+    items, quality, dedup_dropped, outlier_count = _finish_parse(outcome)
 
     # B1-метрики
     _ocr_metrics = compute_ocr_quality_metrics(raw_text)
@@ -2958,6 +4374,54 @@ def _is_rerun_better(quality_first: dict, quality_rerun: dict) -> bool:
 # ==========================
 # PUBLIC: PDF отчёт
 # ==========================
+@dataclass
+class ReportResult:
+    """Готовый отчёт: PDF в памяти; пути заполнены, только если отчёт сохранён на диск."""
+    pdf_bytes: bytes
+    download_name: str
+    pdf_path: Optional[Path] = None
+    html_path: Optional[Path] = None
+    original_path: Optional[Path] = None
+
+    def files(self) -> List[Path]:
+        """Файлы отчёта на диске (исходник, HTML, PDF)."""
+        return [p for p in (self.original_path, self.html_path, self.pdf_path) if p is not None]
+
+
+_REPORT_STORAGE = None
+
+
+def get_report_storage():
+    """
+    Хранилище файлов отчётов в OUT_DIR с фоновой уборкой.
+    Пересоздаётся, если OUT_DIR поменяли (настройка, тесты).
+    """
+    global _REPORT_STORAGE
+    root = OUT_DIR / REPORT_STORAGE_SUBDIR
+    if _REPORT_STORAGE is None or _REPORT_STORAGE.root != root:
+        from parsers.report_storage import ReportStorage
+        if _REPORT_STORAGE is not None:
+            _REPORT_STORAGE.stop_janitor(timeout=0)
+        _REPORT_STORAGE = ReportStorage(
+            root,
+            legacy_dir=OUT_DIR,
+            shard_chars=REPORT_STORAGE_SHARD_CHARS,
+            ttl_sec=REPORT_STORAGE_TTL_SEC,
+            max_bytes=REPORT_STORAGE_MAX_BYTES,
+            compress_after_sec=REPORT_STORAGE_COMPRESS_AFTER_SEC,
+        )
+        if REPORT_STORAGE_JANITOR_INTERVAL_SEC > 0:
+            _REPORT_STORAGE.start_janitor(REPORT_STORAGE_JANITOR_INTERVAL_SEC)
+    return _REPORT_STORAGE
+
+
+def release_report_files(result: ReportResult) -> None:
+    """Файлы вытесненного отчёта больше не нужны — их удалит уборщик."""
+    files = result.files()
+    if files:
+        get_report_storage().release(files)
+
+
 def generate_pdf_report(
     sex: str,
     age: int,
@@ -2965,30 +4429,75 @@ def generate_pdf_report(
     file_bytes: Optional[bytes] = None,
     filename: str = "",
     mimetype: str = "",
+    on_llm_text: Optional[Callable[[str], None]] = None,
 ) -> tuple[Path, str]:
+    """
+    Полный цикл: текст/файл → показатели → расшифровка → HTML → PDF.
+    Отчёт всегда сохраняется в OUT_DIR; возвращает (pdf_path, download_name).
+
+    on_llm_text — необязательный callback для стриминга расшифровки
+    (получает накопленный текст LLM по мере генерации).
+    """
+    result = generate_report(
+        sex, age, raw_text=raw_text, file_bytes=file_bytes, filename=filename,
+        mimetype=mimetype, on_llm_text=on_llm_text, persist=True,
+    )
+    return result.pdf_path, result.download_name
+
+
+@_with_artifact_scope
+def generate_report(
+    sex: str,
+    age: int,
+    raw_text: str = "",
+    file_bytes: Optional[bytes] = None,
+    filename: str = "",
+    mimetype: str = "",
+    on_llm_text: Optional[Callable[[str], None]] = None,
+    persist: Optional[bool] = None,
+    pdf_backend: Optional[str] = None,
+) -> ReportResult:
+    """
+    То же, что generate_pdf_report, но PDF печатается из HTML в памяти
+    (page.set_content → page.pdf()) и возвращается байтами.
+
+    persist — сохранять ли исходный файл, HTML и PDF в OUT_DIR
+    (по умолчанию REPORT_PERSIST_TO_DISK). Без сохранения отчёт
+    не пишет на диск ни одного файла отчёта.
+
+    pdf_backend — "chromium" или "native" (по умолчанию REPORT_PDF_BACKEND).
+    Если нативная печать не удалась (например, нет шрифта), PDF печатается через Chromium.
+    """
+    if persist is None:
+        persist = REPORT_PERSIST_TO_DISK
+    if pdf_backend is None:
+        pdf_backend = REPORT_PDF_BACKEND
+    if pdf_backend not in REPORT_PDF_BACKENDS:
+        raise ValueError(f"Неизвестный pdf_backend: {pdf_backend!r}")
     raw_text = (raw_text or "").strip()
 
     # Создаём timestamp и uid в начале, чтобы использовать их и для исходного файла, и для отчёта
     created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     safe_ts = created_at.replace(":", "-").replace(" ", "_")
     uid = uuid4().hex[:8]
+    report_dir = get_report_storage().shard_dir(uid) if persist else OUT_DIR
 
     # Временно сохраняем исходный загруженный файл для тестирования
     original_file_path: Optional[Path] = None
-    if file_bytes:
+    if file_bytes and persist:
         # Определяем расширение файла
         if mimetype == "application/pdf" or (filename and filename.lower().endswith(".pdf")):
-            original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}.pdf"
+            original_file_path = report_dir / f"original_{safe_ts}_{uid}.pdf"
         elif mimetype in ("image/jpeg", "image/jpg") or (filename and filename.lower().endswith((".jpg", ".jpeg"))):
-            original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}.jpg"
+            original_file_path = report_dir / f"original_{safe_ts}_{uid}.jpg"
         elif mimetype == "image/png" or (filename and filename.lower().endswith(".png")):
-            original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}.png"
+            original_file_path = report_dir / f"original_{safe_ts}_{uid}.png"
         elif mimetype == "image/webp" or (filename and filename.lower().endswith(".webp")):
-            original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}.webp"
+            original_file_path = report_dir / f"original_{safe_ts}_{uid}.webp"
         else:
             # Fallback: используем оригинальное имя или generic расширение
             ext = Path(filename).suffix if filename else ".bin"
-            original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}{ext}"
+            original_file_path = report_dir / f"original_{safe_ts}_{uid}{ext}"
         
         original_file_path.write_bytes(file_bytes)
         _dbg(f"Сохранил исходный файл: {original_file_path.name} (размер: {len(file_bytes)} байт)")
@@ -3017,6 +4526,7 @@ def generate_pdf_report(
                 filename=filename,
                 mimetype=mimetype,
                 adaptive_threshold=preflight["adaptive_threshold"],
+                preprocess_flags=preflight.get("preprocess_flags"),
             ) or ""
         ).strip()
 
@@ -3101,6 +4611,8 @@ def generate_pdf_report(
         quality["metrics"]["ocr_preflight"] = {
             "adaptive_threshold_first_run": _preflight_info["adaptive_threshold"],
             "reason": _preflight_info["reason"],
+            "preprocess_flags": _preflight_info.get("preprocess_flags") or {},
+            "image_metrics": _preflight_info.get("image_metrics"),
         }
 
     low_quality = (
@@ -3152,7 +4664,7 @@ def generate_pdf_report(
     # Если ни одна панель не обнаружена - показываем нейтральное предупреждение
     if max(panel_scores.values()) < PANEL_THRESHOLD and len(parsed_names_before) < 5:
         # Only warn if parse quality suggests problems (not just a small panel)
-        _all_confident = all(getattr(it, 'confidence', 0) >= 0.7 for it in items)
+        _all_confident = all(it.confidence >= 0.7 for it in items)
         _ps_here = quality.get("metrics", {}).get("parse_score", 0)
         if not (_all_confident and _ps_here >= 70.0):
             missing_warnings.append("Распознано мало показателей, возможно неполный разбор.")
@@ -3189,7 +4701,7 @@ def generate_pdf_report(
         # Small panel: allow LLM only if ALL items have high confidence
         # and parse_score is good (indicates clean source, not OCR garbage)
         _all_high_confidence = all(
-            getattr(it, 'confidence', 0) >= 0.7 for it in items
+            it.confidence >= 0.7 for it in items
         )
         _eligible_by_count = _all_high_confidence and _ps >= 70.0
     else:
@@ -3220,6 +4732,14 @@ def generate_pdf_report(
     _dbg(f"LLM gate: decision={_llm_decision}, "
          f"valid_count={_valid_count}, parse_score={_ps}")
 
+    # Простые случаи (всё в норме / 1–2 небольших отклонения) — справка без LLM
+    _route = None
+    if _llm_decision == "CALL":
+        _route, _route_reason = route_narrative(high_low)
+        quality["metrics"]["llm_gate"]["narrative_route"] = _route
+        quality["metrics"]["llm_gate"]["narrative_route_reason"] = _route_reason
+        _dbg(f"narrative route: {_route} ({_route_reason})")
+
     if _llm_decision != "CALL":
         # Не вызываем LLM
         if _llm_decision == "SKIP_LOW_VALUES":
@@ -3235,45 +4755,16 @@ def generate_pdf_report(
                 "Таблица ниже может содержать частично распознанные данные."
             )
         high_low = []  # не показываем факты
-    else:
-        dict_expl = build_dict_explanations(high_low)
-        specialists = suggest_specialists(high_low)
-        llm_prompt = build_llm_prompt(sex, age, high_low, dict_expl, specialists)
-
-        try:
-            token = get_iam_token()
-            answer = call_yandexgpt(token, llm_prompt)
-            answer = re.sub(r"\n{3,}", "\n\n", answer).strip()
-
-            # Detect LLM refusal and retry with softened prompt
-            if _is_llm_refusal(answer):
-                _dbg(f"LLM refusal detected: {answer[:100]}... Retrying with softened prompt.")
-                softened_prompt = (
-                    "Ты — справочный помощник, аналог медицинской энциклопедии. "
-                    "Твоя задача — дать ОБЩУЮ ОБРАЗОВАТЕЛЬНУЮ информацию о лабораторных показателях. "
-                    "Это НЕ медицинская консультация, а информационная справка, как в учебнике.\n\n"
-                    + llm_prompt
-                )
-                answer = call_yandexgpt(token, softened_prompt)
-                answer = re.sub(r"\n{3,}", "\n\n", answer).strip()
-
-                # If still refusing — use fallback text
-                if _is_llm_refusal(answer):
-                    _dbg(f"LLM refusal on retry: {answer[:100]}... Using fallback text.")
-                    answer = build_fallback_text(sex, age, items, high_low)
-        except Exception as e:
-            _dbg(f"LLM failed: {e}")
-            answer = build_fallback_text(sex, age, items, high_low)
+        _emit_llm_text(on_llm_text, answer)
 
     # === UNIVERSAL DISCLAIMER при низком качестве ===
+    disclaimer_prefix = ""
     if low_quality and quality["valid_value_count"] >= 5:
         disclaimer_prefix = (
             "⚠ Часть показателей не распознана надёжно из-за формата бланка/"
             "качества документа. Ниже приведены только уверенно распознанные "
             "результаты; некоторые отклонения могли не попасть в итог.\n\n"
         )
-        answer = disclaimer_prefix + answer
-        _dbg("universal disclaimer prepended to answer")
 
     # === B5-B: добавляем заметку о качестве в текстовый ответ ===
     # Определяем тип источника для рекомендации
@@ -3285,19 +4776,76 @@ def generate_pdf_report(
 
     from parsers.report_helpers import build_user_quality_note
     _quality_note = build_user_quality_note(quality, source_type=_source_type)
-    if _quality_note:
-        answer = answer.rstrip() + "\n\n" + _quality_note
 
-    context = build_template_context(sex, age, items, high_low, answer, missing_warnings, quality=quality)
-    # Используем созданный ранее created_at для контекста (если нужно обновить, можно использовать context["created_at"])
     download_name = f"report_{safe_ts}_{uid}.pdf"
+    html_path = report_dir / f"report_{safe_ts}_{uid}.html"
+    pdf_path = report_dir / download_name
 
-    html_path = OUT_DIR / f"report_{safe_ts}_{uid}.html"
-    pdf_path = OUT_DIR / download_name
+    # Всё, кроме справки, от LLM не зависит: рендерим отчёт заранее
+    # (с меткой на месте справки) и, пока LLM отвечает, прогреваем Chromium.
+    context = build_template_context(
+        sex, age, items, high_low, LLM_NARRATIVE_PLACEHOLDER, missing_warnings, quality=quality,
+    )
+    shell_html = render_html_report(context)
+
+    prewarm: Optional[PrewarmedPdfRender] = None
+    if _route == "LOCAL":
+        _t0 = time.perf_counter()
+        answer = build_local_narrative(sex, age, items, high_low)
+        quality["metrics"]["llm_gate"]["local_narrative_ms"] = round((time.perf_counter() - _t0) * 1000, 3)
+        _emit_llm_text(on_llm_text, answer)
+    elif _route == "LLM":
+        if REPORT_PRERENDER_ENABLED and pdf_backend == "chromium" and PDF_RENDER_WORKERS <= 0:
+            try:
+                prewarm = PrewarmedPdfRender(shell_html, created_at)
+            except Exception as e:
+                _dbg(f"PDF prewarm start failed: {e}")
+        try:
+            answer, llm_cache_info = _generate_llm_answer(
+                sex, age, items, high_low,
+                on_text=on_llm_text, gate_info=quality["metrics"]["llm_gate"],
+            )
+        except BaseException:
+            if prewarm is not None:
+                prewarm.cancel()
+            raise
+        quality["metrics"]["llm_cache"] = llm_cache_info
 
-    rendered_html = render_html_report(context)
-    html_path.write_text(rendered_html, encoding="utf-8")
+    if disclaimer_prefix:
+        answer = disclaimer_prefix + answer
+        _dbg("universal disclaimer prepended to answer")
+    if _quality_note:
+        answer = answer.rstrip() + "\n\n" + _quality_note
 
-    render_pdf_from_html(html_path, pdf_path, created_at)
+    rendered_html = fill_report_narrative(shell_html, answer)
+    if persist:
+        html_path.write_text(rendered_html, encoding="utf-8")
 
-    return pdf_path, download_name
+    pdf_bytes: Optional[bytes] = None
+    if pdf_backend == "native":
+        _t0 = time.perf_counter()
+        try:
+            pdf_bytes = render_pdf_native(context, answer)
+            _dbg(f"PDF printed natively in {(time.perf_counter() - _t0) * 1000:.1f} ms")
+        except Exception as e:
+            _dbg(f"native PDF failed ({e}), falling back to Chromium")
+
+    if pdf_bytes is None and prewarm is not None:
+        if prewarm.finish(answer):
+            _dbg(f"PDF printed from prewarmed page (warm {prewarm.warm_ms} ms)")
+            pdf_bytes = prewarm.pdf_bytes
+        else:
+            _dbg(f"PDF prewarm failed ({prewarm.error or 'timeout'}), rendering from memory")
+    if pdf_bytes is None:
+        pdf_bytes = render_pdf_bytes(rendered_html, created_at)
+    # Файл пишет только этот поток (прогрев отдаёт лишь pdf_bytes)
+    if persist:
+        pdf_path.write_bytes(pdf_bytes)
+
+    return ReportResult(
+        pdf_bytes=pdf_bytes,
+        download_name=download_name,
+        pdf_path=pdf_path if persist else None,
+        html_path=html_path if persist else None,
+        original_path=original_file_path,
+    )
@@ -1,10 +1,16 @@
 """
 Preprocessing изображений перед OCR.
 Операции: grayscale → autocontrast → deskew → upscale (если маленькое) → sharpen → (adaptive threshold).
+
+Tiling: очень высокие/большие сканы режутся на перекрывающиеся горизонтальные
+полосы (split_image_into_tiles), строки OCR склеиваются обратно (stitch_tile_lines).
 """
 from PIL import Image, ImageEnhance, ImageFilter, ImageOps
 import io
-from typing import Tuple
+import math
+import re
+import time
+from typing import List, Tuple
 
 import numpy as np
 import cv2
@@ -22,6 +28,17 @@ DESKEW_MAX_ANGLE = 15.0   # максимальный угол коррекции
 ADAPTIVE_BLOCK_SIZE = 35   # размер блока для adaptive threshold (нечётное число)
 ADAPTIVE_C = 10            # константа вычитания из среднего
 
+# Tiling (длинные бланки, сфотографированные одним кадром)
+TILE_TRIGGER_HEIGHT = 4000       # выше — режем на тайлы
+TILE_TRIGGER_PIXELS = 16_000_000 # больше пикселей — режем на тайлы (OCR сам уменьшает такие)
+TILE_ASPECT = 1.414              # целевое отношение высоты тайла к ширине (лист A4)
+TILE_MIN_HEIGHT = 1200
+TILE_MAX_HEIGHT = 3500
+TILE_OVERLAP_RATIO = 0.1         # перекрытие соседних тайлов (доля высоты тайла)
+TILE_MIN_OVERLAP = 160           # px — в перекрытие должны влезать 2–3 строки текста
+TILE_MAX_OVERLAP = 400
+SEAM_WINDOW_LINES = 10           # сколько строк у шва сравниваем при склейке
+
 
 def _deskew_image(img: Image.Image, max_angle: float = DESKEW_MAX_ANGLE) -> Image.Image:
     """
@@ -196,3 +213,221 @@ def get_image_info(image_bytes: bytes) -> dict:
         "format": img.format,
     }
 
+
+# ============================================================
+# Tiling: нарезка высоких сканов на перекрывающиеся полосы
+# ============================================================
+def needs_tiling(width: int, height: int) -> bool:
+    """Нужно ли резать изображение на тайлы перед OCR."""
+    if width <= 0 or height <= 0:
+        return False
+    return height > TILE_TRIGGER_HEIGHT or width * height > TILE_TRIGGER_PIXELS
+
+
+def plan_tiles(width: int, height: int) -> List[Tuple[int, int]]:
+    """
+    Подбирает тайлы по размерам изображения.
+
+    Высота тайла ≈ ширина * TILE_ASPECT (в пределах MIN..MAX), затем
+    выравнивается так, чтобы все тайлы были одинаковой высоты.
+    Соседние тайлы перекрываются на overlap пикселей.
+
+    Returns:
+        список (top, bottom) в пикселях; один тайл, если резать не нужно.
+    """
+    if not needs_tiling(width, height):
+        return [(0, height)]
+
+    tile_h = int(min(TILE_MAX_HEIGHT, max(TILE_MIN_HEIGHT, width * TILE_ASPECT)))
+    # Широкие сканы: тайл сам не должен превышать лимит по пикселям
+    tile_h = min(tile_h, TILE_TRIGGER_PIXELS // width)
+    overlap = int(min(TILE_MAX_OVERLAP, max(TILE_MIN_OVERLAP, tile_h * TILE_OVERLAP_RATIO)))
+    tile_h = max(tile_h, 2 * overlap)
+    if tile_h >= height:
+        return [(0, height)]
+
+    n = math.ceil((height - overlap) / (tile_h - overlap))
+    # Равномерная высота: n тайлов покрывают height с n-1 перекрытиями
+    tile_h = math.ceil((height + (n - 1) * overlap) / n)
+    step = tile_h - overlap
+
+    tiles: List[Tuple[int, int]] = []
+    for i in range(n):
+        top = i * step
+        bottom = min(height, top + tile_h)
+        tiles.append((top, bottom))
+    return tiles
+
+
+def split_image_into_tiles(image_bytes: bytes) -> List[Tuple[bytes, int, int]]:
+    """
+    Режет изображение на перекрывающиеся горизонтальные тайлы.
+
+    Returns:
+        список (png_bytes, top, bottom). Если резать не нужно — один элемент
+        с исходными байтами.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    spans = plan_tiles(img.width, img.height)
+    if len(spans) == 1:
+        return [(image_bytes, 0, img.height)]
+
+    out: List[Tuple[bytes, int, int]] = []
+    for top, bottom in spans:
+        tile = img.crop((0, top, img.width, bottom))
+        buf = io.BytesIO()
+        tile.save(buf, format="PNG")
+        out.append((buf.getvalue(), top, bottom))
+    return out
+
+
+def _seam_key(line: str) -> str:
+    return re.sub(r"\s+", " ", (line or "").strip()).lower()
+
+
+def _is_solid_seam_run(lines: List[str]) -> bool:
+    """Совпадение у шва достаточно надёжно (не одиночное «г/л»)."""
+    if len(lines) >= 2:
+        return True
+    return len(_seam_key(lines[0])) >= 8
+
+
+def _stitch_pair(head: List[str], tail: List[str], window: int) -> List[str]:
+    """
+    Склеивает строки двух соседних тайлов.
+
+    В зоне перекрытия одни и те же строки есть в обоих тайлах, а на самом
+    срезе — обрезанные (частичные) строки. Ищем самую длинную общую серию
+    строк между концом head и началом tail; всё, что в head после серии,
+    и всё, что в tail до неё, — обрезки у шва, они отбрасываются.
+    """
+    if not head:
+        return list(tail)
+    if not tail:
+        return list(head)
+
+    a0 = max(0, len(head) - window)
+    a_keys = [_seam_key(x) for x in head[a0:]]
+    b_keys = [_seam_key(x) for x in tail[:window]]
+
+    best_len, best_i, best_j = 0, -1, -1
+    for i in range(len(a_keys)):
+        for j in range(len(b_keys)):
+            k = 0
+            while (i + k < len(a_keys) and j + k < len(b_keys)
+                   and a_keys[i + k] and a_keys[i + k] == b_keys[j + k]):
+                k += 1
+            if k > best_len:
+                best_len, best_i, best_j = k, i, j
+
+    if best_len and _is_solid_seam_run(head[a0 + best_i:a0 + best_i + best_len]):
+        cut_head = a0 + best_i + best_len
+        return list(head[:cut_head]) + list(tail[best_j + best_len:])
+
+    # Надёжного совпадения нет — только убираем точный дубль на стыке
+    if _seam_key(head[-1]) and _seam_key(head[-1]) == _seam_key(tail[0]):
+        return list(head) + list(tail[1:])
+    return list(head) + list(tail)
+
+
+def stitch_tile_lines(tiles_lines: List[List[str]], window: int = SEAM_WINDOW_LINES) -> List[str]:
+    """
+    Склеивает построчный OCR-текст тайлов (сверху вниз) в один список строк,
+    убирая дубли и обрезанные строки в зонах перекрытия.
+    """
+    merged: List[str] = []
+    for lines in tiles_lines:
+        lines = [ln for ln in (lines or []) if ln.strip()]
+        merged = _stitch_pair(merged, lines, window)
+    return merged
+
+
+# ============================================================
+# Быстрая оценка качества изображения (для preflight)
+# ============================================================
+ANALYZE_THUMB_MAX_SIDE = 512     # анализируем уменьшенную копию — единицы миллисекунд
+ANALYZE_BG_GRID = 4              # сетка блоков для оценки неравномерности фона
+
+
+def _estimate_skew(gray: np.ndarray) -> float:
+    """Угол наклона строк (градусы) по Hough на миниатюре; 0.0 — если не определён."""
+    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+    lines = cv2.HoughLinesP(
+        edges,
+        rho=1,
+        theta=np.pi / 180,
+        threshold=40,
+        minLineLength=max(20, gray.shape[1] // 8),
+        maxLineGap=5,
+    )
+    if lines is None:
+        return 0.0
+    angles = []
+    # (N, 1, 4) в OpenCV 4, (N, 4) в OpenCV 5
+    for x1, y1, x2, y2 in lines.reshape(-1, 4):
+        if x2 - x1 == 0:
+            continue
+        angle = float(np.degrees(np.arctan2(y2 - y1, x2 - x1)))
+        if abs(angle) < 45:
+            angles.append(angle)
+    if not angles:
+        return 0.0
+    return float(np.median(angles))
+
+
+def _background_unevenness(gray: np.ndarray, grid: int = ANALYZE_BG_GRID) -> float:
+    """
+    Неравномерность фона (тени, виньетка, блики): разброс «светлого уровня»
+    (90-й перцентиль) по блокам сетки, в долях от 255.
+    """
+    h, w = gray.shape[:2]
+    bh, bw = max(1, h // grid), max(1, w // grid)
+    levels = []
+    for gy in range(grid):
+        for gx in range(grid):
+            block = gray[gy * bh:(gy + 1) * bh, gx * bw:(gx + 1) * bw]
+            if block.size:
+                levels.append(float(np.percentile(block, 90)))
+    if len(levels) < 2:
+        return 0.0
+    return (max(levels) - min(levels)) / 255.0
+
+
+def analyze_image_quality(image_bytes: bytes, max_side: int = ANALYZE_THUMB_MAX_SIDE) -> dict:
+    """
+    Дешёвые локальные метрики качества скана/фото (по миниатюре).
+
+    Returns:
+        {
+            "width", "height":  исходные размеры,
+            "contrast":         (p95 - p5) яркости / 255, 0..1,
+            "blur_var":         дисперсия Лапласиана миниатюры (меньше — размытее),
+            "skew_deg":         оценка наклона строк, градусы,
+            "bg_unevenness":    неравномерность фона, 0..1,
+            "elapsed_ms":       время анализа,
+        }
+
+    Raises:
+        исключение PIL, если байты не являются изображением.
+    """
+    t0 = time.perf_counter()
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.width, img.height
+    img.draft("L", (max_side, max_side))  # JPEG: декодируем сразу в уменьшенном виде
+    thumb = img.convert("L")
+    thumb.thumbnail((max_side, max_side))
+    gray = np.asarray(thumb, dtype=np.uint8)
+
+    p5, p95 = np.percentile(gray, (5, 95))
+    contrast = float(p95 - p5) / 255.0
+    blur_var = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    return {
+        "width": width,
+        "height": height,
+        "contrast": round(contrast, 3),
+        "blur_var": round(blur_var, 1),
+        "skew_deg": round(_estimate_skew(gray), 2),
+        "bg_unevenness": round(_background_unevenness(gray), 3),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
@@ -0,0 +1,85 @@
+"""
+Кандидат в показатель — запись, которую экстракторы передают дальше по конвейеру.
+
+Candidate(name, value, ref, unit, source=..., span=...)
+    name    — имя показателя, как его нашёл экстрактор
+    value   — значение (float; None — если экстрактор не смог его прочитать)
+    ref     — референс текстом ("3.8-5.1", "<=20"); в Range его переводит
+              parse_ref_range при сборке Item
+    unit    — единица измерения
+    source  — какой экстрактор нашёл кандидата ("universal", "helix", "medsi")
+    span    — (начало, конец) номеров строк текста экстрактора (после его предобработки)
+
+Запись передаётся между стадиями без форматирования в TSV и обратного разбора.
+TSV (name\\tvalue\\tref\\tunit) собирается только на границе: в отладочных
+артефактах и в текстовых функциях (universal_extract, helix_table_to_candidates, …).
+"""
+
+from typing import Iterable, Optional, Tuple
+
+Span = Tuple[int, int]
+
+
+class Candidate:
+    """
+    Один кандидат. value_text — значение так, как его записала лаборатория
+    (если экстрактор его сохраняет); иначе в TSV значение печатается через :g.
+
+    strip_tsv=True повторяет прежнее f"...".strip() экстракторов: пустые ref и
+    unit в конце строки срезаются, и такой кандидат (две колонки) разбором не берётся.
+    """
+
+    __slots__ = ("name", "value", "ref", "unit", "source", "span", "value_text", "strip_tsv")
+
+    def __init__(
+        self,
+        name: str,
+        value: Optional[float],
+        ref: str = "",
+        unit: str = "",
+        *,
+        source: str = "",
+        span: Optional[Span] = None,
+        value_text: Optional[str] = None,
+        strip_tsv: bool = True,
+    ):
+        self.name = name
+        self.value = value
+        self.ref = ref
+        self.unit = unit
+        self.source = source
+        self.span = span
+        self.value_text = value_text
+        self.strip_tsv = strip_tsv
+
+    @property
+    def value_str(self) -> str:
+        if self.value_text is not None:
+            return self.value_text
+        return "" if self.value is None else f"{self.value:g}"
+
+    @property
+    def columns(self) -> int:
+        """Сколько колонок будет в TSV-строке кандидата."""
+        if not self.strip_tsv or self.unit:
+            return 4
+        return 3 if self.ref else 2
+
+    def to_tsv(self) -> str:
+        line = f"{self.name}\t{self.value_str}\t{self.ref}\t{self.unit}"
+        return line.strip() if self.strip_tsv else line
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Candidate):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.to_tsv()!r}, source={self.source!r}, span={self.span})"
+
+
+def format_candidates(candidates: Iterable[Candidate]) -> str:
+    """TSV: один кандидат на строку."""
+    return "\n".join(c.to_tsv() for c in candidates)
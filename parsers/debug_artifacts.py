@@ -0,0 +1,165 @@
+"""
+Отладочные артефакты (сырой ответ OCR/LLM, извлечённый текст, кандидаты):
+когда их сохранять и запись вне пути запроса.
+
+Режимы (ArtifactWriter.mode):
+    off       — не сохранять ничего
+    sampled   — сохранять артефакты доли запросов (sample_rate) и все артефакты-ошибки
+    on_error  — копить артефакты запроса в памяти и сохранять, только если запрос
+                упал или артефакт сам описывает ошибку (HTTP ≠ 200, ошибка операции OCR)
+    always    — сохранять всё (как раньше)
+
+Запись — в фоновом потоке: payload может быть функцией без аргументов
+(например, json.dumps большого ответа), тогда сериализация тоже выполняется
+в фоне. Очередь ограничена; при переполнении артефакт отбрасывается
+(счётчик dropped), запрос не ждёт диск.
+"""
+
+import contextvars
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+MODE_OFF = "off"
+MODE_SAMPLED = "sampled"
+MODE_ON_ERROR = "on_error"
+MODE_ALWAYS = "always"
+MODES = (MODE_OFF, MODE_SAMPLED, MODE_ON_ERROR, MODE_ALWAYS)
+
+Payload = Union[str, bytes, Callable[[], Union[str, bytes]]]
+_Artifact = Tuple[Path, Payload]
+
+
+class _RequestScope:
+    __slots__ = ("sampled", "pending")
+
+    def __init__(self, sampled: bool):
+        self.sampled = sampled
+        self.pending: List[_Artifact] = []
+
+
+_SCOPE: "contextvars.ContextVar[Optional[_RequestScope]]" = contextvars.ContextVar(
+    "debug_artifacts_scope", default=None,
+)
+
+
+class ArtifactWriter:
+    """Политика сохранения отладочных артефактов и фоновый писатель."""
+
+    def __init__(
+        self,
+        mode: str = MODE_ON_ERROR,
+        *,
+        sample_rate: float = 0.01,
+        max_queue: int = 64,
+        max_pending: int = 32,
+        rng: Callable[[], float] = random.random,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим артефактов: {mode!r} (ожидается одно из {MODES})")
+        self.mode = mode
+        self.sample_rate = float(sample_rate)
+        self.max_pending = max(1, int(max_pending))
+        self._rng = rng
+        self._queue: "queue.Queue[Optional[_Artifact]]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {"written": 0, "skipped": 0, "dropped": 0, "failed": 0}
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """
+        Границы одного запроса: решение о выборке (sampled) и буфер для on_error.
+        Если внутри возникло исключение — накопленные артефакты сохраняются.
+        """
+        sampled = self.mode == MODE_SAMPLED and self._rng() < self.sample_rate
+        scope = _RequestScope(sampled)
+        token = _SCOPE.set(scope)
+        try:
+            yield
+        except BaseException:
+            self._flush_scope(scope)
+            raise
+        finally:
+            _SCOPE.reset(token)
+
+    def write(self, path: Path, payload: Payload, *, error: bool = False) -> None:
+        """Сохраняет артефакт (перезаписывая файл), если это разрешает режим."""
+        scope = _SCOPE.get()
+        if self.mode == MODE_ALWAYS or (error and self.mode != MODE_OFF):
+            if error and scope is not None:
+                self._flush_scope(scope)
+            self._enqueue(Path(path), payload)
+        elif self.mode == MODE_SAMPLED and scope is not None and scope.sampled:
+            self._enqueue(Path(path), payload)
+        elif self.mode == MODE_ON_ERROR and scope is not None:
+            if len(scope.pending) >= self.max_pending:
+                scope.pending.pop(0)
+            scope.pending.append((Path(path), payload))
+        else:
+            self._count("skipped")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока очередь записи опустеет (для тестов и остановки). True — успели."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+
+        def _wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=_wait, daemon=True).start()
+        return done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, mode=self.mode, queue_length=self._queue.qsize())
+
+    # ── внутреннее ───────────────────────────────────────────────────
+
+    def _flush_scope(self, scope: _RequestScope) -> None:
+        pending, scope.pending = scope.pending, []
+        for path, payload in pending:
+            self._enqueue(path, payload)
+
+    def _enqueue(self, path: Path, payload: Payload) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((path, payload))
+        except queue.Full:
+            self._count("dropped")
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="debug-artifacts", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, payload = item
+                data = payload() if callable(payload) else payload
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if isinstance(data, bytes):
+                    path.write_bytes(data)
+                else:
+                    path.write_text(data or "", encoding="utf-8")
+                self._count("written")
+            except Exception:
+                self._count("failed")
+            finally:
+                self._queue.task_done()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
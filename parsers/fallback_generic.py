@@ -7,7 +7,6 @@ Fallback-парсер: универсальный split_value_unit_ref(rest).
   - Fallback НЕ изменяет baseline-логику и работает только когда baseline провалился.
 """
 
-import re
 import sys
 from pathlib import Path
 from typing import Optional, List, Tuple
@@ -17,6 +16,7 @@ _PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
+from parsers import patterns as rx
 from engine import (
     Item, Range, parse_float, parse_ref_range, status_by_range,
     normalize_name, clean_raw_name, _dbg,
@@ -33,7 +33,7 @@ def split_value_unit_ref(rest: str) -> Tuple[Optional[float], str, str]:
 
     Возвращает (value, unit, ref_text) или (None, "", "") если не удалось разобрать.
     """
-    rest = re.sub(r"\s+", " ", (rest or "").strip())
+    rest = rx.WHITESPACE.sub(" ", (rest or "").strip())
     if not rest:
         return None, "", ""
 
@@ -42,13 +42,11 @@ def split_value_unit_ref(rest: str) -> Tuple[Optional[float], str, str]:
 
     # Ищем референсный диапазон в конце строки
     # Формат: числоA - числоB  или  числоA-числоB  (в конце строки)
-    ref_pattern = r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*$"
-    ref_match = re.search(ref_pattern, rest)
+    ref_match = rx.FALLBACK_REF_RANGE_END.search(rest)
 
     if not ref_match:
         # Попробуем формат <=N или >=N
-        comp_pattern = r"(<=|>=|<|>)\s*(\d+(?:\.\d+)?)\s*$"
-        comp_match = re.search(comp_pattern, rest)
+        comp_match = rx.FALLBACK_COMPARATOR_END.search(rest)
         if comp_match:
             ref_text = f"{comp_match.group(1)}{comp_match.group(2)}"
             before = rest[:comp_match.start()].strip()
@@ -64,7 +62,7 @@ def split_value_unit_ref(rest: str) -> Tuple[Optional[float], str, str]:
         return None, "", ref_text
 
     # Сначала ищем число в начале
-    val_match = re.match(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)", before)
+    val_match = rx.VALUE_WITH_REST_OPEN.match(before)
     if not val_match:
         return None, "", ref_text
 
@@ -81,27 +79,27 @@ def fallback_parse_line(line: str) -> Optional[Tuple[str, float, str, str, str]]
     Возвращает (name, value, unit, ref_text) или None.
     Фильтр: строка должна содержать референсный диапазон.
     """
-    s = re.sub(r"\s+", " ", (line or "").strip())
+    s = rx.WHITESPACE.sub(" ", (line or "").strip())
     if not s:
         return None
 
     # Строка должна содержать хотя бы один диапазон (число-число)
-    if not re.search(r"\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?", s):
+    if not rx.FALLBACK_HAS_RANGE.search(s):
         # Или формат <=/>= (более редкий)
-        if not re.search(r"(<=|>=|<|>)\s*\d+", s):
+        if not rx.FALLBACK_HAS_COMPARATOR.search(s):
             # Или формат «до число»
-            if not re.search(r"[Дд]о\s*\d+", s):
+            if not rx.FALLBACK_HAS_UPTO.search(s):
                 return None
 
     # Ищем первое число в строке — это начало данных (после имени)
-    num_match = re.search(r"(?<![A-Za-zА-Яа-я\-])([-+]?\d+(?:[.,]\d+)?)\s", s)
+    num_match = rx.FALLBACK_FIRST_NUMBER.search(s)
     if not num_match:
         return None
 
     name_part = s[:num_match.start()].strip()
     rest_part = s[num_match.start():].strip()
 
-    if not name_part or not re.search(r"[A-Za-zА-Яа-я]{2,}", name_part):
+    if not name_part or not rx.LETTERS2.search(name_part):
         return None
 
     value, unit, ref_text = split_value_unit_ref(rest_part)
@@ -0,0 +1,256 @@
+"""
+Колоночное представление показателей (ItemTable) для пакетной обработки.
+
+Отчёт из десятков Item считается по спискам (engine.assign_confidence,
+apply_sanity_filter, quality.evaluate_parse_quality). Для пакетов и аналитики
+на миллионах показателей тот же расчёт делается по колонкам NumPy:
+
+    value / low / high / confidence — float64 (NaN — нет значения / границы)
+    has_ref, has_unit                — bool
+    name / raw_name / ref_text       — интернированные строки: словарь + int32-коды,
+                                       признаки строк считаются один раз на уникальную строку
+
+ItemTable.from_items(items) строит таблицу из списка Item; методы
+statuses(), sanity_outliers(), confidences(), quality(), panel_scores()
+дают те же результаты, что и поэлементные функции engine/parsers.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from parsers import patterns as rx
+from parsers.quality import CBC_CODES, CBC_EXPECTED_MIN, CBC_THRESHOLD, GENERIC_EXPECTED_MIN
+from parsers.sanity_ranges import SANITY_RANGES
+
+# Коды статусов; STATUS_LABELS[code] — строка, как в engine.status_by_range
+STATUS_NOT_RECOGNIZED, STATUS_UNKNOWN, STATUS_LOW, STATUS_HIGH, STATUS_NORMAL = range(5)
+STATUS_LABELS: Tuple[str, ...] = ("НЕ РАСПОЗНАНО", "НЕИЗВЕСТНО", "НИЖЕ", "ВЫШЕ", "В НОРМЕ")
+
+
+class Interned:
+    """Словарь уникальных строк и коды строк колонки."""
+
+    __slots__ = ("vocab", "codes")
+
+    def __init__(self, values: Iterable[str]):
+        index: Dict[str, int] = {}
+        codes = [index.setdefault(v, len(index)) for v in values]
+        self.vocab: List[str] = list(index)
+        self.codes = np.asarray(codes, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def map(self, fn) -> np.ndarray:
+        """fn над каждой уникальной строкой, разнесённый по строкам колонки."""
+        per_vocab = np.fromiter((fn(v) for v in self.vocab), dtype=np.float64, count=len(self.vocab))
+        return per_vocab[self.codes] if len(self.codes) else per_vocab[:0]
+
+    def values(self) -> List[str]:
+        vocab = self.vocab
+        return [vocab[c] for c in self.codes.tolist()]
+
+
+def _nan_if_none(x: Optional[float]) -> float:
+    return np.nan if x is None else x
+
+
+class ItemTable:
+    """Показатели по колонкам."""
+
+    __slots__ = ("name", "raw_name", "ref_text", "value", "low", "high", "has_ref", "has_unit", "confidence")
+
+    def __init__(
+        self,
+        *,
+        name: Sequence[str],
+        raw_name: Sequence[str],
+        value: Any,
+        low: Any,
+        high: Any,
+        has_ref: Any,
+        has_unit: Any,
+        ref_text: Optional[Sequence[str]] = None,
+        confidence: Any = None,
+    ):
+        self.name = Interned(name)
+        self.raw_name = Interned(raw_name)
+        self.ref_text = Interned(ref_text if ref_text is not None else [""] * len(self.name))
+        self.value = np.asarray(value, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.has_ref = np.asarray(has_ref, dtype=bool)
+        self.has_unit = np.asarray(has_unit, dtype=bool)
+        self.confidence = (np.zeros(len(self.value)) if confidence is None
+                           else np.asarray(confidence, dtype=np.float64))
+
+    @classmethod
+    def from_items(cls, items: Sequence[Any]) -> "ItemTable":
+        refs = [it.ref for it in items]
+        return cls(
+            name=[it.name for it in items],
+            raw_name=[it.raw_name or "" for it in items],
+            ref_text=[it.ref_text or "" for it in items],
+            value=[_nan_if_none(it.value) for it in items],
+            low=[np.nan if r is None else _nan_if_none(r.low) for r in refs],
+            high=[np.nan if r is None else _nan_if_none(r.high) for r in refs],
+            has_ref=[r is not None for r in refs],
+            has_unit=[bool((it.unit or "").strip()) for it in items],
+            confidence=[it.confidence for it in items],
+        )
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    @property
+    def has_value(self) -> np.ndarray:
+        return ~np.isnan(self.value)
+
+    # ── статус ───────────────────────────────────────────────────────
+
+    def status_codes(self) -> np.ndarray:
+        """engine.status_by_range по колонкам: коды STATUS_* (int8)."""
+        v = self.value
+        with np.errstate(invalid="ignore"):
+            below = v < self.low
+            above = v > self.high
+        codes = np.full(len(v), STATUS_NORMAL, dtype=np.int8)
+        codes[above] = STATUS_HIGH
+        codes[below] = STATUS_LOW
+        codes[~self.has_ref] = STATUS_UNKNOWN
+        codes[np.isnan(v)] = STATUS_NOT_RECOGNIZED
+        return codes
+
+    def statuses(self) -> List[str]:
+        return [STATUS_LABELS[c] for c in self.status_codes().tolist()]
+
+    # ── sanity ───────────────────────────────────────────────────────
+
+    def sanity_outliers(self) -> np.ndarray:
+        """sanity_ranges.is_sanity_outlier по колонкам (для value=None — False)."""
+        lo = self.name.map(lambda n: SANITY_RANGES.get(n, (np.nan, np.nan))[0])
+        hi = self.name.map(lambda n: SANITY_RANGES.get(n, (np.nan, np.nan))[1])
+        v = self.value
+        known = ~np.isnan(lo) & ~np.isnan(v)
+        with np.errstate(invalid="ignore"):
+            inside = (lo <= v) & (v <= hi)
+        return known & ~inside
+
+    # ── confidence ───────────────────────────────────────────────────
+
+    def confidences(self) -> np.ndarray:
+        """engine.compute_item_confidence по колонкам."""
+        from parsers.line_scorer import line_features
+
+        raw = self.raw_name
+        bad_raw = raw.map(lambda r: any(ch in r for ch in "^*/") and not rx.POW10_SUFFIX.search(r)) > 0
+        weak_name = raw.map(lambda r: len(r.strip()) < 3 or not rx.LETTERS2.search(r.strip())) > 0
+        # Биомаркер ищется по raw_name, а при пустом raw_name — по name
+        raw_known = raw.map(lambda r: bool(r) and line_features(r).has_biomarker) > 0
+        name_known = self.name.map(lambda n: line_features(n).has_biomarker) > 0
+        raw_empty = raw.map(lambda r: not r) > 0
+        is_known = np.where(raw_empty, name_known, raw_known)
+
+        has_ref, has_unit = self.has_ref, self.has_unit
+        conf = np.select(
+            [
+                ~self.has_value | bad_raw,
+                has_ref & has_unit & is_known,
+                has_ref & has_unit,
+                has_ref & is_known,
+                has_ref,
+                is_known,
+                weak_name,
+            ],
+            [0.0, 1.0, 0.9, 0.8, 0.7, 0.5, 0.3],
+            default=0.5,
+        )
+        return conf
+
+    def assign_confidence(self) -> np.ndarray:
+        self.confidence = self.confidences()
+        return self.confidence
+
+    # ── качество ─────────────────────────────────────────────────────
+
+    def suspicious(self) -> np.ndarray:
+        """quality._is_suspicious_item по колонкам (для строк со значением)."""
+        def bad_raw(r: str) -> bool:
+            no_parens = rx.PARENS.sub("", r)
+            return any(ch in no_parens for ch in "^*/") and not rx.POW10_SUFFIX.search(r)
+
+        def bad_ref(ref: str) -> bool:
+            if not ref:
+                return False
+            combined = ref.replace("-", "").replace(".", "")
+            if len(combined) > 10 and not rx.REF_SHORT_RANGE.match(ref.replace(" ", "")):
+                return True
+            return " " in ref.strip() and len(ref.strip().split()) > 3
+
+        return (self.raw_name.map(bad_raw) > 0) | (self.ref_text.map(bad_ref) > 0)
+
+    def expected_minimum(self) -> int:
+        found_cbc = int(self.name.map(lambda n: n in CBC_CODES).sum())
+        return CBC_EXPECTED_MIN if found_cbc >= CBC_THRESHOLD else GENERIC_EXPECTED_MIN
+
+    def quality(
+        self,
+        expected_minimum: Optional[int] = None,
+        *,
+        filtered_header_count: Optional[int] = None,
+        dedup_dropped_count: Optional[int] = None,
+        sanity_outlier_count: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """quality.evaluate_parse_quality по колонкам (тот же dict)."""
+        if expected_minimum is None:
+            expected_minimum = self.expected_minimum()
+
+        has_value = self.has_value
+        suspicious = has_value & self.suspicious()
+        valid = has_value & ~suspicious
+
+        valid_value_count = int(valid.sum())
+        valid_ref_count = int((valid & self.has_ref).sum())
+        valid_unit_count = int((valid & self.has_unit).sum())
+        # Тот же порядок сложения, что у поэлементного цикла (округление до 3 знаков)
+        confidence_sum = sum(self.confidence[valid].tolist())
+
+        coverage_score = valid_value_count / max(expected_minimum, 1)
+        ratio = (lambda n: n / valid_value_count) if valid_value_count > 0 else (lambda n: 0.0)
+
+        name_counts = np.bincount(self.name.codes[has_value], minlength=len(self.name.vocab))
+        duplicate_name_count = int((name_counts > 1).sum())
+
+        return {
+            "valid_value_count": valid_value_count,
+            "valid_ref_count": valid_ref_count,
+            "error_count": int((~has_value).sum()),
+            "suspicious_count": int(suspicious.sum()),
+            "coverage_score": round(coverage_score, 3),
+            "expected_minimum": expected_minimum,
+            "ref_coverage_ratio": round(ratio(valid_ref_count), 3),
+            "unit_coverage_ratio": round(ratio(valid_unit_count), 3),
+            "duplicate_name_count": duplicate_name_count,
+            "avg_confidence": round(ratio(confidence_sum), 3),
+            "filtered_header_count": filtered_header_count if filtered_header_count is not None else 0,
+            "duplicate_dropped_count": dedup_dropped_count if dedup_dropped_count is not None else 0,
+            "sanity_outlier_count": sanity_outlier_count if sanity_outlier_count is not None else 0,
+        }
+
+    def parse_metrics(self, *, quality_dict: Optional[dict] = None) -> Dict[str, Any]:
+        """metrics.compute_parse_metrics по колонкам."""
+        q = quality_dict or {}
+        return {
+            "parsed_items": len(self),
+            "valid_value_count": q.get("valid_value_count", 0) if q else int(self.has_value.sum()),
+            "suspicious_count": q.get("suspicious_count", 0),
+            "sanity_outlier_count": q.get("sanity_outlier_count", 0),
+            "dedup_dropped_count": q.get("duplicate_dropped_count", 0),
+        }
+
+    def panel_scores(self) -> Dict[str, int]:
+        """engine.detect_panel по уникальным именам таблицы."""
+        from engine import detect_panel
+
+        return detect_panel(set(self.name.vocab))
@@ -0,0 +1,70 @@
+"""
+Поиск множества подстрок за один проход по тексту (автомат Ахо–Корасик).
+
+KeywordMatcher(keys) строится один раз; match_indices(text) возвращает
+номера всех ключей (в порядке keys), которые входят в text подстрокой, —
+то же, что [i for i, k in enumerate(keys) if k in text], но за O(len(text))
+вместо перебора всех ключей. Пустые ключи игнорируются.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """Автомат Ахо–Корасик над фиксированным набором ключей."""
+
+    __slots__ = ("keys", "_goto", "_fail", "_out")
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys: Tuple[str, ...] = tuple(keys)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+
+        # Бор
+        for index, key in enumerate(self.keys):
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(index)
+
+        # Суффиксные ссылки (BFS); выходы узла дополняются выходами по ссылке
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def match_indices(self, text: str) -> List[int]:
+        """Номера ключей, входящих в text, по возрастанию."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            nxt = goto[node].get(ch)
+            while nxt is None and node:
+                node = fail[node]
+                nxt = goto[node].get(ch)
+            node = nxt or 0
+            if out[node]:
+                found.update(out[node])
+        return sorted(found)
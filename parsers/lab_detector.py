@@ -11,7 +11,7 @@ detect_lab_format(text) → str  (legacy-обёртка)
 import re
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List
+from typing import Callable, Dict, List, Optional, Set
 
 
 # ─── Enum типов лабораторий ───
@@ -36,33 +36,61 @@ class LabDetectionResult:
 DetectResult = LabDetectionResult
 
 
+# ─── Текст документа: разбиение на строки общее для всех структурных проверок ───
+
+class _Document:
+    __slots__ = ("text", "lines", "_stripped")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.splitlines()
+        self._stripped: Optional[List[str]] = None
+
+    @property
+    def stripped(self) -> List[str]:
+        if self._stripped is None:
+            self._stripped = [line.strip() for line in self.lines]
+        return self._stripped
+
+
 # ─── Вспомогательные функции для callable-сигнатур ───
 
-def _check_medsi_format(text: str) -> bool:
+def _check_medsi_format(doc: _Document) -> bool:
     """Делегирует в medsi_extractor.is_medsi_format."""
-    from parsers.medsi_extractor import is_medsi_format
-    return is_medsi_format(text)
+    from parsers.medsi_extractor import is_medsi_format_lines
+    return is_medsi_format_lines(doc.text, doc.lines)
+
+
+_MEDSI_CODE_LINE_RE = re.compile(r'^\(\w+\)')
 
 
 def _count_medsi_code_lines(text: str) -> int:
     """Считает строки (CODE) — маркер МЕДСИ."""
     return sum(1 for line in text.splitlines()
-               if re.match(r'^\(\w+\)', line.strip()))
+               if _MEDSI_CODE_LINE_RE.match(line.strip()))
+
+
+_HELIX_NAME_RE = re.compile(r'[A-Za-zА-Яа-я]{3,}')
+_HELIX_VALUE_RE = re.compile(r'^[↑↓+]?\s*\d')
 
 
-def _count_helix_pairs(text: str) -> int:
-    """Считает двухстрочные пары имя→значение (маркер Helix)."""
-    lines = text.splitlines()
+def _count_helix_pairs(lines: List[str], limit: Optional[int] = None) -> int:
+    """
+    Считает двухстрочные пары имя→значение (маркер Helix).
+    lines — строки без пробелов по краям; limit — остановиться, набрав столько пар.
+    """
     count = 0
     for i in range(len(lines) - 1):
-        name_line = lines[i].strip()
-        val_line = lines[i + 1].strip()
+        name_line = lines[i]
+        val_line = lines[i + 1]
         if (name_line
-            and re.search(r'[A-Za-zА-Яа-я]{3,}', name_line)
-            and not re.match(r'^\d', name_line)
             and val_line
-            and re.match(r'^[↑↓+]?\s*\d', val_line)):
+            and not name_line[0].isdecimal()
+            and _HELIX_VALUE_RE.match(val_line)
+            and _HELIX_NAME_RE.search(name_line)):
             count += 1
+            if count == limit:
+                break
     return count
 
 
@@ -77,97 +105,193 @@ _CITILAB_PREFIX_RE = re.compile(
 )
 
 
-def _count_citilab_prefix_lines(text: str) -> int:
-    """Считает строки с приклеенной единицей к имени (``г/лГемоглобин``)."""
-    return sum(1 for line in text.splitlines()
-               if _CITILAB_PREFIX_RE.match(line.strip()))
+def _count_citilab_prefix_lines(lines: List[str], limit: Optional[int] = None) -> int:
+    """Считает строки с приклеенной единицей к имени (``г/лГемоглобин``); lines — без пробелов по краям."""
+    count = 0
+    for line in lines:
+        if _CITILAB_PREFIX_RE.match(line):
+            count += 1
+            if count == limit:
+                break
+    return count
 
 
 # ─── Реестр callable-проверок ───
-_CALLABLE_CHECKS = {
+_CALLABLE_CHECKS: Dict[str, Callable[[_Document], bool]] = {
     "is_medsi_format": _check_medsi_format,
-    "helix_pairs": lambda text: _count_helix_pairs(text) >= 5,
-    "citilab_prefix_lines": lambda text: _count_citilab_prefix_lines(text) >= 5,
+    "helix_pairs": lambda doc: _count_helix_pairs(doc.stripped, limit=5) >= 5,
+    "citilab_prefix_lines": lambda doc: _count_citilab_prefix_lines(doc.stripped, limit=5) >= 5,
 }
 
 
-# ─── Главная функция детекции (data-driven) ───
-
-def detect_lab(text: str) -> LabDetectionResult:
+# ─── Скомпилированный детектор ───
+
+_LITERAL, _REGEX, _CALLABLE = 0, 1, 2
+
+# Запас для верхней оценки score: суммы весов в разном порядке
+# могут отличаться в последнем знаке
+_BOUND_EPS = 1e-9
+
+
+class _Signature:
+    __slots__ = ("label", "weight", "type", "key", "regex", "min_count", "fn")
+
+    def __init__(self, sig: dict):
+        pattern = sig["pattern"]
+        self.label = f"{sig['kind']}:{pattern}"
+        self.weight = sig["weight"]
+        self.key = self.regex = self.fn = None
+        self.min_count = sig.get("min_count", 1)
+        if sig.get("callable", False):
+            self.type = _CALLABLE
+            self.fn = _CALLABLE_CHECKS.get(pattern)
+        elif sig.get("regex", False):
+            self.type = _REGEX
+            self.regex = re.compile(pattern, re.MULTILINE | re.IGNORECASE)
+        else:
+            self.type = _LITERAL
+            self.key = pattern.lower()
+
+    def check(self, doc: _Document) -> bool:
+        if self.type == _REGEX:
+            hits = 0
+            for _ in self.regex.finditer(doc.text):
+                hits += 1
+                if hits >= self.min_count:
+                    return True
+            return hits >= self.min_count
+        return bool(self.fn(doc)) if self.fn else False
+
+
+class _LabState:
+    """Счёт одной лаборатории в ходе detect(): hits[i] — True/False/None (не проверена)."""
+    __slots__ = ("index", "lab_type", "threshold", "signatures", "hits", "pending", "bound")
+
+    def __init__(self, index, lab_type, threshold, signatures, found):
+        self.index = index
+        self.lab_type = lab_type
+        self.threshold = threshold
+        self.signatures = signatures
+        self.hits: List[Optional[bool]] = [
+            (sig.key in found) if sig.type == _LITERAL else None for sig in signatures
+        ]
+        # Сначала регулярки, потом структурные проверки (самые дорогие)
+        self.pending = sorted((i for i, h in enumerate(self.hits) if h is None),
+                              key=lambda i: signatures[i].type)
+        self.bound = self._bound()
+
+    def _bound(self) -> float:
+        score = sum(sig.weight for sig, hit in zip(self.signatures, self.hits) if hit)
+        if not self.pending:
+            return score
+        return score + sum(self.signatures[i].weight for i in self.pending) + _BOUND_EPS
+
+    def evaluate_next(self, doc: _Document) -> None:
+        i = self.pending.pop(0)
+        self.hits[i] = self.signatures[i].check(doc)
+        self.bound = self._bound()
+
+    def matched(self) -> List[str]:
+        return [sig.label for sig, hit in zip(self.signatures, self.hits) if hit]
+
+
+class LabDetector:
     """
-    Data-driven детекция лаборатории.
-
-    Алгоритм:
-    1. Загружаем конфиг сигнатур из parsers.lab_signatures.LAB_SIGNATURES
-    2. Для каждой лаборатории суммируем веса совпавших сигнатур
-    3. confidence = min(raw_score, 1.0)
-    4. Выбираем лабораторию с максимальным raw_score
-    5. Если confidence < threshold → UNKNOWN
+    Сигнатуры LAB_SIGNATURES, скомпилированные один раз.
+
+    detect(text):
+    1. Строковые сигнатуры всех лабораторий проверяются один раз каждая
+       (повторы между лабораториями и ключи, входящие в уже найденные, не ищутся);
+       регулярки скомпилированы заранее.
+    2. Регулярки и структурные проверки считаются лениво: проверяется лаборатория
+       с наибольшей возможной суммой весов (уже совпавшие + ещё не проверенные).
+       Как только у полностью проверенной лаборатории score не меньше верхней
+       оценки всех остальных, остальные проверки не выполняются.
+    Результат совпадает с полным подсчётом всех сигнатур.
     """
-    if not text or not text.strip():
-        return LabDetectionResult(LabType.UNKNOWN, confidence=0.0)
-
-    from parsers.lab_signatures import LAB_SIGNATURES
-
-    text_lower = text.lower()
 
-    # Собираем score для каждой лаборатории
-    results = []  # list of (LabType, raw_score, confidence, matched_sigs, threshold)
+    def __init__(self, lab_signatures: List[dict]):
+        self._labs = []
+        literals = set()
+        for lab_config in lab_signatures:
+            sigs = [_Signature(sig) for sig in lab_config["signatures"]]
+            # Неизвестная callable-проверка никогда не срабатывает
+            sigs_active = [s for s in sigs if not (s.type == _CALLABLE and s.fn is None)]
+            literals.update(s.key for s in sigs_active if s.type == _LITERAL)
+            self._labs.append((lab_config["lab_type"], lab_config["threshold"], sigs, sigs_active))
+
+        # Уникальные ключи, самые длинные — первыми: найденный ключ сразу отмечает
+        # все входящие в него ("www.invitro.ru" → "invitro.ru" → "invitro"),
+        # их поиск по тексту уже не нужен
+        self._literals = sorted(literals, key=len, reverse=True)
+        self._implied = {
+            key: frozenset(other for other in self._literals if other in key)
+            for key in self._literals
+        }
+
+    def _scan_literals(self, text_lower: str) -> Set[str]:
+        found: Set[str] = set()
+        for key in self._literals:
+            if key not in found and key in text_lower:
+                found.update(self._implied[key])
+        return found
+
+    def detect(self, text: str) -> LabDetectionResult:
+        if not text or not text.strip():
+            return LabDetectionResult(LabType.UNKNOWN, confidence=0.0)
+
+        doc = _Document(text)
+        found = self._scan_literals(text.lower())
+        states = [
+            _LabState(index, lab_type, threshold, sigs_active, found)
+            for index, (lab_type, threshold, _, sigs_active) in enumerate(self._labs)
+        ]
+        # confidence = min(raw_score, 1.0) должен достичь threshold
+        active = [st for st in states if min(st.bound, 1.0) >= st.threshold]
+
+        while active:
+            # Максимальный raw_score, при равенстве — первая в конфиге
+            top = max(active, key=lambda st: (st.bound, -st.index))
+            if top.pending:
+                top.evaluate_next(doc)
+                if min(top.bound, 1.0) < top.threshold:
+                    active.remove(top)
+                continue
+            return LabDetectionResult(
+                lab_type=top.lab_type,
+                confidence=min(top.bound, 1.0),
+                matched_signatures=top.matched(),
+            )
 
-    for lab_config in LAB_SIGNATURES:
-        lab_type = lab_config["lab_type"]
-        threshold = lab_config["threshold"]
-        sigs = lab_config["signatures"]
-
-        raw_score = 0.0
-        matched = []
-
-        for sig in sigs:
-            weight = sig["weight"]
-
-            is_callable = sig.get("callable", False)
-            is_regex = sig.get("regex", False)
-            pattern = sig["pattern"]
-
-            hit = False
+        return LabDetectionResult(LabType.UNKNOWN, confidence=0.0)
 
-            if is_callable:
-                # Вызываем функцию из реестра
-                fn = _CALLABLE_CHECKS.get(pattern)
-                if fn:
-                    hit = fn(text)
-            elif is_regex:
-                min_count = sig.get("min_count", 1)
-                count = len(re.findall(pattern, text, re.MULTILINE | re.IGNORECASE))
-                hit = count >= min_count
-            else:
-                # Простой поиск подстроки (регистронезависимо)
-                hit = pattern.lower() in text_lower
 
-            if hit:
-                raw_score += weight
-                matched.append(f"{sig['kind']}:{pattern}")
+_DETECTOR: Optional[LabDetector] = None
 
-        # confidence = raw_score, capped at 1.0
-        confidence = min(raw_score, 1.0)
 
-        results.append((lab_type, raw_score, confidence, matched, threshold))
+def get_lab_detector() -> LabDetector:
+    """Детектор по parsers.lab_signatures.LAB_SIGNATURES (компилируется при первом вызове)."""
+    global _DETECTOR
+    if _DETECTOR is None:
+        from parsers.lab_signatures import LAB_SIGNATURES
+        _DETECTOR = LabDetector(LAB_SIGNATURES)
+    return _DETECTOR
 
-    # Фильтруем: оставляем только тех, чей confidence >= threshold
-    valid = [(lt, rs, conf, m, th) for lt, rs, conf, m, th in results if conf >= th]
 
-    if not valid:
-        return LabDetectionResult(LabType.UNKNOWN, confidence=0.0)
+# ─── Главная функция детекции (data-driven) ───
 
-    # Выбираем лабораторию с максимальным raw_score (при равенстве — первая в конфиге)
-    valid.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    best = valid[0]
+def detect_lab(text: str) -> LabDetectionResult:
+    """
+    Data-driven детекция лаборатории.
 
-    return LabDetectionResult(
-        lab_type=best[0],
-        confidence=best[2],
-        matched_signatures=best[3]
-    )
+    Алгоритм:
+    1. Конфиг сигнатур — parsers.lab_signatures.LAB_SIGNATURES (см. LabDetector)
+    2. Для каждой лаборатории суммируем веса совпавших сигнатур
+    3. confidence = min(raw_score, 1.0)
+    4. Выбираем лабораторию с максимальным raw_score
+    5. Если confidence < threshold → UNKNOWN
+    """
+    return get_lab_detector().detect(text)
 
 
 # ─── Legacy-обёртка (обратная совместимость) ───
@@ -53,7 +53,7 @@ LAB_SIGNATURES = [
             {"kind": "header",     "pattern": r"(Исследование|Тест)\s*\t\s*Результат",
              "weight": 0.5, "regex": True},
             {"kind": "structural", "pattern": "helix_pairs",          "weight": 0.5,
-             "callable": True,  # вызвать _count_helix_pairs(text) >= 5
+             "callable": True,  # вызвать _count_helix_pairs(lines) >= 5
             },
         ],
     },
@@ -10,9 +10,16 @@ score_line(line) → float 0..1
     has_known_unit(line)    — содержит ли известную единицу измерения
     has_known_biomarker(line) — содержит ли известный биомаркер
     is_noise(line)          — является ли служебной / мусорной строкой
+
+line_features(line) → LineFeatures
+    Все признаки строки за один проход; результат кэшируется по строке,
+    предикаты выше — обращения к нему. Повторные проверки одной и той же
+    строки (universal_extractor, metrics, engine) не пересчитывают регулярки.
 """
 
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Set
 
 from parsers.unit_dictionary import is_valid_unit
@@ -216,189 +223,264 @@ _NOISE_PREFIXES = (
 
 
 # ──────────────────────────────────────────────
-# Предикаты
+# Биомаркеры для B1-метрик качества (parsers/metrics):
+# более узкий набор кодов, ищется как отдельное слово в любом регистре
 # ──────────────────────────────────────────────
-def has_numeric_value(line: str) -> bool:
-    """Содержит ли строка числовое значение (целое или дробное)."""
-    return bool(re.search(r"(?<![A-Za-z])\d+(?:[.,]\d+)?", line))
+_METRIC_BIOMARKER_CODES = (
+    "WBC", "RBC", "HGB", "HCT", "PLT", "MCV", "MCH", "MCHC",
+    "RDW", "PDW", "MPV", "PCT",
+    "NEU", "LYM", "MONO", "EOS", "BAS",
+    "NE", "LY", "MO", "EO", "BA",
+    "ALT", "AST", "GGT", "ALP",
+    "TBIL", "DBIL", "IBIL",
+    "CREA", "UREA", "CRP", "CRPN",
+    "GLUC", "GLU", "HBA1C",
+    "CHOL", "HDL", "LDL", "TRIG",
+    "TSH", "FT3", "FT4", "T3", "T4",
+    "FE", "FERR", "VIT",
+    "ESR",
+)
 
 
-def has_ref_pattern(line: str) -> bool:
-    """Содержит ли строка паттерн референса: число-число, <=N, >=N, до N."""
-    s = (line or "").replace("–", "-").replace("—", "-")
-    if re.search(r"\d+(?:[.,]\d+)?\s*-\s*\d+(?:[.,]\d+)?", s):
-        return True
-    if re.search(r"(<=|>=|<|>|≤|≥)\s*\d+(?:[.,]\d+)?", s):
-        return True
-    if re.search(r"(?:^|\s)[Дд]о\s*\d+(?:[.,]\d+)?", s):
-        return True
-    return False
+# ──────────────────────────────────────────────
+# Скомпилированные паттерны
+# ──────────────────────────────────────────────
+_NUMERIC_RE = re.compile(r"(?<![A-Za-z])\d+(?:[.,]\d+)?")
+_REF_RANGE_RE = re.compile(r"\d+(?:[.,]\d+)?\s*-\s*\d+(?:[.,]\d+)?")
+_REF_CMP_RE = re.compile(r"(<=|>=|<|>|≤|≥)\s*\d+(?:[.,]\d+)?")
+_REF_UPTO_RE = re.compile(r"(?:^|\s)[Дд]о\s*\d+(?:[.,]\d+)?")
+_WS_RE = re.compile(r"\s+")
+_SCI_UNIT_RE = re.compile(r"10[\^*]\d+/л")
+_CODE_RE = re.compile(r"\b([A-Za-z][A-Za-z0-9\-]{1,8}(?:%|#)?)\b")
+_BRACKET_CODE_RE = re.compile(r"\(([A-Za-zА-Яа-я\-#%0-9]+)\)")
+_BIOMARKER_FRAGMENT_RE = re.compile("|".join(map(re.escape, _BIOMARKER_RUS_FRAGMENTS)))
+
+_PHONE_RE = re.compile(r"(\+7|8[\s\-]?\(?\d)[\d\s()\-]{7,}")
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}")
+_URL_RE = re.compile(r"(https?://|www\.)")
+_INN_RE = re.compile(r"инн\s*\d{10,12}")
+_OGRN_RE = re.compile(r"огрн\s*\d{13,15}")
+_KPP_RE = re.compile(r"кпп\s*\d{9}")
+_ADDRESS_RE = re.compile(r"^(г\.|ул\.|пр\.|д\.|корп\.|стр\.|пом\.)")
+_ORDER_NO_RE = re.compile(r"^№\s*\d{5,}")
+_ISO_DATE_ONLY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}(\s+\d{2}:\d{2}(:\d{2})?)?$")
+_RU_DATE_ONLY_RE = re.compile(r"^\d{2}\.\d{2}\.\d{4}(\s+\d{2}:\d{2}(:\d{2})?)?$")
+_DATE_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}|\d{4}-\d{2}-\d{2}")
+_BARCODE_RE = re.compile(r"^\d{13,}$")
+_FIO_RE = re.compile(r"^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.$")
+_SERVICE_CODE_RE = re.compile(r"^[A-Z]\d{2}\.\d{2,3}\.\d{3}")
+_LICENSE_RE = re.compile(r"^[Лл][Оо]?[-\s]?\d{2,4}[-\s]")
+_ORDER_MZ_RE = re.compile(r"^\(Приказ\s", re.IGNORECASE)
+_ORDER_SUFFIX_RE = re.compile(r"^\d+[а-яА-Я]*\)$")
+
+_SCALE_START_RE = re.compile(r"^[><≤≥]\s*\d")
+_SCALE_WORDS_RE = re.compile(r"(риск|уровень|ммоль|норм)")
+_DIGITS_ONLY_RE = re.compile(r"^\d+$")
+_PAGE_MARKER_RE = re.compile(r"^---\s*PAGE\s+\d+\s*---$", re.IGNORECASE)
+_VALUE_START_RE = re.compile(r"^\s*[↑↓+]?\s*\d")
+_POW10_START_RE = re.compile(r"^\*?10[\^*]\d+")
+_POW10_UNIT_RE = re.compile(r"^\*?10\s*[\^*]\s*\d+/[а-яa-z]+$", re.IGNORECASE)
+
+_OCR_GARBAGE_RE = re.compile(r"[�□■▪▫●○◆◇★☆]{2,}|[|]{3,}|[*]{3,}|[#]{3,}|[~]{3,}")
+_HAS_ALNUM_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]")
+_DIGIT_RE = re.compile(r"\d")
+_METRIC_BIOMARKER_RE = re.compile(
+    r"(?<![A-Za-zА-Яа-яЁё])(?:"
+    + "|".join(map(re.escape, _METRIC_BIOMARKER_CODES))
+    + r")(?![A-Za-zА-Яа-яЁё])"
+)
 
 
-def has_known_unit(line: str) -> bool:
-    """Содержит ли строка известную единицу измерения."""
-    s = (line or "").strip()
+# ──────────────────────────────────────────────
+# Признаки строки: считаются один раз на уникальную строку
+# ──────────────────────────────────────────────
+LINE_FEATURES_CACHE_SIZE = 16384
+
+
+@dataclass(frozen=True)
+class LineFeatures:
+    """
+    Все признаки строки, которые раньше каждый потребитель
+    (universal_extractor, metrics, engine) вычислял заново своими регулярками.
+    """
+    text: str                  # строка без пробелов по краям
+    has_numeric: bool          # has_numeric_value
+    has_ref: bool              # has_ref_pattern
+    has_unit: bool             # has_known_unit
+    has_biomarker: bool        # has_known_biomarker
+    is_header_service: bool    # is_header_service_line
+    is_noise: bool             # is_noise
+    score: float               # score_line
+    # B1-метрики (parsers/metrics)
+    has_digit: bool
+    is_ocr_garbage: bool       # мусорные символы / ни одной буквы и цифры
+    has_metric_biomarker: bool  # код из _METRIC_BIOMARKER_CODES отдельным словом
+
+
+def line_features(line: str) -> LineFeatures:
+    """Признаки строки (кэшируются по строке без пробелов по краям)."""
+    return _line_features((line or "").strip())
+
+
+@lru_cache(maxsize=LINE_FEATURES_CACHE_SIZE)
+def _line_features(s: str) -> LineFeatures:
+    low = s.lower()
+    has_numeric = bool(_NUMERIC_RE.search(s))
+    has_ref = _ref_pattern(s)
+    has_unit = _known_unit(s)
+    has_bio = _known_biomarker(s, low)
+    header = _header_service(s, low, has_bio, has_unit, has_ref)
+    noise = _noise(s, low, header)
+
+    if noise:
+        score = 0.0
+    else:
+        score = 0.2 * has_numeric + 0.3 * has_ref + 0.2 * has_unit + 0.3 * has_bio
+        # Если строка начинается с числа (без имени) — вероятно, это value-line,
+        # а не самодостаточный кандидат → снижаем
+        if not has_bio and _VALUE_START_RE.match(s):
+            score = max(0.0, score - 0.1)
+        score = min(1.0, round(score, 2))
+
+    return LineFeatures(
+        text=s,
+        has_numeric=has_numeric,
+        has_ref=has_ref,
+        has_unit=has_unit,
+        has_biomarker=has_bio,
+        is_header_service=header,
+        is_noise=noise,
+        score=score,
+        has_digit=bool(_DIGIT_RE.search(s)),
+        is_ocr_garbage=(not s or bool(_OCR_GARBAGE_RE.search(s)) or not _HAS_ALNUM_RE.search(s)),
+        has_metric_biomarker=bool(_METRIC_BIOMARKER_RE.search(s.upper())),
+    )
+
+
+def _ref_pattern(s: str) -> bool:
+    s = s.replace("–", "-").replace("—", "-")
+    return bool(_REF_RANGE_RE.search(s) or _REF_CMP_RE.search(s) or _REF_UPTO_RE.search(s))
+
+
+def _known_unit(s: str) -> bool:
     if not s:
         return False
     # Ищем слова и фрагменты, которые могут быть единицей
-    tokens = re.split(r"\s+", s)
-    for t in tokens:
+    for t in _WS_RE.split(s):
         t_clean = t.strip(".,;:()")
         if t_clean and is_valid_unit(t_clean):
             return True
     # Специальная проверка: *10^N/л, 10*N/л
-    if re.search(r"10[\^*]\d+/л", s):
-        return True
-    return False
+    return bool(_SCI_UNIT_RE.search(s))
 
 
-def has_known_biomarker(line: str) -> bool:
-    """Содержит ли строка известный биомаркер (код или русское название)."""
-    s = (line or "").strip()
+def _known_biomarker(s: str, low: str) -> bool:
     if not s:
         return False
     # Коды (латиница, в скобках или отдельно)
-    codes_in_line = re.findall(r"\b([A-Za-z][A-Za-z0-9\-]{1,8}(?:%|#)?)\b", s)
-    for code in codes_in_line:
+    for code in _CODE_RE.findall(s):
         if code.upper() in _BIOMARKER_CODES:
             return True
     # Код в скобках: (WBC), (NEU%)
-    bracket_codes = re.findall(r"\(([A-Za-zА-Яа-я\-#%0-9]+)\)", s)
-    for code in bracket_codes:
+    for code in _BRACKET_CODE_RE.findall(s):
         if code.upper().rstrip("#%") in _BIOMARKER_CODES:
             return True
     # Русские фрагменты
-    low = s.lower()
-    for frag in _BIOMARKER_RUS_FRAGMENTS:
-        if frag in low:
-            return True
-    return False
+    return bool(_BIOMARKER_FRAGMENT_RE.search(low))
 
 
-def is_header_service_line(line: str) -> bool:
-    """
-    Расширенная проверка «шапочных» / служебных строк PDF.
-    Такие строки не содержат лабораторных показателей и должны
-    отсеиваться на этапе фильтрации кандидатов.
-
-    Проверяемые категории:
-      - Телефон (+7 / 8-800 …)
-      - Email
-      - URL / сайт
-      - ИНН, ОГРН, КПП
-      - Адрес (г., ул., пр., д. …)
-      - Номер заказа / направления (№ NNNNN)
-      - Дата/время БЕЗ биомаркера
-      - QR / штрихкод (длинная цифровая строка > 12 цифр)
-      - ФИО пациента / врача (Иванов И.И.)
-    """
-    s = (line or "").strip()
+def _header_service(s: str, low: str, has_bio: bool, has_unit: bool, has_ref: bool) -> bool:
     if not s:
         return False  # пустые строки обрабатывает is_noise()
-
-    low = s.lower()
-
-    # --- Телефон ---
-    if re.search(r"(\+7|8[\s\-]?\(?\d)[\d\s()\-]{7,}", s):
-        # Не фильтруем, если строка содержит биомаркер
-        if not has_known_biomarker(s):
-            return True
-
-    # --- Email ---
-    if re.search(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}", s):
+    # Телефон (не фильтруем, если строка содержит биомаркер)
+    if not has_bio and _PHONE_RE.search(s):
         return True
-
-    # --- URL / сайт ---
-    if re.search(r"(https?://|www\.)", low):
+    # Email, URL / сайт, ИНН, ОГРН, КПП
+    if _EMAIL_RE.search(s) or _URL_RE.search(low):
         return True
-
-    # --- ИНН ---
-    if re.search(r"инн\s*\d{10,12}", low):
+    if _INN_RE.search(low) or _OGRN_RE.search(low) or _KPP_RE.search(low):
         return True
-
-    # --- ОГРН ---
-    if re.search(r"огрн\s*\d{13,15}", low):
+    # Адрес
+    if _ADDRESS_RE.match(low) or "адрес:" in low:
         return True
-
-    # --- КПП ---
-    if re.search(r"кпп\s*\d{9}", low):
+    # Номер заказа / направления (№ с 5+ цифрами)
+    if _ORDER_NO_RE.match(s):
         return True
-
-    # --- Адрес ---
-    if re.match(r"^(г\.|ул\.|пр\.|д\.|корп\.|стр\.|пом\.)", low):
+    # Дата/время: вся строка — дата, либо дата без биомаркера / единицы / референса
+    if _ISO_DATE_ONLY_RE.match(s) or _RU_DATE_ONLY_RE.match(s):
         return True
-    if "адрес:" in low:
+    if not (has_bio or has_unit or has_ref) and _DATE_RE.search(s):
         return True
-
-    # --- Номер заказа / направления (№ с 5+ цифрами) ---
-    if re.match(r"^№\s*\d{5,}", s):
+    # QR / штрихкод, ФИО (Иванов И.И.), код услуги (B03.016.003), лицензия (Л041-...)
+    if _BARCODE_RE.match(s) or _FIO_RE.match(s) or _SERVICE_CODE_RE.match(s) or _LICENSE_RE.match(s):
         return True
+    # Приказ МЗ в скобках: "(Приказ МЗ..."; номер приказа без контекста: "804н)"
+    return bool(_ORDER_MZ_RE.match(s) or _ORDER_SUFFIX_RE.match(s))
 
-    # --- Дата/время БЕЗ биомаркера ---
-    # Сначала проверяем строгие форматы «чистой даты» (вся строка — дата/время)
-    if re.match(r"^\d{4}-\d{2}-\d{2}(\s+\d{2}:\d{2}(:\d{2})?)?$", s):
+
+def _noise(s: str, low: str, header: bool) -> bool:
+    # Пустая / слишком короткая строка
+    if len(s) < 3:
         return True
-    if re.match(r"^\d{2}\.\d{2}\.\d{4}(\s+\d{2}:\d{2}(:\d{2})?)?$", s):
+    # Шумовые префиксы
+    if low.startswith(_NOISE_PREFIXES):
         return True
-    # Общая проверка: строка содержит дату, но не содержит биомаркер / единицу / реф
-    has_date = bool(re.search(r"\d{2}\.\d{2}\.\d{4}", s)) or bool(re.search(r"\d{4}-\d{2}-\d{2}", s))
-    if has_date and not has_known_biomarker(s):
-        if not has_known_unit(s) and not has_ref_pattern(s):
-            return True
-
-    # --- QR / штрихкод: только цифры, длина > 12 ---
-    if re.match(r"^\d{13,}$", s):
+    # Шкальные аннотации: строка начинается с ">" или "<" и содержит текст-описание уровня
+    if _SCALE_START_RE.match(s) and _SCALE_WORDS_RE.search(low):
         return True
-
-    # --- ФИО-формат: Иванов И.И. ---
-    if re.match(r"^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.$", s):
+    # Только цифры (номера страниц, заказов и т.д.), маркер страницы
+    if _DIGITS_ONLY_RE.match(s) or _PAGE_MARKER_RE.match(s):
         return True
+    # Расширенная проверка шапочных / служебных строк
+    return header
 
-    # --- Код услуги по приказу МЗ (B03.016.003, A09.05.009 и т.п.) ---
-    if re.match(r"^[A-Z]\d{2}\.\d{2,3}\.\d{3}", s):
-        return True
 
-    # --- Лицензия (Л041-..., ЛО-...) ---
-    if re.match(r"^[Лл][Оо]?[-\s]?\d{2,4}[-\s]", s):
-        return True
+# ──────────────────────────────────────────────
+# Предикаты
+# ──────────────────────────────────────────────
+def has_numeric_value(line: str) -> bool:
+    """Содержит ли строка числовое значение (целое или дробное)."""
+    return line_features(line).has_numeric
 
-    # --- Приказ МЗ в скобках: "(Приказ МЗ..." ---
-    if re.match(r"^\(Приказ\s", s, re.IGNORECASE):
-        return True
 
-    # --- Номер приказа без контекста: "804н)" и подобные ---
-    if re.match(r"^\d+[а-яА-Я]*\)$", s):
-        return True
+def has_ref_pattern(line: str) -> bool:
+    """Содержит ли строка паттерн референса: число-число, <=N, >=N, до N."""
+    return line_features(line).has_ref
 
-    return False
+
+def has_known_unit(line: str) -> bool:
+    """Содержит ли строка известную единицу измерения."""
+    return line_features(line).has_unit
+
+
+def has_known_biomarker(line: str) -> bool:
+    """Содержит ли строка известный биомаркер (код или русское название)."""
+    return line_features(line).has_biomarker
+
+
+def is_header_service_line(line: str) -> bool:
+    """
+    Расширенная проверка «шапочных» / служебных строк PDF.
+    Такие строки не содержат лабораторных показателей и должны
+    отсеиваться на этапе фильтрации кандидатов.
+
+    Проверяемые категории:
+      - Телефон (+7 / 8-800 …)
+      - Email
+      - URL / сайт
+      - ИНН, ОГРН, КПП
+      - Адрес (г., ул., пр., д. …)
+      - Номер заказа / направления (№ NNNNN)
+      - Дата/время БЕЗ биомаркера
+      - QR / штрихкод (длинная цифровая строка > 12 цифр)
+      - ФИО пациента / врача (Иванов И.И.)
+    """
+    return line_features(line).is_header_service
 
 
 def is_noise(line: str) -> bool:
     """Является ли строка служебной / мусорной."""
-    s = (line or "").strip()
-    if not s:
-        return True
-    low = s.lower()
-    # Слишком короткая строка без цифр
-    if len(s) < 3:
-        return True
-    # Шумовые префиксы
-    for prefix in _NOISE_PREFIXES:
-        if low.startswith(prefix):
-            return True
-    # Шкальные аннотации: строка начинается с ">" или "<" и содержит текст-описание уровня
-    if re.match(r'^[><≤≥]\s*\d', s) and re.search(r'(риск|уровень|ммоль|норм)', low):
-        return True
-    # Только цифры (номера страниц, заказов и т.д.) без буквенного контекста
-    if re.match(r"^\d+$", s):
-        return True
-    # Маркер страницы
-    if re.match(r"^---\s*PAGE\s+\d+\s*---$", s, re.IGNORECASE):
-        return True
-    # Расширенная проверка шапочных / служебных строк
-    if is_header_service_line(s):
-        return True
-    return False
+    return line_features(line).is_noise
 
 
 def is_unit_only_line(line: str) -> bool:
@@ -410,14 +492,14 @@ def is_unit_only_line(line: str) -> bool:
     if not s or len(s) > 20:
         return False
     # Содержит числа (кроме *10^N) — не чистый unit
-    if has_numeric_value(s) and not re.match(r"^\*?10[\^*]\d+", s):
+    if has_numeric_value(s) and not _POW10_START_RE.match(s):
         return False
     # Проверяем через unit_dictionary
     s_clean = s.strip(".,;:()")
     if s_clean and is_valid_unit(s_clean):
         return True
     # Проверяем шаблоны: *10^N/л
-    if re.match(r"^\*?10\s*[\^*]\s*\d+/[а-яa-z]+$", s, re.IGNORECASE):
+    if _POW10_UNIT_RE.match(s):
         return True
     return False
 
@@ -437,37 +519,4 @@ def score_line(line: str) -> float:
 
     Порог отсечения для кандидата в universal_extractor: >= 0.4
     """
-    s = (line or "").strip()
-    if not s:
-        return 0.0
-
-    if is_noise(s):
-        return 0.0
-
-    score = 0.0
-
-    _has_num = has_numeric_value(s)
-    _has_ref = has_ref_pattern(s)
-    _has_unit = has_known_unit(s)
-    _has_bio = has_known_biomarker(s)
-
-    if _has_num:
-        score += 0.2
-
-    if _has_ref:
-        score += 0.3
-
-    if _has_unit:
-        score += 0.2
-
-    if _has_bio:
-        score += 0.3
-
-    # Если строка начинается с числа (без имени) — вероятно, это value-line,
-    # а не самодостаточный кандидат → снижаем
-    if re.match(r"^\s*[↑↓+]?\s*\d", s) and not _has_bio:
-        score = max(0.0, score - 0.1)
-
-    return min(1.0, round(score, 2))
-
-
+    return line_features(line).score
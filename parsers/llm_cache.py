@@ -0,0 +1,234 @@
+"""
+Кэш ответов LLM и каноническая сигнатура отклонений.
+
+Ответ LLM цитирует точные данные пациента: возраст, значения, названия
+показателей и нормы лаборатории («СОЭ 35 мм/ч при норме 2–20»). Поэтому
+ключ кэша ответа — answer_cache_key: дайджест полного текста промпта.
+Ответ переиспользуется только для того же промпта (повторная загрузка
+того же бланка, тот же набор значений), не дожидаясь YandexGPT (до TIMEOUT_SEC).
+
+deviation_signature — грубая картина отклонений: отсортированные
+(показатель, статус, степень отклонения) + пол + возрастная группа +
+версия промпта. Для ключа ответа она не годится (разные пациенты с одной
+картиной получили бы чужие значения), её использует статистика отказов
+(parsers/llm_refusal_policy.py).
+
+Кэш: TTL, LRU-вытеснение, персистентность в JSON-файл (только если задан
+path; в engine по умолчанию выключена — в файле оказались бы данные пациентов).
+Кэшируются только полные ответы, прошедшие проверку на отказ
+(_is_llm_refusal), — это решает вызывающий код.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Степень отклонения от ближайшей границы нормы (доля от границы)
+MAGNITUDE_SLIGHT = 0.10   # < 10% — незначительное
+MAGNITUDE_MODERATE = 0.50 # < 50% — умеренное, иначе выраженное
+
+DEFAULT_TTL_SEC = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def age_band(age: Any) -> str:
+    """Возрастная группа по десятилетиям: 34 → '30-39'."""
+    try:
+        a = int(age)
+    except (TypeError, ValueError):
+        return "?"
+    if a < 0:
+        return "?"
+    lo = (a // 10) * 10
+    return f"{lo}-{lo + 9}"
+
+
+def magnitude_bucket(value: Optional[float], low: Optional[float], high: Optional[float], status: str) -> str:
+    """
+    Степень отклонения: SLIGHT / MODERATE / MARKED.
+    Считается относительно нарушенной границы; '?' — если посчитать нельзя.
+    """
+    if value is None:
+        return "?"
+    if status == "ВЫШЕ" and high is not None:
+        bound, diff = high, value - high
+    elif status == "НИЖЕ" and low is not None:
+        bound, diff = low, low - value
+    else:
+        return "?"
+
+    # Граница 0 (например «0–5»): меряем относительно ширины диапазона
+    scale = abs(bound)
+    if scale == 0 and low is not None and high is not None:
+        scale = abs(high - low)
+    if scale == 0:
+        return "MARKED" if diff > 0 else "SLIGHT"
+
+    ratio = diff / scale
+    if ratio < MAGNITUDE_SLIGHT:
+        return "SLIGHT"
+    if ratio < MAGNITUDE_MODERATE:
+        return "MODERATE"
+    return "MARKED"
+
+
+def deviation_signature(sex: str, age: Any, deviations: Iterable[Any], version: str = "1") -> str:
+    """
+    Каноническая сигнатура картины отклонений (для статистики отказов).
+
+    deviations — элементы с атрибутами name, status, value, ref (Item из engine).
+    Порядок элементов не важен. Возвращает hex-дайджест.
+    Точные значения и возраст в сигнатуру не входят — ключом кэша ответа
+    она не служит (см. answer_cache_key).
+    """
+    parts = []
+    for it in deviations:
+        ref = getattr(it, "ref", None)
+        low = getattr(ref, "low", None) if ref is not None else None
+        high = getattr(ref, "high", None) if ref is not None else None
+        status = getattr(it, "status", "") or ""
+        parts.append((
+            getattr(it, "name", "") or "",
+            status,
+            magnitude_bucket(getattr(it, "value", None), low, high, status),
+        ))
+    canonical = {
+        "v": version,
+        "sex": (sex or "").strip().lower(),
+        "age": age_band(age),
+        "dev": sorted(set(parts)),
+    }
+    raw = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def answer_cache_key(prompt: str, version: str = "1") -> str:
+    """
+    Ключ кэша ответа LLM: дайджест версии и полного текста промпта.
+
+    Промпт содержит всё, что ответ может процитировать (пол, возраст,
+    названия, значения, единицы и нормы лаборатории), — совпадение ключа
+    означает тот же вопрос к модели.
+    """
+    raw = f"{version}\n{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """
+    LRU-кэш ответов LLM с TTL и сохранением на диск.
+
+    Потокобезопасен (Flask обслуживает запросы в потоках).
+    Ошибки чтения/записи файла не ломают генерацию отчёта — кэш просто
+    работает в памяти.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_sec: float = DEFAULT_TTL_SEC,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path) if path else None
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_sec = float(ttl_sec)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[str]:
+        """Ответ по сигнатуре или None (промах / истёк TTL)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._clock() - entry[0] > self.ttl_sec:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, answer: str) -> None:
+        """Сохраняет ответ; вытесняет самые старые по использованию записи."""
+        if not answer:
+            return
+        with self._lock:
+            self._data[key] = (self._clock(), answer)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._save_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для quality["metrics"]."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._data),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self._save_locked()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # ── персистентность ──────────────────────────────────────────────
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        now = self._clock()
+        entries = payload.get("entries", []) if isinstance(payload, dict) else []
+        # В файле записи лежат от старых к новым — порядок LRU сохраняется
+        for row in entries:
+            try:
+                key, ts, answer = row["key"], float(row["ts"]), row["answer"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if now - ts <= self.ttl_sec and isinstance(answer, str) and answer:
+                self._data[key] = (ts, answer)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        payload = {
+            "entries": [
+                {"key": k, "ts": ts, "answer": ans}
+                for k, (ts, ans) in self._data.items()
+            ]
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
@@ -0,0 +1,162 @@
+"""
+Защита стадии LLM от долгих ожиданий: бюджет времени и circuit breaker.
+
+LlmDeadline    — бюджет времени на всю стадию LLM одного отчёта
+                 (основной запрос + повтор после отказа + ретраи).
+CircuitBreaker — по недавним вызовам (доля ошибок, задержка) решает,
+                 стоит ли вообще идти в LLM или сразу отдавать fallback-текст.
+
+Состояния breaker:
+    CLOSED    — всё нормально, вызовы разрешены
+    OPEN      — эндпоинт деградировал, вызовы запрещены до конца cooldown
+    HALF_OPEN — cooldown прошёл, разрешён один пробный вызов
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+STATE_CLOSED = "CLOSED"
+STATE_OPEN = "OPEN"
+STATE_HALF_OPEN = "HALF_OPEN"
+
+
+class LlmDeadline:
+    """Бюджет времени, отсчитываемый от создания."""
+
+    def __init__(self, budget_sec: float, clock: Callable[[], float] = time.monotonic):
+        self.budget_sec = float(budget_sec)
+        self._clock = clock
+        self._start = clock()
+
+    def elapsed(self) -> float:
+        return self._clock() - self._start
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_sec - self.elapsed())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker по скользящему окну последних вызовов.
+
+    Размыкается, если в окне (не менее min_calls вызовов) доля ошибок
+    ≥ max_error_rate или средняя задержка ≥ max_avg_latency_sec.
+    Через cooldown_sec пропускает один пробный вызов (HALF_OPEN):
+    успех замыкает цепь и очищает окно, ошибка — снова размыкает.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        max_error_rate: float = 0.5,
+        max_avg_latency_sec: float = 30.0,
+        cooldown_sec: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = max(1, int(window))
+        self.min_calls = max(1, int(min_calls))
+        self.max_error_rate = float(max_error_rate)
+        self.max_avg_latency_sec = float(max_avg_latency_sec)
+        self.cooldown_sec = float(cooldown_sec)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, float]] = deque(maxlen=self.window)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.open_reason = ""
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    def allow(self) -> bool:
+        """Можно ли сейчас вызывать LLM."""
+        with self._lock:
+            if self._state == STATE_OPEN:
+                if self._clock() - self._opened_at < self.cooldown_sec:
+                    return False
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency_sec: float) -> None:
+        """Учитывает результат вызова (ok=False — ошибка или таймаут)."""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                    self.open_reason = ""
+                else:
+                    self._open_locked("PROBE_FAILED")
+                return
+
+            self._calls.append((bool(ok), float(latency_sec)))
+            if self._state != STATE_CLOSED or len(self._calls) < self.min_calls:
+                return
+            error_rate, avg_latency = self._stats_locked()
+            if error_rate >= self.max_error_rate:
+                self._open_locked("HIGH_ERROR_RATE")
+            elif avg_latency >= self.max_avg_latency_sec:
+                self._open_locked("HIGH_LATENCY")
+
+    def release(self) -> None:
+        """
+        Возвращает слот пробного вызова, если после allow() запрос так и не
+        был отправлен (результат не учитывается).
+        """
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.cooldown_sec:
+                return STATE_HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние для quality["metrics"]["llm_gate"]["breaker"]."""
+        state = self.state
+        with self._lock:
+            error_rate, avg_latency = self._stats_locked()
+            return {
+                "state": state,
+                "open_reason": self.open_reason or None,
+                "window_calls": len(self._calls),
+                "error_rate": round(error_rate, 3),
+                "avg_latency_sec": round(avg_latency, 2),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._state = STATE_CLOSED
+            self._probe_in_flight = False
+            self.open_reason = ""
+
+    # ── внутреннее ───────────────────────────────────────────────────
+
+    def _stats_locked(self) -> Tuple[float, float]:
+        if not self._calls:
+            return 0.0, 0.0
+        errors = sum(1 for ok, _ in self._calls if not ok)
+        avg_latency = sum(lat for _, lat in self._calls) / len(self._calls)
+        return errors / len(self._calls), avg_latency
+
+    def _open_locked(self, reason: str) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self.open_reason = reason
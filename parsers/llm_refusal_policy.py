@@ -0,0 +1,128 @@
+"""
+Адаптивная политика против отказов LLM.
+
+Для каждой сигнатуры отклонений (parsers/llm_cache.deviation_signature)
+и варианта промпта ("normal" / "softened") копится статистика отказов.
+Если для сигнатуры обычный промпт часто получает отказ, обычный и
+смягчённый промпты отправляются одновременно и берётся первый ответ
+без отказа — вместо двух последовательных запросов.
+
+Оценка доли отказов сглажена априорным распределением (PRIOR_*), чтобы
+единичный отказ на новой сигнатуре не переключал политику.
+Статистика сохраняется в JSON-файл и переживает перезапуск.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+VARIANT_NORMAL = "normal"
+VARIANT_SOFTENED = "softened"
+
+# Априорно: ~1 отказ на 10 вызовов
+PRIOR_REFUSALS = 1.0
+PRIOR_CALLS = 10.0
+
+DEFAULT_SPECULATE_THRESHOLD = 0.3
+DEFAULT_MAX_SIGNATURES = 2000
+
+
+class RefusalStats:
+    """
+    Статистика отказов по (сигнатура, вариант промпта) с сохранением на диск.
+    Потокобезопасна; ошибки файла не ломают генерацию отчёта.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        speculate_threshold: float = DEFAULT_SPECULATE_THRESHOLD,
+        max_signatures: int = DEFAULT_MAX_SIGNATURES,
+    ):
+        self.path = Path(path) if path else None
+        self.speculate_threshold = float(speculate_threshold)
+        self.max_signatures = max(1, int(max_signatures))
+        self._lock = threading.Lock()
+        # signature -> {variant: [calls, refusals]}
+        self._data: "OrderedDict[str, Dict[str, list]]" = OrderedDict()
+        self._load()
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    def record(self, signature: str, variant: str, refused: bool) -> None:
+        """Учитывает результат запроса с данным вариантом промпта."""
+        with self._lock:
+            per_sig = self._data.setdefault(signature, {})
+            counts = per_sig.setdefault(variant, [0, 0])
+            counts[0] += 1
+            if refused:
+                counts[1] += 1
+            self._data.move_to_end(signature)
+            while len(self._data) > self.max_signatures:
+                self._data.popitem(last=False)
+            self._save_locked()
+
+    def refusal_rate(self, signature: str, variant: str = VARIANT_NORMAL) -> float:
+        """Сглаженная доля отказов (для новой сигнатуры — априорная)."""
+        with self._lock:
+            calls, refusals = self._data.get(signature, {}).get(variant, [0, 0])
+        return (refusals + PRIOR_REFUSALS) / (calls + PRIOR_CALLS)
+
+    def should_speculate(self, signature: str) -> bool:
+        """Отправлять ли обычный и смягчённый промпты одновременно."""
+        return self.refusal_rate(signature, VARIANT_NORMAL) >= self.speculate_threshold
+
+    def snapshot(self, signature: str) -> Dict[str, Any]:
+        with self._lock:
+            per_sig = {k: list(v) for k, v in self._data.get(signature, {}).items()}
+        return {
+            "normal_refusal_rate": round(self.refusal_rate(signature, VARIANT_NORMAL), 3),
+            "softened_refusal_rate": round(self.refusal_rate(signature, VARIANT_SOFTENED), 3),
+            "observed": per_sig,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # ── персистентность ──────────────────────────────────────────────
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for sig, per_sig in (payload.get("signatures") or {}).items():
+            if not isinstance(per_sig, dict):
+                continue
+            clean = {}
+            for variant, counts in per_sig.items():
+                try:
+                    calls, refusals = int(counts[0]), int(counts[1])
+                except (TypeError, ValueError, IndexError):
+                    continue
+                if 0 <= refusals <= calls:
+                    clean[variant] = [calls, refusals]
+            if clean:
+                self._data[sig] = clean
+        while len(self._data) > self.max_signatures:
+            self._data.popitem(last=False)
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(
+                json.dumps({"signatures": self._data}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
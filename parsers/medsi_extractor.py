@@ -14,7 +14,7 @@ Extractor кандидатов для лабораторных бланков М
 Этот модуль:
   - детектирует формат МЕДСИ
   - корректно разделяет ref и value
-  - формирует TSV-кандидаты (name\tvalue\tref\tunit)
+  - формирует кандидаты (Candidate; TSV name\tvalue\tref\tunit — medsi_inline_to_candidates)
 
 ВАЖНО: helix_table_to_candidates и baseline-парсер НЕ затрагиваются.
 """
@@ -22,6 +22,12 @@ Extractor кандидатов для лабораторных бланков М
 import re
 from typing import Optional, Tuple, List
 
+from parsers import patterns as rx
+from parsers.candidates import Candidate, format_candidates
+
+# Candidate.source кандидатов этого экстрактора
+_SOURCE = "medsi"
+
 
 # ──────────────────────────────────────────────
 # Маппинг МЕДСИ-кодов → стандартные коды проекта
@@ -65,6 +71,31 @@ _MEDSI_UNITS = [
     "%",
 ]
 _UNITS_RE = "|".join(re.escape(u) for u in _MEDSI_UNITS)
+_UNIT_PRIORITY = {u: i for i, u in enumerate(_MEDSI_UNITS)}
+# ' unit ' — единица, окружённая пробелами. Хвостовой пробел — lookahead,
+# чтобы finditer не пропускал соседние единицы (" г/л % ")
+_UNIT_SPACED_RE = re.compile(r"\s(" + _UNITS_RE + r")(?=\s)")
+# Единица в начале строки; альтернативы в порядке _MEDSI_UNITS
+_UNIT_PREFIX_RE = re.compile(_UNITS_RE)
+
+
+def _find_unit(line: str) -> Optional[Tuple[int, int, str]]:
+    """
+    Единица измерения, окружённая пробелами: (start, end, unit) или None.
+
+    Один проход по строке; из всех вхождений выбирается единица, стоящая
+    раньше в _MEDSI_UNITS (при равенстве — первое вхождение), как при
+    переборе единиц по списку.
+    """
+    best = None
+    best_rank = len(_MEDSI_UNITS)
+    for m in _UNIT_SPACED_RE.finditer(line):
+        rank = _UNIT_PRIORITY[m.group(1)]
+        if rank < best_rank:
+            best, best_rank = m, rank
+    if best is None:
+        return None
+    return best.start(1), best.end(1), best.group(1)
 
 
 # ──────────────────────────────────────────────
@@ -78,6 +109,16 @@ def is_medsi_format(raw_text: str) -> bool:
       ИЛИ 'СОЭ' + 'мм/час' + >= 2 строк (CODE)
     И при этом НЕТ заголовков Хеликс-таблицы.
     """
+    if not raw_text:
+        return False
+    return is_medsi_format_lines(raw_text, raw_text.splitlines())
+
+
+_MEDSI_CODE_LINE_RE = re.compile(r"^\s*\([A-Za-zА-Яа-я\-#%0-9]+\)\s")
+
+
+def is_medsi_format_lines(raw_text: str, lines: List[str]) -> bool:
+    """is_medsi_format для уже разбитого на строки текста (lines = raw_text.splitlines())."""
     if not raw_text:
         return False
 
@@ -85,8 +126,7 @@ def is_medsi_format(raw_text: str) -> bool:
     if "Исследование\tРезультат" in raw_text or "Тест\tРезультат" in raw_text:
         return False
 
-    lines = raw_text.splitlines()
-    code_re = re.compile(r"^\s*\([A-Za-zА-Яа-я\-#%0-9]+\)\s")
+    code_re = _MEDSI_CODE_LINE_RE
     code_count = sum(1 for l in lines if code_re.match(l))
 
     has_10_9 = "10*9" in raw_text
@@ -129,7 +169,7 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
     # Нормализуем дефисы
     s = s.replace("–", "-").replace("—", "-")
 
-    m = re.match(r"^(\d+(?:\.\d+)?)\s*-\s*(.*)", s)
+    m = rx.MEDSI_REF_LOW_DASH.match(s)
     if not m:
         return None, None
 
@@ -148,15 +188,16 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
 
     if dp > 0:
         # Дробные числа: ref_high имеет ровно dp десятичных знаков
-        pat = re.compile(r"^(\d+\.\d{" + str(dp) + r"})(.*)")
-        m2 = pat.match(after_dash)
+        m2 = rx.MEDSI_DECIMAL_HEAD.match(after_dash)
         if m2:
-            ref_high_str = m2.group(1)
-            remainder = m2.group(2)
+            frac = m2.group(2)[:dp]
+            if len(frac) == dp and frac.isdecimal():
+                ref_high_str = f"{m2.group(1)}.{frac}"
+                remainder = m2.group(2)[dp:]
     else:
         # Целые числа
         # a) Проверяем, есть ли естественный разделитель (↑↓ или пробел после цифр)
-        flag_m = re.match(r"^(\d+)\s*([↑↓!])(.*)", after_dash)
+        flag_m = rx.MEDSI_INT_FLAG.match(after_dash)
         if flag_m:
             ref_high_str = flag_m.group(1)
             remainder = flag_m.group(2) + flag_m.group(3)
@@ -169,7 +210,7 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
                     continue
                 cand = after_dash[:nd]
                 rest = after_dash[nd:]
-                if not re.match(r"^\d+$", cand):
+                if not rx.DIGITS_ONLY.match(cand):
                     continue
                 try:
                     if float(cand) >= ref_low:
@@ -183,11 +224,11 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
         return s, None
 
     # Убираем флаги и пробелы из remainder → value
-    remainder = re.sub(r"^[\s↑↓!]+", "", remainder)
+    remainder = rx.MEDSI_LEADING_FLAGS.sub("", remainder)
 
     value_str: Optional[str] = None
     if remainder:
-        val_m = re.match(r"^(\d+(?:[.,]\d+)?)", remainder)
+        val_m = rx.MEDSI_LEADING_NUMBER.match(remainder)
         if val_m:
             value_str = val_m.group(1).replace(",", ".")
 
@@ -251,11 +292,11 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
             continue
 
         # Строка-кандидат: начинается с (CODE) или с 'СОЭ'
-        starts_with_code = bool(re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", line))
-        starts_with_soe = bool(re.match(r"^СОЭ\s", line, re.IGNORECASE))
+        starts_with_code = bool(rx.MEDSI_CODE_PREFIX.match(line))
+        starts_with_soe = bool(rx.MEDSI_ESR_PREFIX.match(line))
 
         # Также: строки без (CODE) но с единицей и ref
-        has_ref = bool(re.search(r"\d+(?:\.\d+)?\s*-\s*\d", line))
+        has_ref = bool(rx.MEDSI_REF_START.search(line))
 
         if (starts_with_code or starts_with_soe) and not has_ref:
             # Неполная строка — склеиваем с последующими
@@ -268,7 +309,7 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
                     continue
                 combined = combined + " " + next_l
                 j += 1
-                if re.search(r"\d+(?:\.\d+)?\s*-\s*\d", combined):
+                if rx.MEDSI_REF_START.search(combined):
                     break
             result.append(combined)
             i = j
@@ -282,26 +323,18 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
 # ──────────────────────────────────────────────
 # ПАРСЕР ОДНОЙ INLINE-СТРОКИ
 # ──────────────────────────────────────────────
-def _try_parse_inline(line: str) -> Optional[str]:
+def _try_parse_inline(line: str) -> Optional[Candidate]:
     """
     Парсит одну inline-строку pypdf МЕДСИ:
       "(WBC) Лейкоциты 10*9/л 4.50-11.004.78"
-    Возвращает TSV-кандидат: "name\\tvalue\\tref\\tunit"
+    Возвращает Candidate (name, value, ref, unit) или None.
     """
     line = line.strip()
     if not line or _is_noise(line):
         return None
 
     # Ищем единицу измерения с пробелом перед ней (чтобы не ловить % внутри кода)
-    unit_match = None
-    for u in _MEDSI_UNITS:
-        # Ищем ' unit ' или ' unit' в конце → единица окружена пробелами
-        pattern = re.compile(r"\s(" + re.escape(u) + r")\s")
-        m = pattern.search(line)
-        if m:
-            unit_match = (m.start(1), m.end(1), u)
-            break
-
+    unit_match = _find_unit(line)
     if not unit_match:
         return None
 
@@ -313,7 +346,7 @@ def _try_parse_inline(line: str) -> Optional[str]:
         return None
 
     # Проверяем наличие ref-диапазона
-    if not re.search(r"\d+(?:\.\d+)?\s*-\s*\d", after_unit):
+    if not rx.MEDSI_REF_START.search(after_unit):
         return None
 
     ref_text, value_str = _split_ref_and_value(after_unit)
@@ -323,7 +356,13 @@ def _try_parse_inline(line: str) -> Optional[str]:
     # Очищаем имя: извлекаем код, маппим МЕДСИ→стандарт
     clean_name = _clean_medsi_name(name_part)
 
-    return f"{clean_name}\t{value_str}\t{ref_text}\t{unit}"
+    return _candidate(clean_name, value_str, ref_text, unit)
+
+
+def _candidate(name: str, value_str: str, ref_text: str, unit: str) -> Candidate:
+    # Значение в TSV — как у лаборатории ("4.50", а не "4.5"); строка не обрезается
+    return Candidate(name, float(value_str), ref_text, unit, source=_SOURCE,
+                     value_text=value_str, strip_tsv=False)
 
 
 def _clean_medsi_name(raw_name: str) -> str:
@@ -333,7 +372,7 @@ def _clean_medsi_name(raw_name: str) -> str:
       '(WBC) Лейкоциты'    →  'Лейкоциты (WBC)'
       'СОЭ'                →  'СОЭ'
     """
-    m = re.match(r"^\(([A-Za-zА-Яа-я\-#%0-9]+)\)\s*(.*)", raw_name)
+    m = rx.MEDSI_CODE_NAME.match(raw_name)
     if m:
         raw_code = m.group(1)
         russian = m.group(2).strip()
@@ -348,7 +387,7 @@ def _clean_medsi_name(raw_name: str) -> str:
 # ──────────────────────────────────────────────
 # ПАРСЕР OCR MULTILINE (вторичный)
 # ──────────────────────────────────────────────
-def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
+def _parse_medsi_ocr_multiline(raw_text: str) -> List[Candidate]:
     """
     Парсит OCR-формат МЕДСИ, где столбцы на отдельных строках:
       (WBC) Лейкоциты
@@ -357,16 +396,16 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
       4.50-11.00
     """
     lines = [l.strip() for l in (raw_text or "").splitlines() if l.strip()]
-    lines = [l for l in lines if not re.match(r"^---\s*PAGE\s+\d+\s*---", l)]
+    lines = [l for l in lines if not rx.PAGE_MARKER_START.match(l)]
 
-    candidates: List[str] = []
+    candidates: List[Candidate] = []
     i = 0
 
     while i < len(lines):
         line = lines[i]
 
-        is_name = bool(re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", line))
-        is_soe = bool(re.match(r"^соэ$", line, re.IGNORECASE))
+        is_name = bool(rx.MEDSI_CODE_PREFIX.match(line))
+        is_soe = bool(rx.MEDSI_ESR.match(line))
 
         if not (is_name or is_soe):
             i += 1
@@ -387,36 +426,33 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
                 continue
 
             # Это новое имя? Прекращаем сбор
-            if re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", nl):
+            if rx.MEDSI_CODE_PREFIX.match(nl):
                 break
 
             # Значение? (число, возможно с "...")
             val_clean = nl.rstrip(".").replace(",", ".")
-            if value_str is None and re.match(r"^-?\d+(?:\.\d+)?$", val_clean):
+            if value_str is None and rx.SIGNED_NUMBER_EXACT.match(val_clean):
                 value_str = val_clean
                 j += 1
                 continue
 
             # Единица?
             if unit is None:
-                nl_clean = nl.rstrip(".")
-                for u in _MEDSI_UNITS:
-                    if nl_clean == u or nl.startswith(u):
-                        unit = u
-                        break
-                if unit is not None:
+                unit_m = _UNIT_PREFIX_RE.match(nl)
+                if unit_m:
+                    unit = unit_m.group(0)
                     j += 1
                     continue
 
             # Референс? (число-число)
-            ref_m = re.match(r"^(\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?)", nl)
+            ref_m = rx.MEDSI_REF_RANGE_START.match(nl)
             if ref_m:
                 ref_text = ref_m.group(1).replace(" ", "")
                 j += 1
                 break
 
             # Продолжение имени (кириллические слова без цифр)
-            if re.match(r"^[а-яА-Я]", nl) and not re.search(r"\d", nl):
+            if rx.CYRILLIC_START.match(nl) and not rx.DIGIT.search(nl):
                 name = name + " " + nl
                 j += 1
                 continue
@@ -425,7 +461,9 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
 
         if value_str and ref_text:
             clean_name = _clean_medsi_name(name)
-            candidates.append(f"{clean_name}\t{value_str}\t{ref_text}\t{unit or ''}")
+            cand = _candidate(clean_name, value_str, ref_text, unit or "")
+            cand.span = (i, j)
+            candidates.append(cand)
 
         i = j if j > i else i + 1
 
@@ -446,24 +484,30 @@ def medsi_inline_to_candidates(raw_text: str) -> str:
     Возвращает TSV (name\\tvalue\\tref\\tunit), совместимый
     с parse_items_from_candidates.
     """
+    return format_candidates(medsi_inline_candidates(raw_text))
+
+
+def medsi_inline_candidates(raw_text: str) -> List[Candidate]:
+    """medsi_inline_to_candidates без форматирования в TSV: список Candidate."""
     if not raw_text:
-        return ""
+        return []
 
     # Убираем маркеры страниц (если есть)
-    text = re.sub(r"---\s*PAGE\s+\d+\s*---", "", raw_text)
+    text = rx.PAGE_MARKER_ANY.sub("", raw_text)
     lines_raw = [l for l in text.splitlines() if l.strip()]
 
     # ─── Pass 1: Inline (pypdf) ───
     joined = _join_medsi_continuations(lines_raw)
-    inline_cands: List[str] = []
-    for line in joined:
+    inline_cands: List[Candidate] = []
+    for pos, line in enumerate(joined):
         cand = _try_parse_inline(line)
-        if cand:
+        if cand is not None:
+            cand.span = (pos, pos + 1)
             inline_cands.append(cand)
 
     # Если inline дал >= 10 кандидатов — хватает
     if len(inline_cands) >= 10:
-        return "\n".join(inline_cands)
+        return inline_cands
 
     # ─── Pass 2: OCR multiline ───
     ocr_cands = _parse_medsi_ocr_multiline(raw_text)
@@ -471,14 +515,14 @@ def medsi_inline_to_candidates(raw_text: str) -> str:
     # Объединяем, дедуплицируем по имени (первый столбец)
     all_cands = inline_cands + ocr_cands
     seen: set = set()
-    result: List[str] = []
+    result: List[Candidate] = []
     for c in all_cands:
-        key = c.split("\t")[0].strip().lower()
+        key = c.name.strip().lower()
         if key not in seen:
             seen.add(key)
             result.append(c)
 
-    return "\n".join(result)
+    return result
 
 
 
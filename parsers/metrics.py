@@ -6,60 +6,13 @@ B4-классификатор причин низкого качества (reas
 """
 
 import logging
-import re
 from typing import List, Any
 
-logger = logging.getLogger(__name__)
-
-# ─── Биомаркеры (копия из line_scorer, чтобы не тянуть зависимость) ───
-_BIOMARKER_CODES = {
-    "WBC", "RBC", "HGB", "HCT", "PLT", "MCV", "MCH", "MCHC",
-    "RDW", "PDW", "MPV", "PCT",
-    "NEU", "LYM", "MONO", "EOS", "BAS",
-    "NE", "LY", "MO", "EO", "BA",
-    "ALT", "AST", "GGT", "ALP",
-    "TBIL", "DBIL", "IBIL",
-    "CREA", "UREA", "CRP", "CRPN",
-    "GLUC", "GLU", "HBA1C",
-    "CHOL", "HDL", "LDL", "TRIG",
-    "TSH", "FT3", "FT4", "T3", "T4",
-    "FE", "FERR", "VIT",
-    "ESR",
-}
-
-# Шумовые символы/паттерны (OCR-мусор)
-_NOISE_RE = re.compile(r"[�□■▪▫●○◆◇★☆]{2,}|[|]{3,}|[*]{3,}|[#]{3,}|[~]{3,}")
-
-# Числовой кандидат: строка, содержащая число (потенциальный показатель)
-_NUMERIC_RE = re.compile(r"(?<![A-Za-z])\d+(?:[.,]\d+)?")
-
-
-def _is_noise_line(line: str) -> bool:
-    """Строка считается шумовой, если содержит мусорные символы или очень короткая/пустая."""
-    stripped = line.strip()
-    if not stripped:
-        return True
-    if _NOISE_RE.search(stripped):
-        return True
-    # Строка из одних спецсимволов (не буквы и не цифры)
-    if not re.search(r"[A-Za-zА-Яа-яЁё0-9]", stripped):
-        return True
-    return False
-
-
-def _is_biomarker_line(line: str) -> bool:
-    """Строка содержит известный код биомаркера."""
-    upper = line.upper()
-    for code in _BIOMARKER_CODES:
-        if re.search(r"(?<![A-Za-zА-Яа-яЁё])" + re.escape(code) + r"(?![A-Za-zА-Яа-яЁё])", upper):
-            return True
-    return False
-
-
-def _has_digit(line: str) -> bool:
-    """Строка содержит хотя бы одну цифру."""
-    return bool(re.search(r"\d", line))
+# Признаки строк (мусор, цифры, коды биомаркеров) считает line_scorer.line_features —
+# одна и та же строка классифицируется один раз и для метрик, и для парсеров.
+from parsers.line_scorer import line_features
 
+logger = logging.getLogger(__name__)
 
 # ════════════════════════════════════════
 # A) compute_ocr_quality_metrics
@@ -102,16 +55,16 @@ def compute_ocr_quality_metrics(text: str) -> dict:
     numeric_candidates = 0
 
     for ln in lines:
-        is_noise = _is_noise_line(ln)
-        if is_noise:
+        f = line_features(ln)
+        if f.is_ocr_garbage:
             noise_count += 1
             continue
 
-        if _has_digit(ln):
+        if f.has_digit:
             digit_count += 1
             numeric_candidates += 1
 
-        if _is_biomarker_line(ln):
+        if f.has_metric_biomarker:
             biomarker_count += 1
 
     return {
@@ -3,9 +3,13 @@ B5-A: Preflight-решение о режиме OCR.
 
 Детерминированная функция — без ML, без внешних сервисов.
 Решает, нужен ли adaptive_threshold=True на ПЕРВОМ прогоне OCR.
+
+Для изображений дополнительно считаются дешёвые метрики качества
+(контраст, размытие, наклон, неравномерность фона — по миниатюре),
+по ним выбираются флаги preprocessing, чтобы реже доходить до rerun (B2).
 """
 
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 # Расширения изображений (не PDF)
@@ -17,6 +21,56 @@ _IMAGE_MIMETYPES = {
     "image/bmp", "image/tiff",
 }
 
+# Пороги метрик качества изображения
+BG_UNEVEN_THRESHOLD = 0.25    # разброс светлого фона по блокам (тени, виньетка) → бинаризация
+LOW_CONTRAST_THRESHOLD = 0.35 # (p95 - p5) / 255 ниже — блёклое фото → бинаризация
+BLUR_VAR_THRESHOLD = 150.0    # дисперсия Лапласиана ниже — размыто → сильнее sharpen
+SKEW_MIN_DEG = 0.3            # наклон меньше — deskew не нужен
+BLURRY_SHARPEN_FACTOR = 1.6
+
+
+def _analyze_image(file_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """Метрики качества изображения; None, если байты не читаются (fail-safe)."""
+    try:
+        from ocr_preprocess import analyze_image_quality
+        return analyze_image_quality(file_bytes)
+    except Exception:
+        return None
+
+
+def choose_preprocess_flags(image_metrics: Dict[str, Any]) -> dict:
+    """
+    По метрикам изображения выбирает режим OCR и флаги preprocess_image_bytes.
+
+    Возвращает:
+        {
+            "adaptive_threshold": bool,
+            "reason": str,
+            "preprocess_flags": dict,  # kwargs для preprocess_image_bytes
+        }
+    """
+    contrast = image_metrics.get("contrast", 1.0)
+    bg_uneven = image_metrics.get("bg_unevenness", 0.0)
+    blur_var = image_metrics.get("blur_var", BLUR_VAR_THRESHOLD)
+    skew = abs(image_metrics.get("skew_deg", 0.0))
+
+    if bg_uneven >= BG_UNEVEN_THRESHOLD:
+        adaptive, reason = True, "IMAGE_UNEVEN_BACKGROUND"
+    elif contrast < LOW_CONTRAST_THRESHOLD:
+        adaptive, reason = True, "IMAGE_LOW_CONTRAST"
+    else:
+        adaptive, reason = False, "IMAGE_CLEAN"
+
+    flags: Dict[str, Any] = {"enable_deskew": skew >= SKEW_MIN_DEG}
+    if blur_var < BLUR_VAR_THRESHOLD:
+        flags["sharpen_factor"] = BLURRY_SHARPEN_FACTOR
+
+    return {
+        "adaptive_threshold": adaptive,
+        "reason": reason,
+        "preprocess_flags": flags,
+    }
+
 
 def choose_ocr_mode_preflight(
     file_bytes: bytes,
@@ -37,6 +91,8 @@ def choose_ocr_mode_preflight(
         {
             "adaptive_threshold": bool,
             "reason": str,   # код причины для диагностики
+            "preprocess_flags": dict,        # kwargs для preprocess_image_bytes
+            "image_metrics": dict | None,    # метрики качества (только изображения)
         }
     """
     name_lower = (filename or "").lower()
@@ -46,10 +102,18 @@ def choose_ocr_mode_preflight(
     is_image_by_ext = any(name_lower.endswith(ext) for ext in _IMAGE_EXTENSIONS)
 
     if is_image_by_mime or is_image_by_ext:
-        return {
-            "adaptive_threshold": True,
-            "reason": "IMAGE_LIKE_INPUT",
-        }
+        image_metrics = _analyze_image(file_bytes)
+        if image_metrics is None:
+            # Не смогли прочитать — прежнее поведение: картинка → бинаризация
+            return {
+                "adaptive_threshold": True,
+                "reason": "IMAGE_LIKE_INPUT",
+                "preprocess_flags": {},
+                "image_metrics": None,
+            }
+        decision = choose_preprocess_flags(image_metrics)
+        decision["image_metrics"] = image_metrics
+        return decision
 
     # ─── Правило 2: PDF, но текстовый слой пустой/очень короткий ───
     is_pdf = (
@@ -64,16 +128,14 @@ def choose_ocr_mode_preflight(
             return {
                 "adaptive_threshold": True,
                 "reason": "PDF_EMPTY_TEXT_LAYER",
+                "preprocess_flags": {},
+                "image_metrics": None,
             }
 
     # ─── По умолчанию: обычный режим ───
     return {
         "adaptive_threshold": False,
         "reason": "PRE_FLIGHT_DEFAULT",
+        "preprocess_flags": {},
+        "image_metrics": None,
     }
-
-
-
-
-
-
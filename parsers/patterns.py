@@ -0,0 +1,198 @@
+"""
+Реестр скомпилированных регулярных выражений парсеров.
+
+Все шаблоны, которые engine.py и parsers/* применяют к строкам отчёта,
+компилируются здесь один раз при импорте; в коде — только вызовы
+методов готовых объектов:
+
+    from parsers import patterns as rx
+    rx.WHITESPACE.sub(" ", s)
+
+Вызов re.match/search/sub с литералом на каждой строке проходит через
+внутренний кэш модуля re (проверка типов и поиск по ключу шаблон+флаги),
+а кэш ограничен и общий для всего процесса: при вытеснении шаблон
+компилируется заново посреди разбора.
+
+Модули со своими таблицами шаблонов (line_scorer, lab_detector,
+universal_extractor) держат их на уровне модуля — там они тоже
+компилируются один раз.
+"""
+
+import re
+
+_I = re.IGNORECASE
+
+# ════════════════════════════════════════
+# Общие
+# ════════════════════════════════════════
+WHITESPACE = re.compile(r"\s+")
+BLANK_LINES = re.compile(r"\n{3,}")
+DIGIT = re.compile(r"\d")
+LEADING_DIGIT = re.compile(r"^\d")
+DIGITS_ONLY = re.compile(r"^\d+$")
+LETTER = re.compile(r"[A-Za-zА-Яа-я]")
+LETTERS2 = re.compile(r"[A-Za-zА-Яа-я]{2,}")
+CYRILLIC_START = re.compile(r"^[а-яА-Я]")
+PARENS = re.compile(r"\([^)]*\)")
+NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+SIGNED_NUMBER_EXACT = re.compile(r"^-?\d+(?:\.\d+)?$")
+NOT_NUMBER_CHARS = re.compile(r"[^\d\.\-]")
+HELIX_PAGE_MARKER = re.compile(r"^---\s*PAGE\s+\d+\s+---", _I)
+PAGE_MARKER_START = re.compile(r"^---\s*PAGE\s+\d+\s*---")
+PAGE_MARKER_ANY = re.compile(r"---\s*PAGE\s+\d+\s*---")
+
+# ════════════════════════════════════════
+# Значения и единицы
+# ════════════════════════════════════════
+VALUE_LINE_START = re.compile(r"^(?:[↑↓+]\s*)?\d")
+VALUE_WITH_REST = re.compile(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)$")
+VALUE_WITH_REST_OPEN = re.compile(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)")
+VALUE_WITH_UNIT = re.compile(r"^([-+]?\d+(?:[.,]\d+)?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$")
+UNIT_TOKEN = re.compile(r"^([^/\s]+(?:[/%][^/\s]*)?)")
+UNIT_WORD_TOKEN = re.compile(r"^([A-Za-zА-Яа-яµ%/\.\-]+(?:[/%][^/\s]*)?)")
+UNIT_TRAILING_RANGE = re.compile(r"\s+\d+\.?\d*\s*[-–—]\s*\d+\.?\d*")
+LEADING_COMPARATOR = re.compile(r"^[<>≤≥]=?\s*")
+TRAILING_COMPARATOR = re.compile(r"\s*[<>≤≥]=?\s*$")
+NEXT_LINE_NUMBER = re.compile(r"^\s*\d+\s")
+TRAILING_DASH_VALUE = re.compile(r"^(\d+(?:[.,]\d+)?)\s*-$")
+CODE_GLUED_VALUE = re.compile(r"(\d+\.\d{2})\d+$")
+
+# Степени десяти: 10~9 / 10*9 → 10^9, «*10^N» в имени, значение перед «*10^»
+POW10_OCR_VARIANT = re.compile(r"10\s*[~*]\s*(\d+)", _I)
+POW10_SUFFIX = re.compile(r"\*10\^\d+")
+POW10_BROKEN_VALUE = re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^", _I)
+POW10_STAR = re.compile(r"10\s*\*\s*(\d+)")
+POW10_TIMES = re.compile(r"[×хx]\s*10\s*\^\s*(\d+)", _I)
+POW10_START = re.compile(r"^[xхXХ]?\*?10[\^*]\d+")
+POW10_UNIT_ONLY = re.compile(r"^[xхXХ]?\*?10\s*\^\s*\d+/[а-яa-z]+$", _I)
+POW10_OPEN_UNIT = re.compile(r"^[xхXХ]?\*?10[\^*]\d+/\s*$", _I)
+
+# Значение со степенью: (число, показатель[, остаток]); порядок — порядок проверки
+HELIX_POW10_VALUE = (
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)", _I),       # 8.23 *10^9
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)", _I),            # 8.23 10^9
+)
+HELIX_POW10_VALUE_UNIT = (
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)(.*)$", _I),  # 8.23 *10^9/л
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)(.*)$", _I),       # 8.23 10^9/л
+)
+POW10_VALUE = (
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)", _I),
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)[-+]?\s+[xхXХ]\*?10\s*\^\s*(\d+)", _I),
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)", _I),
+)
+POW10_VALUE_UNIT = (
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)(.*)$", _I),
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)[-+]?\s+[xхXХ]\*?10\s*\^\s*(\d+)(.*)$", _I),
+    re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)(.*)$", _I),
+)
+
+# Строки-единицы (P10)
+UNIT_ONLY_LINE = re.compile(
+    r'^(?:ммоль/л|мкмоль/л|г/л|мг/л|мг/дл|Ед/л|МЕ/л|мл/мин|нг/мл|'
+    r'пмоль/л|нмоль/л|%|фл|пг|г/дл|мм/ч(?:ас)?|тыс/мкл|млн/мкл|'
+    r'10\^[39]/л|[xхXХ]?\*?10[\^*]?\d+/[а-яa-z]+)\s*$',
+    _I,
+)
+UNIT_PREFIX = re.compile(
+    r'^(10\s*\^?\s*\d{1,2}\s*/\s*[а-яa-z]+'
+    r'|[а-яА-Яa-zA-Z]{1,6}/[а-яa-z]+'
+    r'|МЕ/[а-яa-z]+'
+    r'|мм/ч(?:ас)?'
+    r'|%|фл|пг)'
+)
+STAR_AFTER_DIGIT = re.compile(r'(\d)\*(?=\s|$|[а-яА-Яa-zA-Z])')
+
+# ════════════════════════════════════════
+# Референсы
+# ════════════════════════════════════════
+REF_RANGE = re.compile(r"(-?\d+(?:[.,]\d+)?)\s*[–—-]\s*(-?\d+(?:[.,]\d+)?)")
+REF_COMPARATOR = re.compile(r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)")
+REF_RANGE_DOT = re.compile(r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)")
+REF_COMPARATOR_DOT = re.compile(r"(<=|>=|<|>|≤|≥)\s*(\d+(?:\.\d+)?)")
+REF_UPTO = re.compile(r"(?:^|\s)[Дд]о\s*(\d+(?:\.\d+)?)")
+REF_UPTO_ANY = re.compile(r"[Дд]о\s*(\d+(?:[.,]\d+)?)")
+REF_UPTO_EXACT = re.compile(r"^[Дд]о\s*(\d+(?:\.\d+)?)$")
+REF_UPPER_EXACT = re.compile(r"^(<=|<|≤)(-?\d+(?:\.\d+)?)$")
+REF_LOWER_EXACT = re.compile(r"^(>=|>|≥)(-?\d+(?:\.\d+)?)$")
+REF_RANGE_EXACT = re.compile(r"^(-?\d+(?:\.\d+)?)-(-?\d+(?:\.\d+)?)$")
+REF_RANGE_EXACT_G = re.compile(r"^(-?\d+(\.\d+)?)-(-?\d+(\.\d+)?)$")
+REF_COMPARATOR_EXACT_ASCII = re.compile(r"^(<=|>=|<|>)(-?\d+(\.\d+)?)$")
+REF_WITH_UNIT = re.compile(r"^(.+?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$")
+REF_SHORT_RANGE = re.compile(r"^\d{1,5}(\.\d+)?-\d{1,5}(\.\d+)?$")
+RANGE_ONLY_LINE = re.compile(r'^\d+(?:[.,]\d+)?\s*[-–—]\s*\d+(?:[.,]\d+)?$')
+COMPARATOR_ONLY_LINE = re.compile(r'^(?:<=|>=|<|>|≤|≥)\s*\d+(?:[.,]\d+)?\s*$')
+GLUED_RANGE_DECIMALS = re.compile(r'(\d+)\.(\d+)\s*[-–—]\s*(\d+)\.(\d+)\s*$')
+GLUED_COMPARATOR_DECIMALS = re.compile(r'([<>≤≥]=?)\s*(\d+\.\d{2})(\d{1,5})\s*$')
+
+# Строки шкал интерпретации («< 5.2 — нормальный уровень», «6.5% и более — диабет»)
+SCALE_COMPARATOR_START = re.compile(r'^[><≤≥]\s*\d')
+SCALE_RANGE_DASH_TEXT = re.compile(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*\s+\S+\s*[-–—]\s*\w')
+SCALE_UPTO_START = re.compile(r'^до\s+\d')
+SCALE_PERCENT_AND_MORE = re.compile(r'^\d+[.,]?\d*%\s+(и более|и выше|включительно)')
+SCALE_PERCENT_RANGE_DASH_TEXT = re.compile(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*%\s*[-–—]\s*\w')
+SCALE_PERCENT_RANGE = re.compile(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*\s*%')
+SCALE_PERCENT_AND_MORE_ANY = re.compile(r'\d+[.,]?\d*\s*%\s+и\s+более')
+SCALE_WORDS_RISK = re.compile(r'(риск|уровень|норм)')
+SCALE_WORDS_CRITERIA = re.compile(r'(содержание|уровень|норм|риск|критерий)')
+SCALE_WORDS_DIABETES = re.compile(r'(содержание|уровень|норм|риск|критерий|диабет)')
+SCALE_WORDS_CONSULT = re.compile(r'(риск|уровень|норм|консультаци|критерий)')
+
+# ════════════════════════════════════════
+# Имена показателей
+# ════════════════════════════════════════
+LATIN_CODE_PARENS = re.compile(r"\s*\([A-Za-z0-9\-#%\s]+\)\s*")
+NAME_CODE_PARENS = re.compile(r"\(([A-Za-zА-ЯЁа-яё][A-Za-zА-ЯЁа-яё0-9%-]{1,9})\)")
+NAME_CODE_COMMA = re.compile(r"\(([A-Za-zА-ЯЁа-яё0-9][A-Za-zА-ЯЁа-яё0-9%-]{0,9})\s*,")
+NAME_LATIN_CODE = re.compile(r"\b([A-Za-z]{2,6}%?)\b")
+LAB_CODE_PARENS = re.compile(r'\([A-ZА-Яа-яa-z][A-ZА-Яа-яa-z+\d]{0,5}\)')
+HBA_FRAGMENT = re.compile(r'^hba?\s*$')
+HBA1C_DCCT = re.compile(r'(?i)\b(DCCT|NGSP)\b')
+
+# Служебный текст в имени: приказы, коды услуг, биоматериал, даты
+ORDER_PARENS = re.compile(r"\(Приказ[^)]*\)", _I)
+ORDER_PARENS_OPEN = re.compile(r'\(Приказ[^)]*$', _I)
+ORDER_START = re.compile(r'^\(?приказ')
+ORDER_NUMBER_TAIL = re.compile(r'^\d{3,4}(?:н\)?|\))\s*$')
+NUMBER_SIGN_ONLY = re.compile(r'^№\s*$')
+MZ_RF_TAIL = re.compile(r'^МЗ\s+РФ[^)]*\)', _I)
+SERVICE_CODES = re.compile(r"\bA\d{2}\.\d{2}\.\d{3}(?:\.\d+)?(?:\s*,\s*A\d{2}\.\d{2}\.\d{3}(?:\.\d+)?)*")
+SERVICE_CODE_START = re.compile(r'^a\d{2}\.\d{2}\.\d{3}')
+BIOMATERIAL_PARENS = re.compile(
+    r"\(\s*(?:венозная кровь|сыворотка крови|кровь[^)]*|капиллярная кровь|плазма)\s*\)", _I)
+BIOMATERIAL_PARENS_EXT = re.compile(
+    r'\(\s*(?:венозная кровь|сыворотка крови|кровь[^)]*|капиллярная кровь|плазма крови?)\s*\)', _I)
+METHOD_QUALIFIER_PARENS = re.compile(r"\(в соответствии[^)]*\)", _I)
+STUDY_DATE = re.compile(r"Дата исследования[:\s]*[\d.]+[;\s]*", _I)
+DIRECT_METHOD_SUFFIX = re.compile(r'\s*-\s*прямое\s+определение\b', _I)
+DIRECT_METHOD_TAIL = re.compile(r'\s*-\s*прямое\s*$', _I)
+METHOD_PREFIX = re.compile(r'^определение\s+(?=\d)', _I)
+
+# Строки, которые prestrip сохраняет среди шума
+NOISE_VALUE_START = re.compile(r'^[↑↓+\-]?\s*\d')
+NOISE_UNIT_LINE = re.compile(r'^[а-яА-Яa-zA-Z/%*^°µ]+[/а-яА-Яa-zA-Z0-9^]*$')
+
+# ════════════════════════════════════════
+# fallback_generic
+# ════════════════════════════════════════
+FALLBACK_REF_RANGE_END = re.compile(r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*$")
+FALLBACK_COMPARATOR_END = re.compile(r"(<=|>=|<|>)\s*(\d+(?:\.\d+)?)\s*$")
+FALLBACK_HAS_RANGE = re.compile(r"\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?")
+FALLBACK_HAS_COMPARATOR = re.compile(r"(<=|>=|<|>)\s*\d+")
+FALLBACK_HAS_UPTO = re.compile(r"[Дд]о\s*\d+")
+FALLBACK_FIRST_NUMBER = re.compile(r"(?<![A-Za-zА-Яа-я\-])([-+]?\d+(?:[.,]\d+)?)\s")
+
+# ════════════════════════════════════════
+# МЕДСИ (pypdf inline)
+# ════════════════════════════════════════
+MEDSI_REF_LOW_DASH = re.compile(r"^(\d+(?:\.\d+)?)\s*-\s*(.*)")
+MEDSI_DECIMAL_HEAD = re.compile(r"^(\d+)\.(.*)")
+MEDSI_INT_FLAG = re.compile(r"^(\d+)\s*([↑↓!])(.*)")
+MEDSI_LEADING_FLAGS = re.compile(r"^[\s↑↓!]+")
+MEDSI_LEADING_NUMBER = re.compile(r"^(\d+(?:[.,]\d+)?)")
+MEDSI_REF_START = re.compile(r"\d+(?:\.\d+)?\s*-\s*\d")
+MEDSI_REF_RANGE_START = re.compile(r"^(\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?)")
+MEDSI_CODE_PREFIX = re.compile(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)")
+MEDSI_CODE_NAME = re.compile(r"^\(([A-Za-zА-Яа-я\-#%0-9]+)\)\s*(.*)")
+MEDSI_ESR_PREFIX = re.compile(r"^СОЭ\s", _I)
+MEDSI_ESR = re.compile(r"^соэ$", _I)
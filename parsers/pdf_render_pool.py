@@ -0,0 +1,373 @@
+"""
+Пул процессов для печати PDF через Chromium.
+
+Sync API Playwright привязан к потоку и не годится для общего использования
+из потоков Flask, поэтому печать вынесена в отдельные процессы: каждый
+воркер держит свой прогретый браузер и печатает присланный HTML.
+
+PdfRenderPool
+    submit(html, pdf_options) → Future[bytes]; render() — то же, но ждёт результат.
+    Очередь ограничена max_queue: при переполнении submit сразу бросает
+    RenderQueueFull (backpressure — отказ, а не бесконечный рост очереди).
+    Печать дольше render_timeout (запуск воркера и браузера не в счёт —
+    на него start_timeout) — процесс воркера убивается и запускается
+    заново, future получает RenderTimeout. Упавший воркер тоже перезапускается.
+    stats() — длина очереди, занятые воркеры, время печати и ожидания, перезапуски.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class RenderQueueFull(RuntimeError):
+    """Очередь печати переполнена — запрос отклонён."""
+
+
+class RenderTimeout(TimeoutError):
+    """Печать не уложилась в render_timeout; воркер перезапущен."""
+
+
+class RenderError(RuntimeError):
+    """Ошибка печати в воркере (или воркер упал)."""
+
+
+# ==========================
+# Процесс воркера
+# ==========================
+class _ChromiumHandle:
+    """Запущенный Chromium вместе с владеющим им Playwright."""
+
+    def __init__(self, playwright: Any, browser: Any):
+        self.playwright = playwright
+        self.browser = browser
+
+    def new_page(self) -> Any:
+        return self.browser.new_page()
+
+    def close(self) -> None:
+        try:
+            self.browser.close()
+        finally:
+            self.playwright.stop()
+
+
+def launch_chromium() -> _ChromiumHandle:
+    """Фабрика браузера по умолчанию; вызывается внутри процесса воркера."""
+    from playwright.sync_api import sync_playwright
+
+    playwright = sync_playwright().start()
+    try:
+        return _ChromiumHandle(playwright, playwright.chromium.launch())
+    except BaseException:
+        playwright.stop()
+        raise
+
+
+def _close_quietly(browser: Any) -> None:
+    if browser is None:
+        return
+    try:
+        browser.close()
+    except Exception:
+        pass
+
+
+def _worker_main(conn: Any, browser_factory: Callable[[], Any]) -> None:
+    """
+    Цикл воркера: после прогрева шлёт ("ready", None, ms), затем на каждый
+    (html, pdf_options) отвечает ("ok", bytes, ms) | ("error", текст, ms); None — выход.
+    """
+    t0 = time.perf_counter()
+    try:
+        browser = browser_factory()       # прогрев до первого запроса
+    except Exception:
+        browser = None                    # повторим при первом запросе — ошибка уйдёт в future
+    try:
+        conn.send(("ready", None, (time.perf_counter() - t0) * 1000.0))
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg is None:
+                break
+            html, pdf_options = msg
+            t0 = time.perf_counter()
+            try:
+                if browser is None:
+                    browser = browser_factory()
+                page = browser.new_page()
+                try:
+                    page.set_content(html, wait_until="load")
+                    data = page.pdf(**pdf_options)
+                finally:
+                    page.close()
+                conn.send(("ok", data, (time.perf_counter() - t0) * 1000.0))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}", (time.perf_counter() - t0) * 1000.0))
+                # Браузер мог упасть вместе со страницей — следующий запрос поднимет новый
+                _close_quietly(browser)
+                browser = None
+    finally:
+        _close_quietly(browser)
+
+
+# ==========================
+# Пул
+# ==========================
+class _Job:
+    __slots__ = ("html", "pdf_options", "future", "enqueued_at")
+
+    def __init__(self, html: str, pdf_options: Dict[str, Any], future: "Future[bytes]"):
+        self.html = html
+        self.pdf_options = pdf_options
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _Worker:
+    """Процесс воркера и канал к нему; обслуживается одним потоком-диспетчером."""
+
+    def __init__(self, pool: "PdfRenderPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.process: Any = None
+        self.conn: Any = None
+        self.ready = False
+        self.busy = False
+
+    def spawn(self) -> None:
+        ctx = self.pool._ctx
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, self.pool.browser_factory),
+            name=f"pdf-render-{self.index}", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.ready = False
+
+    def kill(self) -> None:
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join(timeout=5)
+        if self.conn is not None:
+            self.conn.close()
+
+    def restart(self) -> None:
+        self.kill()
+        self.spawn()
+        self.pool._count("restarts")
+
+    def stop(self, timeout: float) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        if self.process is not None:
+            self.process.join(timeout=timeout)
+        self.kill()
+
+    def _exit_error(self) -> RenderError:
+        code = None
+        if self.process is not None:
+            self.process.join(timeout=1)
+            code = self.process.exitcode
+        self.restart()
+        return RenderError(f"Воркер печати завершился (код {code})")
+
+    def wait_ready(self) -> Optional[BaseException]:
+        """Ждёт прогрева воркера (запуск процесса и браузера не входит в render_timeout)."""
+        pool = self.pool
+        if self.ready:
+            return None
+        if not self.conn.poll(pool.start_timeout):
+            self.restart()
+            return RenderTimeout(f"Воркер печати не запустился за {pool.start_timeout:.0f} с")
+        try:
+            self.conn.recv()
+        except (EOFError, OSError):
+            return self._exit_error()
+        self.ready = True
+        return None
+
+    def render(self, job: _Job) -> None:
+        pool = self.pool
+        error = self.wait_ready()
+        if error is not None:
+            pool._finish(job, error=error)
+            return
+        try:
+            self.conn.send((job.html, job.pdf_options))
+        except (OSError, ValueError) as e:
+            self.restart()
+            pool._finish(job, error=RenderError(f"Воркер печати недоступен: {e}"))
+            return
+        if not self.conn.poll(pool.render_timeout):
+            self.restart()
+            pool._count("timeouts")
+            pool._finish(job, error=RenderTimeout(f"Печать PDF дольше {pool.render_timeout:g} с"))
+            return
+        try:
+            status, payload, render_ms = self.conn.recv()
+        except (EOFError, OSError):
+            pool._finish(job, error=self._exit_error())
+            return
+        if status == "ok":
+            pool._finish(job, result=payload, render_ms=render_ms)
+        else:
+            pool._finish(job, error=RenderError(payload), render_ms=render_ms)
+
+
+class PdfRenderPool:
+    """Пул процессов-воркеров с прогретыми браузерами и ограниченной очередью."""
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_queue: int = 16,
+        render_timeout: float = 60.0,
+        start_timeout: float = 60.0,
+        browser_factory: Callable[[], Any] = launch_chromium,
+        start_method: str = "spawn",
+        history: int = 200,
+    ):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.render_timeout = float(render_timeout)
+        self.start_timeout = float(start_timeout)
+        self.browser_factory = browser_factory
+        self._ctx = multiprocessing.get_context(start_method)
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._closed = False
+        self._render_ms: Deque[float] = deque(maxlen=max(1, int(history)))
+        self._wait_ms: Deque[float] = deque(maxlen=max(1, int(history)))
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0,
+            "rejected": 0, "timeouts": 0, "restarts": 0,
+        }
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Запускает воркеры (иначе — при первом submit)."""
+        with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("Пул печати PDF закрыт")
+            for i in range(self.workers):
+                worker = _Worker(self, i)
+                worker.spawn()
+                thread = threading.Thread(target=self._dispatch, args=(worker,),
+                                          name=f"pdf-render-dispatch-{i}", daemon=True)
+                self._workers.append(worker)
+                self._threads.append(thread)
+                thread.start()
+            self._started = True
+
+    def submit(self, html: str, pdf_options: Optional[Dict[str, Any]] = None) -> "Future[bytes]":
+        """Ставит HTML в очередь; Future получит байты PDF или исключение."""
+        self.start()
+        future: "Future[bytes]" = Future()
+        try:
+            self._jobs.put_nowait(_Job(html, dict(pdf_options or {}), future))
+        except queue.Full:
+            self._count("rejected")
+            raise RenderQueueFull(
+                f"Очередь печати PDF переполнена ({self.max_queue}), попробуйте позже"
+            ) from None
+        self._count("submitted")
+        return future
+
+    def render(self, html: str, pdf_options: Optional[Dict[str, Any]] = None,
+               timeout: Optional[float] = None) -> bytes:
+        return self.submit(html, pdf_options).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            render_ms = sorted(self._render_ms)
+            wait_ms = list(self._wait_ms)
+            snap: Dict[str, Any] = dict(self._counters)
+            snap.update({
+                "workers": self.workers,
+                "alive_workers": sum(1 for w in self._workers if w.process is not None and w.process.is_alive()),
+                "busy_workers": sum(1 for w in self._workers if w.busy),
+                "queue_length": self._jobs.qsize(),
+                "max_queue": self.max_queue,
+            })
+        snap["render_ms_avg"] = round(sum(render_ms) / len(render_ms), 1) if render_ms else None
+        snap["render_ms_p95"] = round(render_ms[int(0.95 * (len(render_ms) - 1))], 1) if render_ms else None
+        snap["wait_ms_avg"] = round(sum(wait_ms) / len(wait_ms), 1) if wait_ms else None
+        return snap
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Останавливает воркеры; задачи, оставшиеся в очереди, получают RenderError."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            started = self._started
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._finish(job, error=RenderError("Пул печати PDF закрыт"))
+        if not started:
+            return
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout + self.render_timeout)
+
+    # ── внутреннее ───────────────────────────────────────────────────
+
+    def _dispatch(self, worker: _Worker) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                worker.stop(timeout=5.0)
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                worker.busy = True
+                self._wait_ms.append((time.monotonic() - job.enqueued_at) * 1000.0)
+            try:
+                worker.render(job)
+            except BaseException as e:   # не даём диспетчеру умереть, future не должна зависнуть
+                self._finish(job, error=RenderError(f"{type(e).__name__}: {e}"))
+            finally:
+                with self._lock:
+                    worker.busy = False
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _finish(self, job: _Job, result: Optional[bytes] = None,
+                error: Optional[BaseException] = None, render_ms: Optional[float] = None) -> None:
+        with self._lock:
+            if render_ms is not None:
+                self._render_ms.append(render_ms)
+            self._counters["failed" if error is not None else "completed"] += 1
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
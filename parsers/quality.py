@@ -14,10 +14,11 @@ evaluate_parse_quality(items) -> dict с метриками:
   - avg_confidence:       средний confidence (если поле задано)
 """
 
-import re
 from typing import List, Set, TYPE_CHECKING
 from collections import Counter
 
+from parsers import patterns as rx
+
 if TYPE_CHECKING:
     from engine import Item
 
@@ -57,9 +58,9 @@ def _is_suspicious_item(it: "Item") -> bool:
     # Strip parenthesized codes first — biomarker codes like (DCCT/NGSP),
     # (HBA1c, IFCC), (ЛПВП, HDL) legitimately contain '/' and are not garbage.
     raw = it.raw_name or ""
-    raw_no_parens = re.sub(r"\([^)]*\)", "", raw)
+    raw_no_parens = rx.PARENS.sub("", raw)
     if any(ch in raw_no_parens for ch in ['^', '*', '/']):
-        if not re.search(r"\*10\^\d+", raw):
+        if not rx.POW10_SUFFIX.search(raw):
             return True
 
     ref_str = it.ref_text or ""
@@ -68,10 +69,7 @@ def _is_suspicious_item(it: "Item") -> bool:
     # ref+value склейка: "150-400213"
     if ref_str and val_str:
         combined = ref_str.replace("-", "").replace(".", "")
-        if len(combined) > 10 and not re.match(
-            r"^\d{1,5}(\.\d+)?-\d{1,5}(\.\d+)?$",
-            ref_str.replace(" ", ""),
-        ):
+        if len(combined) > 10 and not rx.REF_SHORT_RANGE.match(ref_str.replace(" ", "")):
             return True
 
     # ref_text с кучей частей (>3 частей через пробел — мусор)
@@ -28,6 +28,8 @@ def _llm_gate_text(gate: dict) -> str:
     """
     decision = gate.get("decision", "")
     if decision == "CALL":
+        if gate.get("narrative_route") == "LOCAL":
+            return "ИИ-расшифровка (LLM): не потребовалась — простой случай, справка составлена по шаблону"
         return "ИИ-расшифровка (LLM): выполнена"
     elif decision == "SKIP_LOW_VALUES":
         return "ИИ-расшифровка (LLM): пропущена — недостаточно валидных показателей (нужно ≥ 5)"
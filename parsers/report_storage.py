@@ -0,0 +1,193 @@
+"""
+Хранение файлов отчётов на диске: шардирование, срок жизни, бюджет объёма.
+
+ReportStorage
+    shard_dir(uid)  — подпапка для файлов отчёта: root/<первые символы uid>/,
+                      чтобы в одной папке не копились тысячи файлов.
+    release(paths)  — файлы больше не нужны (токен вытеснен из кэша);
+                      удаляются уборщиком в фоне.
+    run_once()      — один проход уборки:
+                      1) удаляет отпущенные файлы;
+                      2) удаляет файлы старше ttl_sec;
+                      3) сжимает (gzip) исходники original_* старше compress_after_sec;
+                      4) пока суммарный объём > max_bytes — удаляет самые старые.
+    start_janitor() — фоновый поток, вызывающий run_once() раз в interval_sec.
+
+Кроме шардов уборка смотрит и на файлы отчётов прежнего формата,
+лежащие прямо в legacy_dir (original_*, report_*).
+"""
+
+import gzip
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEGACY_PATTERNS = ("original_*", "report_*")
+ORIGINAL_PREFIX = "original_"
+GZIP_SUFFIX = ".gz"
+
+
+class ReportStorage:
+    """Папка с файлами отчётов и её уборка."""
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        legacy_dir: Optional[Path] = None,
+        shard_chars: int = 2,
+        ttl_sec: Optional[float] = 7 * 24 * 3600,
+        max_bytes: Optional[int] = 2 * 1024 ** 3,
+        compress_after_sec: Optional[float] = 3600,
+    ):
+        self.root = Path(root)
+        self.legacy_dir = Path(legacy_dir) if legacy_dir is not None else None
+        self.shard_chars = max(1, int(shard_chars))
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.compress_after_sec = compress_after_sec
+        self._lock = threading.Lock()
+        self._released: List[Path] = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Dict[str, Any] = {}
+
+    # ── публичный API ────────────────────────────────────────────────
+
+    def shard_dir(self, uid: str) -> Path:
+        shard = (uid or "_")[: self.shard_chars].lower()
+        path = self.root / shard
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def release(self, paths: Iterable[Optional[Path]]) -> None:
+        """Отпускает файлы вытесненного отчёта; удаление — в уборщике."""
+        with self._lock:
+            self._released.extend(Path(p) for p in paths if p is not None)
+        self._wakeup.set()
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Один проход уборки; возвращает счётчики (и сохраняет в last_run)."""
+        now = time.time() if now is None else now
+        stats = {"released": 0, "expired": 0, "compressed": 0, "over_budget": 0,
+                 "files": 0, "bytes": 0}
+
+        with self._lock:
+            released, self._released = self._released, []
+        for path in released:
+            stats["released"] += self._remove(path) + self._remove(_gz_path(path))
+
+        files: List[Tuple[float, int, Path]] = []
+        for path in self._iter_files():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            age = now - st.st_mtime
+            if self.ttl_sec is not None and age > self.ttl_sec:
+                stats["expired"] += self._remove(path)
+                continue
+            if (self.compress_after_sec is not None and age > self.compress_after_sec
+                    and path.name.startswith(ORIGINAL_PREFIX) and path.suffix != GZIP_SUFFIX):
+                compressed = self._compress(path, st.st_mtime)
+                if compressed is not None:
+                    stats["compressed"] += 1
+                    path = compressed
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if self.max_bytes is not None and total > self.max_bytes:
+            files.sort(key=lambda f: f[0])
+            kept = []
+            for mtime, size, path in files:
+                if total > self.max_bytes and self._remove(path):
+                    stats["over_budget"] += 1
+                    total -= size
+                else:
+                    kept.append((mtime, size, path))
+            files = kept
+
+        stats["files"] = len(files)
+        stats["bytes"] = total
+        self.last_run = dict(stats, at=now)
+        return stats
+
+    def start_janitor(self, interval_sec: float) -> None:
+        """Запускает фоновую уборку (повторный вызов ничего не делает)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._janitor_loop, args=(float(interval_sec),),
+                name="report-storage-janitor", daemon=True,
+            )
+            self._thread.start()
+
+    def stop_janitor(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    # ── внутреннее ───────────────────────────────────────────────────
+
+    def _janitor_loop(self, interval_sec: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass  # уборка не должна ронять процесс; следующий проход попробует снова
+            self._wakeup.wait(interval_sec)
+            self._wakeup.clear()
+
+    def _iter_files(self) -> Iterable[Path]:
+        candidates: List[Path] = []
+        if self.root.is_dir():
+            for shard in self.root.iterdir():
+                if shard.is_dir():
+                    candidates.extend(shard.iterdir())
+        if self.legacy_dir is not None and self.legacy_dir.is_dir():
+            for pattern in LEGACY_PATTERNS:
+                candidates.extend(self.legacy_dir.glob(pattern))
+        # .tmp — недописанный архив, его не трогаем
+        return (p for p in candidates if p.suffix != ".tmp" and p.is_file())
+
+    @staticmethod
+    def _remove(path: Path) -> int:
+        try:
+            path.unlink()
+            return 1
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _compress(path: Path, mtime: float) -> Optional[Path]:
+        target = _gz_path(path)
+        tmp = target.with_name(target.name + ".tmp")
+        try:
+            with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.utime(tmp, (mtime, mtime))   # возраст файла не меняется от сжатия
+            tmp.replace(target)
+            path.unlink()
+            return target
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return None
+
+
+def _gz_path(path: Path) -> Path:
+    return path.with_name(path.name + GZIP_SUFFIX)
@@ -6,9 +6,10 @@ normalize_unit(raw) — приведение к стандартной форм
 is_valid_unit(text) — проверка, что строка похожа на единицу.
 """
 
-import re
 from typing import Dict, Set
 
+from parsers import patterns as rx
+
 # ──────────────────────────────────────────────
 # Словарь известных единиц (нормализованная форма → множество написаний)
 # ──────────────────────────────────────────────
@@ -107,8 +108,8 @@ def normalize_unit(raw: str) -> str:
             return val
 
     # Нормализация *10^N внутри строки
-    s2 = re.sub(r"10\s*\*\s*(\d+)", r"10^\1", s)
-    s2 = re.sub(r"[×хx]\s*10\s*\^\s*(\d+)", r"*10^\1", s2, flags=re.IGNORECASE)
+    s2 = rx.POW10_STAR.sub(r"10^\1", s)
+    s2 = rx.POW10_TIMES.sub(r"*10^\1", s2)
     if s2 != s:
         norm = _RAW_TO_NORM.get(s2)
         if norm:
@@ -132,7 +133,7 @@ def is_valid_unit(text: str) -> bool:
         return True
 
     # Эвристика: символ '/' + буквы → вероятная единица
-    if "/" in s and re.search(r"[A-Za-zА-Яа-я]", s):
+    if "/" in s and rx.LETTER.search(s):
         return True
 
     # '%' — тоже единица
@@ -2,6 +2,7 @@
 Universal Extractor v2 — главный парсер для ЛЮБЫХ лабораторий.
 
 universal_extract(raw_text) → str (TSV-кандидаты: name\\tvalue\\tref\\tunit)
+universal_extract_candidates(raw_text) → List[Candidate] (то же записями)
 
 Архитектура:
     1. Для МЕДСИ: делегируем в medsi_inline_to_candidates (не дублируем).
@@ -23,7 +24,9 @@ _PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from parsers.line_scorer import score_line, is_noise, has_ref_pattern, has_numeric_value, has_known_biomarker
+from parsers import patterns as rx
+from parsers.candidates import Candidate, format_candidates
+from parsers.line_scorer import line_features, is_noise, has_ref_pattern, has_numeric_value, has_known_biomarker
 from parsers.unit_dictionary import normalize_unit, is_valid_unit
 
 
@@ -43,6 +46,13 @@ _SEE_TEXT_BROAD = re.compile(
 )
 
 
+# Строка-значение (число, возможно со стрелкой / плюсом)
+_VALUE_LINE_RE = re.compile(r'^[↑↓+]?\s*\d')
+
+# Candidate.source кандидатов этого экстрактора
+_SOURCE = "universal"
+
+
 # ──────────────────────────────────────────────
 # Вспомогательные функции (не дублируем engine.py,
 # но используем минимальные обёртки для автономности)
@@ -54,13 +64,13 @@ def _normalize_scientific_notation(s: str) -> str:
     s = s.replace("⁴", "^4").replace("⁵", "^5").replace("⁶", "^6")
     s = s.replace("⁷", "^7").replace("⁸", "^8").replace("⁹", "^9").replace("⁰", "^0")
     # Только ~ и * (без -), чтобы не ловить референсные диапазоны типа "10 - 40"
-    s = re.sub(r"10\s*[~*]\s*(\d+)", r"10^\1", s, flags=re.IGNORECASE)
+    s = rx.POW10_OCR_VARIANT.sub(r"10^\1", s)
     return s
 
 
 def _parse_float(x: str) -> Optional[float]:
     x = (x or "").strip().replace(",", ".")
-    x = re.sub(r"[^\d\.\-]", "", x)
+    x = rx.NOT_NUMBER_CHARS.sub("", x)
     try:
         return float(x)
     except Exception:
@@ -70,19 +80,19 @@ def _parse_float(x: str) -> Optional[float]:
 def _extract_ref_text(s: str) -> str:
     """Извлекает референсный диапазон из строки."""
     t = (s or "").strip().replace("—", "-").replace("–", "-").replace(",", ".")
-    t = re.sub(r"\s+", " ", t)
+    t = rx.WHITESPACE.sub(" ", t)
 
-    m = re.search(r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_RANGE_DOT.search(t)
     if m:
         return f"{m.group(1)}-{m.group(2)}"
 
-    m = re.search(r"(<=|>=|<|>|≤|≥)\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_COMPARATOR_DOT.search(t)
     if m:
         op = m.group(1).replace("≤", "<=").replace("≥", ">=")
         return f"{op}{m.group(2)}"
 
     # Формат «до число» → «<число»
-    m = re.search(r"(?:^|\s)[Дд]о\s*(\d+(?:\.\d+)?)", t)
+    m = rx.REF_UPTO.search(t)
     if m:
         return f"<{m.group(1)}"
 
@@ -147,39 +157,39 @@ def _is_scale_annotation(line: str) -> bool:
             return True
 
     # Паттерн 2: строка начинается с ">число" или "<число" и содержит текст-описание
-    if re.match(r'^[><≤≥]\s*\d', s):
-        if re.search(r'(риск|уровень|норм)', low):
+    if rx.SCALE_COMPARATOR_START.match(s):
+        if rx.SCALE_WORDS_RISK.search(low):
             return True
 
     # Паттерн 3: "число-число ммоль/л - текст описания" (без имени биомаркера)
-    if re.match(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*\s+\S+\s*[-–—]\s*\w', s):
-        if re.search(r'(риск|уровень|норм)', low):
+    if rx.SCALE_RANGE_DASH_TEXT.match(s):
+        if rx.SCALE_WORDS_RISK.search(low):
             return True
 
     # Паттерн 4: "до N% ..." или "N.N% и более ..." с описанием уровня/нормы
-    if re.match(r'^до\s+\d', low) and re.search(r'(содержание|уровень|норм|риск|критерий)', low):
+    if rx.SCALE_UPTO_START.match(low) and rx.SCALE_WORDS_CRITERIA.search(low):
         return True
-    if re.match(r'^\d+[.,]?\d*%\s+(и более|и выше|включительно)', low):
-        if re.search(r'(содержание|уровень|норм|риск|критерий|диабет)', low):
+    if rx.SCALE_PERCENT_AND_MORE.match(low):
+        if rx.SCALE_WORDS_DIABETES.search(low):
             return True
 
     # Паттерн 5: "N.N-N.N% - описание" (напр. "6.0-6.4% - рекомендуется консультация")
-    if re.match(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*%\s*[-–—]\s*\w', s):
-        if re.search(r'(риск|уровень|норм|консультаци|критерий)', low):
+    if rx.SCALE_PERCENT_RANGE_DASH_TEXT.match(s):
+        if rx.SCALE_WORDS_CONSULT.search(low):
             return True
 
     # P7: агрессивные паттерны для HbA1c шкалы (без требования ключевых слов)
 
     # "6.0-6.4% - рекомендуется консультация" — процентный диапазон в начале строки
-    if re.match(r'^\d+[.,]?\d*\s*[-–—]\s*\d+[.,]?\d*\s*%', s):
+    if rx.SCALE_PERCENT_RANGE.match(s):
         return True
 
     # "до N..." в начале строки — шкальная аннотация
-    if re.match(r'^до\s+\d', low):
+    if rx.SCALE_UPTO_START.match(low):
         return True
 
     # "N% и более" в любом месте строки
-    if re.search(r'\d+[.,]?\d*\s*%\s+и\s+более', low):
+    if rx.SCALE_PERCENT_AND_MORE_ANY.search(low):
         return True
 
     # Паттерн 6 (P6): строка СОДЕРЖИТ фразу описания риска/уровня в любом месте,
@@ -203,7 +213,7 @@ def _is_scale_annotation(line: str) -> bool:
 
 def _starts_like_value_line(s: str) -> bool:
     t = (s or "").strip()
-    return bool(re.match(r"^(?:[↑↓+]\s*)?\d", t))
+    return bool(rx.VALUE_LINE_START.match(t))
 
 
 def _looks_like_name_line(s: str) -> bool:
@@ -217,7 +227,7 @@ def _looks_like_name_line(s: str) -> bool:
         return False
     if _starts_like_value_line(t):
         return False
-    if not re.search(r"[A-Za-zА-Яа-я]{2,}", t):
+    if not rx.LETTERS2.search(t):
         return False
 
     # P6/P7: отклонить строки, которые являются ТОЛЬКО указанием биоматериала.
@@ -243,20 +253,14 @@ def _preclean_line(s: str) -> str:
     """
     if not s:
         return s
-    out = re.sub(
-        r'\bA\d{2}\.\d{2}\.\d{3}(?:\.\d+)?(?:\s*,\s*A\d{2}\.\d{2}\.\d{3}(?:\.\d+)?)*',
-        '', s,
-    )
-    out = re.sub(r'\(Приказ[^)]*\)', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'\(Приказ[^)]*$', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'^МЗ\s+РФ[^)]*\)', '', out, flags=re.IGNORECASE)
-    out = re.sub(
-        r'\(\s*(?:венозная кровь|сыворотка крови|кровь[^)]*|капиллярная кровь|плазма крови?)\s*\)',
-        '', out, flags=re.IGNORECASE,
-    )
-    out = re.sub(r'\(в соответствии[^)]*\)', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'Дата исследования[:\s]*[\d.]+[;\s]*', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'\s+', ' ', out).strip()
+    out = rx.SERVICE_CODES.sub('', s)
+    out = rx.ORDER_PARENS.sub('', out)
+    out = rx.ORDER_PARENS_OPEN.sub('', out)
+    out = rx.MZ_RF_TAIL.sub('', out)
+    out = rx.BIOMATERIAL_PARENS_EXT.sub('', out)
+    out = rx.METHOD_QUALIFIER_PARENS.sub('', out)
+    out = rx.STUDY_DATE.sub('', out)
+    out = rx.WHITESPACE.sub(' ', out).strip()
     return out
 
 
@@ -269,7 +273,13 @@ def _try_parse_one_line(line: str) -> Optional[str]:
     Формат: «Имя показателя  значение  единица  ref_low - ref_high»
     Возвращает TSV: name\\tvalue\\tref\\tunit или None.
     """
-    s = re.sub(r"\s+", " ", (line or "").strip())
+    cand = _one_line_candidate(line)
+    return cand.to_tsv() if cand is not None else None
+
+
+def _one_line_candidate(line: str) -> Optional[Candidate]:
+    """_try_parse_one_line, но возвращает Candidate."""
+    s = rx.WHITESPACE.sub(" ", (line or "").strip())
     if not s:
         return None
     if is_noise(s):
@@ -297,7 +307,7 @@ def _try_parse_one_line(line: str) -> Optional[str]:
         s_clean_norm = s_clean.replace(",", ".")
         s_clean_norm = _normalize_scientific_notation(s_clean_norm)
 
-        nums = re.findall(r"[-+]?\d+(?:\.\d+)?", s_clean_norm)
+        nums = rx.NUMBER.findall(s_clean_norm)
 
         if nums:
             # Value BEFORE see-text marker (e.g. "Холестерин 4.73 см. текст")
@@ -309,42 +319,36 @@ def _try_parse_one_line(line: str) -> Optional[str]:
             after_value = s_clean_norm.split(value_str, 1)[1].strip() if value_str in s_clean_norm else ""
             unit = ""
             if after_value:
-                unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", after_value)
+                unit_match = rx.UNIT_TOKEN.match(after_value)
                 if unit_match:
                     unit = unit_match.group(1).strip()
-            if not name_part or not re.search(r"[A-Za-zА-Яа-я]", name_part):
+            if not name_part or not rx.LETTER.search(name_part):
                 return None
-            return f"{name_part}\t{value:g}\t\t{unit}"
+            return Candidate(name_part, value, "", unit, source=_SOURCE, strip_tsv=False)
 
         # Value AFTER see-text marker (e.g. "ЛПВП (HDL) см. интерпретацию 1.567")
         s_after = s_norm[see_text_match.end():].strip()
         if s_after:
             s_after_norm = s_after.replace(",", ".")
-            nums_after = re.findall(r"[-+]?\d+(?:\.\d+)?", s_after_norm)
+            nums_after = rx.NUMBER.findall(s_after_norm)
             if nums_after:
                 value_str = nums_after[-1]
                 # Strip trailing lab code from bare see-text value: "1.567" → "1.56"
-                m_code = re.match(r'(\d+\.\d{2})\d+$', value_str)
+                m_code = rx.CODE_GLUED_VALUE.match(value_str)
                 if m_code:
                     value_str = m_code.group(1)
                 value = _parse_float(value_str)
                 if value is not None:
                     name_part = s_clean
-                    if name_part and re.search(r"[A-Za-zА-Яа-я]", name_part):
-                        return f"{name_part}\t{value:g}\t\t"
+                    if name_part and rx.LETTER.search(name_part):
+                        return Candidate(name_part, value, source=_SOURCE, strip_tsv=False)
 
         return None
 
     # Ищем референсный диапазон
-    range_match = re.search(
-        r"(-?\d+(?:[.,]\d+)?)\s*[–—-]\s*(-?\d+(?:[.,]\d+)?)", s_norm
-    )
-    comp_match = re.search(
-        r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)", s_norm
-    )
-    do_match = re.search(
-        r"[Дд]о\s*(\d+(?:[.,]\d+)?)", s_norm
-    )
+    range_match = rx.REF_RANGE.search(s_norm)
+    comp_match = rx.REF_COMPARATOR.search(s_norm)
+    do_match = rx.REF_UPTO_ANY.search(s_norm)
 
     ref_span = None
     ref_text = ""
@@ -373,10 +377,8 @@ def _try_parse_one_line(line: str) -> Optional[str]:
     # When first comp_match is used as ref but left has no digits,
     # look for a second comp operator → first is value, second is ref.
     if not range_match and comp_match and ref_span == comp_match.span():
-        if not re.search(r"\d", left):
-            second_comp = re.search(
-                r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)", right
-            )
+        if not rx.DIGIT.search(left):
+            second_comp = rx.REF_COMPARATOR.search(right)
             if second_comp:
                 value_num = _parse_float(comp_match.group(2).replace(",", "."))
                 if value_num is not None:
@@ -386,22 +388,17 @@ def _try_parse_one_line(line: str) -> Optional[str]:
                     between = right[:second_comp.start()].strip()
                     unit = between if between else ""
                     name_part = left.strip()
-                    if name_part and re.search(r"[A-Za-zА-Яа-я]", name_part):
-                        return f"{name_part}\t{value_num:g}\t{new_ref}\t{unit}".strip()
+                    if name_part and rx.LETTER.search(name_part):
+                        return Candidate(name_part, value_num, new_ref, unit, source=_SOURCE)
 
     # Ищем значение в left
     left_norm = left.replace(",", ".")
     left_norm = _normalize_scientific_notation(left_norm)
 
     # Сначала: формат *10^N (включая x10^N из pypdf после P10-склейки)
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)",
-        r"([-+]?\d+(?:[.,]\d+)?)[-+]?\s+[xхXХ]\*?10\s*\^\s*(\d+)",
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)",
-    ]
     pow_match = None
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, left_norm, re.IGNORECASE)
+    for pattern in rx.POW10_VALUE:
+        pow_match = pattern.search(left_norm)
         if pow_match:
             break
 
@@ -419,11 +416,11 @@ def _try_parse_one_line(line: str) -> Optional[str]:
             unit = f"*10^{exp}"
             if right:
                 right_unit = right.split(" ")[0].strip()
-                if right_unit and not re.match(r"^\d", right_unit):
+                if right_unit and not rx.LEADING_DIGIT.match(right_unit):
                     unit = f"{unit}{right_unit}"
     else:
         # Обычный формат
-        nums = re.findall(r"[-+]?\d+(?:\.\d+)?", left_norm)
+        nums = rx.NUMBER.findall(left_norm)
         if not nums:
             return None
         value_str = nums[-1]
@@ -432,23 +429,23 @@ def _try_parse_one_line(line: str) -> Optional[str]:
             return None
         name_part = left_norm.rsplit(value_str, 1)[0].strip()
         # Strip trailing comparison operators (e.g., "Тестостерон >" → "Тестостерон")
-        name_part = re.sub(r'\s*[<>≤≥]=?\s*$', '', name_part).strip()
+        name_part = rx.TRAILING_COMPARATOR.sub('', name_part).strip()
         unit = ""
         after_value = left_norm.split(value_str, 1)[1] if value_str in left_norm else ""
         if after_value:
             after_value = after_value.strip()
-            unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", after_value)
+            unit_match = rx.UNIT_TOKEN.match(after_value)
             if unit_match:
                 unit = unit_match.group(1).strip()
         if not unit and right:
             right_first = right.split(" ")[0].strip()
-            if right_first and not re.match(r"^\d", right_first):
+            if right_first and not rx.LEADING_DIGIT.match(right_first):
                 unit = right_first
 
-    if not name_part or not re.search(r"[A-Za-zА-Яа-я]", name_part):
+    if not name_part or not rx.LETTER.search(name_part):
         return None
 
-    return f"{name_part}\t{value:g}\t{ref_text}\t{unit}".strip()
+    return Candidate(name_part, value, ref_text, unit, source=_SOURCE)
 
 
 # ──────────────────────────────────────────────
@@ -464,14 +461,14 @@ def _extract_unit_from_line(s: str) -> str:
     if not t or len(t) > 20:  # unit не может быть длиннее 20 символов
         return ""
     # Содержит числа (кроме *10^N) — не чистый unit
-    if has_numeric_value(t) and not re.match(r"^[xхXХ]?\*?10[\^*]\d+", t):
+    if has_numeric_value(t) and not rx.POW10_START.match(t):
         return ""
     t_norm = _normalize_scientific_notation(t)
     # Проверяем через unit_dictionary
     if is_valid_unit(t_norm.strip(".,;:()")):
         return t_norm
     # Проверяем шаблоны: *10^N/л, г/л и т.д.
-    if re.match(r"^[xхXХ]?\*?10\s*\^\s*\d+/[а-яa-z]+$", t_norm, re.IGNORECASE):
+    if rx.POW10_UNIT_ONLY.match(t_norm):
         return t_norm
     return ""
 
@@ -481,22 +478,17 @@ def _extract_unit_from_line(s: str) -> str:
 # ──────────────────────────────────────────────
 def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
     """Парсит значение и единицу из строки-значения."""
-    t = re.sub(r"\s+", " ", (s or "").strip())
+    t = rx.WHITESPACE.sub(" ", (s or "").strip())
     t = t.replace("↑", "").replace("↓", "").replace("+", "").strip()
     # Убираем trailing dash (Гемотест: "0.28-" означает ↓)
-    t = re.sub(r"^(\d+(?:[.,]\d+)?)\s*-$", r"\1", t)
+    t = rx.TRAILING_DASH_VALUE.sub(r"\1", t)
     # Strip leading comparison operators: "< 37 пмоль/л" → "37 пмоль/л"
-    t = re.sub(r"^[<>≤≥]=?\s*", "", t).strip()
+    t = rx.LEADING_COMPARATOR.sub("", t).strip()
     t = _normalize_scientific_notation(t)
 
     # *10^N (включая x10^N из pypdf после P10-склейки)
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)(.*)$",
-        r"([-+]?\d+(?:[.,]\d+)?)[-+]?\s+[xхXХ]\*?10\s*\^\s*(\d+)(.*)$",
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)(.*)$",
-    ]
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, t, re.IGNORECASE)
+    for pattern in rx.POW10_VALUE_UNIT:
+        pow_match = pattern.search(t)
         if pow_match:
             base = _parse_float(pow_match.group(1))
             if base is not None:
@@ -508,13 +500,13 @@ def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
                 return base, unit
 
     # Обычный формат
-    m = re.match(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)$", t)
+    m = rx.VALUE_WITH_REST.match(t)
     if not m:
         return None, ""
     val = _parse_float(m.group(1))
     rest = (m.group(2) or "").strip()
     if rest:
-        unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", rest)
+        unit_match = rx.UNIT_TOKEN.match(rest)
         if unit_match:
             unit = unit_match.group(1).strip()
         else:
@@ -533,133 +525,142 @@ def _multi_line_pass(lines: List[str]) -> List[str]:
 
     Возвращает список TSV-кандидатов: name\\tvalue\\tref\\tunit.
     """
-    out: List[str] = []
-    i = 0
+    return [c.to_tsv() for c in _multi_line_candidates(lines)]
 
-    while i < len(lines):
-        ln = lines[i]
 
-        # Ищем строку-имя
-        if not _looks_like_name_line(ln):
-            i += 1
-            continue
+# Окно Pass 2: строка-имя + 3 строки + строка «Смотри текст» сразу после окна
+_MULTI_LINE_WINDOW = 5
 
-        # Если строка содержит "Смотри текст" — это однострочный кейс с пустым ref,
-        # не ищем ref в следующих строках (иначе зацепим мусорные пояснения).
-        if _SEE_TEXT_PATTERN.search(ln):
-            i += 1
-            continue
 
-        # P9: Очищаем имя от регуляторных кодов для формирования кандидата
-        name_clean = _preclean_line(ln)
-        if not name_clean:
-            i += 1
-            continue
+def _multi_line_candidates(lines: List[str]) -> List[Candidate]:
+    """Pass 2 записями Candidate; span — номера строк, из которых собран кандидат."""
+    out: List[Candidate] = []
+    i = 0
+    while i < len(lines):
+        candidate, advance = _multi_line_step(lines[i:i + _MULTI_LINE_WINDOW])
+        if candidate is not None:
+            candidate.span = (i, i + advance)
+            out.append(candidate)
+        i += advance
+    return out
 
-        # Нашли имя — собираем окно из следующих 1–3 строк
-        window = lines[i + 1: i + 4]  # максимум 3 строки после имени
 
-        value_found: Optional[float] = None
-        unit_found: str = ""
-        ref_found: str = ""
-        consumed: int = 0  # сколько строк из окна использовали
+def _multi_line_step(lines: List[str]) -> Tuple[Optional[Candidate], int]:
+    """
+    Один шаг Pass 2 для строки lines[0] (lines — она и до 4 следующих строк).
+    Возвращает (кандидат или None, сколько строк пройдено).
+    """
+    ln = lines[0]
+
+    # Ищем строку-имя
+    if not _looks_like_name_line(ln):
+        return None, 1
+
+    # Если строка содержит "Смотри текст" — это однострочный кейс с пустым ref,
+    # не ищем ref в следующих строках (иначе зацепим мусорные пояснения).
+    if _SEE_TEXT_PATTERN.search(ln):
+        return None, 1
+
+    # P9: Очищаем имя от регуляторных кодов для формирования кандидата
+    name_clean = _preclean_line(ln)
+    if not name_clean:
+        return None, 1
+
+    # Нашли имя — собираем окно из следующих 1–3 строк
+    window = lines[1:4]  # максимум 3 строки после имени
+
+    value_found: Optional[float] = None
+    unit_found: str = ""
+    ref_found: str = ""
+    consumed: int = 0  # сколько строк из окна использовали
+
+    for j, w in enumerate(window):
+        w_stripped = (w or "").strip()
+        if not w_stripped:
+            continue  # пустая строка → пропуск
+
+        # P9: Pre-clean regulatory codes in window lines
+        w_stripped = _preclean_line(w_stripped)
+        if not w_stripped:
+            consumed = j + 1
+            continue  # строка содержала только регуляторный код → пропуск
+
+        # Если строка — noise, но НЕ числовая → пропускаем (не ломаем окно)
+        if is_noise(w_stripped) and not _VALUE_LINE_RE.match(w_stripped):
+            consumed = j + 1
+            continue
 
-        for j, w in enumerate(window):
-            w_stripped = (w or "").strip()
-            if not w_stripped:
-                continue  # пустая строка → пропуск
+        # Если встретили строку-имя, которая НЕ является единицей → СТОП
+        if _looks_like_name_line(w_stripped) and not _extract_unit_from_line(w_stripped):
+            break
 
-            # P9: Pre-clean regulatory codes in window lines
-            w_stripped = _preclean_line(w_stripped)
-            if not w_stripped:
+        # --- Компонент: value (+ возможно unit и ref в той же строке) ---
+        if value_found is None and _starts_like_value_line(w_stripped):
+            val, unit_candidate = _parse_value_unit_from_line(w_stripped)
+            if val is not None:
+                value_found = val
+                if unit_candidate:
+                    unit_found = unit_candidate
+                # Ref тоже может быть на этой же строке (напр. "34.7 % 35.0 - 45.0")
+                if not ref_found:
+                    ref_candidate = _extract_ref_text(w_stripped)
+                    if ref_candidate:
+                        ref_found = ref_candidate
                 consumed = j + 1
-                continue  # строка содержала только регуляторный код → пропуск
+                continue
 
-            # Если строка — noise, но НЕ числовая → пропускаем (не ломаем окно)
-            if is_noise(w_stripped) and not re.match(r'^[↑↓+]?\s*\d', w_stripped):
+        # --- Компонент: ref ---
+        if not ref_found:
+            ref_candidate = _extract_ref_text(w_stripped)
+            if ref_candidate:
+                ref_found = ref_candidate
                 consumed = j + 1
                 continue
 
-            # Если встретили строку-имя, которая НЕ является единицей → СТОП
-            if _looks_like_name_line(w_stripped) and not _extract_unit_from_line(w_stripped):
-                break
-
-            # --- Компонент: value (+ возможно unit и ref в той же строке) ---
-            if value_found is None and _starts_like_value_line(w_stripped):
-                val, unit_candidate = _parse_value_unit_from_line(w_stripped)
-                if val is not None:
-                    value_found = val
-                    if unit_candidate:
-                        unit_found = unit_candidate
-                    # Ref тоже может быть на этой же строке (напр. "34.7 % 35.0 - 45.0")
-                    if not ref_found:
-                        ref_candidate = _extract_ref_text(w_stripped)
-                        if ref_candidate:
-                            ref_found = ref_candidate
-                    consumed = j + 1
-                    continue
-
-            # --- Компонент: ref ---
-            if not ref_found:
-                ref_candidate = _extract_ref_text(w_stripped)
-                if ref_candidate:
-                    ref_found = ref_candidate
-                    consumed = j + 1
-                    continue
-
-            # --- Компонент: unit (на отдельной строке) ---
-            if not unit_found:
-                unit_candidate = _extract_unit_from_line(w_stripped)
-                if unit_candidate:
-                    unit_found = unit_candidate
-                    consumed = j + 1
-                    continue
-
-            # Строка не дала ни одного компонента → СТОП
-            break
-
-        # Формируем кандидата: обязательны value + ref
-        if value_found is not None and ref_found:
-            candidate = f"{name_clean}\t{value_found:g}\t{ref_found}\t{unit_found}".strip()
-            out.append(candidate)
-            i += 1 + consumed  # перепрыгиваем использованные строки
-            continue
-
-        # P6: если нашли value, но НЕТ ref — проверяем, не стоит ли дальше "Смотри текст"
-        if value_found is not None and not ref_found:
-            next_idx = i + 1 + consumed
-            if next_idx < len(lines) and _SEE_TEXT_PATTERN.search(lines[next_idx]):
-                candidate = f"{name_clean}\t{value_found:g}\t\t{unit_found}".strip()
-                out.append(candidate)
-                i = next_idx + 1  # перепрыгиваем строку "Смотри текст"
+        # --- Компонент: unit (на отдельной строке) ---
+        if not unit_found:
+            unit_candidate = _extract_unit_from_line(w_stripped)
+            if unit_candidate:
+                unit_found = unit_candidate
+                consumed = j + 1
                 continue
 
-        # P6: если value НЕ найдено в окне, но в самой строке-имени есть число,
-        # а следующая строка — "Смотри текст" → извлекаем value из строки-имени
-        if value_found is None and not ref_found:
-            next_check_idx = i + 1
-            if next_check_idx < len(lines) and _SEE_TEXT_PATTERN.search(lines[next_check_idx]):
-                ln_norm = name_clean.replace(",", ".")
-                ln_norm = _normalize_scientific_notation(ln_norm)
-                nums = re.findall(r"[-+]?\d+(?:\.\d+)?", ln_norm)
-                if nums:
-                    val = _parse_float(nums[-1])
-                    if val is not None:
-                        val_str = nums[-1]
-                        after_val = ln_norm.split(val_str, 1)[-1].strip() if val_str in ln_norm else ""
-                        embedded_unit = ""
-                        if after_val:
-                            u_match = re.match(r"^([A-Za-zА-Яа-яµ%/\.\-]+(?:[/%][^/\s]*)?)", after_val)
-                            if u_match:
-                                embedded_unit = u_match.group(1).strip()
-                        candidate = f"{name_clean}\t{val:g}\t\t{embedded_unit}".strip()
-                        out.append(candidate)
-                        i = next_check_idx + 1
-                        continue
-
-        i += 1
+        # Строка не дала ни одного компонента → СТОП
+        break
+
+    # Формируем кандидата: обязательны value + ref
+    if value_found is not None and ref_found:
+        candidate = Candidate(name_clean, value_found, ref_found, unit_found, source=_SOURCE)
+        return candidate, 1 + consumed  # перепрыгиваем использованные строки
+
+    # P6: если нашли value, но НЕТ ref — проверяем, не стоит ли дальше "Смотри текст"
+    if value_found is not None and not ref_found:
+        next_idx = 1 + consumed
+        if next_idx < len(lines) and _SEE_TEXT_PATTERN.search(lines[next_idx]):
+            candidate = Candidate(name_clean, value_found, "", unit_found, source=_SOURCE)
+            return candidate, next_idx + 1  # перепрыгиваем строку "Смотри текст"
+
+    # P6: если value НЕ найдено в окне, но в самой строке-имени есть число,
+    # а следующая строка — "Смотри текст" → извлекаем value из строки-имени
+    if value_found is None and not ref_found:
+        if len(lines) > 1 and _SEE_TEXT_PATTERN.search(lines[1]):
+            ln_norm = name_clean.replace(",", ".")
+            ln_norm = _normalize_scientific_notation(ln_norm)
+            nums = rx.NUMBER.findall(ln_norm)
+            if nums:
+                val = _parse_float(nums[-1])
+                if val is not None:
+                    val_str = nums[-1]
+                    after_val = ln_norm.split(val_str, 1)[-1].strip() if val_str in ln_norm else ""
+                    embedded_unit = ""
+                    if after_val:
+                        u_match = rx.UNIT_WORD_TOKEN.match(after_val)
+                        if u_match:
+                            embedded_unit = u_match.group(1).strip()
+                    candidate = Candidate(name_clean, val, "", embedded_unit, source=_SOURCE)
+                    return candidate, 2
 
-    return out
+    return None, 1
 
 
 def _two_line_pass_legacy(lines: List[str]) -> List[str]:
@@ -685,7 +686,7 @@ def _two_line_pass_legacy(lines: List[str]) -> List[str]:
 
         if pending_name and _starts_like_value_line(ln):
             combined_line = ln
-            if i + 1 < len(lines) and re.search(r"^\s*\d+\s", lines[i + 1]):
+            if i + 1 < len(lines) and rx.NEXT_LINE_NUMBER.search(lines[i + 1]):
                 combined_line = f"{ln} {lines[i + 1]}"
 
             val, unit = _parse_value_unit_from_line(combined_line)
@@ -723,15 +724,12 @@ def _two_line_pass_legacy(lines: List[str]) -> List[str]:
 # ──────────────────────────────────────────────
 # Дедупликация
 # ──────────────────────────────────────────────
-def _dedup_candidates(candidates: List[str]) -> List[str]:
+def _dedup_candidates(candidates: List[Candidate]) -> List[Candidate]:
     """Дедупликация по ключу: (name_norm, value)."""
     seen: Set[str] = set()
-    result: List[str] = []
+    result: List[Candidate] = []
     for c in candidates:
-        parts = c.split("\t")
-        if len(parts) < 2:
-            continue
-        key = re.sub(r"\s+", " ", parts[0].strip().lower()) + "|" + parts[1].strip()
+        key = _WS_RE.sub(" ", c.name.strip().lower()) + "|" + c.value_str
         if key not in seen:
             seen.add(key)
             result.append(c)
@@ -750,14 +748,7 @@ def _strip_prefix_unit(line: str) -> str:
          '%Гематокрит ...' → 'Гематокрит ...'
     Only strips when next char after unit is uppercase (start of name).
     """
-    m = re.match(
-        r'^(10\s*\^?\s*\d{1,2}\s*/\s*[а-яa-z]+'
-        r'|[а-яА-Яa-zA-Z]{1,6}/[а-яa-z]+'
-        r'|МЕ/[а-яa-z]+'
-        r'|мм/ч(?:ас)?'
-        r'|%|фл|пг)',
-        line
-    )
+    m = rx.UNIT_PREFIX.match(line)
     if m:
         rest = line[m.end():]
         if rest and rest[0].isupper():
@@ -775,10 +766,7 @@ def _strip_trailing_lab_code(line: str) -> str:
     '... 0.010 - 0.0901001' → '... 0.010 - 0.090' (low 3dec → high 3dec)
     """
     # Range: "low.DDD - high.DDDCCC" at end of line
-    m = re.search(
-        r'(\d+)\.(\d+)\s*[-–—]\s*(\d+)\.(\d+)\s*$',
-        line
-    )
+    m = rx.GLUED_RANGE_DECIMALS.search(line)
     if m:
         low_dec_len = len(m.group(2))
         high_dec_str = m.group(4)
@@ -788,10 +776,7 @@ def _strip_trailing_lab_code(line: str) -> str:
         return line
 
     # Comparison: "<|>|<=|>=|≤|≥ number.DDCCC" at end of line
-    m = re.search(
-        r'([<>≤≥]=?)\s*(\d+\.\d{2})(\d{1,5})\s*$',
-        line
-    )
+    m = rx.GLUED_COMPARATOR_DECIMALS.search(line)
     if m:
         return line[:m.start(3)]
 
@@ -800,7 +785,7 @@ def _strip_trailing_lab_code(line: str) -> str:
 
 def _strip_asterisk_marker(line: str) -> str:
     """Remove asterisk (*) after numeric values: '5.32*' → '5.32'"""
-    return re.sub(r'(\d)\*(?=\s|$|[а-яА-Яa-zA-Z])', r'\1', line)
+    return rx.STAR_AFTER_DIGIT.sub(r'\1', line)
 
 
 def _strip_direct_determination(line: str) -> str:
@@ -810,9 +795,9 @@ def _strip_direct_determination(line: str) -> str:
     Split case: '(ЛПНП, LDL) - прямое' at end → '(ЛПНП, LDL)'
                'определение 1.83 ...' at start → '1.83 ...'
     """
-    out = re.sub(r'\s*-\s*прямое\s+определение\b', '', line, flags=re.IGNORECASE)
-    out = re.sub(r'\s*-\s*прямое\s*$', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'^определение\s+(?=\d)', '', out, flags=re.IGNORECASE)
+    out = rx.DIRECT_METHOD_SUFFIX.sub('', line)
+    out = rx.DIRECT_METHOD_TAIL.sub('', out)
+    out = rx.METHOD_PREFIX.sub('', out)
     return out
 
 
@@ -857,10 +842,10 @@ def _rejoin_broken_units(lines: List[str]) -> List[str]:
     i = 0
     while i < len(lines):
         ln = lines[i]
-        if (ln.rstrip().endswith('/') and 
-            i + 1 < len(lines) and 
-            len(lines[i + 1].strip()) <= 2 and 
-            re.match(r'^[а-яА-Яa-zA-Z]+$', lines[i + 1].strip())):
+        if (ln.rstrip().endswith('/') and
+            i + 1 < len(lines) and
+            len(lines[i + 1].strip()) <= 2 and
+            _UNIT_TAIL_RE.match(lines[i + 1].strip())):
             result.append(ln.rstrip() + lines[i + 1].strip())
             i += 2
         else:
@@ -869,6 +854,9 @@ def _rejoin_broken_units(lines: List[str]) -> List[str]:
     return result
 
 
+_UNIT_TAIL_RE = re.compile(r'^[а-яА-Яa-zA-Z]+$')
+
+
 def _rejoin_broken_names(lines: List[str]) -> List[str]:
     """
     Склеивает имя показателя с продолжением в скобках:
@@ -883,18 +871,18 @@ def _rejoin_broken_names(lines: List[str]) -> List[str]:
     i = 0
     while i < len(lines):
         ln = lines[i]
-        if (i + 1 < len(lines) and 
+        if (i + 1 < len(lines) and
             _looks_like_name_line(ln) and
             not _starts_like_value_line(ln)):
             next_ln = lines[i + 1].strip()
             # Случай 1: следующая строка — код в скобках: (MCV), (МСН), (МСНС)
-            if re.match(r'^\([A-Za-zА-Яа-яёЁ0-9\-]+\)$', next_ln):
+            if _NAME_CODE_TAIL_RE.match(next_ln):
                 result.append(ln.strip() + ' ' + next_ln)
                 i += 2
                 continue
             # Случай 2: следующая строка — короткое слово (Hb, IgG и т.п.)
-            if (len(next_ln) <= 5 and 
-                re.match(r'^[A-Za-z][A-Za-z0-9]*$', next_ln) and
+            if (len(next_ln) <= 5 and
+                _NAME_WORD_TAIL_RE.match(next_ln) and
                 not _starts_like_value_line(next_ln)):
                 result.append(ln.strip() + ' ' + next_ln)
                 i += 2
@@ -904,6 +892,10 @@ def _rejoin_broken_names(lines: List[str]) -> List[str]:
     return result
 
 
+_NAME_CODE_TAIL_RE = re.compile(r'^\([A-Za-zА-Яа-яёЁ0-9\-]+\)$')
+_NAME_WORD_TAIL_RE = re.compile(r'^[A-Za-z][A-Za-z0-9]*$')
+
+
 # ──────────────────────────────────────────────
 # P13: Rejoin lines with unclosed parentheses
 # ──────────────────────────────────────────────
@@ -945,17 +937,17 @@ def _is_discardable_fragment(s: str) -> bool:
         return True
 
     # Service codes: A09.05.XXX (одиночные и через запятую)
-    if re.match(r'^a\d{2}\.\d{2}\.\d{3}', low):
+    if rx.SERVICE_CODE_START.match(low):
         return True
 
     # Regulatory: ТОЛЬКО автономные фрагменты (не полные строки-показатели)
-    if re.match(r'^\(?приказ', low):
+    if rx.ORDER_START.match(low):
         return True
     if low.startswith('мз рф') or low.startswith('мз  рф'):
         return True
-    if low.strip() == '№' or re.match(r'^№\s*$', low):
+    if low.strip() == '№' or rx.NUMBER_SIGN_ONLY.match(low):
         return True
-    if re.match(r'^\d{3,4}(?:н\)?|\))\s*$', low):
+    if rx.ORDER_NUMBER_TAIL.match(low):
         return True
 
     # Biomaterial in parentheses — standalone
@@ -1008,15 +1000,10 @@ def _is_unit_only(s: str) -> bool:
     t = (s or "").strip()
     if not t or len(t) > 20:
         return False
-    if re.match(
-        r'^(?:ммоль/л|мкмоль/л|г/л|мг/л|мг/дл|Ед/л|МЕ/л|мл/мин|нг/мл|'
-        r'пмоль/л|нмоль/л|%|фл|пг|г/дл|мм/ч(?:ас)?|тыс/мкл|млн/мкл|'
-        r'10\^[39]/л|[xхXХ]?\*?10[\^*]?\d+/[а-яa-z]+)\s*$',
-        t, re.IGNORECASE,
-    ):
+    if rx.UNIT_ONLY_LINE.match(t):
         return True
     # Broken unit fragments: "x10*12/", "x10*9/" (ending with /)
-    if re.match(r'^[xхXХ]?\*?10[\^*]\d+/\s*$', t, re.IGNORECASE):
+    if rx.POW10_OPEN_UNIT.match(t):
         return True
     return False
 
@@ -1026,9 +1013,9 @@ def _is_ref_range_line(s: str) -> bool:
     t = (s or "").strip()
     if not t:
         return False
-    if re.match(r'^\d+(?:[.,]\d+)?\s*[-–—]\s*\d+(?:[.,]\d+)?$', t):
+    if rx.RANGE_ONLY_LINE.match(t):
         return True
-    if re.match(r'^(?:<=|>=|<|>|≤|≥)\s*\d+(?:[.,]\d+)?\s*$', t):
+    if rx.COMPARATOR_ONLY_LINE.match(t):
         return True
     return False
 
@@ -1059,8 +1046,7 @@ def _rejoin_fragmented_lines(lines: list[str]) -> list[str]:
         # 1. «Смотри текст» → add to buf + flush
         if _SEE_TEXT_PATTERN.search(stripped):
             buf.append(stripped)
-            if buf:
-                out.append(' '.join(buf))
+            out.append(' '.join(buf))
             buf = []
             continue
 
@@ -1070,26 +1056,19 @@ def _rejoin_fragmented_lines(lines: list[str]) -> list[str]:
             continue
 
         # 3. Value-like or comparison (цифра / < / > / ≤ / ≥) → add to buf
-        if re.match(r'^[-+↑↓]?\s*\d', stripped) or re.match(r'^[<>≤≥]', stripped):
+        if _FRAGMENT_VALUE_RE.match(stripped):
             buf.append(stripped)
             continue
 
         # 4. Name-like (начинается с буквы) → flush old buf, start new
-        if re.match(r'^[A-ZА-ЯЁa-zа-яё]', stripped):
+        if _FRAGMENT_NAME_RE.match(stripped):
             if buf:
                 out.append(' '.join(buf))
-            cleaned = re.sub(
-                r'\s*\(?Приказ[^)]*$', '', stripped, flags=re.IGNORECASE,
-            ).strip()
+            cleaned = _FRAGMENT_ORDER_TAIL_RE.sub('', stripped).strip()
             buf = [cleaned or stripped]
             continue
 
-        # 5. Lab code in parentheses: (K+), (Na+), (АЛТ), (ЛДГ)
-        if re.match(r'^\([A-ZА-Яа-яa-z+\d]{1,6}\)$', stripped):
-            buf.append(stripped)
-            continue
-
-        # 6. Всё остальное — в буфер
+        # 5. Lab code in parentheses: (K+), (Na+), (АЛТ), (ЛДГ) и 6. всё остальное — в буфер
         buf.append(stripped)
 
     if buf:
@@ -1098,6 +1077,11 @@ def _rejoin_fragmented_lines(lines: list[str]) -> list[str]:
     return out
 
 
+_FRAGMENT_VALUE_RE = re.compile(r'^[-+↑↓]?\s*\d|^[<>≤≥]')
+_FRAGMENT_NAME_RE = re.compile(r'^[A-ZА-ЯЁa-zа-яё]')
+_FRAGMENT_ORDER_TAIL_RE = re.compile(r'\s*\(?Приказ[^)]*$', re.IGNORECASE)
+
+
 # ──────────────────────────────────────────────
 # P11: Strip Gemotest +/- out-of-range markers
 # ──────────────────────────────────────────────
@@ -1113,15 +1097,50 @@ def _strip_gemotest_markers(lines: list[str]) -> list[str]:
     out = []
     for ln in lines:
         # "53+ г/л" → "53 г/л"  (+ перед пробелом)
-        cleaned = re.sub(r'(\d+\.?\d*)\+(?=\s|$)', r'\1', ln)
+        cleaned = _GEMOTEST_PLUS_RE.sub(r'\1', ln)
         # "71.0- мкмоль/л" → "71.0 мкмоль/л"  (- перед пробелом+буквой)
-        cleaned = re.sub(r'(\d+\.?\d*)-(?=\s+[А-Яа-яA-Za-z%])', r'\1', cleaned)
+        cleaned = _GEMOTEST_MINUS_RE.sub(r'\1', cleaned)
         # "71.0-" в конце строки
-        cleaned = re.sub(r'(\d+\.?\d*)-$', r'\1', cleaned)
+        cleaned = _GEMOTEST_MINUS_END_RE.sub(r'\1', cleaned)
         out.append(cleaned)
     return out
 
 
+_GEMOTEST_PLUS_RE = re.compile(r'(\d+\.?\d*)\+(?=\s|$)')
+_GEMOTEST_MINUS_RE = re.compile(r'(\d+\.?\d*)-(?=\s+[А-Яа-яA-Za-z%])')
+_GEMOTEST_MINUS_END_RE = re.compile(r'(\d+\.?\d*)-$')
+
+
+# ──────────────────────────────────────────────
+# Подготовка строк и Pass 1
+# ──────────────────────────────────────────────
+_WS_RE = re.compile(r"\s+")
+_PAGE_MARKER_RE = re.compile(r"^---\s*PAGE\s+\d+\s*---", re.IGNORECASE)
+
+
+def _prepared_lines(raw_text: str) -> List[str]:
+    """Строки без лишних пробелов, без пустых и маркеров страниц."""
+    lines = [_WS_RE.sub(" ", ln.strip()) for ln in raw_text.splitlines()]
+    return [ln for ln in lines if ln and not _PAGE_MARKER_RE.match(ln)]
+
+
+def _one_line_pass(lines: List[str]) -> List[Candidate]:
+    """Pass 1: кандидаты из одной строки; span — номер строки."""
+    out: List[Candidate] = []
+    for pos, ln in enumerate(lines):
+        # "Смотри текст" / "см. интерпретацию" и строки с известным биомаркером обходят score-фильтр
+        has_see_text = bool(_SEE_TEXT_BROAD.search(ln))
+        features = line_features(ln)
+        if not has_see_text and not features.has_biomarker:
+            if features.score < 0.4:
+                continue
+        cand = _one_line_candidate(ln)
+        if cand is not None:
+            cand.span = (pos, pos + 1)
+            out.append(cand)
+    return out
+
+
 # ──────────────────────────────────────────────
 # ГЛАВНАЯ ФУНКЦИЯ
 # ──────────────────────────────────────────────
@@ -1135,19 +1154,20 @@ def universal_extract(raw_text: str) -> str:
     Возвращает TSV-кандидаты (name\\tvalue\\tref\\tunit), один кандидат на строку.
     Пустая строка — если ничего не найдено.
     """
-    if not raw_text or not raw_text.strip():
-        return ""
+    return format_candidates(universal_extract_candidates(raw_text)).strip("\n\r ")
+
 
-    # Подготовка строк
-    lines = [re.sub(r"\s+", " ", ln.strip()) for ln in raw_text.splitlines()]
-    lines = [
-        ln for ln in lines
-        if ln and not re.match(r"^---\s*PAGE\s+\d+\s*---", ln, re.IGNORECASE)
-    ]
-    lines = [ln for ln in lines if ln]
+def universal_extract_candidates(raw_text: str) -> List[Candidate]:
+    """
+    universal_extract без форматирования в TSV: список Candidate.
+    span кандидата — номера строк после предобработки (склеек и фильтров).
+    """
+    if not raw_text or not raw_text.strip():
+        return []
 
+    lines = _prepared_lines(raw_text)
     if not lines:
-        return ""
+        return []
 
     # ─── Предобработка: склейка разбитых единиц (x10*12/ + л) ───
     lines = _rejoin_broken_units(lines)
@@ -1173,25 +1193,11 @@ def universal_extract(raw_text: str) -> str:
     lines = [ln for ln in lines if not _is_scale_annotation(ln)]
 
     # ─── Pass 1: однострочный ───
-    one_line_cands: List[str] = []
-    for ln in lines:
-        # "Смотри текст" / "см. интерпретацию" и строки с известным биомаркером обходят score-фильтр
-        has_see_text = bool(_SEE_TEXT_BROAD.search(ln))
-        has_biomarker = has_known_biomarker(ln)
-        if not has_see_text and not has_biomarker:
-            sc = score_line(ln)
-            if sc < 0.4:
-                continue
-        cand = _try_parse_one_line(ln)
-        if cand:
-            one_line_cands.append(cand)
+    one_line_cands = _one_line_pass(lines)
 
     # ─── Pass 2: многострочный (окно 2–4 строки) ───
-    multi_line_cands = _multi_line_pass(lines)
+    multi_line_cands = _multi_line_candidates(lines)
 
     # ─── Слияние + дедупликация ───
     # Многострочный приоритетнее (первым в списке)
-    merged = _dedup_candidates(multi_line_cands + one_line_cands)
-
-    return "\n".join(merged).strip('\n\r ')
-
+    return _dedup_candidates(multi_line_cands + one_line_cands)
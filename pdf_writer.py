@@ -0,0 +1,731 @@
+"""
+Нативная печать отчёта в PDF без Chromium.
+
+Раскладывает тот же контекст, что и templates/report.html
+(build_template_context: rows, facts, explain_lines, human_text,
+quality_section_html, missing_warnings), на страницы A4 и пишет PDF
+вручную: TrueType-шрифт встраивается подмножеством (CIDFontType2,
+Identity-H, с ToUnicode для копирования/поиска текста), контент сжат zlib.
+
+Зависимостей нет — только стандартная библиотека. Нужен TTF-шрифт
+с кириллицей (например, DejaVuSans.ttf), путь передаётся в TrueTypeFont.
+"""
+import html as _html
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+# Страница A4 и поля — как в engine._pdf_options (12 мм по бокам, 18 мм сверху/снизу)
+MM = 72.0 / 25.4
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN_X = 12 * MM
+MARGIN_TOP = 18 * MM
+MARGIN_BOTTOM = 18 * MM
+
+# Размеры шрифта (pt)
+SIZE_H1 = 18.0
+SIZE_H2 = 13.0
+SIZE_BODY = 9.5
+SIZE_TABLE = 8.5
+SIZE_SMALL = 7.0
+LINE_GAP = 1.35           # межстрочный интервал, доля размера шрифта
+CARD_PAD = 6.0
+
+# Цвета (RGB 0..1), как в CSS шаблона
+COLOR_TEXT = (0.12, 0.16, 0.22)
+COLOR_MUTED = (0.42, 0.45, 0.50)
+COLOR_BORDER = (0.90, 0.91, 0.92)
+COLOR_CARD = (0.976, 0.98, 0.984)
+COLOR_WARN_BG = (1.0, 0.969, 0.929)
+COLOR_WARN_BAR = (0.976, 0.451, 0.086)
+COLOR_BADGE_BG = (0.933, 0.949, 1.0)
+COLOR_BADGE = (0.216, 0.188, 0.639)
+STATUS_COLORS = {
+    "status-normal": (0.016, 0.471, 0.341),
+    "status-warn": (0.706, 0.325, 0.035),
+    "status-high": (0.725, 0.110, 0.110),
+    "muted": COLOR_MUTED,
+}
+
+TABLE_COLUMNS = (
+    ("Показатель", 0.27),
+    ("Значение", 0.20),
+    ("Норма", 0.19),
+    ("Источник", 0.18),
+    ("Статус", 0.16),
+)
+
+DISCLAIMER_TEXT = (
+    "Представленная информация носит исключительно справочный характер и подготовлена "
+    "в рамках информационного сервиса, не являющегося медицинским учреждением. "
+    "Данный отчёт не является медицинским заключением, диагнозом или рекомендацией по лечению. "
+    "Для интерпретации результатов и принятия решений необходимо обратиться к врачу."
+)
+
+
+class FontError(RuntimeError):
+    """Шрифт не найден или не поддерживается (нужен TrueType с таблицей glyf)."""
+
+
+# ==========================
+# TrueType
+# ==========================
+class TrueTypeFont:
+    """
+    Минимальный разбор TrueType: метрики, cmap, ширины глифов
+    и сборка подмножества шрифта для встраивания в PDF.
+    """
+
+    def __init__(self, source: Union[str, Path, bytes]):
+        if isinstance(source, (str, Path)):
+            self.name = re.sub(r"[^A-Za-z0-9-]", "", Path(source).stem) or "Font"
+            data = Path(source).read_bytes()
+        else:
+            self.name = "Font"
+            data = bytes(source)
+        self.data = data
+        try:
+            self._parse()
+        except (struct.error, KeyError, IndexError) as e:
+            raise FontError(f"Не удалось разобрать TrueType-шрифт: {e}") from e
+
+    # ── разбор ───────────────────────────────────────────────────────
+
+    def _parse(self) -> None:
+        data = self.data
+        version, num_tables = struct.unpack_from(">IH", data, 0)
+        if version not in (0x00010000, 0x74727565):
+            raise FontError("Поддерживаются только TrueType-шрифты (не OTF/CFF)")
+        self.tables: Dict[str, Tuple[int, int]] = {}
+        for i in range(num_tables):
+            tag, _checksum, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+            self.tables[tag.decode("latin-1")] = (offset, length)
+        for tag in ("head", "hhea", "maxp", "hmtx", "cmap", "loca", "glyf"):
+            if tag not in self.tables:
+                raise FontError(f"В шрифте нет таблицы {tag}")
+
+        head = self._table("head")
+        self.units_per_em = struct.unpack_from(">H", head, 18)[0]
+        self.bbox = struct.unpack_from(">hhhh", head, 36)
+        self.index_to_loc_format = struct.unpack_from(">h", head, 50)[0]
+
+        hhea = self._table("hhea")
+        self.ascent, self.descent = struct.unpack_from(">hh", hhea, 4)
+        num_hmetrics = struct.unpack_from(">H", hhea, 34)[0]
+
+        self.num_glyphs = struct.unpack_from(">H", self._table("maxp"), 4)[0]
+
+        hmtx = self._table("hmtx")
+        advances = [struct.unpack_from(">H", hmtx, 4 * i)[0] for i in range(num_hmetrics)]
+        advances += [advances[-1]] * (self.num_glyphs - num_hmetrics)
+        self.advances = advances
+
+        self.cap_height = int(self.ascent * 0.7)
+        if "OS/2" in self.tables:
+            os2 = self._table("OS/2")
+            if struct.unpack_from(">H", os2, 0)[0] >= 2 and len(os2) >= 90:
+                self.cap_height = struct.unpack_from(">h", os2, 88)[0]
+        self.italic_angle = 0.0
+        if "post" in self.tables:
+            self.italic_angle = struct.unpack_from(">i", self._table("post"), 4)[0] / 65536.0
+
+        self.cmap = self._parse_cmap()
+        self._width_cache: Dict[str, float] = {}
+
+    def _table(self, tag: str) -> bytes:
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def _parse_cmap(self) -> Dict[int, int]:
+        cmap = self._table("cmap")
+        num = struct.unpack_from(">H", cmap, 2)[0]
+        candidates = {}
+        for i in range(num):
+            platform, encoding, offset = struct.unpack_from(">HHI", cmap, 4 + 8 * i)
+            fmt = struct.unpack_from(">H", cmap, offset)[0]
+            candidates[(platform, encoding, fmt)] = offset
+        for key in ((3, 10, 12), (0, 4, 12), (0, 6, 12), (3, 1, 4), (0, 3, 4), (0, 1, 4), (0, 0, 4)):
+            if key in candidates:
+                offset = candidates[key]
+                return self._cmap_format12(cmap, offset) if key[2] == 12 else self._cmap_format4(cmap, offset)
+        raise FontError("В шрифте нет Unicode-таблицы cmap (формат 4/12)")
+
+    @staticmethod
+    def _cmap_format4(cmap: bytes, offset: int) -> Dict[int, int]:
+        seg_count = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+        ends_at = offset + 14
+        starts_at = ends_at + 2 * seg_count + 2
+        deltas_at = starts_at + 2 * seg_count
+        range_offsets_at = deltas_at + 2 * seg_count
+        result: Dict[int, int] = {}
+        for seg in range(seg_count):
+            end = struct.unpack_from(">H", cmap, ends_at + 2 * seg)[0]
+            start = struct.unpack_from(">H", cmap, starts_at + 2 * seg)[0]
+            delta = struct.unpack_from(">h", cmap, deltas_at + 2 * seg)[0]
+            ro_pos = range_offsets_at + 2 * seg
+            range_offset = struct.unpack_from(">H", cmap, ro_pos)[0]
+            if start == 0xFFFF:
+                continue
+            for code in range(start, end + 1):
+                if range_offset == 0:
+                    gid = (code + delta) & 0xFFFF
+                else:
+                    pos = ro_pos + range_offset + 2 * (code - start)
+                    gid = struct.unpack_from(">H", cmap, pos)[0]
+                    if gid:
+                        gid = (gid + delta) & 0xFFFF
+                if gid:
+                    result[code] = gid
+        return result
+
+    @staticmethod
+    def _cmap_format12(cmap: bytes, offset: int) -> Dict[int, int]:
+        n_groups = struct.unpack_from(">I", cmap, offset + 12)[0]
+        result: Dict[int, int] = {}
+        for g in range(n_groups):
+            start, end, start_gid = struct.unpack_from(">III", cmap, offset + 16 + 12 * g)
+            for code in range(start, min(end, 0x10FFFF) + 1):
+                result[code] = start_gid + (code - start)
+        return result
+
+    # ── метрики ──────────────────────────────────────────────────────
+
+    def glyph_id(self, ch: str) -> int:
+        return self.cmap.get(ord(ch), 0)
+
+    def has_glyph(self, ch: str) -> bool:
+        return ord(ch) in self.cmap
+
+    def char_width(self, ch: str) -> float:
+        """Ширина символа в 1/1000 em."""
+        w = self._width_cache.get(ch)
+        if w is None:
+            w = self._width_cache[ch] = self.advances[self.glyph_id(ch)] * 1000.0 / self.units_per_em
+        return w
+
+    def text_width(self, text: str, size: float) -> float:
+        return sum(self.char_width(ch) for ch in text) * size / 1000.0
+
+    def glyph_width(self, gid: int) -> float:
+        return self.advances[gid] * 1000.0 / self.units_per_em
+
+    def scale(self, value: float) -> int:
+        return int(round(value * 1000.0 / self.units_per_em))
+
+    # ── подмножество ─────────────────────────────────────────────────
+
+    def _glyph_offsets(self) -> List[int]:
+        loca = self._table("loca")
+        n = self.num_glyphs + 1
+        if self.index_to_loc_format == 0:
+            return [2 * v for v in struct.unpack_from(f">{n}H", loca, 0)]
+        return list(struct.unpack_from(f">{n}I", loca, 0))
+
+    def subset(self, gids: Iterable[int]) -> bytes:
+        """
+        TrueType-файл, в котором оставлены контуры только нужных глифов
+        (с компонентами составных). Номера глифов не меняются, поэтому
+        в PDF работает CIDToGIDMap /Identity.
+        """
+        offsets = self._glyph_offsets()
+        glyf = self._table("glyf")
+        keep: Set[int] = {0}
+        stack = [g for g in gids if 0 <= g < self.num_glyphs]
+        while stack:
+            gid = stack.pop()
+            if gid in keep and gid != 0:
+                continue
+            keep.add(gid)
+            start, end = offsets[gid], offsets[gid + 1]
+            if end - start >= 10 and struct.unpack_from(">h", glyf, start)[0] < 0:
+                stack.extend(g for g in self._components(glyf, start + 10) if g not in keep)
+
+        new_glyf = bytearray()
+        new_loca = []
+        for gid in range(self.num_glyphs):
+            new_loca.append(len(new_glyf))
+            if gid in keep:
+                new_glyf += glyf[offsets[gid]:offsets[gid + 1]]
+                new_glyf += b"\0" * (-len(new_glyf) % 4)
+        new_loca.append(len(new_glyf))
+
+        head = bytearray(self._table("head"))
+        struct.pack_into(">I", head, 8, 0)          # checkSumAdjustment
+        struct.pack_into(">h", head, 50, 1)         # indexToLocFormat: long
+        tables = {
+            "head": bytes(head),
+            "loca": struct.pack(f">{len(new_loca)}I", *new_loca),
+            "glyf": bytes(new_glyf),
+        }
+        for tag in ("cmap", "hhea", "maxp", "hmtx", "cvt ", "fpgm", "prep", "OS/2"):
+            if tag in self.tables:
+                tables[tag] = self._table(tag)
+        return _build_sfnt(tables)
+
+    @staticmethod
+    def _components(glyf: bytes, pos: int) -> List[int]:
+        result = []
+        while True:
+            flags, gid = struct.unpack_from(">HH", glyf, pos)
+            result.append(gid)
+            pos += 4
+            pos += 4 if flags & 0x0001 else 2
+            if flags & 0x0008:
+                pos += 2
+            elif flags & 0x0040:
+                pos += 4
+            elif flags & 0x0080:
+                pos += 8
+            if not flags & 0x0020:
+                return result
+
+
+def _table_checksum(data: bytes) -> int:
+    padded = data + b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(padded) // 4}I", padded)) & 0xFFFFFFFF
+
+
+def _build_sfnt(tables: Dict[str, bytes]) -> bytes:
+    tags = sorted(tables)
+    n = len(tags)
+    entry_selector = max(0, n.bit_length() - 1)
+    search_range = (2 ** entry_selector) * 16
+    header = struct.pack(">IHHHH", 0x00010000, n, search_range, entry_selector, n * 16 - search_range)
+    offset = 12 + 16 * n
+    records = b""
+    body = b""
+    for tag in tags:
+        data = tables[tag]
+        records += struct.pack(">4sIII", tag.encode("latin-1"), _table_checksum(data), offset + len(body), len(data))
+        body += data + b"\0" * (-len(data) % 4)
+    return header + records + body
+
+
+# ==========================
+# Текст
+# ==========================
+_BLOCK_TAGS_RE = re.compile(r"<\s*(br|/p|/div|/li|/tr|/h\d)\s*/?\s*>", re.IGNORECASE)
+_LI_RE = re.compile(r"<\s*li[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_BOLD_LINE_RE = re.compile(r"^\*\*(.+?)\*\*:?\s*$")
+
+
+def html_to_text(fragment: str) -> str:
+    """Текст из HTML-фрагмента контекста (facts, explain_lines, секция качества)."""
+    text = _BLOCK_TAGS_RE.sub("\n", fragment or "")
+    text = _LI_RE.sub("• ", text)
+    text = _html.unescape(_TAG_RE.sub("", text))
+    lines = [re.sub(r"[ \t]+", " ", ln).strip() for ln in text.split("\n")]
+    return "\n".join(ln for ln in lines if ln)
+
+
+def wrap_text(font: TrueTypeFont, text: str, size: float, width: float) -> List[str]:
+    """Перенос по словам; слово длиннее строки режется по символам."""
+    lines: List[str] = []
+    for paragraph in (text or "").split("\n"):
+        words = paragraph.split(" ")
+        line = ""
+        for word in words:
+            candidate = f"{line} {word}" if line else word
+            if font.text_width(candidate, size) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ""
+            while font.text_width(word, size) > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and font.text_width(word[:cut], size) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+# ==========================
+# Раскладка
+# ==========================
+def _rgb(color: Sequence[float], stroke: bool = False) -> str:
+    return "{:.3f} {:.3f} {:.3f} {}".format(*color, "RG" if stroke else "rg")
+
+
+class _Page:
+    def __init__(self) -> None:
+        self.ops: List[str] = []
+
+
+class _Layout:
+    """Курсор по страницам: строки текста, прямоугольники, перенос на новую страницу."""
+
+    def __init__(self, font: TrueTypeFont):
+        self.font = font
+        self.pages: List[_Page] = []
+        self.used_gids: Set[int] = set()
+        self.content_width = PAGE_WIDTH - 2 * MARGIN_X
+        self._boxes: List[Dict[str, Any]] = []
+        self._new_page()
+
+    # ── страницы ─────────────────────────────────────────────────────
+
+    def _new_page(self) -> None:
+        for box in self._boxes:
+            self._close_box_segment(box)
+        self.page = _Page()
+        self.pages.append(self.page)
+        self.y = PAGE_HEIGHT - MARGIN_TOP
+        for box in self._boxes:
+            box["page"], box["index"], box["top"] = self.page, len(self.page.ops), self.y
+            self.y -= CARD_PAD
+
+    def ensure(self, height: float) -> bool:
+        """Переходит на новую страницу, если высоты не хватает. True — был переход."""
+        if self.y - height < MARGIN_BOTTOM:
+            self._new_page()
+            return True
+        return False
+
+    # ── примитивы ────────────────────────────────────────────────────
+
+    def encode(self, text: str) -> str:
+        gids = []
+        for ch in text:
+            gid = self.font.glyph_id(ch)
+            if gid == 0 and ch in "️‍":
+                continue
+            gids.append(gid)
+        self.used_gids.update(gids)
+        return "".join(f"{g:04X}" for g in gids)
+
+    def text_op(self, x: float, y: float, text: str, size: float,
+                color: Sequence[float] = COLOR_TEXT, bold: bool = False) -> str:
+        # Полужирный — обводка контура (один шрифт на весь отчёт)
+        style = f"2 Tr {size * 0.035:.3f} w {_rgb(color, stroke=True)} " if bold else "0 Tr "
+        return (f"BT /F1 {size:.2f} Tf {style}{_rgb(color)} "
+                f"1 0 0 1 {x:.2f} {y:.2f} Tm <{self.encode(text)}> Tj ET")
+
+    def draw_text(self, x: float, y: float, text: str, size: float,
+                  color: Sequence[float] = COLOR_TEXT, bold: bool = False, page: Optional[_Page] = None) -> None:
+        (page or self.page).ops.append(self.text_op(x, y, text, size, color, bold))
+
+    def rect(self, x: float, y: float, w: float, h: float, fill: Sequence[float],
+             page: Optional[_Page] = None, index: Optional[int] = None) -> None:
+        op = f"{_rgb(fill)} {x:.2f} {y:.2f} {w:.2f} {h:.2f} re f"
+        ops = (page or self.page).ops
+        if index is None:
+            ops.append(op)
+        else:
+            ops.insert(index, op)
+
+    def hline(self, x1: float, x2: float, y: float, color: Sequence[float] = COLOR_BORDER, width: float = 0.6) -> None:
+        self.page.ops.append(f"{_rgb(color, stroke=True)} {width:.2f} w {x1:.2f} {y:.2f} m {x2:.2f} {y:.2f} l S")
+
+    # ── блоки ────────────────────────────────────────────────────────
+
+    def space(self, h: float) -> None:
+        self.y -= h
+
+    def paragraph(self, text: str, size: float = SIZE_BODY, color: Sequence[float] = COLOR_TEXT,
+                  bold: bool = False, indent: float = 0.0) -> None:
+        x = MARGIN_X + indent + (CARD_PAD * len(self._boxes))
+        width = self.content_width - indent - 2 * CARD_PAD * len(self._boxes)
+        leading = size * LINE_GAP
+        for line in wrap_text(self.font, text, size, width):
+            self.ensure(leading)
+            self.y -= leading
+            if line:
+                self.draw_text(x, self.y + (leading - size) / 2 + size * 0.2, line, size, color, bold)
+
+    def heading(self, text: str, size: float = SIZE_H2) -> None:
+        self.ensure(size * 3.5)  # заголовок не остаётся один внизу страницы
+        self.space(size * 0.9)
+        self.paragraph(text, size=size, bold=True)
+        self.space(3)
+        self.hline(MARGIN_X, PAGE_WIDTH - MARGIN_X, self.y)
+        self.space(6)
+
+    def begin_box(self, fill: Sequence[float], bar: Optional[Sequence[float]] = None) -> None:
+        self.ensure(SIZE_BODY * 3)
+        box = {"fill": fill, "bar": bar, "page": self.page, "index": len(self.page.ops), "top": self.y}
+        self._boxes.append(box)
+        self.y -= CARD_PAD
+
+    def end_box(self) -> None:
+        self.y -= CARD_PAD
+        box = self._boxes.pop()
+        self._close_box_segment(box)
+        self.space(6)
+
+    def _close_box_segment(self, box: Dict[str, Any]) -> None:
+        depth = self._boxes.index(box) if box in self._boxes else len(self._boxes)
+        x = MARGIN_X + CARD_PAD * depth
+        w = self.content_width - 2 * CARD_PAD * depth
+        bottom = max(self.y, MARGIN_BOTTOM)
+        h = box["top"] - bottom
+        if box["bar"] is not None:
+            self.rect(x, bottom, 3, h, box["bar"], page=box["page"], index=box["index"])
+        self.rect(x, bottom, w, h, box["fill"], page=box["page"], index=box["index"])
+
+
+def _draw_table(layout: _Layout, rows: List[Dict[str, Any]]) -> None:
+    font = layout.font
+    size = SIZE_TABLE
+    leading = size * LINE_GAP
+    pad = 4.0
+    widths = [layout.content_width * share for _, share in TABLE_COLUMNS]
+
+    def header() -> None:
+        h = leading + 2 * pad
+        layout.ensure(h + leading * 2)
+        layout.rect(MARGIN_X, layout.y - h, layout.content_width, h, COLOR_CARD)
+        x = MARGIN_X
+        for (title, _), w in zip(TABLE_COLUMNS, widths):
+            layout.draw_text(x + pad, layout.y - pad - size, title, size, bold=True)
+            x += w
+        layout.y -= h
+        layout.hline(MARGIN_X, PAGE_WIDTH - MARGIN_X, layout.y)
+
+    header()
+    for r in rows:
+        value = f"{r.get('value', '')} {r.get('unit', '')}".strip()
+        cells = [
+            (r.get("code", ""), COLOR_TEXT, False),
+            (value, COLOR_TEXT, False),
+            (r.get("ref_text") or "—", COLOR_MUTED, False),
+            (r.get("ref_source", ""), COLOR_MUTED, False),
+            (r.get("status", ""), STATUS_COLORS.get(r.get("status_class") or "muted", COLOR_MUTED),
+             (r.get("status_class") or "muted") != "muted"),
+        ]
+        wrapped = [wrap_text(font, str(text), size, w - 2 * pad) for (text, _, _), w in zip(cells, widths)]
+        h = max(len(lines) for lines in wrapped) * leading + 2 * pad
+        if layout.ensure(h):
+            header()
+        x = MARGIN_X
+        for (text, color, bold), lines, w in zip(cells, wrapped, widths):
+            for i, line in enumerate(lines):
+                layout.draw_text(x + pad, layout.y - pad - size - i * leading, line, size, color, bold)
+            x += w
+        layout.y -= h
+        layout.hline(MARGIN_X, PAGE_WIDTH - MARGIN_X, layout.y)
+
+
+def _draw_narrative(layout: _Layout, text: str) -> None:
+    for line in (text or "").split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            layout.space(SIZE_BODY * 0.5)
+            continue
+        m = _BOLD_LINE_RE.match(stripped)
+        if m:
+            layout.space(2)
+            layout.paragraph(m.group(1), bold=True)
+        else:
+            layout.paragraph(stripped.replace("**", ""))
+
+
+def _draw_header_footer(layout: _Layout, created_at: str) -> None:
+    total = len(layout.pages)
+    right_x = PAGE_WIDTH - MARGIN_X
+    font = layout.font
+    for n, page in enumerate(layout.pages, 1):
+        top = PAGE_HEIGHT - MARGIN_TOP / 2
+        bottom = MARGIN_BOTTOM / 2
+        right_head = "Не является диагнозом"
+        right_foot = f"Стр. {n} / {total}"
+        layout.draw_text(MARGIN_X, top, "Информационный отчёт", SIZE_SMALL, COLOR_MUTED, page=page)
+        layout.draw_text(right_x - font.text_width(right_head, SIZE_SMALL), top, right_head,
+                         SIZE_SMALL, COLOR_MUTED, page=page)
+        layout.draw_text(MARGIN_X, bottom, f"Дата/время: {created_at}", SIZE_SMALL, COLOR_MUTED, page=page)
+        layout.draw_text(right_x - font.text_width(right_foot, SIZE_SMALL), bottom, right_foot,
+                         SIZE_SMALL, COLOR_MUTED, page=page)
+
+
+def layout_report(font: TrueTypeFont, context: Dict[str, Any]) -> _Layout:
+    """Раскладывает контекст отчёта по страницам (порядок блоков — как в report.html)."""
+    lay = _Layout(font)
+    created_at = str(context.get("created_at", ""))
+
+    badge = "Информационный отчёт"
+    bw = font.text_width(badge, SIZE_SMALL + 1) + 16
+    lay.rect(MARGIN_X, lay.y - 16, bw, 16, COLOR_BADGE_BG)
+    lay.draw_text(MARGIN_X + 8, lay.y - 11.5, badge, SIZE_SMALL + 1, COLOR_BADGE)
+    lay.space(22)
+    lay.paragraph("Расшифровка лабораторных анализов", size=SIZE_H1, bold=True)
+    lay.paragraph(
+        f"Пол: {context.get('sex', '')} · Возраст: {context.get('age', '')} · Сформировано: {created_at}",
+        color=COLOR_MUTED,
+    )
+    lay.space(8)
+
+    lay.begin_box(COLOR_WARN_BG, bar=COLOR_WARN_BAR)
+    lay.paragraph("Дисклеймер:", bold=True)
+    lay.paragraph(DISCLAIMER_TEXT)
+    lay.end_box()
+
+    lay.heading("Краткий итог по фактам")
+    warnings = list(context.get("missing_warnings") or [])
+    if warnings:
+        lay.begin_box(COLOR_WARN_BG, bar=COLOR_WARN_BAR)
+        lay.paragraph("Предупреждение:", bold=True)
+        for warn in warnings:
+            lay.paragraph(str(warn))
+        joined = ", ".join(str(w) for w in warnings)
+        if "Распознано мало показателей" not in joined and "не входила в назначенный профиль" not in joined:
+            lay.paragraph("Проверьте качество файла или загрузите другой формат.")
+        lay.end_box()
+    facts = context.get("facts") or []
+    if not facts:
+        lay.begin_box(COLOR_CARD)
+        lay.paragraph("По распознанным референсам явных отклонений не найдено (или нормы не распознаны).")
+        lay.end_box()
+    else:
+        for fact in facts:
+            lay.paragraph("• " + html_to_text(fact), indent=6)
+
+    lay.heading("Технический разбор (по референсам)")
+    _draw_table(lay, list(context.get("rows") or []))
+
+    explain_lines = context.get("explain_lines") or []
+    if explain_lines:
+        lay.heading("Пояснения (из словаря, без ИИ)")
+        for line in explain_lines:
+            lay.begin_box(COLOR_CARD)
+            lay.paragraph(html_to_text(line))
+            lay.end_box()
+
+    lay.heading("Информационная справка")
+    lay.begin_box(COLOR_CARD)
+    _draw_narrative(lay, str(context.get("human_text") or ""))
+    lay.end_box()
+
+    quality_html = context.get("quality_section_html") or ""
+    if quality_html:
+        lay.heading("Диагностика качества")
+        lay.begin_box(COLOR_CARD)
+        lay.paragraph(html_to_text(quality_html))
+        lay.end_box()
+
+    lay.space(12)
+    lay.paragraph("Автоматически сформировано информационным сервисом • Не является медицинским документом",
+                  size=SIZE_SMALL + 1, color=COLOR_MUTED)
+
+    _draw_header_footer(lay, created_at)
+    return lay
+
+
+# ==========================
+# Запись PDF
+# ==========================
+class _PdfDocument:
+    def __init__(self) -> None:
+        self.objects: List[bytes] = []
+
+    def reserve(self) -> int:
+        self.objects.append(b"")
+        return len(self.objects)
+
+    def set(self, num: int, body: Union[str, bytes]) -> None:
+        self.objects[num - 1] = body.encode("latin-1") if isinstance(body, str) else body
+
+    def add(self, body: Union[str, bytes]) -> int:
+        num = self.reserve()
+        self.set(num, body)
+        return num
+
+    def add_stream(self, data: bytes, extra: str = "", compress: bool = True) -> int:
+        if compress:
+            data = zlib.compress(data, 6)
+            extra += " /Filter /FlateDecode"
+        head = f"<< /Length {len(data)}{extra} >>\nstream\n".encode("latin-1")
+        return self.add(head + data + b"\nendstream")
+
+    def serialize(self, root: int, info: int) -> bytes:
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(self.objects, 1):
+            offsets.append(len(out))
+            out += f"{i} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+        for off in offsets:
+            out += f"{off:010d} 00000 n \n".encode("latin-1")
+        out += (f"trailer\n<< /Size {len(self.objects) + 1} /Root {root} 0 R /Info {info} 0 R >>\n"
+                f"startxref\n{xref}\n%%EOF\n").encode("latin-1")
+        return bytes(out)
+
+
+def _pdf_string(text: str) -> str:
+    return "<FEFF" + text.encode("utf-16-be").hex().upper() + ">"
+
+
+def _to_unicode_cmap(font: TrueTypeFont, gids: Set[int]) -> bytes:
+    reverse: Dict[int, int] = {}
+    for code, gid in font.cmap.items():
+        if gid in gids and (gid not in reverse or code < reverse[gid]):
+            reverse[gid] = code
+    entries = sorted(reverse.items())
+    lines = [
+        "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+        "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange",
+    ]
+    for i in range(0, len(entries), 100):
+        chunk = entries[i:i + 100]
+        lines.append(f"{len(chunk)} beginbfchar")
+        lines.extend(f"<{gid:04X}> <{chr(code).encode('utf-16-be').hex().upper()}>" for gid, code in chunk)
+        lines.append("endbfchar")
+    lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+    return "\n".join(lines).encode("latin-1")
+
+
+def _write_font(doc: _PdfDocument, font: TrueTypeFont, gids: Set[int]) -> int:
+    gids = set(gids) | {0}
+    base_name = "AAAAAA+" + font.name
+    font_file = doc.add_stream(font.subset(gids))
+    descriptor = doc.add(
+        f"<< /Type /FontDescriptor /FontName /{base_name} /Flags 32 "
+        f"/FontBBox [{' '.join(str(font.scale(v)) for v in font.bbox)}] "
+        f"/ItalicAngle {font.italic_angle:.1f} /Ascent {font.scale(font.ascent)} "
+        f"/Descent {font.scale(font.descent)} /CapHeight {font.scale(font.cap_height)} "
+        f"/StemV 80 /FontFile2 {font_file} 0 R >>"
+    )
+    widths = " ".join(f"{g} [{font.glyph_width(g):.0f}]" for g in sorted(gids))
+    cid_font = doc.add(
+        f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_name} "
+        f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+        f"/FontDescriptor {descriptor} 0 R /CIDToGIDMap /Identity /DW 1000 /W [{widths}] >>"
+    )
+    to_unicode = doc.add_stream(_to_unicode_cmap(font, gids))
+    return doc.add(
+        f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_name} /Encoding /Identity-H "
+        f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>"
+    )
+
+
+def render_report_pdf(context: Dict[str, Any], font: TrueTypeFont, compress: bool = True) -> bytes:
+    """PDF-байты отчёта по контексту build_template_context (human_text — готовая справка)."""
+    lay = layout_report(font, context)
+
+    doc = _PdfDocument()
+    catalog = doc.reserve()
+    pages_obj = doc.reserve()
+    font_obj = _write_font(doc, font, lay.used_gids)
+
+    page_refs = []
+    for page in lay.pages:
+        content = doc.add_stream("\n".join(page.ops).encode("latin-1"), compress=compress)
+        page_refs.append(doc.add(
+            f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font_obj} 0 R >> >> /Contents {content} 0 R >>"
+        ))
+    doc.set(pages_obj, f"<< /Type /Pages /Kids [{' '.join(f'{r} 0 R' for r in page_refs)}] /Count {len(page_refs)} >>")
+    doc.set(catalog, f"<< /Type /Catalog /Pages {pages_obj} 0 R >>")
+    info = doc.add(
+        f"<< /Title {_pdf_string('Расшифровка анализов — отчёт')} /Producer (pdf_writer) >>"
+    )
+    return doc.serialize(catalog, info)
@@ -0,0 +1,100 @@
+"""
+Общие хелперы и фикстуры тестов LLM-стадии.
+
+Что здесь:
+- lab_item — Item с диапазоном нормы лаборатории (ref_source="lab");
+- FakeClock — управляемые часы для breaker / кэша / статистики;
+- FakeLlmResponse, llm_chunk — подмена ответа requests.post YandexGPT
+  (обычного и потокового);
+- фикстуры fresh_llm (чистые глобальные объекты LLM в engine) и raw_path
+  (артефакты ответа и отладочный лог — во временной папке).
+
+Новые глобальные объекты LLM в engine сбрасываются в fresh_llm — одном месте
+для всех тестов.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from engine import Item, Range
+from parsers.llm_cache import LlmResponseCache
+from parsers.llm_refusal_policy import RefusalStats
+
+
+# ─── Хелперы ─────────────────────────────────────────────────────────
+
+def lab_item(name, value, low, high, status, raw_name=None, unit=""):
+    return Item(
+        raw_name=raw_name or name, name=name, value=value, unit=unit,
+        ref_text=f"{low}-{high}", ref=Range(low=low, high=high), ref_source="lab",
+        status=status, confidence=1.0,
+    )
+
+
+class FakeClock:
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def llm_chunk(text, final=False, usage=None, status=None):
+    """Строка ответа YandexGPT: JSON с накопленным текстом (как в стриме)."""
+    status = status or ("ALTERNATIVE_STATUS_FINAL" if final else "ALTERNATIVE_STATUS_PARTIAL")
+    result = {"alternatives": [{"message": {"role": "assistant", "text": text}, "status": status}]}
+    if usage is not None:
+        result["usage"] = usage
+    return json.dumps({"result": result}, ensure_ascii=False)
+
+
+class FakeLlmResponse:
+    """Ответ requests.post: text/json() для обычного вызова, iter_lines() — для стрима."""
+
+    def __init__(self, lines=(), status_code=200, text=None):
+        self.status_code = status_code
+        self._lines = list(lines)
+        self.text = "\n".join(self._lines) if text is None else text
+        self.consumed = 0
+        self.closed = False
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self._lines:
+            self.consumed += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+# ─── Фикстуры ────────────────────────────────────────────────────────
+
+@pytest.fixture
+def fresh_llm(monkeypatch):
+    """
+    Свежие breaker, статистика отказов и кэш в памяти (кэш выключен —
+    тесты кэша включают LLM_CACHE_ENABLED сами), без IAM-запроса.
+    """
+    monkeypatch.setattr(engine, "_LLM_BREAKER", None)
+    monkeypatch.setattr(engine, "_REFUSAL_POLICY", RefusalStats())
+    monkeypatch.setattr(engine, "_LLM_CACHE", LlmResponseCache())
+    monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(engine, "get_iam_token", lambda: "iam")
+
+
+@pytest.fixture
+def raw_path(monkeypatch, tmp_path):
+    """Сырые ответы LLM и отладочный лог — во временной папке."""
+    monkeypatch.setattr(engine, "RAW_RESPONSE_PATH", tmp_path / "yc_raw.json")
+    monkeypatch.setattr(engine, "OCR_DEBUG_PATH", tmp_path / "debug.log")
+    return tmp_path
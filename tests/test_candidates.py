@@ -0,0 +1,157 @@
+"""
+Кандидаты-записи (parsers/candidates.Candidate) между экстракторами и разбором.
+
+Запуск:
+    pytest tests/test_candidates.py -v
+
+Что тестируем:
+1) Candidate.to_tsv / columns повторяют прежние TSV-строки экстракторов
+2) Экстракторы: текстовые функции = записи, отформатированные в TSV
+3) parse_items_from_candidates: записи дают те же Item, что и TSV; значение без округления
+4) _run_parse_pipeline передаёт записи без TSV
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.candidates import Candidate, format_candidates
+from parsers.medsi_extractor import medsi_inline_candidates, medsi_inline_to_candidates
+from parsers.universal_extractor import universal_extract, universal_extract_candidates
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Холестерин 4.73 см. текст
+СОЭ
+35
+мм/ч
+2-20
+"""
+
+MEDSI_TEXT = """(WBC) Лейкоциты 10*9/л 4.50-11.004.78
+(RBC) Эритроциты 10*12/л 4.30-5.705.33
+(PLT) Тромбоциты 10*9/л 150-400213
+"""
+
+
+def _fields(items):
+    return [(it.raw_name, it.name, it.value, it.unit, it.ref_text, it.status) for it in items]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: запись и её TSV                                         ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestCandidate:
+
+    def test_tsv_trims_empty_tail(self):
+        assert Candidate("СОЭ", 35.0, "2-20", "мм/ч").to_tsv() == "СОЭ\t35\t2-20\tмм/ч"
+        assert Candidate("СОЭ", 35.0, "2-20").to_tsv() == "СОЭ\t35\t2-20"
+        assert Candidate("СОЭ", 35.0).to_tsv() == "СОЭ\t35"
+
+    def test_tsv_keeps_empty_columns(self):
+        c = Candidate("Холестерин", 4.73, strip_tsv=False)
+        assert c.to_tsv() == "Холестерин\t4.73\t\t"
+        assert c.columns == 4
+
+    def test_columns(self):
+        assert Candidate("A", 1.0, "0-2", "г/л").columns == 4
+        assert Candidate("A", 1.0, "0-2").columns == 3
+        assert Candidate("A", 1.0).columns == 2
+
+    def test_value_text(self):
+        c = Candidate("A", 4.5, "4.00-5.00", value_text="4.50")
+        assert c.value == 4.5 and c.to_tsv() == "A\t4.50\t4.00-5.00"
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            Candidate("A", 1.0).extra = 1
+
+    def test_format(self):
+        cands = [Candidate("A", 1.0, "0-2"), Candidate("B", 2.5, "<3", "%")]
+        assert format_candidates(cands) == "A\t1\t0-2\nB\t2.5\t<3\t%"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: экстракторы                                             ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestExtractors:
+
+    def test_universal(self):
+        cands = universal_extract_candidates(RAW_TEXT)
+        assert universal_extract(RAW_TEXT) == format_candidates(cands)
+        assert {c.source for c in cands} == {"universal"}
+        assert all(c.span is not None and c.span[0] < c.span[1] for c in cands)
+
+    def test_medsi_keeps_lab_spelling(self):
+        cands = medsi_inline_candidates(MEDSI_TEXT)
+        assert medsi_inline_to_candidates(MEDSI_TEXT) == format_candidates(cands)
+        wbc = cands[0]
+        assert (wbc.value, wbc.ref, wbc.source) == (4.78, "4.50-11.00", "medsi")
+
+    def test_helix(self):
+        cands = engine.helix_table_candidates(RAW_TEXT)
+        assert engine.helix_table_to_candidates(RAW_TEXT) == format_candidates(cands)
+        assert cands and {c.source for c in cands} == {"helix"}
+
+    def test_smart(self):
+        assert engine._smart_to_candidates(RAW_TEXT) == format_candidates(engine._smart_candidates(RAW_TEXT))
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: разбор записей                                          ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestParseRecords:
+
+    @pytest.mark.parametrize("text", [RAW_TEXT, MEDSI_TEXT])
+    def test_same_items_as_tsv(self, text):
+        cands = engine._smart_candidates(text)
+        assert _fields(engine.parse_items_from_candidates(cands)) == \
+            _fields(engine.parse_items_from_candidates(format_candidates(cands)))
+
+    def test_two_column_candidate_skipped(self):
+        assert engine.parse_items_from_candidates([Candidate("Гемоглобин", 140.0)]) == []
+
+    def test_broken_scientific_notation(self):
+        items = engine.parse_items_from_candidates([Candidate("Лейкоциты (WBC) 8.23 *10^", 9.0, "4-10")])
+        assert items[0].value == 8.23
+
+    def test_value_not_rounded(self):
+        # В TSV 1234567 печаталось как 1.23457e+06 и разбиралось в 1.2345706
+        items = engine.parse_items_from_candidates([Candidate("Тромбоциты", 1234567.0, "150-400")])
+        assert items[0].value == 1234567.0
+
+    def test_parse_with_fallback_records(self):
+        cands = engine._smart_candidates(RAW_TEXT)
+        assert _fields(engine.parse_with_fallback(cands)) == \
+            _fields(engine.parse_with_fallback(format_candidates(cands)))
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: конвейер                                                ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPipeline:
+
+    def test_pipeline_passes_records(self, monkeypatch):
+        seen = []
+        real = engine._select_parse
+
+        def spy(source):
+            seen.append(source)
+            return real(source)
+
+        monkeypatch.setattr(engine, "_select_parse", spy)
+        items, *_ = engine._run_parse_pipeline(RAW_TEXT)
+        assert items
+        assert isinstance(seen[0], list) and all(isinstance(c, Candidate) for c in seen[0])
@@ -0,0 +1,112 @@
+"""
+Мемо кандидатов по дайджесту текста (engine.text_to_candidate_records).
+
+Запуск:
+    pytest tests/test_candidates_memo.py -v
+
+Что тестируем:
+1) Один и тот же текст разбирается один раз; разные тексты — отдельно
+2) LRU-граница, выключатель, подмена _smart_candidates сбрасывает мемо
+3) _run_parse_pipeline повторно не разбирает уже разобранный текст
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.candidates import Candidate
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+"""
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Считает вызовы настоящего _smart_candidates."""
+    engine.clear_candidates_memo()
+    real = engine._smart_candidates
+    seen = []
+
+    def counting(text):
+        seen.append(text)
+        return real(text)
+
+    monkeypatch.setattr(engine, "_smart_candidates", counting)
+    monkeypatch.setattr(engine, "CANDIDATES_MEMO_ENABLED", True)
+    yield seen
+    engine.clear_candidates_memo()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: мемо                                                    ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestMemo:
+
+    def test_same_text_extracted_once(self, calls):
+        first = engine.text_to_candidates(RAW_TEXT)
+        second = engine.text_to_candidates(RAW_TEXT)
+        assert first == second and "\t" in first
+        assert calls == [RAW_TEXT]
+
+    def test_distinct_texts(self, calls):
+        engine.text_to_candidates(RAW_TEXT)
+        engine.text_to_candidates(RAW_TEXT + "СОЭ 35 мм/ч 2-20\n")
+        assert len(calls) == 2
+
+    def test_stats(self, calls):
+        before = engine.candidates_memo_stats()
+        engine.text_to_candidates(RAW_TEXT)
+        engine.text_to_candidates(RAW_TEXT)
+        after = engine.candidates_memo_stats()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 1
+        assert after["entries"] == 1
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: граница, выключатель, подмена экстрактора               ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestBounds:
+
+    def test_lru_bound(self, calls, monkeypatch):
+        monkeypatch.setattr(engine, "CANDIDATES_MEMO_MAX_ENTRIES", 2)
+        for text in ("a", "b", "c"):
+            engine.text_to_candidates(text)
+        engine.text_to_candidates("a")  # вытеснен
+        engine.text_to_candidates("c")  # ещё в мемо
+        assert calls == ["a", "b", "c", "a"]
+        assert engine.candidates_memo_stats()["entries"] == 2
+
+    def test_disabled(self, calls, monkeypatch):
+        monkeypatch.setattr(engine, "CANDIDATES_MEMO_ENABLED", False)
+        engine.text_to_candidates(RAW_TEXT)
+        engine.text_to_candidates(RAW_TEXT)
+        assert len(calls) == 2
+
+    def test_replaced_extractor_not_served_from_memo(self, calls, monkeypatch):
+        engine.text_to_candidates(RAW_TEXT)
+        monkeypatch.setattr(engine, "_smart_candidates", lambda text: [Candidate("X", 1, "0-2")])
+        assert engine.text_to_candidates(RAW_TEXT) == "X\t1\t0-2"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: конвейер                                                ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPipeline:
+
+    def test_run_parse_pipeline_reuses_candidates(self, calls):
+        items1, *_ = engine._run_parse_pipeline(RAW_TEXT)
+        items2, *_ = engine._run_parse_pipeline(RAW_TEXT)
+        assert [it.name for it in items1] == [it.name for it in items2]
+        assert calls == [RAW_TEXT]
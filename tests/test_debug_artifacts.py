@@ -0,0 +1,259 @@
+"""
+Политика отладочных артефактов и фоновая запись (parsers/debug_artifacts).
+
+Запуск:
+    pytest tests/test_debug_artifacts.py -v
+
+Что тестируем:
+1) Режимы off / sampled / on_error / always
+2) Ленивый payload сериализуется в фоновом потоке, а не в запросе
+3) engine: _dbg дописывает в конец файла; generate_report открывает границы запроса,
+   при падении в режиме on_error артефакты запроса сохраняются — в том числе
+   записанные в потоках пула LLM и пула OCR тайлов
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.debug_artifacts import ArtifactWriter
+from tests.conftest import FakeLlmResponse, lab_item
+
+
+def _writer(mode, **kw):
+    return ArtifactWriter(mode, **kw)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: режимы                                                  ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestModes:
+
+    def test_off_writes_nothing(self, tmp_path):
+        w = _writer("off")
+        with w.request():
+            w.write(tmp_path / "a.txt", "x")
+            w.write(tmp_path / "err.txt", "boom", error=True)
+        assert w.flush(5)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_always(self, tmp_path):
+        w = _writer("always")
+        w.write(tmp_path / "a.txt", "x")
+        w.write(tmp_path / "b.bin", b"\x00\x01")
+        assert w.flush(5)
+        assert (tmp_path / "a.txt").read_text(encoding="utf-8") == "x"
+        assert (tmp_path / "b.bin").read_bytes() == b"\x00\x01"
+        assert w.stats()["written"] == 2
+
+    def test_on_error_success_discards(self, tmp_path):
+        w = _writer("on_error")
+        with w.request():
+            w.write(tmp_path / "a.txt", "x")
+        assert w.flush(5)
+        assert not (tmp_path / "a.txt").exists()
+
+    def test_on_error_exception_flushes_request(self, tmp_path):
+        w = _writer("on_error")
+        with pytest.raises(RuntimeError):
+            with w.request():
+                w.write(tmp_path / "a.txt", "x")
+                raise RuntimeError("fail")
+        assert w.flush(5)
+        assert (tmp_path / "a.txt").read_text(encoding="utf-8") == "x"
+
+    def test_error_artifact_flushes_context(self, tmp_path):
+        w = _writer("on_error")
+        with w.request():
+            w.write(tmp_path / "ocr.json", "{}")
+            w.write(tmp_path / "http.txt", "HTTP 500", error=True)
+        assert w.flush(5)
+        assert (tmp_path / "ocr.json").exists() and (tmp_path / "http.txt").exists()
+
+    def test_on_error_without_request_skips(self, tmp_path):
+        w = _writer("on_error")
+        w.write(tmp_path / "a.txt", "x")
+        assert w.stats()["skipped"] == 1
+
+    def test_sampled(self, tmp_path):
+        rolls = iter([0.001, 0.9])
+        w = _writer("sampled", sample_rate=0.01, rng=lambda: next(rolls))
+        with w.request():
+            w.write(tmp_path / "sampled.txt", "x")
+        with w.request():
+            w.write(tmp_path / "not_sampled.txt", "x")
+            w.write(tmp_path / "error.txt", "x", error=True)
+        assert w.flush(5)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["error.txt", "sampled.txt"]
+
+    def test_pending_bounded(self, tmp_path):
+        w = _writer("on_error", max_pending=2)
+        with pytest.raises(RuntimeError):
+            with w.request():
+                for i in range(5):
+                    w.write(tmp_path / f"{i}.txt", "x")
+                raise RuntimeError
+        assert w.flush(5)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["3.txt", "4.txt"]
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            ArtifactWriter("verbose")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: сериализация в фоне                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestBackground:
+
+    def test_lazy_payload_runs_in_writer_thread(self, tmp_path):
+        w = _writer("always")
+        threads = []
+
+        def payload():
+            threads.append(threading.current_thread().name)
+            return json.dumps({"a": 1}, indent=2)
+
+        w.write(tmp_path / "raw.json", payload)
+        assert w.flush(5)
+        assert threads == ["debug-artifacts"]
+        assert json.loads((tmp_path / "raw.json").read_text(encoding="utf-8")) == {"a": 1}
+
+    def test_lazy_payload_skipped_when_off(self, tmp_path):
+        w = _writer("off")
+        w.write(tmp_path / "raw.json", lambda: pytest.fail("must not serialize"))
+        assert w.flush(5)
+
+    def test_queue_overflow_drops(self, tmp_path):
+        w = _writer("always", max_queue=1)
+        gate = threading.Event()
+        w.write(tmp_path / "slow.txt", lambda: gate.wait(5) and "x")
+        for i in range(3):
+            w.write(tmp_path / f"{i}.txt", "x")
+        gate.set()
+        assert w.flush(5)
+        assert w.stats()["dropped"] >= 1
+
+    def test_missing_dir_created(self, tmp_path):
+        w = _writer("always")
+        w.write(tmp_path / "no_such_dir" / "a.txt", "x")
+        assert w.flush(5)
+        assert (tmp_path / "no_such_dir" / "a.txt").read_text(encoding="utf-8") == "x"
+
+    def test_write_error_counted(self, tmp_path):
+        (tmp_path / "file").write_text("")
+        w = _writer("always")
+        w.write(tmp_path / "file" / "a.txt", "x")   # папка — обычный файл
+        assert w.flush(5)
+        assert w.stats()["failed"] == 1
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: engine                                                  ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestEngine:
+
+    def test_dbg_appends(self, monkeypatch, tmp_path):
+        log = tmp_path / "debug.log"
+        monkeypatch.setattr(engine, "OCR_DEBUG_PATH", log)
+        engine._dbg("one")
+        engine._dbg("two")
+        lines = log.read_text(encoding="utf-8").splitlines()
+        assert [ln.split("] ", 1)[1] for ln in lines] == ["one", "two"]
+
+    def test_writer_follows_mode(self, monkeypatch):
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "off")
+        assert engine.get_artifact_writer().mode == "off"
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "always")
+        assert engine.get_artifact_writer().mode == "always"
+
+    def test_generate_report_failure_keeps_artifacts(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "on_error")
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        monkeypatch.setattr(engine, "OCR_CANDIDATES_PATH", tmp_path / "cand.txt")
+        # OCR «отработал», но текста нет — generate_report падает с ValueError
+        monkeypatch.setattr(engine, "extract_text_from_upload",
+                            lambda *a, **kw: engine._artifact(engine.OCR_CANDIDATES_PATH, "строки") or "")
+
+        with pytest.raises(ValueError):
+            engine.generate_report("ж", 30, file_bytes=b"\x89PNG", filename="scan.png", mimetype="image/png")
+
+        assert engine.get_artifact_writer().flush(5)
+        assert (tmp_path / "cand.txt").read_text(encoding="utf-8") == "строки"
+
+    def test_llm_http_error_saved(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "on_error")
+        monkeypatch.setattr(engine, "RAW_RESPONSE_PATH", tmp_path / "raw.json")
+
+        class Resp:
+            status_code = 400
+            text = '{"error": "bad request"}'
+
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: Resp())
+        with pytest.raises(RuntimeError):
+            engine.call_yandexgpt("iam", "p")
+
+        assert engine.get_artifact_writer().flush(5)
+        assert "bad request" in (tmp_path / "raw.json").read_text(encoding="utf-8")
+
+    def test_llm_success_not_saved(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "on_error")
+        monkeypatch.setattr(engine, "RAW_RESPONSE_PATH", tmp_path / "raw.json")
+        body = json.dumps({"result": {"alternatives": [{"message": {"text": "ok"}}]}})
+
+        class Resp:
+            status_code = 200
+            text = body
+
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: Resp())
+        assert engine.call_yandexgpt("iam", "p") == "ok"
+        assert engine.get_artifact_writer().flush(5)
+        assert not (tmp_path / "raw.json").exists()
+
+    def test_llm_worker_artifact_kept_on_failure(self, monkeypatch, fresh_llm, raw_path):
+        """Сырой ответ пишется в потоке пула LLM — он должен попасть в буфер запроса."""
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "on_error")
+        body = json.dumps({"result": {"alternatives": [{"message": {"text": "Справка по СОЭ."}}]}}, ensure_ascii=False)
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: FakeLlmResponse(text=body))
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        with pytest.raises(RuntimeError, match="после LLM"):
+            with engine.get_artifact_writer().request():
+                answer, _ = engine._generate_llm_answer("ж", 30, hl, hl)
+                assert answer == "Справка по СОЭ."
+                raise RuntimeError("отчёт упал после LLM")
+
+        assert engine.get_artifact_writer().flush(5)
+        assert "Справка по СОЭ." in engine.RAW_RESPONSE_PATH.read_text(encoding="utf-8")
+
+    def test_ocr_tile_artifacts_kept_on_failure(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "on_error")
+        monkeypatch.setattr(engine, "OCR_DEBUG_PATH", tmp_path / "debug.log")
+        tiles = [(b"tile-%d" % i, i * 10, i * 10 + 12) for i in range(3)]
+        monkeypatch.setattr(engine, "split_image_into_tiles", lambda image_bytes: tiles)
+        monkeypatch.setattr(engine, "ocr_result_to_plaintext", lambda res: res["text"])
+
+        def fake_ocr(iam_token, tile_bytes, mime):
+            name = tile_bytes.decode()
+            engine._artifact(tmp_path / f"{name}.json", name)
+            return {"text": f"строка {name}"}
+
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+
+        with pytest.raises(RuntimeError):
+            with engine.get_artifact_writer().request():
+                engine.ocr_image_tiled("iam", b"image")
+                raise RuntimeError("разбор упал")
+
+        assert engine.get_artifact_writer().flush(5)
+        assert sorted(p.name for p in tmp_path.glob("tile-*.json")) == ["tile-0.json", "tile-1.json", "tile-2.json"]
@@ -12,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from unittest.mock import patch
 from engine import _smart_to_candidates
+from parsers.candidates import Candidate
 from parsers.lab_detector import LabType, LabDetectionResult
 
 
@@ -39,7 +40,9 @@ PARSEABLE_TEXT = """\
 class TestMedsiFallback:
     """МЕДСИ с < 5 кандидатами → fallback на universal."""
 
-    @patch("parsers.medsi_extractor.medsi_inline_to_candidates", return_value="СОЭ\t5\t0-20\tмм/час\nMCV\t87.3\t82-98\tфл")
+    @patch("parsers.medsi_extractor.medsi_inline_candidates", return_value=[
+        Candidate("СОЭ", 5, "0-20", "мм/час"), Candidate("MCV", 87.3, "82-98", "фл"),
+    ])
     @patch("parsers.lab_detector.detect_lab", side_effect=_mock_detect_medsi)
     def test_medsi_few_candidates_falls_to_universal(self, mock_detect, mock_medsi):
         """МЕДСИ вернул 2 кандидата → universal должен дать больше."""
@@ -48,7 +51,13 @@ class TestMedsiFallback:
         # universal должен извлечь >= 5 из PARSEABLE_TEXT
         assert len(lines) >= 5, f"Expected >= 5 candidates, got {len(lines)}"
 
-    @patch("parsers.medsi_extractor.medsi_inline_to_candidates", return_value="Гемоглобин\t140\t130-170\tг/л\nЭритроциты\t4.5\t4.0-5.5\tx10^12/л\nЛейкоциты\t6.0\t4-10\tx10^9/л\nТромбоциты\t200\t150-400\tx10^9/л\nСОЭ\t5\t0-20\tмм/час")
+    @patch("parsers.medsi_extractor.medsi_inline_candidates", return_value=[
+        Candidate("Гемоглобин", 140, "130-170", "г/л"),
+        Candidate("Эритроциты", 4.5, "4.0-5.5", "x10^12/л"),
+        Candidate("Лейкоциты", 6.0, "4-10", "x10^9/л"),
+        Candidate("Тромбоциты", 200, "150-400", "x10^9/л"),
+        Candidate("СОЭ", 5, "0-20", "мм/час"),
+    ])
     @patch("parsers.lab_detector.detect_lab", side_effect=_mock_detect_medsi)
     def test_medsi_enough_candidates_no_fallback(self, mock_detect, mock_medsi):
         """МЕДСИ вернул 5 кандидатов → fallback НЕ нужен."""
@@ -62,7 +71,7 @@ class TestMedsiFallback:
 class TestHelixFallback:
     """HELIX с < 5 кандидатами → fallback на universal."""
 
-    @patch("engine.helix_table_to_candidates", return_value="WBC\t5.0\t4-10\t*10^9/л")
+    @patch("engine.helix_table_candidates", return_value=[Candidate("WBC", 5.0, "4-10", "*10^9/л")])
     @patch("parsers.lab_detector.detect_lab", side_effect=_mock_detect_helix)
     def test_helix_few_candidates_falls_to_universal(self, mock_detect, mock_helix):
         """HELIX вернул 1 кандидат → universal должен дать больше."""
@@ -74,7 +83,7 @@ class TestHelixFallback:
 class TestNoFallbackWhenEmpty:
     """Пустой результат от специализированного парсера → fallback."""
 
-    @patch("parsers.medsi_extractor.medsi_inline_to_candidates", return_value="")
+    @patch("parsers.medsi_extractor.medsi_inline_candidates", return_value=[])
     @patch("parsers.lab_detector.detect_lab", side_effect=_mock_detect_medsi)
     def test_medsi_empty_falls_to_universal(self, mock_detect, mock_medsi):
         """МЕДСИ вернул пустоту → universal."""
@@ -66,13 +66,13 @@ class TestInvitroRouting:
     """INVITRO → universal_extract (нет отдельного парсера)."""
 
     def test_invitro_uses_universal_not_helix(self):
-        """INVITRO не вызывает helix_table_to_candidates."""
+        """INVITRO не вызывает helix_table_candidates."""
         from unittest.mock import patch
         from engine import _smart_to_candidates
 
         text = "invitro.ru\nГемоглобин 145 г/л 120-160"
 
-        with patch("engine.helix_table_to_candidates") as mock_helix:
+        with patch("engine.helix_table_candidates") as mock_helix:
             _smart_to_candidates(text)
             mock_helix.assert_not_called()
 
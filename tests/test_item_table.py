@@ -0,0 +1,158 @@
+"""
+Компактные Item/Range и колоночная таблица показателей (parsers/item_table).
+
+Запуск:
+    pytest tests/test_item_table.py -v
+
+Что тестируем:
+1) Item и Range — slotted-классы без __dict__
+2) ItemTable: статусы, sanity, confidence совпадают с поэлементными функциями engine
+3) ItemTable.quality / parse_metrics / panel_scores совпадают с quality, metrics и detect_panel
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.item_table import ItemTable, STATUS_LABELS
+from parsers.metrics import compute_parse_metrics
+from parsers.quality import evaluate_parse_quality
+from parsers.sanity_ranges import is_sanity_outlier
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 38 % 35-45
+MCV 88 фл 80-100
+Холестерин 4.73 ммоль/л <5.2
+Глюкоза 5.1 ммоль/л 3.9-6.1
+СОЭ 35 мм/ч 2-20
+"""
+
+_NAMES = ["WBC", "RBC", "HGB", "PLT", "ESR", "GLUC", "CHOL", "ALT", "UNKNOWN_X", ""]
+_RAW_NAMES = ["Гемоглобин", "Лейкоциты (WBC)", "Hb*10^9", "мусор/шум", "АЛТ", "x1", "",
+              "Тромбоциты (PLT) 10^9/л", "СОЭ", "ab"]
+_REF_TEXTS = ["", "120-150", "150-400213", "1 2 3 4 5", "<5.2", "3.8 - 5.1"]
+
+
+def _random_items(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    items = []
+    for _ in range(n):
+        value = None if rnd.random() < 0.1 else round(rnd.uniform(-5, 500), 2)
+        ref = None
+        r = rnd.random()
+        if r < 0.5:
+            lo = round(rnd.uniform(0, 100), 1)
+            ref = engine.Range(low=lo, high=lo + rnd.uniform(0, 200))
+        elif r < 0.6:
+            ref = engine.Range(low=None, high=rnd.uniform(0, 100))
+        elif r < 0.7:
+            ref = engine.Range(low=rnd.uniform(0, 100), high=None)
+        items.append(engine.Item(
+            raw_name=rnd.choice(_RAW_NAMES),
+            name=rnd.choice(_NAMES),
+            value=value,
+            unit=rnd.choice(["", " ", "г/л", "%"]),
+            ref_text=rnd.choice(_REF_TEXTS),
+            ref=ref,
+            ref_source="",
+            status="",
+            confidence=rnd.choice([0.0, 0.3, 0.5, 0.9, 1.0]),
+        ))
+    return items
+
+
+def _pipeline_items():
+    items, *_ = engine._run_parse_pipeline(RAW_TEXT)
+    assert items
+    return items
+
+
+@pytest.fixture(params=["pipeline", "random"])
+def items(request):
+    return _pipeline_items() if request.param == "pipeline" else _random_items(500)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: slotted Item / Range                                    ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSlots:
+
+    def test_no_dict(self):
+        it = _random_items(1)[0]
+        assert not hasattr(it, "__dict__")
+        assert not hasattr(engine.Range(1.0, 2.0), "__dict__")
+
+    def test_unknown_attribute_rejected(self):
+        with pytest.raises(AttributeError):
+            _random_items(1)[0].extra = 1
+
+    def test_confidence_default(self):
+        it = engine.Item("A", "A", 1.0, "", "", None, "", "")
+        assert it.confidence == 0.0
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: поэлементные вычисления                                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestVectorized:
+
+    def test_statuses(self, items):
+        table = ItemTable.from_items(items)
+        assert table.statuses() == [engine.status_by_range(it.value, it.ref) for it in items]
+        assert set(STATUS_LABELS) >= set(table.statuses())
+
+    def test_sanity(self, items):
+        table = ItemTable.from_items(items)
+        expected = [it.value is not None and is_sanity_outlier(it.name, it.value) for it in items]
+        assert table.sanity_outliers().tolist() == expected
+
+    def test_confidence(self, items):
+        table = ItemTable.from_items(items)
+        assert table.confidences().tolist() == [engine.compute_item_confidence(it) for it in items]
+
+    def test_assign_confidence(self, items):
+        table = ItemTable.from_items(items)
+        table.assign_confidence()
+        engine.assign_confidence(items)
+        assert table.confidence.tolist() == [it.confidence for it in items]
+
+    def test_empty(self):
+        table = ItemTable.from_items([])
+        assert len(table) == 0
+        assert table.statuses() == [] and table.confidences().tolist() == []
+        assert table.quality() == evaluate_parse_quality([])
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: агрегаты                                                ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestAggregates:
+
+    def test_quality(self, items):
+        table = ItemTable.from_items(items)
+        assert table.quality() == evaluate_parse_quality(items)
+        kw = dict(filtered_header_count=2, dedup_dropped_count=3, sanity_outlier_count=1)
+        assert table.quality(15, **kw) == evaluate_parse_quality(items, 15, **kw)
+
+    def test_parse_metrics(self, items):
+        table = ItemTable.from_items(items)
+        q = table.quality()
+        assert table.parse_metrics() == compute_parse_metrics(items)
+        assert table.parse_metrics(quality_dict=q) == compute_parse_metrics(items, quality_dict=q)
+
+    def test_panel(self, items):
+        table = ItemTable.from_items(items)
+        assert table.panel_scores() == engine.detect_panel({it.name for it in items})
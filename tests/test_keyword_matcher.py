@@ -0,0 +1,120 @@
+"""
+Поиск ключей RUS_NAME_MAP автоматом Ахо–Корасик (parsers/keyword_matcher).
+
+Запуск:
+    pytest tests/test_keyword_matcher.py -v
+
+Что тестируем:
+1) KeywordMatcher.match_indices совпадает с перебором `k in text`
+2) normalize_name даёт тот же код, что прежний перебор ключей
+   (приоритет "%", самый длинный ключ, коды в скобках через ALIASES)
+3) Кэш normalize_name и rebuild_name_matcher()
+"""
+
+import random
+import re
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.keyword_matcher import KeywordMatcher
+
+
+def _brute(keys, text):
+    return [i for i, k in enumerate(keys) if k and k in text]
+
+
+def _legacy_rus_name(low):
+    """Прежняя логика normalize_name: перебор всех ключей RUS_NAME_MAP."""
+    if "%" in low:
+        for k, v in engine.RUS_NAME_MAP.items():
+            if "%" in k and k in low:
+                return v
+    for k in sorted(engine.RUS_NAME_MAP.keys(), key=len, reverse=True):
+        if k in low:
+            return engine.RUS_NAME_MAP[k]
+    return None
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: автомат против перебора                                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestKeywordMatcher:
+
+    def test_overlapping_keys(self):
+        m = KeywordMatcher(["he", "she", "his", "hers"])
+        assert m.match_indices("ushers") == [0, 1, 3]
+        assert m.match_indices("xyz") == []
+
+    def test_empty_key_ignored(self):
+        assert KeywordMatcher(["", "a"]).match_indices("a") == [1]
+
+    def test_random_equivalence(self):
+        rnd = random.Random(7)
+        alphabet = "абв%"
+        for _ in range(300):
+            keys = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 4)))
+                    for _ in range(rnd.randint(1, 8))]
+            text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 20)))
+            assert KeywordMatcher(keys).match_indices(text) == _brute(keys, text)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: normalize_name как раньше                               ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestNormalizeName:
+
+    def test_every_key_and_context(self):
+        for key in engine.RUS_NAME_MAP:
+            for low in (key, f"общий {key} крови", f"{key} %", f"% {key}"):
+                assert engine._match_rus_name(low) == _legacy_rus_name(low), low
+
+    def test_longest_key_wins(self):
+        assert engine.normalize_name("Гликированный гемоглобин") == \
+            _legacy_rus_name("гликированный гемоглобин")
+
+    def test_real_names(self):
+        names = [
+            "Гемоглобин", "Нейтрофилы, %", "Нейтрофилы, абс.", "Лимфоциты %",
+            "Средний объем эритроцита (MCV)", "Гематокрит", "СОЭ по Вестергрену",
+            "Аланинаминотрансфераза (АЛТ)", "Холестерин ЛПНП (ЛПНП, LDL)",
+            "Неизвестный показатель", "",
+        ]
+        for raw in names:
+            s = re.sub(r"\s+", " ", raw.strip())
+            expected = _legacy_rus_name(s.lower())
+            got = engine.normalize_name(raw)
+            if expected is not None and "(" not in s:
+                assert got == expected, raw
+            assert got == engine._normalize_name_cached.__wrapped__(raw)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: кэш                                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestCache:
+
+    def test_cache_hits(self):
+        engine._normalize_name_cached.cache_clear()
+        engine.normalize_name("Гемоглобин")
+        engine.normalize_name("Гемоглобин")
+        assert engine._normalize_name_cached.cache_info().hits == 1
+
+    def test_none_is_empty(self):
+        assert engine.normalize_name(None) == engine.normalize_name("")
+
+    def test_rebuild_after_map_change(self, monkeypatch):
+        monkeypatch.setitem(engine.RUS_NAME_MAP, "тестовый показатель", "TEST_CODE")
+        engine.rebuild_name_matcher()
+        try:
+            assert engine.normalize_name("Тестовый показатель") == "TEST_CODE"
+        finally:
+            monkeypatch.undo()
+            engine.rebuild_name_matcher()
+        assert engine.normalize_name("Тестовый показатель") != "TEST_CODE"
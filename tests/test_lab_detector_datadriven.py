@@ -6,6 +6,7 @@
 - UNKNOWN при недостаточном score
 - Конфликт сигнатур (приоритет через score)
 - Регрессия существующих кейсов
+- Скомпилированный LabDetector: вложенные ключи, ранняя остановка
 
 Запуск: pytest tests/test_lab_detector_datadriven.py -v
 """
@@ -218,3 +219,87 @@ class TestDataDrivenExtensibility:
 
 
 
+
+
+# ══════════════════════════════════════
+# 7. Скомпилированный детектор
+# ══════════════════════════════════════
+
+def _full_score(signatures, text):
+    """Полный подсчёт без ранней остановки (как до LabDetector)."""
+    import re
+    best = None
+    for index, lab in enumerate(signatures):
+        score, matched = 0.0, []
+        for sig in lab["signatures"]:
+            if sig.get("callable"):
+                from parsers.lab_detector import _CALLABLE_CHECKS, _Document
+                fn = _CALLABLE_CHECKS.get(sig["pattern"])
+                hit = bool(fn and fn(_Document(text)))
+            elif sig.get("regex"):
+                hit = len(re.findall(sig["pattern"], text, re.M | re.I)) >= sig.get("min_count", 1)
+            else:
+                hit = sig["pattern"].lower() in text.lower()
+            if hit:
+                score += sig["weight"]
+                matched.append(f"{sig['kind']}:{sig['pattern']}")
+        if min(score, 1.0) >= lab["threshold"] and (best is None or score > best[1]):
+            best = (lab["lab_type"], score, matched)
+    return best
+
+
+class TestCompiledDetector:
+    def test_nested_literals_all_matched(self):
+        result = detect_lab("Сайт: www.invitro.ru")
+        assert result.lab_type == LabType.INVITRO
+        assert set(result.matched_signatures) == {
+            "name:invitro", "domain:invitro.ru", "domain:www.invitro.ru",
+        }
+
+    def test_matches_full_scoring(self):
+        from parsers.lab_signatures import LAB_SIGNATURES
+        texts = [
+            "Клиника МЕДСИ medsi.ru\n(WBC) 5.0 4-9\n(RBC) 4.1 3.8-5.1\n(HGB) 130 120-160\n",
+            "Хеликс helix.ru\nИсследование\tРезультат\n" + "Гемоглобин\n140\n" * 6,
+            "ООО «ИНВИТРО» invitro.ru и медси",
+            "Ситилаб\n" + "г/лГемоглобин 140\n" * 6,
+            "Лаборатория Гемотест, лабораторный комплекс правообладателя",
+            "Гемоглобин 140 г/л 120-160",
+        ]
+        for text in texts:
+            expected = _full_score(LAB_SIGNATURES, text)
+            result = detect_lab(text)
+            if expected is None:
+                assert result.lab_type == LabType.UNKNOWN
+            else:
+                assert (result.lab_type, result.confidence, result.matched_signatures) == \
+                    (expected[0], min(expected[1], 1.0), expected[2]), text
+
+    def test_early_stop_skips_structural_checks(self, monkeypatch):
+        from parsers import lab_detector
+        calls = []
+        monkeypatch.setitem(lab_detector._CALLABLE_CHECKS, "probe",
+                            lambda doc: calls.append(1) or True)
+        detector = lab_detector.LabDetector([
+            {"lab_type": LabType.INVITRO, "threshold": 0.3,
+             "signatures": [{"kind": "name", "pattern": "invitro", "weight": 0.9}]},
+            {"lab_type": LabType.HELIX, "threshold": 0.3,
+             "signatures": [{"kind": "name", "pattern": "helix", "weight": 0.4},
+                            {"kind": "structural", "pattern": "probe", "weight": 0.4,
+                             "callable": True}]},
+        ])
+        assert detector.detect("invitro helix").lab_type == LabType.INVITRO
+        assert calls == [], "HELIX не может набрать больше 0.8 — проверка не нужна"
+
+        assert detector.detect("helix").lab_type == LabType.HELIX
+        assert calls == [1]
+
+    def test_tie_prefers_first_in_config(self):
+        from parsers.lab_detector import LabDetector
+        detector = LabDetector([
+            {"lab_type": LabType.MEDSI, "threshold": 0.3,
+             "signatures": [{"kind": "name", "pattern": "abc", "weight": 0.5}]},
+            {"lab_type": LabType.HELIX, "threshold": 0.3,
+             "signatures": [{"kind": "name", "pattern": "bc", "weight": 0.5}]},
+        ])
+        assert detector.detect("xabcx").lab_type == LabType.MEDSI
@@ -6,6 +6,7 @@
   - score_line на строках с показателями → score >= 0.5
   - is_noise на типовых служебных строках
   - has_numeric_value, has_ref_pattern, has_known_unit, has_known_biomarker
+  - line_features: все признаки за один проход, кэш по строке, B1-метрики
 """
 
 import sys
@@ -21,7 +22,11 @@ from parsers.line_scorer import (
     has_ref_pattern,
     has_known_unit,
     has_known_biomarker,
+    is_header_service_line,
+    line_features,
+    _line_features,
 )
+from parsers.metrics import compute_ocr_quality_metrics
 
 
 # ============================================================
@@ -169,3 +174,50 @@ class TestPredicates:
         assert not has_known_biomarker("Просто какой-то текст")
 
 
+
+
+# ============================================================
+# Тесты: line_features — единые признаки строки
+# ============================================================
+class TestLineFeatures:
+
+    LINES = [
+        "", "  ", "Гемоглобин 140 г/л 120-160", "Лейкоциты (WBC) 5.2 *10^9/л 4.0 - 9.0",
+        "Лицензия № 12345", "+7 (495) 123-45-67", "12.03.2024 10:15", "СОЭ 35 мм/ч до 20",
+        "Страница 1 из 2", "■■■ |||", "ALT 45 Ед/л", "< 5.2 ммоль/л - нормальный уровень",
+    ]
+
+    def test_flags_match_predicates(self):
+        for ln in self.LINES:
+            f = line_features(ln)
+            assert f.score == score_line(ln)
+            assert f.is_noise == is_noise(ln)
+            assert f.is_header_service == is_header_service_line(ln)
+            assert f.has_biomarker == has_known_biomarker(ln)
+            assert f.has_unit == has_known_unit(ln)
+            assert f.has_ref == has_ref_pattern(ln)
+            assert f.has_numeric == has_numeric_value(ln)
+
+    def test_cached_by_stripped_line(self):
+        _line_features.cache_clear()
+        assert line_features("  Гемоглобин 140 ") is line_features("Гемоглобин 140")
+        assert _line_features.cache_info().misses == 1
+
+    def test_none_is_empty(self):
+        assert line_features(None) is line_features("")
+        assert line_features(None).is_noise
+
+    def test_metric_flags(self):
+        assert line_features("■■■ |||").is_ocr_garbage
+        assert line_features("---").is_ocr_garbage
+        assert not line_features("HGB 140").is_ocr_garbage
+        assert line_features("hgb: 140").has_metric_biomarker
+        assert not line_features("HGBX 140").has_metric_biomarker
+        assert not line_features("Гемоглобин").has_metric_biomarker  # только коды
+
+    def test_ocr_quality_metrics(self):
+        m = compute_ocr_quality_metrics("HGB 140 г/л\n■■■\nГемоглобин\nWBC 5.2")
+        assert m["noise_line_ratio"] == 0.25
+        assert m["digit_line_ratio"] == 0.5
+        assert m["biomarker_line_ratio"] == 0.5
+        assert m["numeric_candidates_count"] == 2
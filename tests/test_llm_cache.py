@@ -0,0 +1,251 @@
+"""
+Кэш ответов LLM (ключ — текст промпта) и сигнатура отклонений.
+
+Запуск:
+    pytest tests/test_llm_cache.py -v
+
+Что тестируем:
+1) Сигнатура (статистика отказов): не зависит от порядка и точных значений внутри
+   одной степени отклонения; ключ ответа — зависит от возраста, значений и названий
+2) LlmResponseCache: TTL, LRU-вытеснение, сохранение/загрузка с диска, hit rate
+3) _generate_llm_answer: тот же промпт берётся из кэша, другой пациент с той же
+   картиной — нет (ответ цитирует значения); отказы не кэшируются; по умолчанию
+   кэш только в памяти
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parsers.llm_cache import (
+    LlmResponseCache,
+    age_band,
+    answer_cache_key,
+    deviation_signature,
+    magnitude_bucket,
+)
+from tests.conftest import FakeClock, lab_item
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: сигнатура                                               ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSignature:
+
+    def test_age_band(self):
+        assert age_band(34) == "30-39"
+        assert age_band(40) == "40-49"
+        assert age_band("abc") == "?"
+
+    def test_magnitude_buckets(self):
+        assert magnitude_bucket(21, 2, 20, "ВЫШЕ") == "SLIGHT"
+        assert magnitude_bucket(25, 2, 20, "ВЫШЕ") == "MODERATE"
+        assert magnitude_bucket(45, 2, 20, "ВЫШЕ") == "MARKED"
+        assert magnitude_bucket(3.5, 4.0, 9.0, "НИЖЕ") == "MODERATE"
+        assert magnitude_bucket(None, 1, 2, "ВЫШЕ") == "?"
+
+    def test_zero_bound_uses_range_width(self):
+        assert magnitude_bucket(-1, 0, 10, "НИЖЕ") == "MODERATE"
+
+    def test_order_independent(self):
+        a = [lab_item("ESR", 30, 2, 20, "ВЫШЕ"), lab_item("HGB", 100, 120, 150, "НИЖЕ")]
+        assert deviation_signature("ж", 35, a) == deviation_signature("Ж", 38, list(reversed(a)))
+
+    def test_same_bucket_same_signature(self):
+        a = [lab_item("ESR", 26, 2, 20, "ВЫШЕ")]
+        b = [lab_item("ESR", 28, 2, 20, "ВЫШЕ")]
+        assert deviation_signature("ж", 35, a) == deviation_signature("ж", 35, b)
+
+    def test_differences_change_signature(self):
+        base = [lab_item("ESR", 26, 2, 20, "ВЫШЕ")]
+        sig = deviation_signature("ж", 35, base)
+        assert sig != deviation_signature("м", 35, base)
+        assert sig != deviation_signature("ж", 45, base)
+        assert sig != deviation_signature("ж", 35, [lab_item("ESR", 60, 2, 20, "ВЫШЕ")])
+        assert sig != deviation_signature("ж", 35, base, version="2")
+
+    def test_no_deviations(self):
+        assert deviation_signature("ж", 35, []) == deviation_signature("ж", 31, [])
+
+
+class TestAnswerKey:
+
+    @staticmethod
+    def _prompt(age=35, value=26, raw_name=None, ref_text=None):
+        import engine
+        it = lab_item("ESR", value, 2, 20, "ВЫШЕ", raw_name=raw_name)
+        if ref_text is not None:
+            it.ref_text = ref_text
+        return engine.build_llm_prompt("ж", age, [it], "", [])
+
+    def test_same_prompt_same_key(self):
+        assert answer_cache_key(self._prompt()) == answer_cache_key(self._prompt())
+
+    def test_patient_data_changes_key(self):
+        key = answer_cache_key(self._prompt())
+        # Та же сигнатура отклонений, но ответ процитировал бы другие данные
+        assert deviation_signature("ж", 35, [lab_item("ESR", 26, 2, 20, "ВЫШЕ")]) == \
+            deviation_signature("ж", 36, [lab_item("ESR", 28, 2, 20, "ВЫШЕ")])
+        assert key != answer_cache_key(self._prompt(age=36))
+        assert key != answer_cache_key(self._prompt(value=28))
+        assert key != answer_cache_key(self._prompt(raw_name="СОЭ (по Вестергрену)"))
+        assert key != answer_cache_key(self._prompt(ref_text="0-15"))
+
+    def test_version_changes_key(self):
+        assert answer_cache_key(self._prompt(), version="1") != answer_cache_key(self._prompt(), version="2")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: кэш                                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestLlmResponseCache:
+
+    def test_hit_and_miss_counters(self):
+        c = LlmResponseCache()
+        assert c.get("k") is None
+        c.put("k", "ответ")
+        assert c.get("k") == "ответ"
+        st = c.stats()
+        assert (st["hits"], st["misses"], st["hit_rate"], st["size"]) == (1, 1, 0.5, 1)
+
+    def test_ttl_expiry(self):
+        clock = FakeClock(1000.0)
+        c = LlmResponseCache(ttl_sec=60, clock=clock)
+        c.put("k", "ответ")
+        clock.t += 61
+        assert c.get("k") is None
+        assert len(c) == 0
+
+    def test_lru_eviction(self):
+        c = LlmResponseCache(max_entries=2)
+        c.put("a", "1")
+        c.put("b", "2")
+        c.get("a")          # a — свежий
+        c.put("c", "3")     # вытесняется b
+        assert c.get("b") is None
+        assert c.get("a") == "1"
+        assert c.get("c") == "3"
+
+    def test_empty_answer_not_stored(self):
+        c = LlmResponseCache()
+        c.put("k", "")
+        assert len(c) == 0
+
+    def test_disk_persistence(self, tmp_path):
+        path = tmp_path / "llm_cache.json"
+        c1 = LlmResponseCache(path)
+        c1.put("a", "1")
+        c1.put("b", "2")
+
+        c2 = LlmResponseCache(path, max_entries=1)
+        assert c2.get("b") == "2"
+        assert c2.get("a") is None  # при загрузке обрезано до max_entries (LRU)
+
+    def test_expired_entries_skipped_on_load(self, tmp_path):
+        path = tmp_path / "llm_cache.json"
+        clock = FakeClock(1000.0)
+        LlmResponseCache(path, clock=clock).put("a", "1")
+        clock.t += 100
+        assert LlmResponseCache(path, ttl_sec=50, clock=clock).get("a") is None
+
+    def test_corrupted_file_ignored(self, tmp_path):
+        path = tmp_path / "llm_cache.json"
+        path.write_text("{not json", encoding="utf-8")
+        c = LlmResponseCache(path)
+        assert len(c) == 0
+        c.put("a", "1")
+        assert LlmResponseCache(path).get("a") == "1"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: интеграция в engine                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGenerateLlmAnswerCache:
+
+    @pytest.fixture
+    def engine_env(self, monkeypatch, fresh_llm):
+        import engine
+
+        calls = []
+        replies = []
+
+        def fake_llm(token, prompt, **kw):
+            calls.append(prompt)
+            return replies.pop(0) if replies else "Справка по показателям."
+
+        monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", True)
+        monkeypatch.setattr(engine, "call_yandexgpt", fake_llm)
+        return engine, calls, replies
+
+    def test_same_report_served_from_cache(self, engine_env):
+        engine, calls, _ = engine_env
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        a1, info1 = engine._generate_llm_answer("ж", 34, hl, hl)
+        a2, info2 = engine._generate_llm_answer("ж", 34, [lab_item("ESR", 30, 2, 20, "ВЫШЕ")],
+                                                [lab_item("ESR", 30, 2, 20, "ВЫШЕ")])
+
+        assert len(calls) == 1
+        assert a1 == a2
+        assert info1["hit"] is False
+        assert info2["hit"] is True
+        assert info2["hit_rate"] == 0.5
+
+    def test_other_patient_same_bucket_not_served(self, engine_env):
+        """Тот же bucket, но другие возраст и значение — ответ пациента A пациенту B не отдаётся."""
+        engine, calls, replies = engine_env
+        replies.extend(["СОЭ 30 мм/ч, возраст 34.", "СОЭ 31 мм/ч, возраст 36."])
+        hl_a = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+        hl_b = [lab_item("ESR", 31, 2, 20, "ВЫШЕ")]
+
+        engine._generate_llm_answer("ж", 34, hl_a, hl_a)
+        answer_b, info_b = engine._generate_llm_answer("ж", 36, hl_b, hl_b)
+
+        assert len(calls) == 2
+        assert "возраст 36" in calls[1] and "31" in calls[1]
+        assert answer_b == "СОЭ 31 мм/ч, возраст 36."
+        assert info_b["hit"] is False
+
+    def test_refusal_not_cached(self, engine_env):
+        engine, calls, replies = engine_env
+        refusal = "К сожалению, я не могу обсуждать эту тему."
+        assert engine._is_llm_refusal(refusal)
+        replies.extend([refusal, refusal])
+        hl = [lab_item("HGB", 90, 120, 150, "НИЖЕ")]
+
+        answer, info = engine._generate_llm_answer("м", 50, hl, hl)
+
+        assert not engine._is_llm_refusal(answer)  # fallback-текст
+        assert info["size"] == 0
+
+    def test_default_cache_in_memory_only(self, engine_env, monkeypatch, tmp_path):
+        """По умолчанию ответы (с данными пациента) на диск не пишутся."""
+        engine, calls, _ = engine_env
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        monkeypatch.setattr(engine, "_LLM_CACHE", None)   # кэш из настроек по умолчанию
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        engine._generate_llm_answer("ж", 34, hl, hl)
+        _, info = engine._generate_llm_answer("ж", 34, hl, hl)
+
+        assert engine.LLM_CACHE_PATH is None
+        assert info["hit"] is True and len(calls) == 1
+        assert list(tmp_path.glob("llm_cache*")) == []
+
+    def test_disabled_cache_always_calls(self, engine_env, monkeypatch):
+        engine, calls, _ = engine_env
+        monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", False)
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        engine._generate_llm_answer("ж", 34, hl, hl)
+        _, info = engine._generate_llm_answer("ж", 34, hl, hl)
+
+        assert len(calls) == 2
+        assert info == {"enabled": False, "hit": False}
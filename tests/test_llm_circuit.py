@@ -0,0 +1,304 @@
+"""
+Бюджет времени стадии LLM, circuit breaker и hedged-запросы.
+
+Запуск:
+    pytest tests/test_llm_circuit.py -v
+
+Что тестируем:
+1) CircuitBreaker: размыкание по доле ошибок и по задержке, cooldown, пробный вызов
+2) _call_llm_guarded: бюджет, разомкнутый breaker, hedged-запрос,
+   единственный пробный вызов в HALF_OPEN
+3) _generate_llm_answer: fallback-текст и диагностика в quality["metrics"]["llm_gate"]
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.llm_circuit import CircuitBreaker, LlmDeadline
+from tests.conftest import FakeClock, lab_item
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: CircuitBreaker и LlmDeadline                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestCircuitBreaker:
+
+    def test_stays_closed_below_min_calls(self):
+        b = CircuitBreaker(min_calls=5)
+        for _ in range(4):
+            b.record(False, 1.0)
+        assert b.allow() is True
+        assert b.state == "CLOSED"
+
+    def test_opens_on_error_rate(self):
+        b = CircuitBreaker(min_calls=4, max_error_rate=0.5)
+        for ok in (True, False, True, False):
+            b.record(ok, 1.0)
+        assert b.state == "OPEN"
+        assert b.allow() is False
+        assert b.snapshot()["open_reason"] == "HIGH_ERROR_RATE"
+
+    def test_opens_on_latency(self):
+        b = CircuitBreaker(min_calls=3, max_avg_latency_sec=10.0)
+        for _ in range(3):
+            b.record(True, 15.0)
+        assert b.allow() is False
+        assert b.snapshot()["open_reason"] == "HIGH_LATENCY"
+
+    def test_half_open_single_probe_then_close(self):
+        clock = FakeClock()
+        b = CircuitBreaker(min_calls=2, cooldown_sec=60, clock=clock)
+        b.record(False, 1.0)
+        b.record(False, 1.0)
+        assert b.allow() is False
+
+        clock.t += 61
+        assert b.state == "HALF_OPEN"
+        assert b.allow() is True      # пробный вызов
+        assert b.allow() is False     # второй — ждёт результата пробы
+        b.record(True, 1.0)
+        assert b.state == "CLOSED"
+        assert b.snapshot()["window_calls"] == 0
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        b = CircuitBreaker(min_calls=1, cooldown_sec=10, clock=clock)
+        b.record(False, 1.0)
+        clock.t += 11
+        assert b.allow() is True
+        b.record(False, 1.0)
+        assert b.state == "OPEN"
+        assert b.snapshot()["open_reason"] == "PROBE_FAILED"
+
+    def test_release_returns_probe_slot(self):
+        clock = FakeClock()
+        b = CircuitBreaker(min_calls=1, cooldown_sec=10, clock=clock)
+        b.record(False, 1.0)
+        clock.t += 11
+        assert b.allow() is True
+        b.release()                   # проба не отправлена
+        assert b.state == "HALF_OPEN"
+        assert b.allow() is True
+
+    def test_deadline(self):
+        clock = FakeClock()
+        d = LlmDeadline(10, clock=clock)
+        clock.t += 4
+        assert d.remaining() == 6
+        clock.t += 7
+        assert d.expired() is True
+        assert d.remaining() == 0.0
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: _call_llm_guarded                                       ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestCallLlmGuarded:
+
+    def test_success_recorded(self, fresh_llm):
+        assert engine._call_llm_guarded(lambda: "ok", LlmDeadline(5)) == "ok"
+        assert engine._get_llm_breaker().snapshot()["window_calls"] == 1
+
+    def test_budget_exceeded(self, fresh_llm):
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return "late"
+
+        info = {}
+        t0 = time.monotonic()
+        with pytest.raises(engine.LlmUnavailable) as ei:
+            engine._call_llm_guarded(slow, LlmDeadline(0.2), run_info=info)
+        release.set()
+
+        assert ei.value.reason == "BUDGET_EXCEEDED"
+        assert time.monotonic() - t0 < 2.0
+        assert info["budget_exceeded"] is True
+        assert engine._get_llm_breaker().snapshot()["error_rate"] == 1.0
+
+    def test_breaker_open_skips_call(self, fresh_llm):
+        breaker = engine._get_llm_breaker()
+        for _ in range(engine.LLM_BREAKER_MIN_CALLS):
+            breaker.record(False, 1.0)
+
+        called = []
+        with pytest.raises(engine.LlmUnavailable) as ei:
+            engine._call_llm_guarded(lambda: called.append(1) or "x", LlmDeadline(5))
+        assert ei.value.reason == "BREAKER_OPEN"
+        assert called == []
+
+    def test_expired_budget_keeps_probe_slot(self, fresh_llm, monkeypatch):
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, cooldown_sec=10, clock=clock)
+        monkeypatch.setattr(engine, "_LLM_BREAKER", breaker)
+        breaker.record(False, 1.0)
+        clock.t += 11
+
+        expired = LlmDeadline(1, clock=clock)
+        clock.t += 2
+        with pytest.raises(engine.LlmUnavailable) as ei:
+            engine._call_llm_guarded(lambda: "x", expired)
+        assert ei.value.reason == "BUDGET_EXCEEDED"
+
+        assert engine._call_llm_guarded(lambda: "ok", LlmDeadline(5)) == "ok"
+        assert breaker.state == "CLOSED"
+
+    def test_half_open_probe_skips_alternatives(self, fresh_llm, monkeypatch):
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, cooldown_sec=10, clock=clock)
+        monkeypatch.setattr(engine, "_LLM_BREAKER", breaker)
+        breaker.record(False, 1.0)
+        clock.t += 11
+
+        called = []
+        info = {}
+        result = engine._call_llm_guarded(
+            lambda: called.append("fn") or "probe", LlmDeadline(5), run_info=info,
+            alternatives=(lambda: called.append("alt") or "alt",),
+        )
+        assert result == "probe"
+        assert called == ["fn"]
+        assert info["alternatives_skipped"] is True
+        assert breaker.state == "CLOSED"
+
+    def test_errors_propagate(self, fresh_llm):
+        def boom():
+            raise RuntimeError("LLM HTTP 400")
+
+        with pytest.raises(RuntimeError, match="400"):
+            engine._call_llm_guarded(boom, LlmDeadline(5))
+
+    def test_hedged_request_wins(self, fresh_llm):
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)      # первый «завис»
+                return "slow"
+            return "fast"
+
+        info = {}
+        result = engine._call_llm_guarded(fn, LlmDeadline(5), hedge_delay=0.1, run_info=info)
+        release.set()
+
+        assert result == "fast"
+        assert info["hedged"] is True
+        assert info["hedge_won"] is True
+
+    def test_no_hedge_when_fast(self, fresh_llm):
+        info = {}
+        assert engine._call_llm_guarded(lambda: "ok", LlmDeadline(5), hedge_delay=1.0, run_info=info) == "ok"
+        assert "hedged" not in info
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: интеграция в _generate_llm_answer                       ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGenerateLlmAnswerResilience:
+
+    HL = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+    def test_gate_info_on_success(self, fresh_llm, monkeypatch):
+        monkeypatch.setattr(engine, "call_yandexgpt", lambda token, prompt, **kw: "Справка.")
+        gate = {"decision": "CALL"}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+
+        assert answer == "Справка."
+        assert gate["fallback_reason"] is None
+        assert gate["budget_exceeded"] is False
+        assert gate["breaker"]["state"] == "CLOSED"
+        assert gate["budget_sec"] == engine.LLM_BUDGET_SEC
+
+    def test_budget_overrun_uses_fallback(self, fresh_llm, monkeypatch):
+        release = threading.Event()
+        monkeypatch.setattr(engine, "LLM_BUDGET_SEC", 0.2)
+        monkeypatch.setattr(engine, "call_yandexgpt",
+                            lambda token, prompt, **kw: release.wait(5) and "late")
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+        release.set()
+
+        assert answer == engine.build_fallback_text("ж", 30, self.HL, self.HL)
+        assert gate["fallback_reason"] == "BUDGET_EXCEEDED"
+        assert gate["budget_exceeded"] is True
+
+    def test_open_breaker_goes_straight_to_fallback(self, fresh_llm, monkeypatch):
+        breaker = engine._get_llm_breaker()
+        for _ in range(engine.LLM_BREAKER_MIN_CALLS):
+            breaker.record(False, 1.0)
+        monkeypatch.setattr(engine, "call_yandexgpt",
+                            lambda token, prompt, **kw: pytest.fail("LLM must not be called"))
+        gate = {}
+
+        engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+
+        assert gate["fallback_reason"] == "BREAKER_OPEN"
+        assert gate["breaker"]["state"] == "OPEN"
+
+    def test_half_open_speculative_retries_sequentially(self, fresh_llm, monkeypatch):
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=1, cooldown_sec=10, clock=clock)
+        monkeypatch.setattr(engine, "_LLM_BREAKER", breaker)
+        breaker.record(False, 1.0)
+        clock.t += 11
+        monkeypatch.setattr(engine._REFUSAL_POLICY, "should_speculate", lambda sig: True)
+        prompts = []
+
+        def fake(token, prompt, **kw):
+            prompts.append(prompt)
+            return "К сожалению, я не могу обсуждать это." if len(prompts) == 1 else "Справка."
+
+        # проба спекулятивного вызова идёт стримом, повтор — обычным запросом
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", fake)
+        monkeypatch.setattr(engine, "call_yandexgpt", fake)
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+
+        assert answer == "Справка."
+        assert len(prompts) == 2          # проба, затем смягчённый — по очереди
+        assert gate["alternatives_skipped"] is True
+        assert gate["refusal_policy"]["winner"] == "softened"
+
+    def test_refusal_reason(self, fresh_llm, monkeypatch):
+        monkeypatch.setattr(engine, "call_yandexgpt",
+                            lambda token, prompt, **kw: "К сожалению, я не могу обсуждать это.")
+        gate = {}
+        engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+        assert gate["fallback_reason"] == "REFUSAL"
+
+    def test_abandoned_stream_does_not_overwrite_fallback(self, fresh_llm, monkeypatch):
+        release = threading.Event()
+        finished = threading.Event()
+        monkeypatch.setattr(engine, "LLM_BUDGET_SEC", 0.2)
+
+        def late_stream(token, prompt, on_text=None, **kw):
+            release.wait(5)
+            on_text("Поздний текст LLM " * 20)
+            finished.set()
+            return "Поздний текст LLM"
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", late_stream)
+        received = []
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, on_text=received.append)
+        release.set()
+        finished.wait(5)
+
+        assert received == [answer]
@@ -0,0 +1,307 @@
+"""
+Адаптивная политика против отказов LLM: статистика по сигнатурам
+и одновременная отправка обычного и смягчённого промптов.
+
+Запуск:
+    pytest tests/test_llm_refusal_policy.py -v
+
+Что тестируем:
+1) RefusalStats: сглаженная доля отказов, порог, сохранение на диск
+2) _generate_llm_answer: для «отказной» сигнатуры оба промпта идут параллельно,
+   берётся первый ответ без отказа; для обычной — прежний последовательный путь
+3) Стриминг: клиенту уходит текст только победившего варианта; проигравший
+   запрос останавливается и без подписчика на стрим
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.llm_cache import deviation_signature
+from parsers.llm_refusal_policy import PRIOR_CALLS, PRIOR_REFUSALS, RefusalStats
+from tests.conftest import FakeLlmResponse, lab_item, llm_chunk
+
+
+REFUSAL = "К сожалению, я не могу обсуждать эту тему."
+ANSWER = "Справочная информация о показателе СОЭ."
+
+HL = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+
+def _signature():
+    return deviation_signature("ж", 30, HL, version=engine.LLM_CACHE_VERSION)
+
+
+@pytest.fixture
+def policy(fresh_llm):
+    return engine._REFUSAL_POLICY
+
+
+def _make_refusal_prone(stats, n=5):
+    for _ in range(n):
+        stats.record(_signature(), "normal", True)
+    assert stats.should_speculate(_signature())
+
+
+def _as_stream(fake_llm):
+    """
+    Потоковая подмена из обычной: текст с отказом подписчику не уходит
+    (как окно проверки в call_yandexgpt_stream), should_stop — по готовности.
+    """
+    def fake_stream(token, prompt, on_text=None, should_stop=None, **kw):
+        text = fake_llm(token, prompt, **kw)
+        if should_stop is not None and should_stop():
+            return ""
+        if on_text is not None and not engine._is_llm_refusal(text):
+            on_text(text)
+        return text
+
+    return fake_stream
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: RefusalStats                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRefusalStats:
+
+    def test_prior_for_unknown_signature(self):
+        s = RefusalStats()
+        assert s.refusal_rate("new") == PRIOR_REFUSALS / PRIOR_CALLS
+        assert s.should_speculate("new") is False
+
+    def test_single_refusal_does_not_switch(self):
+        s = RefusalStats()
+        s.record("sig", "normal", True)
+        assert s.should_speculate("sig") is False
+
+    def test_repeated_refusals_switch(self):
+        s = RefusalStats()
+        for _ in range(4):
+            s.record("sig", "normal", True)
+        assert s.should_speculate("sig") is True
+
+    def test_successes_switch_back(self):
+        s = RefusalStats()
+        for _ in range(4):
+            s.record("sig", "normal", True)
+        for _ in range(20):
+            s.record("sig", "normal", False)
+        assert s.should_speculate("sig") is False
+
+    def test_variants_tracked_separately(self):
+        s = RefusalStats()
+        for _ in range(4):
+            s.record("sig", "softened", True)
+        assert s.should_speculate("sig") is False
+        snap = s.snapshot("sig")
+        assert snap["observed"] == {"softened": [4, 4]}
+        assert snap["softened_refusal_rate"] > snap["normal_refusal_rate"]
+
+    def test_persisted_across_restarts(self, tmp_path):
+        path = tmp_path / "stats.json"
+        s1 = RefusalStats(path)
+        for _ in range(4):
+            s1.record("sig", "normal", True)
+
+        s2 = RefusalStats(path)
+        assert s2.should_speculate("sig") is True
+
+    def test_corrupted_file_ignored(self, tmp_path):
+        path = tmp_path / "stats.json"
+        path.write_text("[]oops", encoding="utf-8")
+        assert len(RefusalStats(path)) == 0
+
+    def test_signature_cap(self):
+        s = RefusalStats(max_signatures=2)
+        for sig in ("a", "b", "c"):
+            s.record(sig, "normal", False)
+        assert len(s) == 2
+        assert s.snapshot("a")["observed"] == {}
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: параллельные промпты в _generate_llm_answer              ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSpeculativePrompts:
+
+    def test_sequential_for_normal_signature(self, policy, monkeypatch):
+        prompts = []
+
+        def fake_llm(token, prompt, **kw):
+            prompts.append(prompt)
+            return REFUSAL if len(prompts) == 1 else ANSWER
+
+        monkeypatch.setattr(engine, "call_yandexgpt", fake_llm)
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, gate_info=gate)
+
+        assert answer == ANSWER
+        assert len(prompts) == 2
+        assert prompts[1].startswith(engine.LLM_SOFTENED_PROMPT_PREFIX)
+        assert gate["refusal_policy"]["speculative"] is False
+        assert gate["refusal_policy"]["winner"] == "softened"
+        assert policy.snapshot(_signature())["observed"] == {
+            "normal": [1, 1], "softened": [1, 0],
+        }
+
+    def test_concurrent_for_refusal_prone_signature(self, policy, monkeypatch):
+        _make_refusal_prone(policy)
+        started = []
+        both_started = threading.Event()
+
+        def fake_llm(token, prompt, **kw):
+            started.append(prompt)
+            if len(started) == 2:
+                both_started.set()
+            both_started.wait(2)
+            if prompt.startswith(engine.LLM_SOFTENED_PROMPT_PREFIX):
+                return ANSWER
+            time.sleep(0.3)
+            return REFUSAL
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", _as_stream(fake_llm))
+        gate = {}
+
+        t0 = time.monotonic()
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, gate_info=gate)
+
+        assert answer == ANSWER
+        assert both_started.is_set(), "оба промпта должны уйти одновременно"
+        assert time.monotonic() - t0 < 0.3, "не ждём проигравший запрос"
+        assert gate["refusal_policy"] == {
+            "speculative": True,
+            "winner": "softened",
+            "normal_refusal_rate": gate["refusal_policy"]["normal_refusal_rate"],
+        }
+
+    def test_normal_answer_wins_when_not_refused(self, policy, monkeypatch):
+        _make_refusal_prone(policy)
+
+        def fake_llm(token, prompt, **kw):
+            if prompt.startswith(engine.LLM_SOFTENED_PROMPT_PREFIX):
+                time.sleep(0.2)
+                return "Смягчённый ответ."
+            return ANSWER
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", _as_stream(fake_llm))
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, gate_info=gate)
+
+        assert answer == ANSWER
+        assert gate["refusal_policy"]["winner"] == "normal"
+
+    def test_both_refused_fallback(self, policy, monkeypatch):
+        _make_refusal_prone(policy)
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", _as_stream(lambda token, prompt, **kw: REFUSAL))
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, gate_info=gate)
+
+        assert answer == engine.build_fallback_text("ж", 30, HL, HL)
+        assert gate["fallback_reason"] == "REFUSAL"
+        assert gate["refusal_policy"]["winner"] is None
+
+    def test_loser_stopped_without_subscriber(self, policy, monkeypatch, raw_path):
+        _make_refusal_prone(policy)
+
+        class SlowResponse(FakeLlmResponse):
+            def iter_lines(self, decode_unicode=False):
+                for line in super().iter_lines(decode_unicode):
+                    time.sleep(0.02)
+                    yield line
+
+        slow = SlowResponse([llm_chunk("Смягчённый ответ " * (20 + i)) for i in range(50)])
+
+        def fake_post(url, json=None, **kw):
+            assert json["completionOptions"]["stream"] is True
+            if json["messages"][1]["text"].startswith(engine.LLM_SOFTENED_PROMPT_PREFIX):
+                return slow
+            return FakeLlmResponse([llm_chunk(ANSWER, final=True)])
+
+        monkeypatch.setattr(engine.requests, "post", fake_post)
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, gate_info=gate)
+
+        assert answer == ANSWER
+        assert gate["refusal_policy"]["winner"] == "normal"
+        for _ in range(100):
+            if slow.closed:
+                break
+            time.sleep(0.02)
+        assert slow.closed
+        assert slow.consumed < 10, "проигравший запрос дочитан до конца"
+
+    def test_policy_disabled(self, policy, monkeypatch):
+        _make_refusal_prone(policy)
+        monkeypatch.setattr(engine, "LLM_REFUSAL_POLICY_ENABLED", False)
+        prompts = []
+        monkeypatch.setattr(engine, "call_yandexgpt",
+                            lambda token, prompt, **kw: prompts.append(prompt) or ANSWER)
+
+        engine._generate_llm_answer("ж", 30, HL, HL)
+
+        assert len(prompts) == 1
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: стриминг при параллельных промптах                      ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSpeculativeStreaming:
+
+    def test_only_winner_streamed_and_loser_stopped(self, policy, monkeypatch):
+        _make_refusal_prone(policy)
+        stopped = threading.Event()
+
+        def fake_stream(token, prompt, on_text=None, should_stop=None, **kw):
+            if prompt.startswith(engine.LLM_SOFTENED_PROMPT_PREFIX):
+                on_text(ANSWER)
+                on_text(ANSWER + " Продолжение.")
+                return ANSWER + " Продолжение."
+            # Обычный промпт «пишет» медленно и должен быть остановлен
+            for _ in range(100):
+                if should_stop():
+                    stopped.set()
+                    return ""
+                time.sleep(0.01)
+            on_text("Текст обычного промпта")
+            return "Текст обычного промпта"
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", fake_stream)
+        received = []
+
+        answer, _ = engine._generate_llm_answer("ж", 30, HL, HL, on_text=received.append)
+
+        assert answer == ANSWER + " Продолжение."
+        assert received == [ANSWER, ANSWER + " Продолжение."]
+        assert stopped.wait(2)
+        # Остановленный запрос не портит статистику обычного промпта
+        assert policy.snapshot(_signature())["observed"]["normal"] == [5, 5]
+
+    def test_stream_should_stop_aborts_reading(self, monkeypatch, raw_path):
+        resp = FakeLlmResponse([llm_chunk("x" * (300 + i)) for i in range(10)])
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: resp)
+        flag = {"stop": False}
+        received = []
+
+        def on_text(t):
+            received.append(t)
+            flag["stop"] = True
+
+        text = engine.call_yandexgpt_stream("iam", "p", on_text=on_text, should_stop=lambda: flag["stop"])
+
+        assert text == ""
+        assert resp.consumed <= 2
+        assert len(received) == 1
@@ -0,0 +1,226 @@
+"""
+Стриминг ответа LLM и доставка в браузер через SSE.
+
+Запуск:
+    pytest tests/test_llm_streaming.py -v
+
+Что тестируем:
+1) call_yandexgpt_stream: накопленный текст по чанкам, отказ ловится на первых чанках
+2) _generate_llm_answer(on_text=...): повтор со смягчённым промптом, fallback тоже уходит в стрим
+3) app: /generate запускает фоновую генерацию, /stream/<token> отдаёт text → done / error
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from tests.conftest import FakeLlmResponse, lab_item, llm_chunk
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: call_yandexgpt_stream                                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestCallYandexgptStream:
+
+    def test_cumulative_text_forwarded(self, monkeypatch, raw_path):
+        long_a = "Справка. " * 30
+        long_b = long_a + "Продолжение текста."
+        resp = FakeLlmResponse([llm_chunk("Справка."), llm_chunk(long_a), llm_chunk(long_b, final=True)])
+        seen = {}
+        monkeypatch.setattr(engine.requests, "post",
+                            lambda *a, **kw: seen.update(kw) or resp)
+        received = []
+
+        text = engine.call_yandexgpt_stream("iam", "prompt", on_text=received.append)
+
+        assert text == long_b
+        assert seen["json"]["completionOptions"]["stream"] is True
+        assert seen["stream"] is True
+        # Короткий первый чанк не отдаётся, пока не пройдено окно проверки на отказ
+        assert received == [long_a, long_b]
+        assert resp.closed
+
+    def test_short_final_answer_forwarded(self, monkeypatch, raw_path):
+        resp = FakeLlmResponse([llm_chunk("Все показатели в норме.", final=True)])
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: resp)
+        received = []
+
+        engine.call_yandexgpt_stream("iam", "prompt", on_text=received.append)
+
+        assert received == ["Все показатели в норме."]
+
+    def test_refusal_stops_early(self, monkeypatch, raw_path):
+        refusal = "К сожалению, я не могу обсуждать"
+        lines = [llm_chunk(refusal)] + [llm_chunk(refusal + " эту тему" + "." * i) for i in range(50)]
+        resp = FakeLlmResponse(lines)
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: resp)
+        received = []
+
+        text = engine.call_yandexgpt_stream("iam", "prompt", on_text=received.append)
+
+        assert engine._is_llm_refusal(text)
+        assert resp.consumed == 1
+        assert received == []
+
+    def test_http_error_raises(self, monkeypatch, raw_path):
+        monkeypatch.setattr(engine.requests, "post",
+                            lambda *a, **kw: FakeLlmResponse(["bad"], status_code=400))
+        with pytest.raises(RuntimeError):
+            engine.call_yandexgpt_stream("iam", "prompt")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: _generate_llm_answer в режиме стриминга                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGenerateLlmAnswerStreaming:
+
+    @pytest.fixture
+    def env(self, monkeypatch, fresh_llm):
+        monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", True)
+        monkeypatch.setattr(engine, "call_yandexgpt",
+                            lambda *a: pytest.fail("non-stream call in streaming mode"))
+
+    def test_softened_retry_uses_stream(self, monkeypatch, env):
+        prompts = []
+        replies = ["К сожалению, я не могу обсуждать это.", "Справочная информация."]
+
+        def fake_stream(token, prompt, on_text=None, **kw):
+            prompts.append(prompt)
+            text = replies.pop(0)
+            if not engine._is_llm_refusal(text):
+                on_text(text)
+            return text
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", fake_stream)
+        received = []
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        answer, _ = engine._generate_llm_answer("ж", 30, hl, hl, on_text=received.append)
+
+        assert answer == "Справочная информация."
+        assert len(prompts) == 2
+        assert prompts[1].startswith("Ты — справочный помощник")
+        assert received == ["Справочная информация."]
+
+    def test_fallback_text_streamed(self, monkeypatch, env):
+        def broken_stream(token, prompt, on_text=None, **kw):
+            raise RuntimeError("LLM down")
+
+        monkeypatch.setattr(engine, "call_yandexgpt_stream", broken_stream)
+        received = []
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        answer, _ = engine._generate_llm_answer("ж", 30, hl, hl, on_text=received.append)
+
+        assert received == [answer]
+
+    def test_cache_hit_streamed(self, monkeypatch, env):
+        monkeypatch.setattr(engine, "call_yandexgpt_stream",
+                            lambda token, prompt, on_text=None, **kw: "Ответ из LLM.")
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+        engine._generate_llm_answer("ж", 30, hl, hl, on_text=lambda t: None)
+
+        received = []
+        engine._generate_llm_answer("ж", 30, hl, hl, on_text=received.append)
+
+        assert received == ["Ответ из LLM."]
+
+    def test_callback_errors_ignored(self, monkeypatch, env):
+        monkeypatch.setattr(engine, "call_yandexgpt_stream",
+                            lambda token, prompt, on_text=None, **kw: "Ответ из LLM.")
+        hl = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+        def bad_callback(text):
+            raise ValueError("client gone")
+
+        engine._emit_llm_text(bad_callback, "текст")  # не бросает
+        answer, _ = engine._generate_llm_answer("ж", 30, hl, hl, on_text=bad_callback)
+        assert answer == "Ответ из LLM."
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: SSE в app                                               ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.split("\n\n"):
+        lines = [ln for ln in block.splitlines() if ln and not ln.startswith(":")]
+        if not lines:
+            continue
+        ev = dict(ln.split(": ", 1) for ln in lines)
+        events.append((ev["event"], json.loads(ev["data"])))
+    return events
+
+
+def _wait_job(app_module, token, timeout=5.0):
+    job = app_module.JOBS[token]
+    deadline = time.time() + timeout
+    while not (job.done or job.error) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestAppStreaming:
+
+    @pytest.fixture
+    def client(self):
+        import app as app_module
+        app_module.app.config["TESTING"] = True
+        return app_module, app_module.app.test_client()
+
+    def _token(self, html: str) -> str:
+        marker = "/stream/"
+        start = html.index(marker) + len(marker)
+        return html[start:start + 32]
+
+    def test_stream_text_then_done(self, client, monkeypatch):
+        app_module, c = client
+
+        def fake_generate(**kwargs):
+            kwargs["on_llm_text"]("Часть")
+            kwargs["on_llm_text"]("Часть ответа")
+            return engine.ReportResult(pdf_bytes=b"%PDF-1.4", download_name="r.pdf")
+
+        monkeypatch.setattr(app_module, "generate_report", fake_generate)
+
+        r = c.post("/generate", data={"sex": "ж", "age": "30", "raw_text": "HGB 120"})
+        token = self._token(r.get_data(as_text=True))
+        _wait_job(app_module, token)
+
+        events = _parse_sse(c.get(f"/stream/{token}").get_data(as_text=True))
+        assert events == [("text", {"text": "Часть ответа"}), ("done", {})]
+        assert c.get(f"/download/{token}").status_code == 200
+
+    def test_stream_error(self, client, monkeypatch):
+        app_module, c = client
+
+        def failing_generate(**kwargs):
+            raise ValueError("Не удалось получить текст из файла.")
+
+        monkeypatch.setattr(app_module, "generate_report", failing_generate)
+
+        r = c.post("/generate", data={"sex": "м", "age": "40", "raw_text": "HGB 120"})
+        token = self._token(r.get_data(as_text=True))
+        _wait_job(app_module, token)
+
+        events = _parse_sse(c.get(f"/stream/{token}").get_data(as_text=True))
+        assert events == [("error", {"message": "Не удалось получить текст из файла."})]
+
+    def test_unknown_token(self, client):
+        _, c = client
+        events = _parse_sse(c.get("/stream/deadbeef").get_data(as_text=True))
+        assert events[0][0] == "error"
+
+    def test_validation_errors_stay_synchronous(self, client):
+        _, c = client
+        r = c.post("/generate", data={"sex": "м", "age": "abc", "raw_text": "HGB 120"})
+        assert "Возраст должен быть целым числом." in r.get_data(as_text=True)
@@ -0,0 +1,248 @@
+"""
+Бюджет токенов запроса к LLM: компактный промпт и maxTokens по числу отклонений.
+
+Запуск:
+    pytest tests/test_llm_token_budget.py -v
+
+Что тестируем:
+1) build_dict_explanations: без повторов, compact — первое предложение
+2) build_llm_prompt(compact=True) короче, но сохраняет структуру; llm_max_tokens
+3) call_yandexgpt(_stream): maxTokens в запросе, токены из result.usage
+4) _generate_llm_answer: quality["metrics"]["llm_gate"]["tokens"]
+5) Ответ, обрезанный по maxTokens: повтор с MAX_TOKENS, в кэш не попадает
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from engine import (
+    build_dict_explanations, build_llm_prompt, estimate_tokens, llm_max_tokens, suggest_specialists,
+)
+from tests.conftest import FakeLlmResponse, lab_item, llm_chunk
+
+
+BIG_PANEL = [
+    lab_item(code, 200, 10, 100, "ВЫШЕ")
+    for code in ("WBC", "RBC", "HGB", "HCT", "PLT", "MCV", "MCH", "MCHC", "ESR")
+]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: build_dict_explanations                                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestDictExplanations:
+
+    def test_same_marker_once(self):
+        wbc = lab_item("WBC", 12, 4, 9, "ВЫШЕ")
+        text = build_dict_explanations([wbc, lab_item("WBC", 12, 4, 9, "ВЫШЕ", raw_name="Лейкоциты")])
+        assert text.count("- WBC:") == 1
+
+    def test_identical_explanations_merged(self, monkeypatch):
+        monkeypatch.setitem(engine.EXPLAIN_DICT, "AAA", "Общая справка.")
+        monkeypatch.setitem(engine.EXPLAIN_DICT, "BBB", "Общая справка.")
+        text = build_dict_explanations([lab_item("AAA", 2, 0, 1, "ВЫШЕ"), lab_item("BBB", 2, 0, 1, "ВЫШЕ")])
+        assert text == "- AAA, BBB: Общая справка."
+
+    def test_repeated_sentence_dropped(self, monkeypatch):
+        monkeypatch.setitem(engine.EXPLAIN_DICT, "AAA", "Первый показатель. Оценивается в динамике.")
+        monkeypatch.setitem(engine.EXPLAIN_DICT, "BBB", "Второй показатель. Оценивается в динамике.")
+        text = build_dict_explanations([lab_item("AAA", 2, 0, 1, "ВЫШЕ"), lab_item("BBB", 2, 0, 1, "ВЫШЕ")])
+        assert text.count("Оценивается в динамике.") == 1
+        assert "- BBB: Второй показатель." in text
+
+    def test_compact_first_sentence(self):
+        text = build_dict_explanations([lab_item("WBC", 12, 4, 9, "ВЫШЕ")], compact=True)
+        assert text == "- WBC: Лейкоциты — клетки иммунной системы."
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: компактный промпт и maxTokens                           ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPromptBudget:
+
+    def _prompt(self, compact):
+        expl = build_dict_explanations(BIG_PANEL, compact=compact)
+        return build_llm_prompt("м", 50, BIG_PANEL, expl, suggest_specialists(BIG_PANEL), compact=compact)
+
+    def test_compact_is_shorter_with_same_sections(self):
+        full, compact = self._prompt(False), self._prompt(True)
+        assert estimate_tokens(compact) < estimate_tokens(full) * 0.85
+        for header in ("ДИСКЛЕЙМЕР", "КРАТКИЙ ИТОГ", "СПЕЦИАЛИСТ", "ВОПРОСЫ ВРАЧУ"):
+            assert header in compact
+        for it in BIG_PANEL:
+            assert f"- {it.raw_name}: ВЫШЕ 200" in compact
+
+    def test_compact_chosen_automatically(self):
+        expl = build_dict_explanations(BIG_PANEL, compact=True)
+        auto = build_llm_prompt("м", 50, BIG_PANEL, expl, suggest_specialists(BIG_PANEL))
+        assert auto == self._prompt(True)
+
+    def test_max_tokens_scales(self):
+        assert llm_max_tokens(0) == engine.LLM_MAX_TOKENS_ALL_NORMAL
+        assert llm_max_tokens(1) < llm_max_tokens(3) < engine.MAX_TOKENS
+        assert llm_max_tokens(50) == engine.MAX_TOKENS
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("а" * 300) == 101
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: maxTokens и usage в вызовах YandexGPT                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+USAGE = {"inputTextTokens": "812", "completionTokens": "305", "totalTokens": "1117"}
+
+
+class TestUsage:
+
+    def test_non_stream(self, monkeypatch, raw_path):
+        body = json.dumps({"result": {
+            "alternatives": [{"message": {"text": "Ответ"}, "status": "ALTERNATIVE_STATUS_FINAL"}],
+            "usage": USAGE,
+        }})
+        sent = {}
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: sent.update(kw) or FakeLlmResponse(text=body))
+        usage = {}
+
+        assert engine.call_yandexgpt("iam", "p", max_tokens=420, usage=usage) == "Ответ"
+
+        assert sent["json"]["completionOptions"]["maxTokens"] == "420"
+        assert usage == {"input_tokens": 812, "completion_tokens": 305, "max_tokens": 420,
+                         "status": "ALTERNATIVE_STATUS_FINAL", "truncated": False}
+        assert "LLM usage: input=812 completion=305" in (engine.OCR_DEBUG_PATH.read_text(encoding="utf-8"))
+
+    def test_default_max_tokens(self, monkeypatch, raw_path):
+        body = json.dumps({"result": {"alternatives": [{"message": {"text": "x"}}]}})
+        sent = {}
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: sent.update(kw) or FakeLlmResponse(text=body))
+        engine.call_yandexgpt("iam", "p")
+        assert sent["json"]["completionOptions"]["maxTokens"] == str(engine.MAX_TOKENS)
+
+    def test_stream_usage_from_last_chunk(self, monkeypatch, raw_path):
+        lines = [
+            json.dumps({"result": {"alternatives": [{"message": {"text": "Ответ " * 50}}],
+                                   "usage": {"inputTextTokens": "812", "completionTokens": "10"}}}),
+            json.dumps({"result": {"alternatives": [{"message": {"text": "Ответ " * 60},
+                                                     "status": "ALTERNATIVE_STATUS_FINAL"}],
+                                   "usage": USAGE}}),
+        ]
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: FakeLlmResponse(lines))
+        usage = {}
+
+        engine.call_yandexgpt_stream("iam", "p", max_tokens=500, usage=usage)
+
+        assert usage["completion_tokens"] == 305
+
+    def test_truncated_status(self, monkeypatch, raw_path):
+        body = json.dumps({"result": {
+            "alternatives": [{"message": {"text": "Обрыв"}, "status": engine.LLM_TRUNCATED_STATUS}],
+            "usage": USAGE,
+        }})
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: FakeLlmResponse(text=body))
+        usage = {}
+
+        engine.call_yandexgpt("iam", "p", max_tokens=305, usage=usage)
+
+        assert usage["truncated"] is True
+        assert f"status={engine.LLM_TRUNCATED_STATUS}" in engine.OCR_DEBUG_PATH.read_text(encoding="utf-8")
+
+    def test_stream_truncated_status(self, monkeypatch, raw_path):
+        lines = [
+            llm_chunk("Ответ " * 50),
+            llm_chunk("Ответ " * 60, usage=USAGE, status=engine.LLM_TRUNCATED_STATUS),
+        ]
+        monkeypatch.setattr(engine.requests, "post", lambda *a, **kw: FakeLlmResponse(lines))
+        usage = {}
+
+        engine.call_yandexgpt_stream("iam", "p", max_tokens=305, usage=usage)
+
+        assert usage["truncated"] is True
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: tokens в llm_gate                                       ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGateTokens:
+
+    def test_tokens_recorded(self, monkeypatch, fresh_llm):
+        seen = {}
+
+        def fake_llm(token, prompt, max_tokens=None, usage=None):
+            seen["max_tokens"] = max_tokens
+            usage.update({"input_tokens": 700, "completion_tokens": 250, "max_tokens": max_tokens})
+            return "Справка."
+
+        monkeypatch.setattr(engine, "call_yandexgpt", fake_llm)
+        gate = {}
+
+        engine._generate_llm_answer("м", 50, BIG_PANEL, BIG_PANEL, gate_info=gate)
+
+        tokens = gate["tokens"]
+        assert seen["max_tokens"] == llm_max_tokens(len(BIG_PANEL))
+        assert tokens["compact_prompt"] is True
+        assert tokens["max_tokens"] == seen["max_tokens"]
+        assert tokens["prompt_estimate"] > 0
+        assert (tokens["calls"], tokens["input_tokens"], tokens["completion_tokens"]) == (1, 700, 250)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 5: ответ, обрезанный по maxTokens                          ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestTruncatedAnswer:
+
+    HL = [lab_item("ESR", 30, 2, 20, "ВЫШЕ")]
+
+    @pytest.fixture
+    def cache_on(self, fresh_llm, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", True)
+        return engine._LLM_CACHE
+
+    def _fake(self, monkeypatch, truncated_limits):
+        limits = []
+
+        def fake_llm(token, prompt, max_tokens=None, usage=None):
+            limits.append(max_tokens)
+            truncated = max_tokens in truncated_limits
+            usage.update({"input_tokens": 700, "completion_tokens": max_tokens if truncated else 200,
+                          "max_tokens": max_tokens, "truncated": truncated})
+            return f"Справка (лимит {max_tokens})."
+
+        monkeypatch.setattr(engine, "call_yandexgpt", fake_llm)
+        return limits
+
+    def test_retried_with_ceiling(self, cache_on, monkeypatch):
+        budget = llm_max_tokens(len(self.HL))
+        limits = self._fake(monkeypatch, {budget})
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+
+        assert limits == [budget, engine.MAX_TOKENS]
+        assert answer == f"Справка (лимит {engine.MAX_TOKENS})."
+        assert (gate["tokens"]["truncated"], gate["tokens"]["retried"]) == (1, 1)
+        assert gate["tokens"]["completion_max"] == budget
+        assert len(cache_on) == 1
+
+    def test_truncated_after_retry_not_cached(self, cache_on, monkeypatch):
+        budget = llm_max_tokens(len(self.HL))
+        limits = self._fake(monkeypatch, {budget, engine.MAX_TOKENS})
+        gate = {}
+
+        answer, _ = engine._generate_llm_answer("ж", 30, self.HL, self.HL, gate_info=gate)
+
+        assert answer == f"Справка (лимит {engine.MAX_TOKENS})."
+        assert len(limits) == 2
+        assert gate["tokens"]["truncated"] == 2
+        assert len(cache_on) == 0
@@ -0,0 +1,165 @@
+"""
+Локальная справка без LLM для простых случаев.
+
+Запуск:
+    pytest tests/test_local_narrative.py -v
+
+Что тестируем:
+1) route_narrative: все в норме / 1–2 небольших отклонения → LOCAL, иначе → LLM
+2) build_local_narrative: структура ответа как у LLM, факты и пояснения из словарей
+3) generate_pdf_report: локальный маршрут не зовёт LLM, решение видно в llm_gate
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from engine import build_local_narrative, route_narrative
+from parsers.report_helpers import _llm_gate_text
+from tests.conftest import lab_item
+
+
+def _item(name, value, low, high, status, raw_name=None):
+    return lab_item(name, value, low, high, status, raw_name=raw_name, unit="10^9/л")
+
+
+WBC_MILD = _item("WBC", 9.5, 4.0, 9.0, "ВЫШЕ")       # +5.6% → status-warn
+PLT_MILD = _item("PLT", 140, 150, 400, "НИЖЕ")       # -6.7% → status-warn
+ESR_MARKED = _item("ESR", 35, 2, 20, "ВЫШЕ")         # +75% → status-high
+HGB_NORMAL = _item("HGB", 130, 120, 150, "В НОРМЕ")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: route_narrative                                         ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRouteNarrative:
+
+    def test_all_normal_local(self):
+        assert route_narrative([]) == ("LOCAL", "ALL_NORMAL")
+
+    def test_mild_deviations_local(self):
+        assert route_narrative([WBC_MILD, PLT_MILD]) == ("LOCAL", "MILD_DEVIATIONS")
+
+    def test_marked_deviation_goes_to_llm(self):
+        assert route_narrative([WBC_MILD, ESR_MARKED]) == ("LLM", "MARKED_DEVIATION")
+
+    def test_too_many_deviations(self):
+        hgb = _item("HGB", 118, 120, 150, "НИЖЕ")
+        assert route_narrative([WBC_MILD, PLT_MILD, hgb]) == ("LLM", "TOO_MANY_DEVIATIONS")
+
+    def test_unknown_marker(self):
+        odd = _item("XYZ_UNKNOWN", 9.5, 4.0, 9.0, "ВЫШЕ")
+        assert route_narrative([odd]) == ("LLM", "UNKNOWN_MARKER")
+
+    def test_config(self, monkeypatch):
+        monkeypatch.setattr(engine, "LOCAL_NARRATIVE_STATUS_CLASSES", ("status-warn", "status-high"))
+        assert route_narrative([ESR_MARKED])[0] == "LOCAL"
+        monkeypatch.setattr(engine, "LOCAL_NARRATIVE_ENABLED", False)
+        assert route_narrative([]) == ("LLM", "DISABLED")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: build_local_narrative                                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestBuildLocalNarrative:
+
+    def test_all_normal_is_short(self):
+        text = build_local_narrative("ж", 30, [HGB_NORMAL], [])
+
+        assert "**ДИСКЛЕЙМЕР**" in text
+        assert "отклонений не обнаружено" in text
+        assert "Гемоглобин" in text
+        assert "ВОПРОСЫ ВРАЧУ" not in text
+        assert "СПЕЦИАЛИСТ" not in text
+
+    def test_all_normal_explanations_inline(self):
+        wbc_normal = _item("WBC", 6.0, 4.0, 9.0, "В НОРМЕ")
+        text = build_local_narrative("ж", 30, [HGB_NORMAL, wbc_normal], [])
+
+        # В отчёте без отклонений раздела пояснений нет — справка не ссылается на него
+        ctx = engine.build_template_context("ж", 30, [HGB_NORMAL, wbc_normal], [], text)
+        assert ctx["explain_lines"] == []
+        assert "таблиц" not in text and "приведены" not in text
+        for code in ("HGB", "WBC"):
+            first = engine._SENTENCE_SPLIT_RE.split(engine.EXPLAIN_DICT[code])[0]
+            assert f"• {first}" in text
+
+    def test_deviation_sections(self):
+        text = build_local_narrative("м", 40, [WBC_MILD, HGB_NORMAL], [WBC_MILD])
+
+        for header in ("**ДИСКЛЕЙМЕР**", "**КРАТКИЙ ИТОГ ПО ФАКТАМ**",
+                       "**ЧТО ОТРАЖАЮТ ЭТИ ПОКАЗАТЕЛИ**",
+                       "**К КАКИМ СПЕЦИАЛИСТАМ ИМЕЕТ СМЫСЛ ОБРАТИТЬСЯ**",
+                       "**ЧТО ИМЕЕТ СМЫСЛ ОБСУДИТЬ С ВРАЧОМ**", "**ВОПРОСЫ ВРАЧУ**"):
+            assert header in text
+        assert "Лейкоциты (WBC): выше референса — 9.5 10^9/л (норма: 4.0-9.0), на 6% выше верхней границы" in text
+        assert engine.EXPLAIN_DICT["WBC"] in text
+        assert "гематолог" in text
+        assert "Остальные распознанные показатели (1)" in text
+
+    def test_name_falls_back_to_rus_name_map(self):
+        # В EXPLAIN_DICT для MCV нет заголовка «Название — …»
+        assert engine._narrative_name("MCV") != "MCV"
+        assert engine._narrative_name("NO_SUCH_CODE") == "NO_SUCH_CODE"
+
+    def test_not_refusal(self):
+        text = build_local_narrative("м", 40, [WBC_MILD], [WBC_MILD])
+        assert not engine._is_llm_refusal(text)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: маршрутизация в generate_pdf_report                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+MILD_TEXT = """Гемоглобин 125 г/л 120-150
+Эритроциты 4.2 10^12/л 3.8-5.1
+Лейкоциты 9.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 40 % 35-45
+СОЭ 10 мм/ч 2-20
+"""
+
+
+class TestGeneratePdfReportRouting:
+
+    @pytest.fixture
+    def env(self, monkeypatch, tmp_path):
+        captured = {}
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        monkeypatch.setattr(engine, "render_pdf_bytes", lambda html, created: b"%PDF")
+        monkeypatch.setattr(engine, "_generate_llm_answer",
+                            lambda *a, **kw: pytest.fail("LLM must not be called"))
+        monkeypatch.setattr(engine, "PrewarmedPdfRender",
+                            lambda *a: pytest.fail("no prewarm for local narrative"))
+        real_context = engine.build_template_context
+
+        def spy(*a, **kw):
+            captured["quality"] = kw.get("quality")
+            return real_context(*a, **kw)
+
+        monkeypatch.setattr(engine, "build_template_context", spy)
+        return captured
+
+    def test_mild_panel_rendered_locally(self, env):
+        streamed = []
+        pdf_path, _ = engine.generate_pdf_report("ж", 30, raw_text=MILD_TEXT, on_llm_text=streamed.append)
+
+        gate = env["quality"]["metrics"]["llm_gate"]
+        assert gate["decision"] == "CALL"
+        assert gate["narrative_route"] == "LOCAL"
+        assert gate["narrative_route_reason"] == "MILD_DEVIATIONS"
+        assert gate["local_narrative_ms"] < 50
+        html = pdf_path.with_suffix(".html").read_text(encoding="utf-8")
+        assert "Лейкоциты (" in html
+        assert streamed and "Лейкоциты (" in streamed[0]
+
+    def test_gate_text(self):
+        assert "по шаблону" in _llm_gate_text({"decision": "CALL", "narrative_route": "LOCAL"})
+        assert _llm_gate_text({"decision": "CALL", "narrative_route": "LLM"}).endswith("выполнена")
@@ -7,6 +7,7 @@
   3. НЕТ подстрок "10^", НЕТ склеек типа "150-400213"
   4. Интеграция: parse_items_from_candidates корректно разбирает кандидатов
   5. Ожидаемые значения: WBC=4.78, RBC=5.33, PLT=213, СОЭ=35, LYM%=38.6
+  6. _find_unit: одна альтернация с приоритетом единиц как в _MEDSI_UNITS
 """
 
 import sys
@@ -21,6 +22,7 @@ from parsers.medsi_extractor import (
     medsi_inline_to_candidates,
     _split_ref_and_value,
     _map_medsi_code,
+    _find_unit,
 )
 from engine import parse_items_from_candidates, Item
 
@@ -154,6 +156,32 @@ class TestCodeMapping:
         assert _map_medsi_code("PLT") == "PLT"
 
 
+# ============================================================
+# ТЕСТЫ: Поиск единицы измерения
+# ============================================================
+class TestFindUnit:
+
+    def test_basic(self):
+        line = "(WBC) Лейкоциты 10*9/л 4.50-11.004.78"
+        start, end, unit = _find_unit(line)
+        assert unit == "10*9/л" and line[start:end] == unit
+
+    def test_priority_over_position(self):
+        """Единица раньше в списке выигрывает, даже если стоит правее."""
+        assert _find_unit("Показатель % 1 г/л 120-150130")[2] == "г/л"
+
+    def test_adjacent_units(self):
+        assert _find_unit("X пг г/дл 1-2")[2] == "г/дл"
+
+    def test_longer_variant(self):
+        assert _find_unit("СОЭ мм/час 2-2035")[2] == "мм/час"
+        assert _find_unit("(MCV) Средний объём фл. 80.0-100.090.1")[2] == "фл."
+
+    def test_requires_spaces(self):
+        assert _find_unit("(NEU%) Нейтрофилы") is None
+        assert _find_unit("Показатель г/л") is None
+
+
 # ============================================================
 # ТЕСТЫ: Кандидаты
 # ============================================================
@@ -0,0 +1,175 @@
+"""
+Preflight по метрикам качества изображения.
+
+Запуск:
+    pytest tests/test_ocr_preflight_metrics.py -v
+
+Что тестируем:
+1) analyze_image_quality: контраст, размытие, наклон, неравномерность фона
+2) choose_ocr_mode_preflight: чистый скан → без бинаризации, тени/блёклое фото → бинаризация
+3) Нечитаемые байты → прежний IMAGE_LIKE_INPUT
+4) extract_text_from_upload передаёт флаги в preprocess_image_bytes
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ocr_preprocess import analyze_image_quality
+from parsers.ocr_preflight import choose_ocr_mode_preflight, choose_preprocess_flags
+
+
+# ─── Хелперы ─────────────────────────────────────────────────────────
+
+def _doc(width=1000, height=1400, bg=250, ink=20, gradient=False, blur=0, angle=0.0,
+         fmt="PNG") -> bytes:
+    """Синтетический «бланк»: строки текста (полоски) на фоне."""
+    img = Image.new("L", (width, height), color=bg)
+    if gradient:
+        # Тень: фон темнеет слева направо
+        px = img.load()
+        for x in range(width):
+            level = int(bg - (bg - 90) * x / width)
+            for y in range(height):
+                px[x, y] = level
+    draw = ImageDraw.Draw(img)
+    for y in range(80, height - 60, 45):
+        draw.rectangle([60, y, width - 60, y + 10], fill=ink)
+    if angle:
+        img = img.rotate(angle, expand=False, fillcolor=bg)
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: метрики                                                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestAnalyzeImageQuality:
+
+    def test_structure(self):
+        m = analyze_image_quality(_doc())
+        assert {"width", "height", "contrast", "blur_var", "skew_deg",
+                "bg_unevenness", "elapsed_ms"} <= set(m)
+        assert (m["width"], m["height"]) == (1000, 1400)
+
+    def test_clean_scan_high_contrast(self):
+        m = analyze_image_quality(_doc())
+        assert m["contrast"] > 0.8
+        assert m["bg_unevenness"] < 0.1
+
+    def test_low_contrast_detected(self):
+        m = analyze_image_quality(_doc(bg=150, ink=120))
+        assert m["contrast"] < 0.2
+
+    def test_blur_lowers_laplacian_variance(self):
+        sharp = analyze_image_quality(_doc())
+        blurry = analyze_image_quality(_doc(blur=4))
+        assert blurry["blur_var"] < sharp["blur_var"]
+
+    def test_uneven_background_detected(self):
+        m = analyze_image_quality(_doc(gradient=True))
+        assert m["bg_unevenness"] > 0.3
+
+    def test_skew_detected(self):
+        m = analyze_image_quality(_doc(angle=3.0))
+        assert abs(m["skew_deg"]) > 1.0
+
+    def test_jpeg_supported(self):
+        m = analyze_image_quality(_doc(fmt="JPEG"))
+        assert m["width"] == 1000
+
+    def test_invalid_bytes_raise(self):
+        with pytest.raises(Exception):
+            analyze_image_quality(b"\x89PNG\r\n")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: выбор режима по метрикам                                ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPreflightByImageMetrics:
+
+    def test_clean_scan_no_threshold(self):
+        r = choose_ocr_mode_preflight(_doc(), "scan.png", "image/png")
+        assert r["adaptive_threshold"] is False
+        assert r["reason"] == "IMAGE_CLEAN"
+        assert r["image_metrics"]["contrast"] > 0.8
+        assert r["preprocess_flags"]["enable_deskew"] is False
+
+    def test_shadowed_photo_threshold(self):
+        r = choose_ocr_mode_preflight(_doc(gradient=True), "photo.jpg", "image/jpeg")
+        assert r["adaptive_threshold"] is True
+        assert r["reason"] == "IMAGE_UNEVEN_BACKGROUND"
+
+    def test_faded_photo_threshold(self):
+        r = choose_ocr_mode_preflight(_doc(bg=150, ink=120), "photo.png", "image/png")
+        assert r["adaptive_threshold"] is True
+        assert r["reason"] == "IMAGE_LOW_CONTRAST"
+
+    def test_skewed_photo_deskew_enabled(self):
+        r = choose_ocr_mode_preflight(_doc(angle=3.0), "photo.png", "image/png")
+        assert r["preprocess_flags"]["enable_deskew"] is True
+
+    def test_unreadable_image_falls_back(self):
+        r = choose_ocr_mode_preflight(b"\x89PNG\r\n", "scan.png", "image/png")
+        assert r["adaptive_threshold"] is True
+        assert r["reason"] == "IMAGE_LIKE_INPUT"
+        assert r["image_metrics"] is None
+
+    def test_blurry_metrics_stronger_sharpen(self):
+        r = choose_preprocess_flags({"contrast": 0.9, "bg_unevenness": 0.0,
+                                     "blur_var": 10.0, "skew_deg": 0.0})
+        assert r["preprocess_flags"]["sharpen_factor"] > 1.3
+
+    def test_pdf_has_no_image_metrics(self):
+        r = choose_ocr_mode_preflight(b"%PDF-1.4", "a.pdf", "application/pdf",
+                                      pdf_direct_text="")
+        assert r["image_metrics"] is None
+        assert r["preprocess_flags"] == {}
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: флаги доходят до preprocess_image_bytes                 ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestEngineUsesPreprocessFlags:
+
+    def test_flags_forwarded(self, monkeypatch, tmp_path):
+        import engine
+
+        seen = {}
+
+        def fake_preprocess(data, mime, **kwargs):
+            seen.update(kwargs)
+            return data, "image/png"
+
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "iam")
+        monkeypatch.setattr(engine, "preprocess_image_bytes", fake_preprocess)
+        monkeypatch.setattr(engine, "ocr_image_sync", lambda iam, data, mime: {})
+        monkeypatch.setattr(engine, "ocr_result_to_plaintext", lambda res: "Гемоглобин 140")
+        monkeypatch.setattr(engine, "_smart_candidates", lambda text: [])
+        monkeypatch.setattr(engine, "OCR_RAW_PATH", tmp_path / "ocr_raw.json")
+        monkeypatch.setattr(engine, "OCR_PLAIN_PATH", tmp_path / "ocr_plain.txt")
+        monkeypatch.setattr(engine, "OCR_CANDIDATES_PATH", tmp_path / "cand.txt")
+
+        engine.extract_text_from_upload(
+            _doc(), "scan.png", "image/png",
+            adaptive_threshold=True,
+            preprocess_flags={"enable_deskew": False, "sharpen_factor": 1.6},
+        )
+
+        assert seen == {
+            "enable_deskew": False,
+            "sharpen_factor": 1.6,
+            "enable_adaptive_threshold": True,
+        }
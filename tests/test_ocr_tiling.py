@@ -0,0 +1,199 @@
+"""
+Tiling OCR: нарезка высоких сканов на перекрывающиеся тайлы и склейка строк.
+
+Запуск:
+    pytest tests/test_ocr_tiling.py -v
+
+Что тестируем:
+1) plan_tiles: обычные изображения не режутся, высокие — покрываются целиком с перекрытием
+2) split_image_into_tiles: размеры тайлов совпадают с планом
+3) stitch_tile_lines: дубли и обрезанные строки на швах убираются
+4) extract_text_from_upload: высокий скан идёт через тайлы, обычный — одним запросом
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ocr_preprocess import (
+    TILE_MAX_HEIGHT,
+    TILE_MIN_OVERLAP,
+    TILE_TRIGGER_PIXELS,
+    needs_tiling,
+    plan_tiles,
+    split_image_into_tiles,
+    stitch_tile_lines,
+)
+
+
+def _png(width: int, height: int) -> bytes:
+    img = Image.new("L", (width, height), color=255)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: план тайлов                                             ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPlanTiles:
+    """Подбор тайлов по размерам изображения."""
+
+    def test_a4_scan_not_tiled(self):
+        assert needs_tiling(2480, 3508) is False
+        assert plan_tiles(2480, 3508) == [(0, 3508)]
+
+    def test_tall_receipt_tiled(self):
+        assert needs_tiling(1200, 9000) is True
+        tiles = plan_tiles(1200, 9000)
+        assert len(tiles) > 1
+        assert tiles[0][0] == 0
+        assert tiles[-1][1] == 9000
+
+    def test_tiles_overlap_and_cover(self):
+        tiles = plan_tiles(1500, 12000)
+        for (t1, b1), (t2, b2) in zip(tiles, tiles[1:]):
+            assert t2 < b1, "соседние тайлы должны перекрываться"
+            assert b1 - t2 >= TILE_MIN_OVERLAP
+        assert all(b - t <= TILE_MAX_HEIGHT for t, b in tiles)
+
+    def test_tiles_equal_height(self):
+        tiles = plan_tiles(1200, 10000)
+        heights = {b - t for t, b in tiles[:-1]}
+        assert len(heights) == 1
+        assert tiles[-1][1] - tiles[-1][0] <= max(heights)
+
+    def test_wide_huge_scan_tile_pixel_cap(self):
+        tiles = plan_tiles(6000, 6000)
+        assert len(tiles) > 1
+        assert all(6000 * (b - t) <= TILE_TRIGGER_PIXELS for t, b in tiles)
+
+    def test_degenerate_sizes(self):
+        assert needs_tiling(0, 0) is False
+        assert plan_tiles(0, 10) == [(0, 10)]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: нарезка байтов                                          ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSplitImage:
+
+    def test_small_image_returns_original_bytes(self):
+        raw = _png(800, 1000)
+        tiles = split_image_into_tiles(raw)
+        assert len(tiles) == 1
+        assert tiles[0] == (raw, 0, 1000)
+
+    def test_tall_image_split_matches_plan(self):
+        raw = _png(400, 5000)
+        tiles = split_image_into_tiles(raw)
+        assert [(t, b) for _, t, b in tiles] == plan_tiles(400, 5000)
+        for data, top, bottom in tiles:
+            img = Image.open(io.BytesIO(data))
+            assert img.width == 400
+            assert img.height == bottom - top
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: склейка строк на швах                                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestStitchTileLines:
+
+    def test_overlap_deduplicated(self):
+        head = ["Гемоглобин 140 г/л", "Эритроциты 4.5 10^12/л", "Лейкоциты 6.1 10^9/л"]
+        tail = ["Эритроциты 4.5 10^12/л", "Лейкоциты 6.1 10^9/л", "Тромбоциты 250 10^9/л"]
+        assert stitch_tile_lines([head, tail]) == [
+            "Гемоглобин 140 г/л",
+            "Эритроциты 4.5 10^12/л",
+            "Лейкоциты 6.1 10^9/л",
+            "Тромбоциты 250 10^9/л",
+        ]
+
+    def test_cut_lines_at_seam_dropped(self):
+        """Строки, разрезанные краем тайла, не попадают в результат."""
+        head = ["Глюкоза 5.1 ммоль/л", "Холестерин 4.8 ммоль/л", "АЛТ 2"]
+        tail = ["ин 4.8 ммоль/л", "Холестерин 4.8 ммоль/л", "АЛТ 25 Ед/л"]
+        out = stitch_tile_lines([head, tail])
+        assert out == ["Глюкоза 5.1 ммоль/л", "Холестерин 4.8 ммоль/л", "АЛТ 25 Ед/л"]
+
+    def test_no_overlap_keeps_everything(self):
+        out = stitch_tile_lines([["Строка один"], ["Строка два"]])
+        assert out == ["Строка один", "Строка два"]
+
+    def test_short_coincidence_not_treated_as_seam(self):
+        """Одиночное короткое совпадение («г/л») — не шов, строки не режем."""
+        head = ["Гемоглобин 140", "г/л", "Ферритин 80"]
+        tail = ["г/л", "Железо 18 мкмоль/л"]
+        out = stitch_tile_lines([head, tail])
+        assert "Ферритин 80" in out
+        assert "Железо 18 мкмоль/л" in out
+
+    def test_empty_tiles(self):
+        assert stitch_tile_lines([[], ["A1 строка"], []]) == ["A1 строка"]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: интеграция в extract_text_from_upload                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestEngineTiledOcr:
+    """Высокий скан OCR-ится по тайлам, обычный — одним запросом."""
+
+    def _patch(self, monkeypatch, tmp_path):
+        import engine
+
+        calls = []
+
+        def fake_ocr(iam, data, mime):
+            img = Image.open(io.BytesIO(data))
+            calls.append((img.width, img.height, mime))
+            return {"lines": [f"Строка тайла {len(calls)}"]}
+
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "iam")
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "ocr_result_to_plaintext",
+                            lambda res: "\n".join(res["lines"]))
+        monkeypatch.setattr(engine, "OCR_PREPROCESS_ENABLED", False)
+        monkeypatch.setattr(engine, "OCR_RAW_PATH", tmp_path / "ocr_raw.json")
+        monkeypatch.setattr(engine, "OCR_PLAIN_PATH", tmp_path / "ocr_plain.txt")
+        monkeypatch.setattr(engine, "OCR_CANDIDATES_PATH", tmp_path / "cand.txt")
+        monkeypatch.setattr(engine, "_smart_candidates", lambda text: [])
+        return engine, calls
+
+    def test_tall_scan_uses_tiles(self, monkeypatch, tmp_path):
+        engine, calls = self._patch(monkeypatch, tmp_path)
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "always")   # ocr_raw.json пишется всегда
+        raw = _png(400, 6000)
+
+        text = engine.extract_text_from_upload(raw, "long.png", "image/png")
+
+        assert len(calls) == len(plan_tiles(400, 6000))
+        assert all(w == 400 and h < 6000 for w, h, _ in calls)
+        assert len(text.splitlines()) == len(calls)
+        assert engine.get_artifact_writer().flush(5)
+        assert '"tiles"' in (tmp_path / "ocr_raw.json").read_text(encoding="utf-8")
+
+    def test_regular_scan_single_request(self, monkeypatch, tmp_path):
+        engine, calls = self._patch(monkeypatch, tmp_path)
+        raw = _png(800, 1100)
+
+        engine.extract_text_from_upload(raw, "scan.png", "image/png")
+
+        assert calls == [(800, 1100, "image/png")]
+
+    def test_tiling_disabled(self, monkeypatch, tmp_path):
+        engine, calls = self._patch(monkeypatch, tmp_path)
+        monkeypatch.setattr(engine, "OCR_TILING_ENABLED", False)
+
+        engine.extract_text_from_upload(_png(400, 6000), "long.png", "image/png")
+
+        assert len(calls) == 1
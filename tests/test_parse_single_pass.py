@@ -0,0 +1,108 @@
+"""
+Однопроходный разбор: _select_parse → _finish_parse без повторных расчётов.
+
+Запуск:
+    pytest tests/test_parse_single_pass.py -v
+
+Что тестируем:
+1) Baseline: confidence, дедупликация и качество считаются один раз
+2) Переиспользованное качество совпадает с evaluate_parse_quality по итоговым items
+3) Если sanity-фильтр или fallback-референсы меняют items — качество пересчитывается
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+import parsers.quality as quality_mod
+from parsers.candidates import Candidate
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 38 % 35-45
+MCV 88 фл 80-100
+Холестерин 4.73 ммоль/л <5.2
+Глюкоза 5.1 ммоль/л 3.9-6.1
+СОЭ 35 мм/ч 2-20
+"""
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    counts = {"quality": 0, "dedup": 0}
+    real_quality = quality_mod.evaluate_parse_quality
+    real_dedup = engine.deduplicate_items
+
+    def quality(*a, **kw):
+        counts["quality"] += 1
+        return real_quality(*a, **kw)
+
+    def dedup(items):
+        counts["dedup"] += 1
+        return real_dedup(items)
+
+    monkeypatch.setattr(quality_mod, "evaluate_parse_quality", quality)
+    monkeypatch.setattr(engine, "deduplicate_items", dedup)
+    return counts
+
+
+def _final(records):
+    return engine._finish_parse(engine._select_parse(records))
+
+
+def _fresh_quality(items, dedup_dropped, outlier_count):
+    return quality_mod.evaluate_parse_quality(
+        items, dedup_dropped_count=dedup_dropped, sanity_outlier_count=outlier_count)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: baseline считается один раз                             ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestSinglePass:
+
+    def test_baseline_outcome(self):
+        outcome = engine._select_parse(engine.text_to_candidate_records(RAW_TEXT))
+        assert outcome.source == "baseline" and outcome.deduped
+        assert outcome.quality == quality_mod.evaluate_parse_quality(outcome.items)
+
+    def test_pipeline_evaluates_once(self, calls):
+        items, quality, dedup_dropped, outlier_count = engine._run_parse_pipeline(RAW_TEXT)
+        assert items and quality["metrics"]
+        assert calls == {"quality": 1, "dedup": 1}
+
+    def test_reused_quality_matches_fresh(self):
+        items, quality, dedup_dropped, outlier_count = _final(engine.text_to_candidate_records(RAW_TEXT))
+        assert quality == _fresh_quality(items, dedup_dropped, outlier_count)
+
+    def test_parse_with_fallback_items(self):
+        records = engine.text_to_candidate_records(RAW_TEXT)
+        assert engine.parse_with_fallback(records) == engine._select_parse(records).items
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: items изменились — качество пересчитывается             ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRecompute:
+
+    def test_sanity_outlier(self):
+        records = engine.text_to_candidate_records(RAW_TEXT) + [Candidate("Креатинин", 99999.0, "62-106", "мкмоль/л")]
+        items, quality, dedup_dropped, outlier_count = _final(records)
+        assert outlier_count == 1
+        assert quality == _fresh_quality(items, dedup_dropped, outlier_count)
+
+    def test_fallback_ref(self):
+        records = engine.text_to_candidate_records(RAW_TEXT) + [Candidate("Холестерин ЛПВП", 1.6, "", "ммоль/л", strip_tsv=False)]
+        items, quality, dedup_dropped, outlier_count = _final(records)
+        hdl = [it for it in items if it.name == "HDL"]
+        assert hdl and hdl[0].ref is not None
+        assert quality == _fresh_quality(items, dedup_dropped, outlier_count)
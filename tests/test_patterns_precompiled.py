@@ -0,0 +1,141 @@
+"""
+Реестр предкомпилированных регулярных выражений (parsers/patterns).
+
+Запуск:
+    pytest tests/test_patterns_precompiled.py -v
+
+Что тестируем:
+1) Все имена реестра — скомпилированные re.Pattern (или кортежи из них)
+2) Горячий путь разбора не компилирует строковые паттерны во время вызова:
+   re.match/search/sub/... с литералом вместо rx.* ловятся через re._compile.
+   Ленивые однократные компиляции (LabDetector при первом вызове) допустимы —
+   поэтому первый прогон прогревочный, проверяется повторный
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers import patterns as rx
+from parsers import medsi_extractor
+from parsers.fallback_generic import fallback_parse_candidates
+from parsers.quality import evaluate_parse_quality
+from parsers.universal_extractor import universal_extract
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Холестерин 4.73 ммоль/л <5.2
+Глюкоза 5.1 ммоль/л 3.9-6.1
+СОЭ 35 мм/ч 2-20
+HbA1c (DCCT) 5.4 % 4.0-6.0
+"""
+
+HELIX_TEXT = """Исследование Результат Единицы Референсные значения
+Лейкоциты (WBC)
+6.2
+*10^9/л
+4.0 - 9.0
+Эритроциты (RBC)
+4.5 *10^12/л
+3.8 - 5.1
+Ферритин 45 мкг/л 10 - 120
+Витамин D (25-OH) 18 нг/мл > 30
+Страница 1 из 2
+"""
+
+MEDSI_TEXT = """(WBC) Лейкоциты 10*9/л 4.50-11.004.78
+(RBC) Эритроциты 10*12/л 4.30-5.705.33
+(PLT) Тромбоциты 10*9/л 150-400213
+(HGB) Гемоглобин г/л 132-173145
+"""
+
+FIXTURE_TEXT = (Path(__file__).parent / "fixtures" / "medsi_pypdf_text.txt").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def compiled(monkeypatch):
+    """Строковые паттерны, скомпилированные через модуль re во время теста."""
+    seen = []
+    real_compile = re._compile
+
+    def spy(pattern, flags):
+        if isinstance(pattern, str):
+            seen.append(pattern)
+        return real_compile(pattern, flags)
+
+    monkeypatch.setattr(re, "_compile", spy)
+    yield seen
+    engine._normalize_name_cached.cache_clear()
+
+
+def _steady(compiled, fn):
+    """Прогрев, затем повторный вызов с чистым кэшем normalize_name; возвращает компиляции."""
+    fn()
+    engine._normalize_name_cached.cache_clear()
+    compiled.clear()
+    fn()
+    return compiled
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: состав реестра                                          ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRegistry:
+
+    def test_all_compiled(self):
+        names = [n for n in dir(rx) if n.isupper() and not n.startswith("_")]
+        assert names
+        for name in names:
+            value = getattr(rx, name)
+            if isinstance(value, tuple):
+                assert value and all(isinstance(p, re.Pattern) for p in value), name
+            else:
+                assert isinstance(value, re.Pattern), name
+
+    def test_spy_catches_inline(self, compiled):
+        re.match(r"^\d+ тест-шпион$", "1 тест-шпион")
+        assert compiled == [r"^\d+ тест-шпион$"]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: горячий путь без компиляции на вызове                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestHotPath:
+
+    @pytest.mark.parametrize("text", [RAW_TEXT, HELIX_TEXT, MEDSI_TEXT, FIXTURE_TEXT],
+                             ids=["generic", "helix", "medsi", "medsi_fixture"])
+    def test_pipeline(self, compiled, text, monkeypatch):
+        monkeypatch.setattr(engine, "CANDIDATES_MEMO_ENABLED", False)
+        assert _steady(compiled, lambda: engine._run_parse_pipeline(text)) == []
+
+    @pytest.mark.parametrize("text", [RAW_TEXT, HELIX_TEXT, MEDSI_TEXT, FIXTURE_TEXT],
+                             ids=["generic", "helix", "medsi", "medsi_fixture"])
+    def test_extractors(self, compiled, text):
+        def run():
+            universal_extract(text)
+            medsi_extractor.medsi_inline_to_candidates(text)
+            engine.helix_table_to_candidates(text)
+            evaluate_parse_quality(fallback_parse_candidates(text))
+
+        assert _steady(compiled, run) == []
+
+    def test_line_helpers(self, compiled):
+        def run():
+            for line in (RAW_TEXT + HELIX_TEXT + MEDSI_TEXT).splitlines():
+                engine._one_line_row_candidate(line)
+                medsi_extractor._try_parse_inline(line)
+                engine._is_garbage_name(engine.sanitize_raw_name(line))
+                engine.normalize_name(line)
+
+        assert _steady(compiled, run) == []
@@ -0,0 +1,259 @@
+"""
+Пул процессов печати PDF (parsers/pdf_render_pool).
+
+Запуск:
+    pytest tests/test_pdf_render_pool.py -v
+
+Что тестируем:
+1) PdfRenderPool: печать в процессе-воркере, результат через Future, метрики
+2) Backpressure: переполненная очередь → RenderQueueFull
+3) Зависшая печать → RenderTimeout и перезапуск воркера; упавший воркер перезапускается
+4) engine: render_pdf_bytes идёт в пул, прогрев PrewarmedPdfRender при пуле не запускается;
+   метрики пула в /render-stats
+
+Вместо Chromium в воркерах — фейковый браузер (фабрика на уровне модуля,
+чтобы её можно было передать в процесс, запущенный через spawn).
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.pdf_render_pool import PdfRenderPool, RenderError, RenderQueueFull, RenderTimeout
+
+
+# ─── Фейковый браузер (живёт в процессе воркера) ─────────────────────
+
+class _FakePage:
+    def __init__(self):
+        self.html = ""
+
+    def set_content(self, html, wait_until=None):
+        self.html = html
+
+    def pdf(self, **options):
+        if self.html == "HANG":
+            time.sleep(60)
+        if self.html == "CRASH":
+            os._exit(3)
+        if self.html == "FAIL":
+            raise ValueError("page crashed")
+        return b"%PDF-" + self.html.encode() + b"|" + str(options.get("format")).encode() + \
+            b"|" + str(os.getpid()).encode()
+
+    def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def new_page(self):
+        return _FakePage()
+
+    def close(self):
+        pass
+
+
+def fake_browser_factory():
+    return _FakeBrowser()
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kw):
+        kw.setdefault("browser_factory", fake_browser_factory)
+        kw.setdefault("render_timeout", 10.0)
+        pool = PdfRenderPool(**kw)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close(timeout=1.0)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: печать и метрики                                        ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRender:
+
+    def test_render_in_worker_process(self, make_pool):
+        pool = make_pool(workers=1)
+
+        data = pool.render("<html>x</html>", {"format": "A4"})
+
+        body, fmt, pid = data.split(b"|")
+        assert body == b"%PDF-<html>x</html>"
+        assert fmt == b"A4"
+        assert int(pid) != os.getpid()
+
+    def test_future_and_stats(self, make_pool):
+        pool = make_pool(workers=2)
+
+        futures = [pool.submit(f"doc{i}", {"format": "A4"}) for i in range(6)]
+        results = [f.result(timeout=30) for f in futures]
+
+        assert [r.split(b"|")[0] for r in results] == [f"%PDF-doc{i}".encode() for i in range(6)]
+        stats = pool.stats()
+        assert stats["submitted"] == stats["completed"] == 6
+        assert stats["failed"] == stats["restarts"] == 0
+        assert stats["alive_workers"] == 2
+        assert stats["queue_length"] == 0
+        assert stats["render_ms_avg"] is not None and stats["render_ms_p95"] is not None
+
+    def test_render_error_keeps_worker(self, make_pool):
+        pool = make_pool(workers=1)
+
+        with pytest.raises(RenderError, match="page crashed"):
+            pool.render("FAIL")
+
+        assert pool.render("ok").startswith(b"%PDF-ok")
+        assert pool.stats()["restarts"] == 0
+
+    def test_closed_pool_rejects(self, make_pool):
+        pool = make_pool(workers=1)
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.submit("x")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: backpressure                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestBackpressure:
+
+    def test_queue_full_rejected(self, make_pool):
+        pool = make_pool(workers=1, max_queue=1, render_timeout=2.0)
+        hanging = pool.submit("HANG")
+        assert _wait_for(lambda: pool.stats()["busy_workers"] == 1)
+        queued = pool.submit("queued")
+
+        with pytest.raises(RenderQueueFull):
+            pool.submit("overflow")
+
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["queue_length"] == 1
+        with pytest.raises(RenderTimeout):
+            hanging.result(timeout=30)
+        assert queued.result(timeout=30).startswith(b"%PDF-queued")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: зависание и падение воркера                             ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRecovery:
+
+    def test_hung_render_times_out_and_restarts(self, make_pool):
+        pool = make_pool(workers=1, render_timeout=0.5)
+        first_pid = pool.render("a").split(b"|")[2]
+
+        with pytest.raises(RenderTimeout):
+            pool.render("HANG")
+
+        second_pid = pool.render("b").split(b"|")[2]
+        assert second_pid != first_pid
+        stats = pool.stats()
+        assert (stats["timeouts"], stats["restarts"]) == (1, 1)
+
+    def test_crashed_worker_restarts(self, make_pool):
+        pool = make_pool(workers=1)
+
+        with pytest.raises(RenderError, match="код 3"):
+            pool.render("CRASH")
+
+        assert pool.render("after").startswith(b"%PDF-after")
+        assert pool.stats()["restarts"] == 1
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: интеграция с engine                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 30 % 35-45
+СОЭ 35 мм/ч 2-20
+"""
+
+
+class _InlinePool:
+    def __init__(self):
+        self.calls = []
+
+    def render(self, html, pdf_options=None, timeout=None):
+        self.calls.append((html, pdf_options))
+        return b"%PDF-pool"
+
+    def stats(self):
+        return {"queue_length": 0}
+
+
+class TestEngineIntegration:
+
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        pool = _InlinePool()
+        monkeypatch.setattr(engine, "PDF_RENDER_WORKERS", 2)
+        monkeypatch.setattr(engine, "_PDF_RENDER_POOL", pool)
+        monkeypatch.setattr(engine, "sync_playwright",
+                            lambda: pytest.fail("Playwright must not run in the request thread"))
+        return pool
+
+    def test_render_pdf_bytes_uses_pool(self, pool):
+        assert engine.render_pdf_bytes("<html></html>", "2026-01-01 10:00:00") == b"%PDF-pool"
+        html, options = pool.calls[0]
+        assert html == "<html></html>"
+        assert options == engine._pdf_options("2026-01-01 10:00:00")
+
+    def test_generate_pdf_report_submits_without_prewarm(self, pool, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        monkeypatch.setattr(engine, "_generate_llm_answer",
+                            lambda *a, **kw: ("Ответ LLM", {"enabled": False, "hit": False}))
+        monkeypatch.setattr(engine, "PrewarmedPdfRender",
+                            lambda *a: pytest.fail("pool workers are already warm"))
+
+        pdf_path, _ = engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+
+        assert pdf_path.read_bytes() == b"%PDF-pool"
+        assert "Ответ LLM" in pool.calls[0][0]
+
+    def test_pool_singleton(self, monkeypatch):
+        monkeypatch.setattr(engine, "_PDF_RENDER_POOL", None)
+        monkeypatch.setattr(engine, "PDF_RENDER_QUEUE_MAX", 3)
+        pool = engine.get_pdf_render_pool()
+        try:
+            assert engine.get_pdf_render_pool() is pool
+            assert pool.max_queue == 3
+        finally:
+            pool.close()
+
+    def test_stats_endpoint(self, pool, monkeypatch):
+        import app as app_module
+        monkeypatch.setattr(engine, "_PDF_RENDER_POOL", None)
+        client = app_module.app.test_client()
+        assert client.get("/render-stats").get_json() == {"pool": None}
+
+        monkeypatch.setattr(engine, "_PDF_RENDER_POOL", pool)
+        assert client.get("/render-stats").get_json() == {"pool": {"queue_length": 0}}
@@ -0,0 +1,261 @@
+"""
+Нативная печать отчёта в PDF без Chromium (pdf_writer).
+
+Запуск:
+    pytest tests/test_pdf_writer.py -v
+
+Что тестируем:
+1) TrueTypeFont: метрики, cmap, подмножество шрифта
+2) render_report_pdf: валидный PDF, текст извлекается, шапка таблицы
+   повторяется на каждой странице, нумерация «Стр. N / M»
+3) generate_report(pdf_backend="native"): без браузера; без шрифта — откат на Chromium
+4) app: проверка поля pdf_backend
+
+Нужен любой TTF-шрифт (ищется Lato из rdoc или DejaVuSans), иначе тесты пропускаются.
+Lato без кириллицы, поэтому текст проверяем по латинским строкам.
+"""
+
+import glob
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+import pdf_writer
+from pdf_writer import FontError, TrueTypeFont, html_to_text, render_report_pdf, wrap_text
+
+pypdf = pytest.importorskip("pypdf")
+
+
+def _find_font():
+    candidates = [str(p) for p in engine.NATIVE_PDF_FONT_PATHS]
+    candidates += sorted(glob.glob("/root/.rbenv/versions/*/lib/ruby/*/rdoc/generator/template/darkfish/fonts/Lato-Regular.ttf"))
+    candidates += sorted(glob.glob("/usr/share/fonts/**/*.ttf", recursive=True))
+    for path in candidates:
+        if Path(path).is_file():
+            return path
+    return None
+
+
+FONT_PATH = _find_font()
+pytestmark = pytest.mark.skipif(FONT_PATH is None, reason="нет TTF-шрифта")
+
+
+@pytest.fixture(scope="module")
+def font():
+    return TrueTypeFont(FONT_PATH)
+
+
+def _row(i, status_class="status-normal"):
+    return {
+        "code": f"MARKER{i}", "value": 10 + i, "unit": "g/l", "ref_text": "5-15",
+        "ref_source": "lab", "status": "NORMAL", "status_class": status_class,
+    }
+
+
+def _context(n_rows=5, **overrides):
+    ctx = {
+        "sex": "m", "age": 40, "created_at": "2026-01-01 10:00:00",
+        "facts": ["<b>MARKER1</b> above range"],
+        "rows": [_row(i) for i in range(n_rows)],
+        "explain_lines": ["<b>MARKER1</b>: reference text"],
+        "human_text": "**SUMMARY**\nPlain narrative line.",
+        "quality_section_html": "<p>Quality line</p>",
+        "missing_warnings": [],
+    }
+    ctx.update(overrides)
+    return ctx
+
+
+def _read(data):
+    return pypdf.PdfReader(io.BytesIO(data))
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: TrueTypeFont                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestTrueTypeFont:
+
+    def test_metrics(self, font):
+        assert font.units_per_em > 0
+        assert font.has_glyph("A")
+        assert font.char_width("W") > font.char_width("i") > 0
+        assert font.text_width("AA", 10) == pytest.approx(2 * font.text_width("A", 10))
+
+    def test_not_a_font(self):
+        with pytest.raises(FontError):
+            TrueTypeFont(b"not a font at all, definitely")
+
+    def test_subset_is_smaller_and_parses(self, font):
+        gids = {font.glyph_id(ch) for ch in "Hello"}
+        data = font.subset(gids)
+        assert len(data) < len(font.data)
+        sub = TrueTypeFont(data)
+        assert sub.num_glyphs == font.num_glyphs
+        assert sub.glyph_id("H") == font.glyph_id("H")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: render_report_pdf                                       ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRenderReportPdf:
+
+    def test_valid_pdf_with_text(self, font):
+        data = render_report_pdf(_context(), font)
+
+        assert data.startswith(b"%PDF-1.4")
+        reader = _read(data)
+        assert len(reader.pages) == 1
+        text = reader.pages[0].extract_text()
+        for needle in ("MARKER3", "g/l", "above range", "reference text", "SUMMARY",
+                       "Plain narrative line.", "Quality line", "2026-01-01 10:00:00"):
+            assert needle in text
+
+    def test_long_table_paginates_with_header(self, font, monkeypatch):
+        monkeypatch.setattr(pdf_writer, "TABLE_COLUMNS",
+                            tuple((f"COL{i}", share) for i, (_, share) in enumerate(pdf_writer.TABLE_COLUMNS)))
+        reader = _read(render_report_pdf(_context(n_rows=120), font))
+
+        assert len(reader.pages) > 2
+        texts = [p.extract_text() for p in reader.pages]
+        table_pages = [t for t in texts if "MARKER" in t]
+        assert len(table_pages) > 1
+        assert all("COL0" in t for t in table_pages)
+        assert "MARKER119" in "".join(texts)
+
+    def test_page_numbers(self, font):
+        reader = _read(render_report_pdf(_context(n_rows=120), font))
+        total = len(reader.pages)
+        # Lato без кириллицы: «Стр.» не извлекается, номера — да
+        assert f"{total} / {total}" in reader.pages[-1].extract_text()
+
+    def test_uncompressed_content(self, font):
+        data = render_report_pdf(_context(), font, compress=False)
+        assert b"/F1" in data and b" Tj ET" in data
+
+    def test_unknown_chars_do_not_fail(self, font):
+        ctx = _context(human_text="Справка ✓ 🙂", facts=[], missing_warnings=["мало показателей"])
+        assert _read(render_report_pdf(ctx, font)).pages
+
+
+class TestTextHelpers:
+
+    def test_html_to_text(self):
+        assert html_to_text("<p>a &amp; b</p><p><b>c</b></p>") == "a & b\nc"
+        assert html_to_text("<ul><li>x</li><li>y</li></ul>") == "• x\n• y"
+
+    def test_wrap_respects_width(self, font):
+        lines = wrap_text(font, "word " * 50, 10, 100)
+        assert len(lines) > 1
+        assert all(font.text_width(ln, 10) <= 100 for ln in lines)
+
+    def test_wrap_splits_long_word(self, font):
+        lines = wrap_text(font, "x" * 200, 10, 50)
+        assert "".join(lines) == "x" * 200
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: generate_report(pdf_backend="native")                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 30 % 35-45
+СОЭ 35 мм/ч 2-20
+"""
+
+
+class TestGenerateReportNative:
+
+    @pytest.fixture
+    def env(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        monkeypatch.setattr(engine, "NATIVE_PDF_FONT_PATHS", (Path(FONT_PATH),))
+        monkeypatch.setattr(engine, "_NATIVE_PDF_FONT", None)
+        monkeypatch.setattr(engine, "_generate_llm_answer",
+                            lambda *a, **kw: ("LLM answer text", {"enabled": False, "hit": False}))
+        chromium = []
+        monkeypatch.setattr(engine, "render_pdf_bytes", lambda html, created: chromium.append(html) or b"%PDF-chromium")
+        monkeypatch.setattr(engine, "PrewarmedPdfRender",
+                            lambda *a: pytest.fail("native backend must not prewarm Chromium"))
+        return chromium
+
+    def test_native_without_browser(self, env):
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, pdf_backend="native", persist=True)
+
+        assert env == []
+        assert result.pdf_bytes.startswith(b"%PDF-1.4")
+        assert result.pdf_path.read_bytes() == result.pdf_bytes
+        text = "".join(p.extract_text() for p in _read(result.pdf_bytes).pages)
+        assert "LLM answer text" in text
+
+    def test_default_from_config(self, env, monkeypatch):
+        monkeypatch.setattr(engine, "REPORT_PDF_BACKEND", "native")
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT)
+        assert env == [] and result.pdf_bytes.startswith(b"%PDF-1.4")
+
+    def test_fallback_to_chromium_without_font(self, env, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "NATIVE_PDF_FONT_PATHS", (tmp_path / "missing.ttf",))
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, pdf_backend="native")
+        assert result.pdf_bytes == b"%PDF-chromium"
+        assert len(env) == 1
+
+    def test_unknown_backend(self, env):
+        with pytest.raises(ValueError):
+            engine.generate_report("ж", 30, raw_text=RAW_TEXT, pdf_backend="wkhtml")
+
+    def test_font_cached(self, env):
+        assert engine.get_native_pdf_font() is engine.get_native_pdf_font()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: app                                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestAppPdfBackend:
+
+    @pytest.fixture
+    def app_module(self, monkeypatch):
+        import app as app_module
+        app_module.app.config["TESTING"] = True
+        started = []
+
+        class _Thread:
+            def __init__(self, target, args, kwargs, daemon):
+                started.append(kwargs)
+
+            def start(self):
+                pass
+
+        monkeypatch.setattr(app_module.threading, "Thread", _Thread)
+        return app_module, started
+
+    def test_backend_passed_to_job(self, app_module):
+        module, started = app_module
+        r = module.app.test_client().post("/generate", data={
+            "sex": "ж", "age": "30", "raw_text": RAW_TEXT, "pdf_backend": "native",
+        })
+        assert r.status_code == 200
+        assert started[0]["pdf_backend"] == "native"
+
+    def test_backend_optional(self, app_module):
+        module, started = app_module
+        module.app.test_client().post("/generate", data={"sex": "ж", "age": "30", "raw_text": RAW_TEXT})
+        assert started[0]["pdf_backend"] is None
+
+    def test_invalid_backend_rejected(self, app_module):
+        module, started = app_module
+        r = module.app.test_client().post("/generate", data={
+            "sex": "ж", "age": "30", "raw_text": RAW_TEXT, "pdf_backend": "wkhtml",
+        })
+        assert started == []
+        assert "pdf_backend" in r.get_data(as_text=True)
@@ -0,0 +1,287 @@
+"""
+Печать PDF из HTML в памяти и выдача отчёта без файлов на диске.
+
+Запуск:
+    pytest tests/test_report_in_memory.py -v
+
+Что тестируем:
+1) render_pdf_bytes / PrewarmedPdfRender: set_content → байты PDF
+2) generate_report: persist=False не пишет файлы отчёта и не падает, если
+   OUT_DIR недоступна; persist=True — пишет. _append_log: ротация в *.1
+3) app: /download отдаёт PDF из памяти, кэш ограничен по объёму; незавершённые
+   задачи не вытесняются; сверх MAX_CONCURRENT_JOBS — 503 «сервер занят»
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 30 % 35-45
+СОЭ 35 мм/ч 2-20
+"""
+
+
+class _FakePage:
+    def __init__(self, log):
+        self.log = log
+        self.content = ""
+
+    def goto(self, url, wait_until=None):
+        self.log.append("goto")
+
+    def set_content(self, html, wait_until=None):
+        self.log.append("set_content")
+        self.content = html
+
+    def evaluate(self, js, arg):
+        self.content = self.content.replace(engine.LLM_NARRATIVE_PLACEHOLDER, arg)
+        return True
+
+    def pdf(self, path=None, **kwargs):
+        self.log.append(("pdf", path))
+        return b"%PDF-" + str(len(self.content)).encode()
+
+
+class _FakePlaywright:
+    def __init__(self, page):
+        self.page = page
+
+    @property
+    def chromium(self):
+        return self
+
+    def launch(self):
+        return self
+
+    def new_page(self):
+        return self.page
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def fake_browser(monkeypatch):
+    log = []
+    page = _FakePage(log)
+    monkeypatch.setattr(engine, "sync_playwright", lambda: _FakePlaywright(page))
+    monkeypatch.setattr(engine, "PDF_RENDER_WORKERS", 0)   # печать в потоке, без пула воркеров
+    return page, log
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: печать в памяти                                         ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRenderPdfBytes:
+
+    def test_set_content_and_bytes(self, fake_browser):
+        page, log = fake_browser
+        data = engine.render_pdf_bytes("<html><body>Отчёт</body></html>", "2026-01-01 10:00:00")
+
+        assert data.startswith(b"%PDF-")
+        assert log == ["set_content", ("pdf", None)]
+        assert page.content == "<html><body>Отчёт</body></html>"
+
+    def test_prewarm_bytes_only(self, fake_browser):
+        _, log = fake_browser
+        shell = '<div id="llm-narrative">' + engine.LLM_NARRATIVE_PLACEHOLDER + "</div>"
+        r = engine.PrewarmedPdfRender(shell, "now")
+
+        assert r.finish("Текст") is True
+        assert r.pdf_bytes.startswith(b"%PDF-")
+        assert ("pdf", None) in log
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: generate_report                                         ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGenerateReport:
+
+    @pytest.fixture
+    def env(self, monkeypatch, tmp_path, fake_browser):
+        out = tmp_path / "out"
+        out.mkdir()
+        monkeypatch.setattr(engine, "OUT_DIR", out)
+        monkeypatch.setattr(engine, "REPORT_PRERENDER_ENABLED", False)
+        monkeypatch.setattr(engine, "_generate_llm_answer",
+                            lambda *a, **kw: ("Ответ LLM", {"enabled": False, "hit": False}))
+        return out, fake_browser[1]
+
+    def test_in_memory_writes_nothing(self, env):
+        out, log = env
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, file_bytes=b"\x89PNG",
+                                        filename="scan.png", persist=False)
+
+        assert result.pdf_bytes.startswith(b"%PDF-")
+        assert result.download_name.endswith(".pdf")
+        assert result.pdf_path is None and result.html_path is None
+        assert list(out.iterdir()) == []
+        assert "goto" not in log
+
+    def test_in_memory_with_unwritable_out_dir(self, env, monkeypatch, tmp_path):
+        # OUT_DIR внутри обычного файла: ни создать, ни писать (chmod под root не помогает)
+        blocker = tmp_path / "blocker"
+        blocker.write_text("")
+        new_out = blocker / "outputs"
+        monkeypatch.setattr(engine, "OUT_DIR", new_out)
+        for name in dir(engine):
+            value = getattr(engine, name)
+            if name.endswith("_PATH") and isinstance(value, Path) and value.parent == Path("outputs"):
+                monkeypatch.setattr(engine, name, new_out / value.name)
+        monkeypatch.setattr(engine, "DEBUG_ARTIFACTS_MODE", "always")
+
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, persist=False)
+
+        assert result.pdf_bytes.startswith(b"%PDF-")
+        assert not new_out.exists()
+
+    def test_append_log_rotates(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "DEBUG_LOG_MAX_BYTES", 100)
+        log = tmp_path / "logs" / "debug.txt"   # папки ещё нет
+        for i in range(10):
+            engine._append_log(log, f"строка {i}")
+
+        rotated = log.with_name("debug.txt.1")
+        assert rotated.exists()
+        assert "строка 9" in log.read_text(encoding="utf-8") + rotated.read_text(encoding="utf-8")
+
+    def test_default_from_config(self, env, monkeypatch):
+        out, _ = env
+        monkeypatch.setattr(engine, "REPORT_PERSIST_TO_DISK", True)
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT)
+        assert result.pdf_path.read_bytes() == result.pdf_bytes
+        assert "Ответ LLM" in result.html_path.read_text(encoding="utf-8")
+
+    def test_generate_pdf_report_persists(self, env):
+        out, _ = env
+        pdf_path, name = engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+        assert pdf_path.name == name
+        assert pdf_path.parent.parent == out / engine.REPORT_STORAGE_SUBDIR   # шард хранилища
+        assert pdf_path.read_bytes().startswith(b"%PDF-")
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: app                                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestAppDownload:
+
+    @pytest.fixture
+    def app_module(self, monkeypatch):
+        import app as app_module
+        app_module.app.config["TESTING"] = True
+        monkeypatch.setattr(app_module, "REPORTS", {})
+        return app_module
+
+    def test_download_from_memory(self, app_module):
+        app_module.REPORTS["t1"] = engine.ReportResult(pdf_bytes=b"%PDF-mem", download_name="r.pdf")
+
+        r = app_module.app.test_client().get("/download/t1")
+
+        assert r.status_code == 200
+        assert r.data == b"%PDF-mem"
+        assert r.mimetype == "application/pdf"
+        assert "r.pdf" in r.headers["Content-Disposition"]
+
+    def test_cache_bounded_by_bytes(self, app_module, monkeypatch):
+        monkeypatch.setattr(app_module, "MAX_REPORT_BYTES_IN_MEMORY", 25)
+        for i in range(4):
+            app_module.REPORTS[f"t{i}"] = engine.ReportResult(pdf_bytes=b"x" * 10, download_name="r.pdf")
+
+        app_module._trim_reports_cache()
+
+        assert list(app_module.REPORTS) == ["t2", "t3"]
+
+    def test_trim_keeps_running_jobs(self, app_module, monkeypatch):
+        monkeypatch.setattr(app_module, "MAX_REPORTS_IN_MEMORY", 2)
+        jobs = {f"t{i}": app_module.ReportJob() for i in range(5)}
+        jobs["t1"].done = True
+        jobs["t3"].error = "сбой"
+        monkeypatch.setattr(app_module, "JOBS", dict(jobs))
+
+        app_module._trim_reports_cache()
+
+        # завершённые вытеснены, идущие остались — даже сверх лимита
+        assert list(app_module.JOBS) == ["t0", "t2", "t4"]
+
+    def test_generate_busy_when_slots_taken(self, app_module, monkeypatch):
+        slots = threading.BoundedSemaphore(1)
+        monkeypatch.setattr(app_module, "_JOB_SLOTS", slots)
+        monkeypatch.setattr(app_module, "JOBS", {})
+        slots.acquire()
+
+        r = app_module.app.test_client().post("/generate", data={"sex": "ж", "age": "30", "raw_text": RAW_TEXT})
+
+        assert r.status_code == 503
+        assert app_module.BUSY_MESSAGE in r.get_data(as_text=True)
+        assert app_module.JOBS == {}
+
+    def test_generate_releases_slot(self, app_module, monkeypatch):
+        slots = threading.BoundedSemaphore(1)
+        monkeypatch.setattr(app_module, "_JOB_SLOTS", slots)
+        monkeypatch.setattr(app_module, "JOBS", {})
+        monkeypatch.setattr(app_module, "generate_report",
+                            lambda **kw: engine.ReportResult(pdf_bytes=b"%PDF", download_name="r.pdf"))
+        client = app_module.app.test_client()
+
+        for _ in range(2):   # второй запрос проходит только если первый вернул место
+            r = client.post("/generate", data={"sex": "ж", "age": "30", "raw_text": RAW_TEXT})
+            assert r.status_code == 200
+            assert slots.acquire(timeout=5)
+            slots.release()
+
+        assert all(job.done for job in app_module.JOBS.values())
+
+    def test_concurrent_jobs_store_and_trim(self, app_module, monkeypatch):
+        """Параллельные генерации пишут в REPORTS и чистят его — без гонок и ложных ошибок."""
+        n = 32
+        barrier = threading.Barrier(n)
+
+        class SlowDict(dict):
+            """Обход values() уступает поток — без блокировки вставка посреди обхода падает."""
+
+            def values(self):
+                for v in super().values():
+                    time.sleep(0.0005)
+                    yield v
+
+        def fake_generate(**kwargs):
+            barrier.wait(timeout=5)
+            return engine.ReportResult(pdf_bytes=b"%PDF" * 4, download_name="r.pdf")
+
+        monkeypatch.setattr(app_module, "REPORTS", SlowDict())
+        monkeypatch.setattr(app_module, "JOBS", {})
+        monkeypatch.setattr(app_module, "MAX_REPORTS_IN_MEMORY", 3)
+        monkeypatch.setattr(app_module, "generate_report", fake_generate)
+        jobs = [app_module.ReportJob() for _ in range(n)]
+        threads = [threading.Thread(target=app_module._run_report_job, args=(f"t{i}", job))
+                   for i, job in enumerate(jobs)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        assert [job.error for job in jobs] == [None] * n
+        assert all(job.done for job in jobs)
+        assert len(app_module.REPORTS) == 3
@@ -0,0 +1,270 @@
+"""
+Параллельная подготовка отчёта, пока LLM генерирует текст.
+
+Запуск:
+    pytest tests/test_report_prerender.py -v
+
+Что тестируем:
+1) Отчёт с меткой + подстановка текста == обычный рендер с текстом
+2) PrewarmedPdfRender: страница загружается заранее, текст вставляется в #llm-narrative, затем печать
+3) generate_pdf_report: прогрев стартует до вызова LLM; при сбое прогрева — обычная печать из HTML в памяти
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 30 % 35-45
+СОЭ 35 мм/ч 2-20
+"""
+
+
+# ─── Фейковый Playwright ─────────────────────────────────────────────
+
+class _FakePage:
+    def __init__(self, log, fail_on=None, pdf_delay=0.0):
+        self.log = log
+        self.fail_on = fail_on
+        self.pdf_delay = pdf_delay
+        self.content = ""
+        self.narrative_loaded = threading.Event()
+
+    def set_content(self, html, wait_until=None):
+        self.log.append("set_content")
+        self.content = html
+        self.narrative_loaded.set()
+
+    def evaluate(self, js, arg):
+        self.log.append("evaluate")
+        if "llm-narrative" not in self.content:
+            return False
+        self.content = self.content.replace(engine.LLM_NARRATIVE_PLACEHOLDER, arg)
+        return True
+
+    def pdf(self, path=None, **kwargs):
+        self.log.append("pdf")
+        time.sleep(self.pdf_delay)
+        if self.fail_on == "pdf":
+            raise RuntimeError("print failed")
+        if path:
+            Path(path).write_bytes(b"%PDF-fake")
+        return b"%PDF-fake"
+
+
+class _FakeBrowser:
+    def __init__(self, page, log):
+        self.page, self.log = page, log
+
+    def new_page(self):
+        return self.page
+
+    def close(self):
+        self.log.append("close")
+
+
+class _FakePlaywright:
+    def __init__(self, page, log, fail_launch=False):
+        self.page, self.log, self.fail_launch = page, log, fail_launch
+
+    @property
+    def chromium(self):
+        return self
+
+    def launch(self):
+        if self.fail_launch:
+            raise RuntimeError("Executable doesn't exist")
+        self.log.append("launch")
+        return _FakeBrowser(self.page, self.log)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _install_fake(monkeypatch, fail_launch=False, fail_on=None, pdf_delay=0.0):
+    log = []
+    page = _FakePage(log, fail_on=fail_on, pdf_delay=pdf_delay)
+    monkeypatch.setattr(engine, "sync_playwright",
+                        lambda: _FakePlaywright(page, log, fail_launch=fail_launch))
+    return page, log
+
+
+def _shell_html():
+    ctx = engine.build_template_context(
+        "ж", 30, [], [], engine.LLM_NARRATIVE_PLACEHOLDER, [], quality=None,
+    )
+    return engine.render_html_report(ctx)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: подстановка текста в заранее отрендеренный отчёт        ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestFillNarrative:
+
+    @pytest.mark.parametrize("text", [
+        "Простой ответ",
+        "**ДИСКЛЕЙМЕР**\nСтрока 1\n\nСтрока <b>2</b> & «кавычки»",
+        "",
+    ])
+    def test_same_as_direct_render(self, text):
+        ctx = engine.build_template_context("м", 40, [], [], text, [], quality=None)
+        direct = engine.render_html_report(dict(ctx))
+        ctx["human_text"] = engine.LLM_NARRATIVE_PLACEHOLDER
+        shell = engine.render_html_report(ctx)
+
+        assert engine.fill_report_narrative(shell, text) == direct
+
+    def test_narrative_block_has_id(self):
+        assert 'id="llm-narrative"' in _shell_html()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: PrewarmedPdfRender                                      ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestPrewarmedPdfRender:
+
+    def test_page_loaded_before_text(self, monkeypatch, tmp_path):
+        page, log = _install_fake(monkeypatch)
+
+        r = engine.PrewarmedPdfRender(_shell_html(), "2026-01-01 10:00:00")
+        assert page.narrative_loaded.wait(5), "страница должна грузиться до появления текста"
+        assert "pdf" not in log
+
+        assert r.finish("Текст\nсправки") is True
+        assert log == ["launch", "set_content", "evaluate", "pdf", "close"]
+        assert "Текст<br>справки" in page.content
+        assert r.pdf_bytes == b"%PDF-fake"
+        assert r.warm_ms is not None
+        # Файлы пишет только вызывающий код
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cancel_closes_without_printing(self, monkeypatch, tmp_path):
+        page, log = _install_fake(monkeypatch)
+        r = engine.PrewarmedPdfRender(_shell_html(), "now")
+        r.cancel()
+        r._thread.join(5)
+        assert "pdf" not in log
+        assert log[-1] == "close"
+
+    def test_launch_failure_reported(self, monkeypatch, tmp_path):
+        _install_fake(monkeypatch, fail_launch=True)
+        r = engine.PrewarmedPdfRender(_shell_html(), "now")
+        assert r.finish("Текст") is False
+        assert isinstance(r.error, RuntimeError)
+
+    def test_missing_narrative_block_is_error(self, monkeypatch, tmp_path):
+        _install_fake(monkeypatch)
+        r = engine.PrewarmedPdfRender("<html><body>без блока</body></html>", "now")
+        assert r.finish("Текст") is False
+
+    def test_timeout_cancels_and_joins(self, monkeypatch):
+        """Печать не уложилась в timeout: поток дожидается закрытия браузера, результат отброшен."""
+        page, log = _install_fake(monkeypatch, pdf_delay=0.3)
+        r = engine.PrewarmedPdfRender(_shell_html(), "now")
+        assert page.narrative_loaded.wait(5)
+
+        assert r.finish("Текст", timeout=0.2) is False
+
+        assert not r._thread.is_alive()
+        assert log[-1] == "close"
+        assert r.pdf_bytes is None
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: generate_pdf_report                                     ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestGeneratePdfReportOverlap:
+
+    @pytest.fixture
+    def env(self, monkeypatch, tmp_path):
+        order = []
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+        # Прогрев работает только при печати в потоке запроса (без пула воркеров)
+        monkeypatch.setattr(engine, "PDF_RENDER_WORKERS", 0)
+        monkeypatch.setattr(engine, "render_pdf_bytes",
+                            lambda html, created: order.append("render_in_memory") or b"%PDF-memory")
+
+        def fake_llm(sex, age, items, high_low, on_text=None, gate_info=None):
+            order.append("llm")
+            return "Ответ LLM\nвторая строка", {"enabled": False, "hit": False}
+
+        monkeypatch.setattr(engine, "_generate_llm_answer", fake_llm)
+        return order
+
+    def _fake_prewarm(self, order, ok=True):
+        class FakePrewarm:
+            warm_ms = 1.0
+            error = None if ok else RuntimeError("no chromium")
+            pdf_bytes = b"%PDF-prewarmed" if ok else None
+
+            def __init__(self, shell_html, created_at):
+                order.append("prewarm")
+                assert engine.LLM_NARRATIVE_PLACEHOLDER in shell_html
+                self.shell_html = shell_html
+
+            def finish(self, text):
+                order.append(("finish", text))
+                return ok
+
+            def cancel(self):
+                order.append("cancel")
+
+        return FakePrewarm
+
+    def test_prewarm_started_before_llm(self, env, monkeypatch, tmp_path):
+        monkeypatch.setattr(engine, "PrewarmedPdfRender", self._fake_prewarm(env))
+
+        pdf_path, _ = engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+
+        assert env[0] == "prewarm"
+        assert env[1] == "llm"
+        assert env[2][0] == "finish" and env[2][1].startswith("Ответ LLM")
+        assert "render_in_memory" not in env
+        assert pdf_path.read_bytes() == b"%PDF-prewarmed"
+        html = pdf_path.with_suffix(".html").read_text(encoding="utf-8")
+        assert "Ответ LLM<br>вторая строка" in html
+        assert engine.LLM_NARRATIVE_PLACEHOLDER not in html
+
+    def test_fallback_when_prewarm_fails(self, env, monkeypatch):
+        monkeypatch.setattr(engine, "PrewarmedPdfRender", self._fake_prewarm(env, ok=False))
+
+        engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+
+        assert env[-1] == "render_in_memory"
+
+    def test_prerender_disabled(self, env, monkeypatch):
+        monkeypatch.setattr(engine, "REPORT_PRERENDER_ENABLED", False)
+        monkeypatch.setattr(engine, "PrewarmedPdfRender", self._fake_prewarm(env))
+
+        engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+
+        assert env == ["llm", "render_in_memory"]
+
+    def test_llm_exception_cancels_prewarm(self, env, monkeypatch):
+        monkeypatch.setattr(engine, "PrewarmedPdfRender", self._fake_prewarm(env))
+
+        def crash(*a, **kw):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(engine, "_generate_llm_answer", crash)
+        with pytest.raises(KeyboardInterrupt):
+            engine.generate_pdf_report("ж", 30, raw_text=RAW_TEXT)
+        assert env == ["prewarm", "cancel"]
@@ -0,0 +1,219 @@
+"""
+Хранение файлов отчётов: шарды, срок жизни, бюджет объёма, уборщик.
+
+Запуск:
+    pytest tests/test_report_storage.py -v
+
+Что тестируем:
+1) ReportStorage.shard_dir: подпапки по первым символам uid
+2) run_once: отпущенные файлы, TTL, сжатие исходников, бюджет объёма, старые файлы в корне
+3) Фоновый уборщик: release() будит его и файлы удаляются
+4) engine/app: generate_report пишет в шард; вытеснение токена отпускает файлы
+"""
+
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+from parsers.report_storage import ReportStorage
+
+
+NOW = 1_800_000_000.0
+HOUR = 3600
+
+
+def _file(path, size=10, age=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (NOW - age, NOW - age))
+    return path
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return ReportStorage(tmp_path / "reports", legacy_dir=tmp_path, ttl_sec=24 * HOUR,
+                         max_bytes=None, compress_after_sec=HOUR)
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: шарды                                                   ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestShards:
+
+    def test_shard_by_uid_prefix(self, storage, tmp_path):
+        assert storage.shard_dir("AB12cdef") == tmp_path / "reports" / "ab"
+        assert (tmp_path / "reports" / "ab").is_dir()
+
+    def test_shard_chars(self, tmp_path):
+        s = ReportStorage(tmp_path, shard_chars=3)
+        assert s.shard_dir("abcdef").name == "abc"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: проход уборки                                           ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRunOnce:
+
+    def test_released_files_removed(self, storage):
+        shard = storage.shard_dir("ab")
+        pdf = _file(shard / "report_1.pdf")
+        keep = _file(shard / "report_2.pdf")
+
+        storage.release([pdf, None])
+        stats = storage.run_once(now=NOW)
+
+        assert not pdf.exists() and keep.exists()
+        assert stats["released"] == 1
+
+    def test_ttl(self, storage):
+        shard = storage.shard_dir("ab")
+        old = _file(shard / "report_old.pdf", age=25 * HOUR)
+        fresh = _file(shard / "report_new.pdf", age=HOUR / 2)
+
+        stats = storage.run_once(now=NOW)
+
+        assert not old.exists() and fresh.exists()
+        assert stats["expired"] == 1
+
+    def test_originals_compressed(self, storage):
+        shard = storage.shard_dir("ab")
+        orig = _file(shard / "original_1.png", size=5000, age=2 * HOUR)
+        report = _file(shard / "report_1.html", age=2 * HOUR)
+
+        stats = storage.run_once(now=NOW)
+
+        gz = shard / "original_1.png.gz"
+        assert not orig.exists() and gz.exists() and report.exists()
+        assert gzip.decompress(gz.read_bytes()) == b"x" * 5000
+        assert gz.stat().st_mtime == pytest.approx(NOW - 2 * HOUR)
+        assert stats["compressed"] == 1
+
+    def test_release_removes_compressed_original(self, storage):
+        shard = storage.shard_dir("ab")
+        orig = _file(shard / "original_1.png", age=2 * HOUR)
+        storage.run_once(now=NOW)
+
+        storage.release([orig])
+        storage.run_once(now=NOW)
+
+        assert list(shard.iterdir()) == []
+
+    def test_size_budget_removes_oldest(self, tmp_path):
+        s = ReportStorage(tmp_path / "reports", ttl_sec=None, max_bytes=250, compress_after_sec=None)
+        shard = s.shard_dir("ab")
+        files = [_file(shard / f"report_{i}.pdf", size=100, age=100 - i) for i in range(4)]
+
+        stats = s.run_once(now=NOW)
+
+        assert [f.exists() for f in files] == [False, False, True, True]
+        assert stats["over_budget"] == 2
+        assert stats["bytes"] == 200 and stats["files"] == 2
+
+    def test_legacy_flat_files(self, storage, tmp_path):
+        old = _file(tmp_path / "report_2025.pdf", age=48 * HOUR)
+        debug = _file(tmp_path / "ocr_debug.txt", age=48 * HOUR)
+
+        storage.run_once(now=NOW)
+
+        assert not old.exists()
+        assert debug.exists(), "служебные файлы OUT_DIR не трогаем"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: фоновый уборщик                                         ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestJanitor:
+
+    def test_release_wakes_janitor(self, storage):
+        pdf = _file(storage.shard_dir("ab") / "report_1.pdf", age=0)
+        os.utime(pdf)  # свежий файл — TTL его не тронет
+        storage.start_janitor(interval_sec=60)
+        try:
+            storage.release([pdf])
+            deadline = time.monotonic() + 5
+            while pdf.exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert not pdf.exists()
+        finally:
+            storage.stop_janitor()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: engine и app                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+RAW_TEXT = """Гемоглобин 95 г/л 120-150
+Эритроциты 3.2 10^12/л 3.8-5.1
+Лейкоциты 12.5 10^9/л 4.0-9.0
+Тромбоциты 250 10^9/л 150-400
+Гематокрит 30 % 35-45
+СОЭ 35 мм/ч 2-20
+"""
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+    monkeypatch.setattr(engine, "_REPORT_STORAGE", None)
+    monkeypatch.setattr(engine, "REPORT_STORAGE_JANITOR_INTERVAL_SEC", 0)
+    monkeypatch.setattr(engine, "REPORT_PRERENDER_ENABLED", False)
+    monkeypatch.setattr(engine, "render_pdf_bytes", lambda html, created: b"%PDF-x")
+    monkeypatch.setattr(engine, "_generate_llm_answer",
+                        lambda *a, **kw: ("Ответ LLM", {"enabled": False, "hit": False}))
+    return tmp_path
+
+
+class TestEngineStorage:
+
+    def test_report_files_in_shard(self, env):
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, file_bytes=b"\x89PNG",
+                                        filename="scan.png", persist=True)
+
+        files = result.files()
+        assert [p.name.split("_")[0] for p in files] == ["original", "report", "report"]
+        assert all(p.exists() and p.parent.parent == env / "reports" for p in files)
+        assert len({p.parent for p in files}) == 1
+
+    def test_release_report_files(self, env):
+        result = engine.generate_report("ж", 30, raw_text=RAW_TEXT, persist=True)
+
+        engine.release_report_files(result)
+        engine.get_report_storage().run_once()
+
+        assert not result.pdf_path.exists() and not result.html_path.exists()
+
+    def test_storage_follows_out_dir(self, env, monkeypatch, tmp_path):
+        first = engine.get_report_storage()
+        monkeypatch.setattr(engine, "OUT_DIR", tmp_path / "other")
+        assert engine.get_report_storage() is not first
+        assert engine.get_report_storage().root == tmp_path / "other" / "reports"
+
+
+class TestAppEviction:
+
+    def test_evicted_token_releases_files(self, env, monkeypatch):
+        import app as app_module
+        monkeypatch.setattr(app_module, "REPORTS", {})
+        monkeypatch.setattr(app_module, "JOBS", {})
+        monkeypatch.setattr(app_module, "MAX_REPORTS_IN_MEMORY", 1)
+        results = [engine.generate_report("ж", 30, raw_text=RAW_TEXT, persist=True) for _ in range(2)]
+        for i, r in enumerate(results):
+            app_module.REPORTS[f"t{i}"] = r
+
+        app_module._trim_reports_cache()
+        engine.get_report_storage().run_once()
+
+        assert list(app_module.REPORTS) == ["t1"]
+        assert not results[0].pdf_path.exists()
+        assert results[1].pdf_path.exists()
@@ -0,0 +1,149 @@
+"""
+Реестр скомпилированных шаблонов (engine) и заранее скомпилированные страницы app.
+
+Запуск:
+    pytest tests/test_template_registry.py -v
+
+Что тестируем:
+1) get_template: компиляция один раз, auto-reload в dev, bytecode cache
+2) render_html_report: понятная ошибка без шаблона
+3) app: страницы рендерятся из FORM_TEMPLATE / READY_TEMPLATE; импорт app
+   не зависит от текущей папки и не падает без шаблона
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine
+
+
+@pytest.fixture
+def tpl_dir(monkeypatch, tmp_path):
+    (tmp_path / "report.html").write_text("<p>{{ name }}</p>", encoding="utf-8")
+    monkeypatch.setattr(engine, "TEMPLATES_DIR", tmp_path)
+    engine.reset_template_cache()
+    yield tmp_path
+    engine.reset_template_cache()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: get_template                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestTemplateRegistry:
+
+    def test_compiled_once(self, tpl_dir, monkeypatch):
+        loads = []
+        env = engine.get_template_env()
+        real = env.loader.get_source
+        monkeypatch.setattr(env.loader, "get_source", lambda e, n: loads.append(n) or real(e, n))
+
+        for _ in range(5):
+            assert engine.render_html_report({"name": "x"}) == "<p>x</p>"
+
+        assert loads == ["report.html"]
+        assert engine.get_template() is engine.get_template()
+
+    def test_file_change_ignored_without_auto_reload(self, tpl_dir):
+        engine.render_html_report({"name": "x"})
+        (tpl_dir / "report.html").write_text("<b>{{ name }}</b>", encoding="utf-8")
+        assert engine.render_html_report({"name": "x"}) == "<p>x</p>"
+
+    def test_auto_reload(self, tpl_dir, monkeypatch):
+        import os
+
+        monkeypatch.setattr(engine, "TEMPLATES_AUTO_RELOAD", True)
+        engine.reset_template_cache()
+        engine.render_html_report({"name": "x"})
+
+        path = tpl_dir / "report.html"
+        path.write_text("<b>{{ name }}</b>", encoding="utf-8")
+        st = path.stat()
+        os.utime(path, (st.st_atime, st.st_mtime + 5))
+
+        assert engine.render_html_report({"name": "x"}) == "<b>x</b>"
+
+    def test_bytecode_cache(self, tpl_dir, monkeypatch, tmp_path):
+        cache_dir = tmp_path / "jinja_cache"
+        monkeypatch.setattr(engine, "TEMPLATES_BYTECODE_CACHE_DIR", cache_dir)
+        engine.reset_template_cache()
+
+        engine.warm_templates()
+
+        assert list(cache_dir.iterdir())
+
+    def test_autoescape(self, tpl_dir):
+        assert engine.render_html_report({"name": "<script>"}) == "<p>&lt;script&gt;</p>"
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: отсутствующий шаблон                                    ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+def test_missing_template(monkeypatch, tmp_path):
+    monkeypatch.setattr(engine, "TEMPLATES_DIR", tmp_path / "nope")
+    engine.reset_template_cache()
+    try:
+        with pytest.raises(FileNotFoundError, match="Не найден шаблон"):
+            engine.render_html_report({})
+    finally:
+        engine.reset_template_cache()
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: страницы app                                            ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestAppPages:
+
+    @pytest.fixture
+    def client(self):
+        import app as app_module
+        app_module.app.config["TESTING"] = True
+        return app_module, app_module.app.test_client()
+
+    def test_pages_precompiled(self, client, monkeypatch):
+        app_module, c = client
+        compiled = []
+        monkeypatch.setattr(app_module.app.jinja_env, "from_string",
+                            lambda *a, **kw: compiled.append(1))
+
+        assert 'name="raw_text"' in c.get("/").get_data(as_text=True)
+        r = c.post("/generate", data={"sex": "м", "age": "abc", "raw_text": "HGB 120"})
+
+        assert "Возраст должен быть целым числом." in r.get_data(as_text=True)
+        assert compiled == []
+
+    def test_form_values_escaped(self, client):
+        _, c = client
+        r = c.post("/generate", data={"sex": "м", "age": "abc", "raw_text": "<b>HGB</b>"})
+        assert "&lt;b&gt;HGB&lt;/b&gt;" in r.get_data(as_text=True)
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _import_app(cwd, code):
+    return subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(ROOT)!r}); {code}"],
+        cwd=cwd, capture_output=True, text=True, timeout=60,
+    )
+
+
+class TestAppImport:
+
+    def test_import_from_other_cwd(self, tmp_path):
+        r = _import_app(tmp_path, "import app, engine; print(engine.get_template().name)")
+        assert r.returncode == 0, r.stderr
+        assert r.stdout.strip() == engine.TEMPLATE_NAME
+
+    def test_missing_template_does_not_break_import(self, tmp_path):
+        r = _import_app(tmp_path, "import engine; engine.TEMPLATES_DIR = engine.Path('nope'); import app")
+        assert r.returncode == 0, r.stderr
+        assert "Не удалось заранее скомпилировать шаблоны" in r.stderr
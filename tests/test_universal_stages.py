@@ -0,0 +1,152 @@
+"""
+Стадии предобработки universal_extract на границах входа.
+
+Запуск:
+    pytest tests/test_universal_stages.py -v
+
+Что тестируем:
+1) _multi_line_pass: окно у конца входа (имя, значение и «Смотри текст»
+   на последних строках), span кандидата
+2) _rejoin_open_parens: незакрытая скобка на последней строке и склейка,
+   дошедшая до конца входа; не больше 5 склеек
+3) _rejoin_broken_units / _rejoin_broken_names: кандидат на склейку — последняя строка
+4) universal_extract_candidates — последовательное применение тех же стадий
+"""
+
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parsers import universal_extractor as ue
+
+
+FIXTURE_TEXT = (Path(__file__).parent / "fixtures" / "medsi_pypdf_text.txt").read_text(encoding="utf-8")
+
+GEMOTEST_TEXT = """--- PAGE 1 ---
+Калий
+(K+)
+(сыворотка крови)
+A09.05.031
+3.7
+ммоль/л
+3.5 - 5.1
+Глюкоза
+5.27+
+ммоль/л
+4.1 - 5.9
+Гликозилированный гемоглобин (HBA1c,
+DCCT/NGSP)
+5.0
+%
+4.0 - 6.0
+Средний объем эритроцитов
+(MCV)
+87.3
+фл
+80 - 100
+Лейкоциты 6.1 x10*9/
+л"""
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 1: Pass 2 у конца входа                                    ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestMultiLineAtEof:
+
+    def test_full_window_ends_at_eof(self):
+        assert ue._multi_line_pass(["Гемоглобин", "144", "г/л", "132 - 172"]) == [
+            "Гемоглобин\t144\t132-172\tг/л",
+        ]
+
+    def test_span_covers_consumed_lines(self):
+        cands = ue._multi_line_candidates(["Заголовок", "Гемоглобин", "144", "г/л", "132 - 172"])
+        assert [(c.name, c.span) for c in cands] == [("Гемоглобин", (1, 5))]
+
+    def test_value_without_ref_at_eof(self):
+        assert ue._multi_line_pass(["Мусор", "Гемоглобин", "144"]) == []
+
+    def test_see_text_is_last_line(self):
+        assert ue._multi_line_pass(["Гемоглобин", "144", "г/л", "Смотри текст"]) == [
+            "Гемоглобин\t144\t\tг/л",
+        ]
+
+    def test_value_in_name_line_then_see_text(self):
+        assert ue._multi_line_pass(["Витамин D 25 нг/мл", "Смотри текст"]) == [
+            "Витамин D 25 нг/мл\t25\t\tнг/мл",
+        ]
+
+    @pytest.mark.parametrize("lines", [[], ["Гемоглобин"]], ids=["empty", "name_only"])
+    def test_nothing_to_pair(self, lines):
+        assert ue._multi_line_pass(lines) == []
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 2: незакрытые скобки                                       ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestOpenParensAtEof:
+
+    def test_open_paren_on_last_line(self):
+        assert ue._rejoin_open_parens(["Гемоглобин (HBA1c,"]) == ["Гемоглобин (HBA1c,"]
+
+    def test_join_reaches_eof(self):
+        assert ue._rejoin_open_parens(["СОЭ 5", "Гемоглобин (HBA1c,", "DCCT/NGSP"]) == [
+            "СОЭ 5", "Гемоглобин (HBA1c, DCCT/NGSP",
+        ]
+
+    def test_at_most_five_joins(self):
+        lines = ["((((((((", "a", "b", "c", "d", "e", "f", "g"]
+        assert ue._rejoin_open_parens(lines) == ["(((((((( a b c d e", "f", "g"]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 3: склейка единиц и имён на последней строке               ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+class TestRejoinLastLine:
+
+    def test_broken_unit_without_tail(self):
+        assert ue._rejoin_broken_units(["Лейкоциты 6.1 x10*9/"]) == ["Лейкоциты 6.1 x10*9/"]
+
+    def test_broken_unit_tail_is_last_line(self):
+        assert ue._rejoin_broken_units(["Лейкоциты 6.1 x10*9/", "л"]) == ["Лейкоциты 6.1 x10*9/л"]
+
+    def test_name_without_tail(self):
+        assert ue._rejoin_broken_names(["Средний объем эритроцитов"]) == ["Средний объем эритроцитов"]
+
+    def test_name_code_tail_is_last_line(self):
+        assert ue._rejoin_broken_names(["87.3", "Средний объем эритроцитов", "(MCV)"]) == [
+            "87.3", "Средний объем эритроцитов (MCV)",
+        ]
+
+    def test_name_word_tail_is_last_line(self):
+        assert ue._rejoin_broken_names(["Среднее содержание", "Hb"]) == ["Среднее содержание Hb"]
+
+
+# ╔══════════════════════════════════════════════════════════════════╗
+# ║ Тест 4: конвейер целиком                                        ║
+# ╚══════════════════════════════════════════════════════════════════╝
+
+def _by_stages(raw_text):
+    lines = ue._prepared_lines(raw_text)
+    for stage in (ue._rejoin_broken_units, ue._preclean_citilab_format, ue._rejoin_open_parens,
+                  ue._rejoin_fragmented_lines, ue._strip_gemotest_markers, ue._rejoin_broken_names):
+        lines = stage(lines)
+    lines = [ln for ln in lines if not ue._is_scale_annotation(ln)]
+    return ue._dedup_candidates(ue._multi_line_candidates(lines) + ue._one_line_pass(lines))
+
+
+@pytest.mark.parametrize("text", [GEMOTEST_TEXT, FIXTURE_TEXT], ids=["gemotest", "medsi_fixture"])
+def test_pipeline_is_stage_composition(text):
+    with contextlib.redirect_stderr(io.StringIO()):
+        got = ue.universal_extract_candidates(text)
+        expected = _by_stages(text)
+    assert got
+    assert [(c.to_tsv(), c.span) for c in got] == [(c.to_tsv(), c.span) for c in expected]
@@ -8,6 +8,7 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from parsers.candidates import Candidate
 from parsers.lab_detector import detect_lab, LabType
 
 
@@ -21,12 +22,12 @@ class TestUnknownNeverCallsHelix:
         assert result.lab_type == LabType.UNKNOWN
 
     def test_unknown_does_not_call_helix_parser(self):
-        """При UNKNOWN _smart_to_candidates НЕ вызывает helix_table_to_candidates."""
+        """При UNKNOWN _smart_to_candidates НЕ вызывает helix_table_candidates."""
         from engine import _smart_to_candidates
 
         text = "Гемоглобин 145 г/л 120-160\nЛейкоциты 5.2 10^9/л 4.0-9.0"
 
-        with patch("engine.helix_table_to_candidates") as mock_helix:
+        with patch("engine.helix_table_candidates") as mock_helix:
             _smart_to_candidates(text)
             mock_helix.assert_not_called()
 
@@ -36,19 +37,20 @@ class TestUnknownNeverCallsHelix:
 
         text = "какой-то абсолютно неразборчивый текст ъъъъ"
 
-        with patch("engine.helix_table_to_candidates") as mock_helix:
+        with patch("engine.helix_table_candidates") as mock_helix:
             result = _smart_to_candidates(text)
             mock_helix.assert_not_called()
             assert result == ""
 
     def test_helix_called_only_when_detected_as_helix(self):
-        """helix_table_to_candidates вызывается ТОЛЬКО при LabType.HELIX."""
+        """helix_table_candidates вызывается ТОЛЬКО при LabType.HELIX."""
         from engine import _smart_to_candidates
 
         # Текст с Helix-сигнатурами
         helix_text = "helix.ru\nИсследование\tРезультат\nWBC\t5.0"
 
-        with patch("engine.helix_table_to_candidates", return_value="WBC\t5.0\t10^9/л\t\t") as mock_helix:
+        with patch("engine.helix_table_candidates",
+                   return_value=[Candidate("WBC", 5.0, "10^9/л", "", strip_tsv=False)]) as mock_helix:
             _smart_to_candidates(helix_text)
             mock_helix.assert_called_once()
 